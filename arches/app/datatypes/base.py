@@ -251,6 +251,20 @@ class BaseDataType(object):
             if display_value:
                 return str(display_value)
 
+    def get_display_values(self, pairs, **kwargs):
+        """
+        Returns the display values of a list of (tile, node) pairs, in the same order
+        Datatypes that look their values up elsewhere should override this
+        to look up the values of all the pairs at once
+
+        Keyword Arguments:
+        pairs -- a list of (tile, node) tuples where node is of this datatype
+        kwargs -- passed on to get_display_value
+
+        """
+
+        return [self.get_display_value(tile, node, **kwargs) for tile, node in pairs]
+
     def get_search_terms(self, nodevalue, nodeid=None):
         """
         Returns an array of arches.app.search_term.SearchTerm objects
@@ -435,6 +449,19 @@ class BaseDataType(object):
             return [nodevalue]
         return nodevalue
 
+    def warm_cache(self, tiles, nodeids):
+        """
+        Called with a batch of tiles before their values are indexed so that datatypes
+        which look their values up elsewhere can fetch them all at once
+
+        Keyword Arguments:
+        tiles -- a list of tiles
+        nodeids -- the ids (as strings) of the nodes of this datatype
+
+        """
+
+        pass
+
     def ignore_keys(self):
         """
         Each entry returned in the array is a string, consisting of the combination of two full URIs
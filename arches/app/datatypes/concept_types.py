@@ -6,11 +6,11 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.utils.translation import gettext as _
 from arches.app.models import models
 from arches.app.models import concept
-from django.core.cache import cache
 from arches.app.models.system_settings import settings
 from arches.app.datatypes.base import BaseDataType
 from arches.app.datatypes.datatypes import DataTypeFactory, get_value_from_jsonld
 from arches.app.models.concept import (
+    CONCEPT_CACHE_VERSION_KEY,
     get_preflabel_from_valueid,
     get_preflabel_from_conceptid,
     get_valueids_from_concept_label,
@@ -25,6 +25,7 @@ from arches.app.search.elasticsearch_dsl_builder import (
     Terms,
 )
 from arches.app.utils.date_utils import ExtendedDateFormat
+from arches.app.utils.graph_cache import VersionedLRUDict, get_version_cache_alias
 
 # for the RDF graph export helper functions
 from rdflib import Namespace, URIRef, Literal, BNode
@@ -43,13 +44,40 @@ logger = logging.getLogger(__name__)
 class BaseConceptDataType(BaseDataType):
     def __init__(self, model=None):
         super(BaseConceptDataType, self).__init__(model=model)
-        self.value_lookup = {}
-        self.collection_lookup = {}
-        self.collection_by_node_lookup = {}
+        # datatype instances live as long as the process, so these are bounded, expire
+        # and are emptied in every process whenever a concept is saved, deleted or reindexed
+        self.value_lookup = self.get_versioned_dict(settings.CONCEPT_VALUE_CACHE_SIZE)
+        self.concept_dates_lookup = self.get_versioned_dict(
+            settings.CONCEPT_VALUE_CACHE_SIZE
+        )
+        self.collection_lookup = self.get_versioned_dict(
+            settings.CONCEPT_COLLECTION_CACHE_SIZE
+        )
+        self.collection_by_node_lookup = self.get_versioned_dict(
+            settings.CONCEPT_COLLECTION_CACHE_SIZE
+        )
+
+    def get_versioned_dict(self, maxsize):
+        return VersionedLRUDict(
+            CONCEPT_CACHE_VERSION_KEY,
+            maxsize=maxsize,
+            timeout=settings.CONCEPT_VALUE_CACHE_TIMEOUT,
+            cache_alias=get_version_cache_alias(),
+        )
+
+    def get_cache_stats(self):
+        return {
+            "value_lookup": self.value_lookup.stats(),
+            "concept_dates_lookup": self.concept_dates_lookup.stats(),
+            "collection_lookup": self.collection_lookup.stats(),
+            "collection_by_node_lookup": self.collection_by_node_lookup.stats(),
+        }
 
     def lookup_label(self, label, collectionid):
         ret = label
-        collection_values = self.collection_lookup[collectionid]
+        collection_values = self.collection_lookup.get(collectionid)
+        if collection_values is None:
+            raise KeyError(collectionid)
         for concept in collection_values:
             if concept[1] in (label, label.strip()):
                 ret = concept[2]
@@ -60,31 +88,72 @@ class BaseConceptDataType(BaseDataType):
             collectionid = config["rdmCollection"]
         elif "nodeid" in config:
             nodeid = config["nodeid"]
-            if nodeid in self.collection_by_node_lookup:
-                collectionid = self.collection_by_node_lookup[nodeid]
-            else:
+            collectionid = self.collection_by_node_lookup.get(nodeid)
+            if collectionid is None:
                 collectionid = models.Node.objects.get(nodeid=nodeid).config[
                     "rdmCollection"
                 ]
-                self.collection_by_node_lookup[nodeid] = collectionid
+                self.collection_by_node_lookup.set(nodeid, collectionid)
         try:
             result = self.lookup_label(value, collectionid)
         except KeyError:
-            self.collection_lookup[collectionid] = Concept().get_child_collections(
-                collectionid
+            self.collection_lookup.set(
+                collectionid, Concept().get_child_collections(collectionid)
             )
             result = self.lookup_label(value, collectionid)
         return result
 
     def get_value(self, valueid):
-        try:
-            return self.value_lookup[valueid]
-        except:
+        value = self.value_lookup.get(str(valueid))
+        if value is None:
             try:
-                self.value_lookup[valueid] = models.Value.objects.get(pk=valueid)
-                return self.value_lookup[valueid]
+                value = models.Value.objects.get(pk=valueid)
+                self.value_lookup.set(str(valueid), value)
             except ObjectDoesNotExist:
                 return models.Value()
+        return value
+
+    def prefetch_values(self, valueids):
+        """
+        Loads the values (and the date ranges of their concepts) that aren't yet cached
+        with one query each, eg: before indexing a batch of tiles
+
+        Keyword Arguments:
+        valueids -- a list of value ids
+
+        """
+
+        missing = []
+        for valueid in {str(valueid) for valueid in valueids if valueid}:
+            if self.value_lookup.get(valueid) is None:
+                try:
+                    missing.append(str(uuid.UUID(valueid)))
+                except ValueError:
+                    pass
+        if missing:
+            for value in models.Value.objects.filter(pk__in=missing):
+                self.value_lookup.set(str(value.pk), value)
+        values = [
+            self.value_lookup.get(str(valueid)) for valueid in valueids if valueid
+        ]
+        self.prefetch_concept_dates([value.concept_id for value in values if value])
+
+    def warm_cache(self, tiles, nodeids):
+        valueids = []
+        for tile in tiles:
+            data = tile["data"] if isinstance(tile, dict) else tile.data
+            for nodeid in nodeids:
+                valueids.extend(self.get_nodevalues(data.get(nodeid)))
+        self.prefetch_values(valueids)
+
+    def get_display_values(self, pairs, **kwargs):
+        valueids = []
+        for tile, node in pairs:
+            data = self.get_tile_data(tile)
+            if data:
+                valueids.extend(self.get_nodevalues(data.get(str(node.nodeid))))
+        self.prefetch_values(valueids)
+        return super().get_display_values(pairs, **kwargs)
 
     def get_concept_export_value(self, valueid, concept_export_value_type=None):
         ret = ""
@@ -102,29 +171,45 @@ class BaseConceptDataType(BaseDataType):
             ret = valueid
         return ret
 
-    def get_concept_dates(self, concept):
-        result = None
-        date_range = {}
-        cache_value = cache.get("concept-" + str(concept.conceptid), "no result")
-        if cache_value == "no result":
-            values = models.Value.objects.filter(concept=concept)
-            for value in values:
-                if value.valuetype.valuetype in ("min_year" "max_year"):
-                    date_range[value.valuetype.valuetype] = value.value
-            if "min_year" in date_range and "max_year" in date_range:
-                result = date_range
-            cache.set("concept-" + str(concept.conceptid), result, 500)
-            cache_value = result
-        else:
-            return cache_value
+    def prefetch_concept_dates(self, conceptids):
+        """
+        Loads the date ranges of the concepts that aren't yet cached with one query
 
-        return cache_value
+        Keyword Arguments:
+        conceptids -- a list of concept ids
+
+        """
+
+        missing = [
+            conceptid
+            for conceptid in {str(conceptid) for conceptid in conceptids if conceptid}
+            if self.concept_dates_lookup.get(conceptid) is None
+        ]
+        if missing:
+            date_ranges = {conceptid: {} for conceptid in missing}
+            for conceptid, valuetype, value in models.Value.objects.filter(
+                concept_id__in=missing, valuetype_id__in=("min_year", "max_year")
+            ).values_list("concept_id", "valuetype_id", "value"):
+                date_ranges[str(conceptid)][valuetype] = value
+            for conceptid, date_range in date_ranges.items():
+                # an empty dict records that the concept has no date range
+                self.concept_dates_lookup.set(conceptid, date_range)
+
+    def get_concept_dates(self, concept):
+        if concept is None:
+            return None
+        conceptid = str(getattr(concept, "conceptid", concept))
+        self.prefetch_concept_dates([conceptid])
+        date_range = self.concept_dates_lookup.get(conceptid)
+        if date_range and "min_year" in date_range and "max_year" in date_range:
+            return date_range
+        return None
 
     def append_to_document(self, document, nodevalue, nodeid, tile, provisional=False):
         nodevalue = self.get_nodevalues(nodevalue)
         for valueid in nodevalue:
             value = self.get_value(valueid)
-            date_range = self.get_concept_dates(value.concept)
+            date_range = self.get_concept_dates(value.concept_id)
             if date_range is not None:
                 min_date = ExtendedDateFormat(date_range["min_year"]).lower
                 max_date = ExtendedDateFormat(date_range["max_year"]).upper
@@ -21,7 +21,10 @@ from django.db.models import fields
 from arches.app.const import ExtensionType
 from arches.app.datatypes.base import BaseDataType
 from arches.app.models import models
-from arches.app.models.concept import get_preflabel_from_valueid
+from arches.app.models.concept import (
+    get_preflabel_from_valueid,
+    get_preflabels_from_valueids,
+)
 from arches.app.models.system_settings import settings
 from arches.app.models.fields.i18n import I18n_JSONField, I18n_String
 from arches.app.utils.date_utils import ExtendedDateFormat
@@ -116,6 +119,30 @@ class DataTypeFactory(object):
             self.datatype_instances = DataTypeFactory._datatype_instances
         return datatype_instance
 
+    def get_display_values(self, pairs, **kwargs):
+        """
+        Returns the display values of a list of (tile, node) pairs, in the same order,
+        the values of the nodes of each datatype are looked up together
+
+        Keyword Arguments:
+        pairs -- a list of (tile, node) tuples
+        kwargs -- passed on to each datatype's get_display_values
+
+        """
+
+        indexes_by_datatype = {}
+        for index, (tile, node) in enumerate(pairs):
+            indexes_by_datatype.setdefault(node.datatype, []).append(index)
+
+        display_values = [None] * len(pairs)
+        for datatype, indexes in indexes_by_datatype.items():
+            values = self.get_instance(datatype).get_display_values(
+                [pairs[index] for index in indexes], **kwargs
+            )
+            for index, value in zip(indexes, values):
+                display_values[index] = value
+        return display_values
+
 
 class StringDataType(BaseDataType):
     def validate(
@@ -2128,6 +2155,48 @@ class ResourceInstanceDataType(BaseDataType):
                 logger.info(f'Resource with id "{resourceid}" not in the system.')
         return ", ".join(items)
 
+    def get_display_values(self, pairs, **kwargs):
+        from arches.app.models.resource import (
+            Resource,
+        )  # import here rather than top to avoid circular import
+
+        nodevalues = []
+        resourceids = set()
+        for tile, node in pairs:
+            data = self.get_tile_data(tile)
+            nodevalue = self.get_nodevalues(data[str(node.nodeid)])
+            nodevalues.append(nodevalue)
+            for resourceXresource in nodevalue:
+                try:
+                    resourceids.add(str(uuid.UUID(resourceXresource["resourceId"])))
+                except (AttributeError, TypeError, KeyError, ValueError):
+                    pass
+
+        displaynames = {
+            str(resourceid): related_resource.displayname()
+            for resourceid, related_resource in Resource.objects.in_bulk(
+                resourceids
+            ).items()
+        }
+
+        display_values = []
+        for nodevalue in nodevalues:
+            items = []
+            for resourceXresource in nodevalue:
+                try:
+                    resourceid = resourceXresource["resourceId"]
+                except (TypeError, KeyError):
+                    continue
+                try:
+                    displayname = displaynames[str(uuid.UUID(resourceid))]
+                except (AttributeError, TypeError, ValueError, KeyError):
+                    logger.info(f'Resource with id "{resourceid}" not in the system.')
+                    continue
+                if displayname is not None:
+                    items.append(displayname)
+            display_values.append(", ".join(items))
+        return display_values
+
     def get_relationship_display_value(self, relationship_valueid):
         preflabel = get_preflabel_from_valueid(relationship_valueid, get_language())
         if preflabel:
@@ -2135,6 +2204,30 @@ class ResourceInstanceDataType(BaseDataType):
         else:
             return None
 
+    def get_relationship_display_values(self, nodevalue):
+        """
+        Returns the labels of the ontology properties of a list of relationships keyed by valueid
+        The labels of all the relationships are looked up together
+
+        """
+
+        valueids = []
+        for relatedResourceItem in nodevalue:
+            for ontology_property_item in [
+                relatedResourceItem.get("ontologyProperty", ""),
+                relatedResourceItem.get("inverseOntologyProperty", ""),
+            ]:
+                try:
+                    valueids.append(str(uuid.UUID(ontology_property_item)))
+                except (AttributeError, TypeError, ValueError):
+                    pass
+        if not valueids:
+            return {}
+        preflabels = get_preflabels_from_valueids(valueids, get_language())
+        return {
+            valueid: preflabel["value"] for valueid, preflabel in preflabels.items()
+        }
+
     def to_json(self, tile, node):
         from arches.app.models.resource import (
             Resource,
@@ -2155,6 +2248,7 @@ class ResourceInstanceDataType(BaseDataType):
 
     def append_to_document(self, document, nodevalue, nodeid, tile, provisional=False):
         nodevalue = self.get_nodevalues(nodevalue)
+        relationship_labels = self.get_relationship_display_values(nodevalue)
         for relatedResourceItem in nodevalue:
             relationship = None
             document["ids"].append(
@@ -2178,10 +2272,9 @@ class ResourceInstanceDataType(BaseDataType):
             ]:
                 if ontology_property_item != "":
                     try:
-                        uuid.UUID(ontology_property_item)
+                        valueid = str(uuid.UUID(ontology_property_item))
                         relationship = (
-                            self.get_relationship_display_value(ontology_property_item)
-                            or ontology_property_item
+                            relationship_labels.get(valueid) or ontology_property_item
                         )
                     except ValueError:
                         relationship = ontology_property_item
@@ -2196,6 +2289,7 @@ class ResourceInstanceDataType(BaseDataType):
     def get_search_terms(self, nodevalue, nodeid=None):
         terms = []
         nodevalue = self.get_nodevalues(nodevalue)
+        relationship_labels = self.get_relationship_display_values(nodevalue)
         for relatedResourceItem in nodevalue:
             if relatedResourceItem.get("resourceName", "") != "":
                 terms.append(
@@ -2207,10 +2301,9 @@ class ResourceInstanceDataType(BaseDataType):
             ]:
                 if ontology_property_item != "":
                     try:
-                        uuid.UUID(ontology_property_item)
+                        valueid = str(uuid.UUID(ontology_property_item))
                         relationship = (
-                            self.get_relationship_display_value(ontology_property_item)
-                            or ontology_property_item
+                            relationship_labels.get(valueid) or ontology_property_item
                         )
                         terms.append(SearchTerm(value=relationship, lang=""))
                     except ValueError:
@@ -13,6 +13,16 @@ class BaseFunction(object):
     def post_save(self, *args, **kwargs):
         raise NotImplementedError
 
+    # called by Tile.bulk_save with the tiles of one nodegroup in place of save
+    def bulk_save(self, tiles, request, context=None):
+        for tile in tiles:
+            self.save(tile, request, context=context)
+
+    # called by Tile.bulk_save with the tiles of one nodegroup in place of post_save
+    def bulk_post_save(self, tiles, request, context=None):
+        for tile in tiles:
+            self.post_save(tile, request, context=context)
+
     def delete(self, *args, **kwargs):
         raise NotImplementedError
 
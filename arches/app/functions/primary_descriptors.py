@@ -4,10 +4,97 @@ from arches.app.utils.betterJSONSerializer import JSONSerializer
 from arches.app.functions.base import BaseFunction
 from arches.app.models import models
 from arches.app.datatypes.datatypes import DataTypeFactory
+from arches.app.utils.graph_cache import LRUDict, published_graph_cache
 from django.utils.translation import gettext as _
 
 logger = logging.getLogger(__name__)
 
+# CompiledDescriptorTemplates keyed by (publicationid, nodegroupid, string_template)
+compiled_templates = LRUDict(maxsize=1024)
+
+
+class CompiledDescriptorTemplate(object):
+    """
+    A descriptor's string_template with its <node name> placeholders resolved to the nodes
+    (and datatypes) of the descriptor's nodegroup
+
+    """
+
+    def __init__(self, string_template, nodes, datatype_factory=None):
+        if datatype_factory is None:
+            datatype_factory = DataTypeFactory()
+        self.string_template = string_template
+        self.nodeids = set()
+        self.placeholders = []
+        for node in nodes:
+            self.nodeids.add(str(node.nodeid))
+            placeholder = "<%s>" % node.name
+            if placeholder in string_template:
+                self.placeholders.append(
+                    (
+                        placeholder,
+                        str(node.nodeid),
+                        node,
+                        datatype_factory.get_instance(node.datatype),
+                    )
+                )
+
+    def render(self, tile, language=None):
+        """
+        Returns the template rendered from the data of a tile and whether
+        any node of the nodegroup had data in the tile
+
+        """
+
+        data = {}
+        if tile.data:
+            data = tile.data
+        elif tile.provisionaledits is not None and len(tile.provisionaledits) == 1:
+            userid = list(tile.provisionaledits.keys())[0]
+            data = tile.provisionaledits[userid]["value"]
+
+        result = self.string_template
+        updated = not self.nodeids.isdisjoint(data)
+        for placeholder, nodeid, node, datatype in self.placeholders:
+            if nodeid in data:
+                value = datatype.get_display_value(tile, node, language=language)
+                if value is None:
+                    value = ""
+                result = result.replace(placeholder, str(value))
+        return result, updated
+
+
+def get_compiled_template(graphid, nodegroupid, string_template):
+    """
+    Returns the CompiledDescriptorTemplate of a descriptor, it is compiled once
+    per publication of the graph (and every time for unpublished graphs)
+
+    """
+
+    publicationid = published_graph_cache.get_publicationid(graphid)
+    if publicationid is None:
+        return CompiledDescriptorTemplate(
+            string_template, models.Node.objects.filter(nodegroup_id=nodegroupid)
+        )
+
+    structure = published_graph_cache.get_structure(graphid)
+    key = (str(publicationid), str(nodegroupid), string_template)
+    entry = compiled_templates.get(key)
+    # the entry is only valid for the structure it was compiled from
+    if entry is not None and entry[0] is structure:
+        return entry[1]
+
+    compiled_template = CompiledDescriptorTemplate(
+        string_template,
+        [
+            node
+            for node in structure.nodes.values()
+            if str(node.nodegroup_id) == str(nodegroupid)
+        ],
+    )
+    compiled_templates.set(key, (structure, compiled_template))
+    return compiled_template
+
 
 class AbstractPrimaryDescriptorsFunction(BaseFunction):
     def get_primary_descriptor_from_nodes(
@@ -40,7 +127,6 @@ class PrimaryDescriptorsFunction(AbstractPrimaryDescriptorsFunction):
         descriptor -- type of descriptor, e.g. "name", "map_popup", or "description"
         """
 
-        datatype_factory = None
         language = (
             context["language"]
             if (context is not None and "language" in context)
@@ -55,45 +141,17 @@ class PrimaryDescriptorsFunction(AbstractPrimaryDescriptorsFunction):
                 and config["nodegroup_id"] != ""
                 and config["nodegroup_id"] is not None
             ):
-                tile = context.get("tile")
-
-                if not tile or tile.sortorder:
-                    tile = (
-                        models.TileModel.objects.filter(
-                            nodegroup_id=uuid.UUID(config["nodegroup_id"])
-                        )
-                        .filter(resourceinstance_id=resource.resourceinstanceid)
-                        .order_by("sortorder")
-                        .first()
-                    )
+                nodegroupid = uuid.UUID(config["nodegroup_id"])
+                tile = self.get_descriptor_tile(resource, nodegroupid, context)
 
                 if not tile:  # tile has been deleted
                     result = ""
                     updated = True
                 else:
-                    for node in models.Node.objects.filter(
-                        nodegroup_id=uuid.UUID(config["nodegroup_id"])
-                    ):
-                        data = {}
-                        if len(list(tile.data.keys())) > 0:
-                            data = tile.data
-                        elif (
-                            tile.provisionaledits is not None
-                            and len(list(tile.provisionaledits.keys())) == 1
-                        ):
-                            userid = list(tile.provisionaledits.keys())[0]
-                            data = tile.provisionaledits[userid]["value"]
-                        if str(node.nodeid) in data:
-                            if not datatype_factory:
-                                datatype_factory = DataTypeFactory()
-                            datatype = datatype_factory.get_instance(node.datatype)
-                            value = datatype.get_display_value(
-                                tile, node, language=language
-                            )
-                            if value is None:
-                                value = ""
-                            result = result.replace("<%s>" % node.name, str(value))
-                            updated = True
+                    template = get_compiled_template(
+                        resource.graph_id, nodegroupid, result
+                    )
+                    result, updated = template.render(tile, language=language)
         except ValueError:
             logger.error(
                 _(
@@ -109,3 +167,42 @@ class PrimaryDescriptorsFunction(AbstractPrimaryDescriptorsFunction):
                 pass
 
         return result
+
+    def get_descriptor_tile(self, resource, nodegroupid, context=None):
+        """
+        Returns the tile to calculate a descriptor from, either the tile in the context
+        or the first tile of the nodegroup, read from resource.tiles when they are loaded
+
+        """
+
+        tile = context.get("tile") if context is not None else None
+        if tile and not tile.sortorder:
+            return tile
+
+        resource_tiles = getattr(resource, "tiles", None)
+        if resource_tiles:
+            tiles = [
+                tile
+                for tile in flatten_tiles(resource_tiles)
+                if str(tile.nodegroup_id) == str(nodegroupid)
+            ]
+            if not tiles:
+                return None
+            # sorted the same as order_by("sortorder"), nulls last
+            return min(
+                tiles,
+                key=lambda tile: (tile.sortorder is None, tile.sortorder or 0),
+            )
+
+        return (
+            models.TileModel.objects.filter(nodegroup_id=nodegroupid)
+            .filter(resourceinstance_id=resource.resourceinstanceid)
+            .order_by("sortorder")
+            .first()
+        )
+
+
+def flatten_tiles(tiles):
+    for tile in tiles:
+        yield tile
+        yield from flatten_tiles(getattr(tile, "tiles", None) or [])
@@ -22,13 +22,18 @@ import copy
 from operator import itemgetter
 from operator import methodcaller
 from django.db import transaction, connection
-from django.db.models import Q
+from django.db.models import Count, Q
 from arches.app.models import models
 from arches.app.models.system_settings import settings
 from arches.app.search.search_engine_factory import SearchEngineInstance as se
 from arches.app.search.elasticsearch_dsl_builder import Term, Query, Bool, Match, Terms
 from arches.app.search.mappings import CONCEPTS_INDEX
 from arches.app.utils.betterJSONSerializer import JSONSerializer, JSONDeserializer
+from arches.app.utils.graph_cache import (
+    VersionedLRUDict,
+    get_version_cache_alias,
+    invalidate_version,
+)
 from arches.app.utils.i18n import capitalize_region, rank_label
 from django.utils.translation import get_language, gettext as _
 from django.db import IntegrityError
@@ -125,8 +130,12 @@ class Concept(object):
         pathway_filter=None,
         **kwargs,
     ):
+        _loader = kwargs.pop("_loader", None)
         if id != "":
-            self.load(models.Concept.objects.get(pk=id))
+            if _loader is not None and str(id) in _loader.concepts:
+                self.load(_loader.concepts[str(id)])
+            else:
+                self.load(models.Concept.objects.get(pk=id))
         elif legacyoid != "":
             self.load(models.Concept.objects.get(legacyoid=legacyoid))
 
@@ -163,6 +172,21 @@ class Concept(object):
                 up_depth_limit if up_depth_limit is None else int(up_depth_limit)
             )
 
+            if _loader is None and (include_subconcepts or include_parentconcepts):
+                # load the whole tree up front, the recursive calls below then need no queries
+                _loader = ConceptGraphLoader(
+                    self.id,
+                    pathway_filter,
+                    depth_limit=(
+                        None if depth_limit is None else depth_limit - downlevel
+                    ),
+                    up_depth_limit=(
+                        None if up_depth_limit is None else up_depth_limit - uplevel
+                    ),
+                    include_subconcepts=include_subconcepts,
+                    include_parentconcepts=include_parentconcepts,
+                )
+
             if include is not None:
                 if len(include) > 0 and len(exclude) > 0:
                     raise Exception(
@@ -171,29 +195,45 @@ class Concept(object):
                 include = (
                     include
                     if len(include) != 0
-                    else models.DValueType.objects.distinct("category").values_list(
-                        "category", flat=True
+                    else (
+                        _loader.get_value_categories()
+                        if _loader is not None
+                        else models.DValueType.objects.distinct("category").values_list(
+                            "category", flat=True
+                        )
                     )
                 )
                 include = set(include).difference(exclude)
                 exclude = []
 
                 if len(include) > 0:
-                    values = models.Value.objects.filter(concept=self.id)
+                    values = _loader.get_values(self.id) if _loader else None
+                    if values is None:
+                        values = models.Value.objects.filter(
+                            concept=self.id
+                        ).select_related("valuetype")
                     for value in values:
                         if value.valuetype.category in include:
                             self.values.append(ConceptValue(value))
 
-            hassubconcepts = models.Relation.objects.filter(
-                Q(conceptfrom=self.id), pathway_filter, ~Q(relationtype="related")
-            )[0:1]
-            if len(hassubconcepts) > 0:
+            hassubconcepts = _loader.has_subconcepts(self.id) if _loader else None
+            if hassubconcepts is None:
+                hassubconcepts = models.Relation.objects.filter(
+                    Q(conceptfrom=self.id), pathway_filter, ~Q(relationtype="related")
+                ).exists()
+            if hassubconcepts:
                 self.hassubconcepts = True
 
             if include_subconcepts:
-                conceptrealations = models.Relation.objects.filter(
-                    Q(conceptfrom=self.id), pathway_filter, ~Q(relationtype="related")
+                conceptrealations = (
+                    _loader.get_subconcept_relations(self.id) if _loader else None
                 )
+                if conceptrealations is None:
+                    conceptrealations = models.Relation.objects.filter(
+                        Q(conceptfrom=self.id),
+                        pathway_filter,
+                        ~Q(relationtype="related"),
+                    )
                 if depth_limit is None or downlevel < depth_limit:
                     if depth_limit is not None:
                         downlevel = downlevel + 1
@@ -216,6 +256,7 @@ class Concept(object):
                                 semantic=semantic,
                                 pathway_filter=pathway_filter,
                                 _cache=_cache.copy(),
+                                _loader=_loader,
                                 lang=lang,
                             )
                         )
@@ -233,9 +274,15 @@ class Concept(object):
                     #     'get_sortkey', lang=lang), reverse=False)
 
             if include_parentconcepts:
-                conceptrealations = models.Relation.objects.filter(
-                    Q(conceptto=self.id), pathway_filter, ~Q(relationtype="related")
+                conceptrealations = (
+                    _loader.get_parentconcept_relations(self.id) if _loader else None
                 )
+                if conceptrealations is None:
+                    conceptrealations = models.Relation.objects.filter(
+                        Q(conceptto=self.id),
+                        pathway_filter,
+                        ~Q(relationtype="related"),
+                    )
                 if up_depth_limit is None or uplevel < up_depth_limit:
                     if up_depth_limit is not None:
                         uplevel = uplevel + 1
@@ -258,6 +305,7 @@ class Concept(object):
                                 semantic=semantic,
                                 pathway_filter=pathway_filter,
                                 _cache=_cache.copy(),
+                                _loader=_loader,
                                 lang=lang,
                             )
                         )
@@ -350,6 +398,7 @@ class Concept(object):
 
                 child_concepts.traverse(applyRelationship)
 
+        invalidate_concept_caches()
         return concept
 
     def delete(self, delete_self=False):
@@ -462,6 +511,7 @@ class Concept(object):
                         node.save()
 
                 models.Concept.objects.get(pk=key).delete()
+        invalidate_concept_caches()
         return
 
     def add_relation(self, concepttorelate, relationtype):
@@ -1046,47 +1096,49 @@ class Concept(object):
             subconcept.index(scheme=scheme)
 
     def bulk_index(self):
-        concept_docs = []
+        """
+        Indexes the labels of this concept (or concept scheme) and every concept below it,
+        the documents are streamed to elasticsearch in batches as they are read
 
-        if self.nodetype == "ConceptScheme":
-            concept = Concept().get(id=self.id, values=["label"])
-            concept.index()
-            for topConcept in self.get_child_concepts_for_indexing(
-                self.id, depth_limit=1
-            ):
-                concept = Concept().get(id=topConcept["conceptid"])
-                scheme = concept.get_context()
-                topConcept["top_concept"] = scheme.id
-                concept_docs.append(
-                    se.create_bulk_item(
+        """
+
+        with se.BulkIndexer(batch_size=settings.BULK_IMPORT_BATCH_SIZE) as indexer:
+            if self.nodetype == "ConceptScheme":
+                concept = Concept().get(id=self.id, values=["label"])
+                concept.index()
+                # the context (see get_context) of a top concept is the top concept itself
+                topconceptids = []
+                for topConcept in self.get_child_concepts_for_indexing(
+                    self.id, depth_limit=1
+                ):
+                    topConcept["top_concept"] = topConcept["conceptid"]
+                    indexer.add(
                         index=CONCEPTS_INDEX, id=topConcept["id"], data=topConcept
                     )
-                )
-                for childConcept in concept.get_child_concepts_for_indexing(
-                    topConcept["conceptid"]
-                ):
-                    childConcept["top_concept"] = scheme.id
-                    concept_docs.append(
-                        se.create_bulk_item(
+                    if topConcept["conceptid"] not in topconceptids:
+                        topconceptids.append(topConcept["conceptid"])
+                for topconceptid in topconceptids:
+                    for childConcept in self.get_child_concepts_for_indexing(
+                        topconceptid
+                    ):
+                        childConcept["top_concept"] = topconceptid
+                        indexer.add(
                             index=CONCEPTS_INDEX,
                             id=childConcept["id"],
                             data=childConcept,
                         )
-                    )
 
-        if self.nodetype == "Concept":
-            concept = Concept().get(id=self.id, values=["label"])
-            scheme = concept.get_context()
-            concept.index(scheme)
-            for childConcept in concept.get_child_concepts_for_indexing(self.id):
-                childConcept["top_concept"] = scheme.id
-                concept_docs.append(
-                    se.create_bulk_item(
+            if self.nodetype == "Concept":
+                concept = Concept().get(id=self.id, values=["label"])
+                scheme = concept.get_context()
+                concept.index(scheme)
+                for childConcept in concept.get_child_concepts_for_indexing(self.id):
+                    childConcept["top_concept"] = scheme.id
+                    indexer.add(
                         index=CONCEPTS_INDEX, id=childConcept["id"], data=childConcept
                     )
-                )
 
-        se.bulk_index(concept_docs)
+        invalidate_concept_caches()
 
     def delete_index(self, delete_self=False):
         def delete_concept_values_index(concepts_to_delete):
@@ -1103,6 +1155,7 @@ class Concept(object):
             for subconcept in self.subconcepts:
                 concepts_to_delete = Concept.gather_concepts_to_delete(subconcept)
                 delete_concept_values_index(concepts_to_delete)
+        invalidate_concept_caches()
 
     def concept_tree(
         self,
@@ -1119,57 +1172,77 @@ class Concept(object):
                 self.load_on_demand = False
                 self.children = []
 
-        def _findNarrowerConcept(conceptid, depth_limit=None, level=0):
-            labels = models.Value.objects.filter(concept=conceptid)
-            ret = concept()
-            temp = Concept()
-            for label in labels:
-                temp.addvalue(label)
-                if label.valuetype_id == "sortorder":
-                    try:
-                        ret.sortorder = float(label.value)
-                    except:
-                        ret.sortorder = None
-
-            label = temp.get_preflabel(lang=lang)
-            ret.label = label.value
-            ret.id = label.conceptid
-            ret.labelid = label.id
+        if mode == "semantic":
+            pathway_filter = Q(relationtype__category="Semantic Relations") | Q(
+                relationtype__category="Properties"
+            )
+        if mode == "collections":
+            pathway_filter = Q(relationtype="member") | Q(relationtype="hasCollection")
 
-            if mode == "semantic":
-                conceptrealations = models.Relation.objects.filter(
-                    Q(conceptfrom=conceptid),
-                    Q(relationtype__category="Semantic Relations")
-                    | Q(relationtype__category="Properties"),
-                )
-            if mode == "collections":
-                conceptrealations = models.Relation.objects.filter(
-                    Q(conceptfrom=conceptid),
-                    Q(relationtype="member") | Q(relationtype="hasCollection"),
-                )
-            if (
-                depth_limit is not None
-                and len(conceptrealations) > 0
-                and level >= depth_limit
-            ):
-                ret.load_on_demand = True
-            else:
-                if depth_limit is not None:
-                    level = level + 1
-                for relation in conceptrealations:
-                    ret.children.append(
-                        _findNarrowerConcept(
-                            relation.conceptto_id, depth_limit=depth_limit, level=level
-                        )
-                    )
+        def _findNarrowerConcepts(conceptids, depth_limit=None, level=0):
+            """
+            Returns the tree below each concept keyed by conceptid,
+            the values and relations of each level are loaded in one query each
 
-                ret.children = sorted(
-                    ret.children,
-                    key=lambda concept: self.natural_keys(
-                        concept.sortorder if concept.sortorder else concept.label
-                    ),
-                    reverse=False,
+            """
+
+            conceptids = list(dict.fromkeys(str(conceptid) for conceptid in conceptids))
+            labels = {conceptid: [] for conceptid in conceptids}
+            for label in models.Value.objects.filter(
+                concept_id__in=conceptids
+            ).select_related("valuetype"):
+                labels[str(label.concept_id)].append(label)
+            conceptrealations = {conceptid: [] for conceptid in conceptids}
+            for relation in models.Relation.objects.filter(
+                Q(conceptfrom_id__in=conceptids), pathway_filter
+            ):
+                conceptrealations[str(relation.conceptfrom_id)].append(relation)
+
+            expand = depth_limit is None or level < depth_limit
+            children = {}
+            childids = [
+                relation.conceptto_id
+                for relations in conceptrealations.values()
+                for relation in relations
+            ]
+            if expand and childids:
+                children = _findNarrowerConcepts(
+                    childids,
+                    depth_limit=depth_limit,
+                    level=level + 1 if depth_limit is not None else level,
                 )
+
+            ret = {}
+            for conceptid in conceptids:
+                node = concept()
+                temp = Concept()
+                for label in labels[conceptid]:
+                    temp.addvalue(label)
+                    if label.valuetype_id == "sortorder":
+                        try:
+                            node.sortorder = float(label.value)
+                        except:
+                            node.sortorder = None
+
+                label = temp.get_preflabel(lang=lang)
+                node.label = label.value
+                node.id = label.conceptid
+                node.labelid = label.id
+
+                if not expand and len(conceptrealations[conceptid]) > 0:
+                    node.load_on_demand = True
+                elif expand:
+                    node.children = sorted(
+                        [
+                            children[str(relation.conceptto_id)]
+                            for relation in conceptrealations[conceptid]
+                        ],
+                        key=lambda concept: self.natural_keys(
+                            concept.sortorder if concept.sortorder else concept.label
+                        ),
+                        reverse=False,
+                    )
+                ret[conceptid] = node
             return ret
 
         def _findBroaderConcept(conceptid, child_concept, depth_limit=None, level=0):
@@ -1210,18 +1283,26 @@ class Concept(object):
         ):
             if mode == "semantic":
                 concepts = models.Concept.objects.filter(nodetype="ConceptScheme")
-                for conceptmodel in concepts:
-                    graph.append(_findNarrowerConcept(conceptmodel.pk, depth_limit=1))
+                graph = list(
+                    _findNarrowerConcepts(
+                        concepts.values_list("pk", flat=True), depth_limit=1
+                    ).values()
+                )
             if mode == "collections":
                 concepts = models.Concept.objects.filter(nodetype="Collection")
-                for conceptmodel in concepts:
-                    graph.append(_findNarrowerConcept(conceptmodel.pk, depth_limit=0))
+                graph = list(
+                    _findNarrowerConcepts(
+                        concepts.values_list("pk", flat=True), depth_limit=0
+                    ).values()
+                )
 
                 graph = sorted(graph, key=lambda concept: concept.label)
                 # graph = _findNarrowerConcept(concepts[0].pk, depth_limit=1).children
 
         else:
-            graph = _findNarrowerConcept(self.id, depth_limit=1).children
+            graph = _findNarrowerConcepts([self.id], depth_limit=1)[
+                str(self.id)
+            ].children
             # concepts = _findNarrowerConcept(self.id, depth_limit=1)
             # graph = [_findBroaderConcept(self.id, concepts, depth_limit=1)]
 
@@ -1395,30 +1476,35 @@ class Concept(object):
 
         return None
 
+    def get_usage(self):
+        """
+        Returns the ConceptUsage rows of the values of this concept and its (loaded) subconcepts
+
+        """
+
+        return get_concept_usage([concept.id for concept in self.flatten()])
+
     def check_if_concept_in_use(self):
         """Checks  if a concept or any of its subconcepts is in use by a resource instance"""
 
-        in_use = False
-        cursor = connection.cursor()
-        for value in self.values:
-            sql = (
-                """
-                SELECT count(*) from tiles t, jsonb_each_text(t.tiledata) as json_data
-                WHERE json_data.value = '%s'
-            """
-                % value.id
-            )
-            cursor.execute(sql)
-            rows = cursor.fetchall()
-            if rows[0][0] > 0:
-                in_use = True
-                break
-        if in_use is not True:
-            for subconcept in self.subconcepts:
-                in_use = subconcept.check_if_concept_in_use()
-                if in_use == True:
-                    return in_use
-        return in_use
+        return self.get_usage().exists()
+
+    def get_usage_counts(self):
+        """
+        Returns the number of tiles and resource instances using this concept or
+        any of its subconcepts, per node, eg: {nodeid: {"tiles": 2, "resources": 1}}
+
+        """
+
+        return get_concept_usage_counts([concept.id for concept in self.flatten()])
+
+    def get_resources_using(self):
+        """
+        Returns the ids of the resource instances using this concept or any of its subconcepts
+
+        """
+
+        return get_resources_using_concepts([concept.id for concept in self.flatten()])
 
     def get_e55_domain(self, conceptid):
         """
@@ -1477,44 +1563,33 @@ class Concept(object):
                 self.children = []
 
         result = Val(conceptid)
-
-        def _findNarrower(val, path, rec):
-            for conceptid in path:
-                childids = [child.conceptid for child in val.children]
-                if conceptid not in childids:
-                    new_val = Val(rec["conceptidto"])
-                    if rec["vtype"] == "sortorder":
-                        new_val.sortorder = rec["valueto"]
-                    elif rec["vtype"] in ("prefLabel", "altLabel"):
-                        new_val.text = rec["valueto"]
-                        new_val.id = rec["valueidto"]
-                    elif rec["vtype"] == "collector":
-                        new_val.collector = "collector"
-                    val.children.append(new_val)
-                else:
-                    for child in val.children:
-                        if conceptid == child.conceptid:
-                            if conceptid == path[-1]:
-                                if rec["vtype"] == "sortorder":
-                                    child.sortorder = rec["valueto"]
-                                elif rec["vtype"] in ("prefLabel", "altLabel"):
-                                    child.text = rec["valueto"]
-                                    child.id = rec["valueidto"]
-                                elif rec["vtype"] == "collector":
-                                    child.collector = "collector"
-                            path.pop(0)
-                            _findNarrower(child, path, rec)
-                val.children.sort(key=lambda x: (x.sortorder, x.text))
+        # the Val of each concept path, a concept reached by two paths appears twice
+        vals = {(): result}
 
         def best_language_last(rec):
-            """_findNarrower updates via recursive search, so sort the best language last."""
+            """records are applied in turn, so sort the best language last."""
             label_rank = rank_label(kind=rec["vtype"], source_lang=rec["languageid"])
             return (rec["depth"], rec["conceptpath"], label_rank)
 
         records = [dict(list(zip(column_names, row))) for row in rows]
         for rec in sorted(records, key=best_language_last):
-            path = rec["conceptpath"][1:-1].split(",")
-            _findNarrower(result, path, rec)
+            path = tuple(rec["conceptpath"][1:-1].split(","))
+            val = vals.get(path)
+            if val is None:
+                # records are sorted by depth, so the parent path has already been added
+                val = Val(rec["conceptidto"])
+                vals[path[:-1]].children.append(val)
+                vals[path] = val
+            if rec["vtype"] == "sortorder":
+                val.sortorder = rec["valueto"]
+            elif rec["vtype"] in ("prefLabel", "altLabel"):
+                val.text = rec["valueto"]
+                val.id = rec["valueidto"]
+            elif rec["vtype"] == "collector":
+                val.collector = "collector"
+
+        for val in vals.values():
+            val.children.sort(key=lambda x: (x.sortorder, x.text))
 
         return JSONSerializer().serializeToPython(result)["children"]
 
@@ -1547,6 +1622,164 @@ class Concept(object):
         return collection_concept
 
 
+class ConceptGraphLoader(object):
+    """
+    Loads the concepts, values and relations reachable from a concept along a pathway
+    in a few set based queries, so that Concept.get can assemble a whole tree in memory
+
+    Keyword Arguments:
+    conceptid -- the concept to start from
+    pathway_filter -- a Q object filtering the relations to follow
+    depth_limit -- the number of levels of subconcepts to load, None for all
+    up_depth_limit -- the number of levels of parent concepts to load, None for all
+    include_subconcepts -- True to load the subconcepts of the concept
+    include_parentconcepts -- True to load the parent concepts of the concept (and of its subconcepts)
+
+    """
+
+    def __init__(
+        self,
+        conceptid,
+        pathway_filter,
+        depth_limit=None,
+        up_depth_limit=None,
+        include_subconcepts=False,
+        include_parentconcepts=False,
+    ):
+        self.pathway = models.Relation.objects.filter(pathway_filter).exclude(
+            relationtype="related"
+        )
+        self.concepts = {}
+        self.values = {}
+        # the relations out of (or into) each concept, only for the concepts that were expanded
+        self.subconcept_relations = {}
+        self.parentconcept_relations = {}
+        self.subconcepts = set()
+        self.value_categories = None
+
+        conceptid = str(conceptid)
+        conceptids = {conceptid}
+        if include_subconcepts and (depth_limit is None or depth_limit > 0):
+            relations, expanded = self.get_relations(
+                [conceptid], depth_limit, direction="down"
+            )
+            for expanded_conceptid in expanded:
+                self.subconcept_relations[expanded_conceptid] = []
+            for relation in relations:
+                self.subconcept_relations[str(relation.conceptfrom_id)].append(relation)
+                conceptids.add(str(relation.conceptto_id))
+        if include_parentconcepts and (up_depth_limit is None or up_depth_limit > 0):
+            relations, expanded = self.get_relations(
+                list(conceptids), up_depth_limit, direction="up"
+            )
+            for expanded_conceptid in expanded:
+                self.parentconcept_relations[expanded_conceptid] = []
+            for relation in relations:
+                self.parentconcept_relations[str(relation.conceptto_id)].append(
+                    relation
+                )
+                conceptids.add(str(relation.conceptfrom_id))
+
+        for concept in models.Concept.objects.filter(pk__in=conceptids):
+            self.concepts[str(concept.pk)] = concept
+        for conceptid in self.concepts:
+            self.values[conceptid] = []
+        for value in models.Value.objects.filter(
+            concept_id__in=conceptids
+        ).select_related("valuetype"):
+            self.values[str(value.concept_id)].append(value)
+
+        # concepts whose relations were not all loaded need to be checked for subconcepts
+        for conceptid, relations in self.subconcept_relations.items():
+            if relations:
+                self.subconcepts.add(conceptid)
+        unexpanded = [
+            conceptid
+            for conceptid in self.concepts
+            if conceptid not in self.subconcept_relations
+        ]
+        self.subconcepts.update(
+            str(conceptid)
+            for conceptid in self.pathway.filter(conceptfrom_id__in=unexpanded)
+            .order_by()
+            .values_list("conceptfrom_id", flat=True)
+            .distinct()
+        )
+
+    def get_relations(self, conceptids, depth_limit=None, direction="down"):
+        """
+        Returns the pathway relations reachable from concepts going down (to subconcepts)
+        or up (to parent concepts), and the ids of the concepts whose relations were all loaded
+
+        """
+
+        pathway_sql, pathway_params = (
+            self.pathway.order_by()
+            .values("relationid", "conceptfrom", "conceptto", "relationtype")
+            .query.sql_with_params()
+        )
+        start, end, end_field = (
+            ("conceptidfrom", "conceptidto", "conceptto_id")
+            if direction == "down"
+            else ("conceptidto", "conceptidfrom", "conceptfrom_id")
+        )
+        # without a depth limit every level gets depth 1, so that UNION discards the
+        # relations already found and the recursion ends even if the relations form a cycle
+        next_depth = "1" if depth_limit is None else "r.depth + 1"
+        depth_clause = "" if depth_limit is None else "WHERE r.depth < %s"
+        depth_params = [] if depth_limit is None else [depth_limit]
+
+        relations = models.Relation.objects.raw(
+            f"""
+            WITH RECURSIVE pathway AS ({pathway_sql}),
+            reachable AS (
+                SELECT p.relationid, p.conceptidfrom, p.conceptidto, p.relationtype, 1 AS depth
+                FROM pathway p
+                WHERE p.{start} = ANY(%s::uuid[])
+                UNION
+                SELECT p.relationid, p.conceptidfrom, p.conceptidto, p.relationtype, {next_depth}
+                FROM pathway p
+                JOIN reachable r ON p.{start} = r.{end}
+                {depth_clause}
+            )
+            SELECT relationid, conceptidfrom, conceptidto, relationtype, min(depth) AS depth
+            FROM reachable
+            GROUP BY relationid, conceptidfrom, conceptidto, relationtype
+            """,
+            [*pathway_params, conceptids, *depth_params],
+        )
+
+        expanded = set(conceptids)
+        relations = list(relations)
+        for relation in relations:
+            if depth_limit is None or relation.depth < depth_limit:
+                expanded.add(str(getattr(relation, end_field)))
+        return relations, expanded
+
+    def get_values(self, conceptid):
+        return self.values.get(str(conceptid))
+
+    def get_value_categories(self):
+        if self.value_categories is None:
+            self.value_categories = list(
+                models.DValueType.objects.distinct("category").values_list(
+                    "category", flat=True
+                )
+            )
+        return self.value_categories
+
+    def has_subconcepts(self, conceptid):
+        if str(conceptid) not in self.concepts:
+            return None
+        return str(conceptid) in self.subconcepts
+
+    def get_subconcept_relations(self, conceptid):
+        return self.subconcept_relations.get(str(conceptid))
+
+    def get_parentconcept_relations(self, conceptid):
+        return self.parentconcept_relations.get(str(conceptid))
+
+
 class ConceptValue(object):
     def __init__(self, *args, **kwargs):
         self.id = ""
@@ -1647,12 +1880,14 @@ class ConceptValue(object):
 
             data["top_concept"] = scheme.id
             se.index_data(index=CONCEPTS_INDEX, body=data, idfield="id")
+            invalidate_concept_caches()
 
     def delete_index(self):
         query = Query(se, start=0, limit=10000)
         term = Term(field="id", term=self.id)
         query.add_query(term)
         query.delete(index=CONCEPTS_INDEX)
+        invalidate_concept_caches()
 
     def get_scheme_id(self):
         result = se.search(index=CONCEPTS_INDEX, id=self.id)
@@ -1662,8 +1897,130 @@ class ConceptValue(object):
             return None
 
 
-def get_preflabel_from_conceptid(conceptid, lang):
-    default = {
+CONCEPT_CACHE_VERSION_KEY = "concept_cache_version"
+_missing = object()
+concept_label_cache = VersionedLRUDict(
+    CONCEPT_CACHE_VERSION_KEY,
+    maxsize=settings.CONCEPT_LABEL_CACHE_SIZE,
+    timeout=settings.CONCEPT_LABEL_CACHE_TIMEOUT,
+    cache_alias=get_version_cache_alias(),
+)
+
+
+def invalidate_concept_caches():
+    """
+    Discards the cached concept labels and values of every process
+
+    """
+
+    invalidate_version(CONCEPT_CACHE_VERSION_KEY, get_version_cache_alias())
+
+
+def get_subconcept_ids(conceptids):
+    """
+    Returns the ids of concepts and every concept below them following the
+    same (default, semantic) relations as Concept.get(include_subconcepts=True)
+
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            WITH RECURSIVE subconcepts AS (
+                SELECT unnest(%s::uuid[]) AS conceptid
+                UNION
+                SELECT r.conceptidto
+                FROM relations r
+                JOIN d_relation_types rt ON rt.relationtype = r.relationtype
+                JOIN subconcepts s ON s.conceptid = r.conceptidfrom
+                WHERE rt.category IN ('Semantic Relations', 'Properties')
+                AND r.relationtype <> 'related'
+            )
+            SELECT conceptid::text FROM subconcepts
+            """,
+            [[str(conceptid) for conceptid in conceptids]],
+        )
+        return [conceptid for (conceptid,) in cursor.fetchall()]
+
+
+def get_concept_usage(conceptids, include_subconcepts=False):
+    """
+    Returns a queryset of the ConceptUsage rows of the values of concepts
+
+    Keyword Arguments:
+    conceptids -- a list of concept ids
+    include_subconcepts -- True to also include the concepts below each concept, see get_subconcept_ids
+
+    """
+
+    if include_subconcepts:
+        conceptids = get_subconcept_ids(conceptids)
+    return models.ConceptUsage.objects.filter(
+        valueid__in=models.Value.objects.filter(concept_id__in=conceptids).values(
+            "valueid"
+        )
+    )
+
+
+def check_if_concepts_in_use(conceptids, include_subconcepts=False):
+    return get_concept_usage(conceptids, include_subconcepts).exists()
+
+
+def get_concept_usage_counts(conceptids, include_subconcepts=False):
+    """
+    Returns the number of tiles and resource instances using concepts per node,
+    eg: {nodeid: {"tiles": 2, "resources": 1}}
+
+    """
+
+    usage = (
+        get_concept_usage(conceptids, include_subconcepts)
+        .values("nodeid")
+        .annotate(
+            tiles=Count("tileid", distinct=True),
+            resources=Count("resourceinstanceid", distinct=True),
+        )
+        .order_by()
+    )
+    return {
+        str(row["nodeid"]): {"tiles": row["tiles"], "resources": row["resources"]}
+        for row in usage
+    }
+
+
+def get_resources_using_concepts(conceptids, include_subconcepts=False):
+    return [
+        str(resourceinstanceid)
+        for resourceinstanceid in get_concept_usage(conceptids, include_subconcepts)
+        .order_by()
+        .values_list("resourceinstanceid", flat=True)
+        .distinct()
+    ]
+
+
+def rebuild_concept_usage():
+    """
+    Rebuilds the concept_usage table from the tiles table,
+    returns the number of rows written
+
+    """
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM concept_usage")
+            cursor.execute(
+                """
+                INSERT INTO concept_usage (valueid, nodeid, tileid, resourceinstanceid)
+                SELECT v.valueid, v.nodeid, t.tileid, t.resourceinstanceid
+                FROM tiles t
+                CROSS JOIN LATERAL __arches_get_tile_concept_values(t.tiledata) v
+                """
+            )
+            return cursor.rowcount
+
+
+def get_empty_preflabel():
+    return {
         "category": "",
         "conceptid": "",
         "language": "",
@@ -1671,26 +2028,65 @@ def get_preflabel_from_conceptid(conceptid, lang):
         "type": "",
         "id": "",
     }
-    query = Query(se)
-    bool_query = Bool()
-    bool_query.must(Match(field="type", query="prefLabel", type="phrase"))
-    bool_query.filter(Terms(field="conceptid", terms=[conceptid]))
-    query.add_query(bool_query)
-    preflabels = query.search(index=CONCEPTS_INDEX)["hits"]["hits"]
-
-    ranked = sorted(
-        preflabels,
-        key=lambda prefLabel: rank_label(
-            kind=prefLabel["_source"]["type"],
-            source_lang=prefLabel["_source"]["language"],
-            target_lang=lang,
-        ),
-        reverse=True,
-    )
 
-    if not ranked:
-        return default
-    return ranked[0]["_source"]
+
+def get_preflabels_from_conceptids(conceptids, lang):
+    """
+    Returns a dictionary of the best ranked prefLabel of each concept keyed by conceptid
+    Concepts without a prefLabel map to an empty label
+
+    Keyword Arguments:
+    conceptids -- a list of concept ids
+    lang -- the language to rank the labels against
+
+    """
+
+    # rank_label ranks against the active language when no language is given
+    cache_lang = lang or get_language()
+    ret = {}
+    missing = []
+    for conceptid in {str(conceptid) for conceptid in conceptids if conceptid}:
+        preflabel = concept_label_cache.get(("preflabel", conceptid, cache_lang))
+        if preflabel is not None:
+            ret[conceptid] = preflabel
+        else:
+            missing.append(conceptid)
+
+    for i in range(0, len(missing), 1000):
+        chunk = missing[i : i + 1000]
+        query = Query(se, start=0, limit=10000)
+        bool_query = Bool()
+        bool_query.must(Match(field="type", query="prefLabel", type="phrase"))
+        bool_query.filter(Terms(field="conceptid", terms=chunk))
+        query.add_query(bool_query)
+        preflabels = {}
+        for hit in query.search(index=CONCEPTS_INDEX)["hits"]["hits"]:
+            preflabel = hit["_source"]
+            rank = rank_label(
+                kind=preflabel["type"],
+                source_lang=preflabel["language"],
+                target_lang=lang,
+            )
+            best = preflabels.get(preflabel["conceptid"])
+            if best is None or rank > best[0]:
+                preflabels[preflabel["conceptid"]] = (rank, preflabel)
+
+        for conceptid in chunk:
+            preflabel = (
+                preflabels[conceptid][1]
+                if conceptid in preflabels
+                else get_empty_preflabel()
+            )
+            concept_label_cache.set(("preflabel", conceptid, cache_lang), preflabel)
+            ret[conceptid] = preflabel
+
+    return ret
+
+
+def get_preflabel_from_conceptid(conceptid, lang):
+    return get_preflabels_from_conceptids([conceptid], lang).get(
+        str(conceptid), get_empty_preflabel()
+    )
 
 
 def get_valueids_from_concept_label(label, conceptid=None, lang=None):
@@ -1729,7 +2125,40 @@ def get_valueids_from_concept_label(label, conceptid=None, lang=None):
     ]
 
 
+def get_preflabels_from_valueids(valueids, lang):
+    """
+    Returns a dictionary of the best ranked prefLabel of the concept of each value keyed by valueid
+    Values that aren't indexed are left out
+
+    Keyword Arguments:
+    valueids -- a list of value ids
+    lang -- the language to rank the labels against, defaults to the active language
+
+    """
+
+    conceptids = {}
+    missing = []
+    for valueid in {str(valueid) for valueid in valueids if valueid}:
+        conceptid = concept_label_cache.get(("conceptid", valueid), _missing)
+        if conceptid is _missing:
+            missing.append(valueid)
+        elif conceptid is not None:
+            conceptids[valueid] = conceptid
+
+    for i in range(0, len(missing), 1000):
+        chunk = missing[i : i + 1000]
+        found = {
+            doc["_id"]: doc["_source"]["conceptid"]
+            for doc in se.search(index=CONCEPTS_INDEX, id=chunk)["docs"]
+            if doc.get("found")
+        }
+        for valueid in chunk:
+            concept_label_cache.set(("conceptid", valueid), found.get(valueid))
+        conceptids.update(found)
+
+    preflabels = get_preflabels_from_conceptids(conceptids.values(), lang)
+    return {valueid: preflabels[conceptid] for valueid, conceptid in conceptids.items()}
+
+
 def get_preflabel_from_valueid(valueid, lang):
-    concept_label = se.search(index=CONCEPTS_INDEX, id=valueid)
-    if concept_label["found"]:
-        return get_preflabel_from_conceptid(concept_label["_source"]["conceptid"], lang)
+    return get_preflabels_from_valueids([valueid], lang).get(str(valueid))
@@ -34,6 +34,7 @@ from arches.app.etl_modules.bulk_data_deletion import BulkDataDeletion
 from arches.app.utils.betterJSONSerializer import JSONSerializer, JSONDeserializer
 from arches.app.search.search_engine_factory import SearchEngineFactory
 from arches.app.utils.i18n import LanguageSynchronizer
+from arches.app.utils.graph_cache import published_graph_cache
 from django.utils.translation import gettext as _
 from pyld.jsonld import compact, JsonLdError
 from django.db.models.base import Deferred
@@ -2136,6 +2137,8 @@ class Graph(models.GraphModel):
                 published_graph.save()
                 translation.deactivate()
 
+            transaction.on_commit(published_graph_cache.invalidate)
+
     def publish(self, user, notes=None):
         """
         Adds a row to the GraphXPublishedGraph table
@@ -2176,12 +2179,15 @@ class Graph(models.GraphModel):
             except Exception as e:
                 raise UnpublishedModelError(e)
 
+            transaction.on_commit(published_graph_cache.invalidate)
+
     def unpublish(self):
         """
         Unassigns GraphXPublishedGraph id from Graph
         """
         self.publication = None
         self.save(validate=False)
+        transaction.on_commit(published_graph_cache.invalidate)
 
 
 class GraphPublicationError(Exception):
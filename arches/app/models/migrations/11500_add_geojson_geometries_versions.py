@@ -0,0 +1,92 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("models", "11499_add_editlog_resourceinstance_idx"),
+    ]
+
+    add_geojson_geometries_version_triggers = """
+        CREATE OR REPLACE FUNCTION __arches_bump_geojson_geometries_versions()
+        RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                UPDATE geojson_geometries_versions SET version = version + 1;
+            ELSIF TG_OP = 'INSERT' THEN
+                INSERT INTO geojson_geometries_versions (nodeid, version)
+                SELECT DISTINCT nodeid, 1 FROM new_rows
+                ON CONFLICT (nodeid) DO UPDATE
+                SET version = geojson_geometries_versions.version + 1;
+            ELSIF TG_OP = 'UPDATE' THEN
+                INSERT INTO geojson_geometries_versions (nodeid, version)
+                SELECT nodeid, 1 FROM (
+                    SELECT nodeid FROM new_rows
+                    UNION
+                    SELECT nodeid FROM old_rows
+                ) changed
+                ON CONFLICT (nodeid) DO UPDATE
+                SET version = geojson_geometries_versions.version + 1;
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO geojson_geometries_versions (nodeid, version)
+                SELECT DISTINCT nodeid, 1 FROM old_rows
+                ON CONFLICT (nodeid) DO UPDATE
+                SET version = geojson_geometries_versions.version + 1;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER __arches_geojson_geometries_insert_version_trigger
+            AFTER INSERT ON geojson_geometries
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT
+            EXECUTE PROCEDURE __arches_bump_geojson_geometries_versions();
+
+        CREATE TRIGGER __arches_geojson_geometries_update_version_trigger
+            AFTER UPDATE ON geojson_geometries
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT
+            EXECUTE PROCEDURE __arches_bump_geojson_geometries_versions();
+
+        CREATE TRIGGER __arches_geojson_geometries_delete_version_trigger
+            AFTER DELETE ON geojson_geometries
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT
+            EXECUTE PROCEDURE __arches_bump_geojson_geometries_versions();
+
+        CREATE TRIGGER __arches_geojson_geometries_truncate_version_trigger
+            AFTER TRUNCATE ON geojson_geometries
+            FOR EACH STATEMENT
+            EXECUTE PROCEDURE __arches_bump_geojson_geometries_versions();
+
+        INSERT INTO geojson_geometries_versions (nodeid, version)
+        SELECT DISTINCT nodeid, 1 FROM geojson_geometries
+        ON CONFLICT (nodeid) DO NOTHING;
+        """
+
+    remove_geojson_geometries_version_triggers = """
+        DROP TRIGGER IF EXISTS __arches_geojson_geometries_insert_version_trigger ON geojson_geometries;
+        DROP TRIGGER IF EXISTS __arches_geojson_geometries_update_version_trigger ON geojson_geometries;
+        DROP TRIGGER IF EXISTS __arches_geojson_geometries_delete_version_trigger ON geojson_geometries;
+        DROP TRIGGER IF EXISTS __arches_geojson_geometries_truncate_version_trigger ON geojson_geometries;
+        DROP FUNCTION IF EXISTS __arches_bump_geojson_geometries_versions();
+        """
+
+    operations = [
+        migrations.CreateModel(
+            name="GeoJSONGeometryVersion",
+            fields=[
+                ("nodeid", models.UUIDField(primary_key=True, serialize=False)),
+                ("version", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "db_table": "geojson_geometries_versions",
+                "managed": True,
+            },
+        ),
+        migrations.RunSQL(
+            add_geojson_geometries_version_triggers,
+            remove_geojson_geometries_version_triggers,
+        ),
+    ]
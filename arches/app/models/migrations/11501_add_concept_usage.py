@@ -0,0 +1,109 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("models", "11500_add_geojson_geometries_versions"),
+    ]
+
+    add_concept_usage_triggers = """
+        CREATE OR REPLACE FUNCTION __arches_get_tile_concept_values(tiledata jsonb)
+        RETURNS TABLE (nodeid uuid, valueid uuid) AS $$
+            SELECT n.nodeid, tile_values.valueid::uuid
+            FROM jsonb_each(tiledata) AS node_values
+            JOIN nodes n ON n.nodeid = node_values.key::uuid
+            CROSS JOIN LATERAL (
+                SELECT node_values.value #>> '{}' AS valueid
+                WHERE jsonb_typeof(node_values.value) = 'string'
+                UNION ALL
+                SELECT jsonb_array_elements_text(node_values.value)
+                WHERE jsonb_typeof(node_values.value) = 'array'
+            ) AS tile_values
+            WHERE n.datatype IN ('concept', 'concept-list')
+            AND tile_values.valueid ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$';
+        $$ LANGUAGE sql STABLE;
+
+        CREATE OR REPLACE FUNCTION __arches_refresh_concept_usage()
+        RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                DELETE FROM concept_usage;
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM concept_usage
+                WHERE tileid IN (SELECT tileid FROM old_rows);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO concept_usage (valueid, nodeid, tileid, resourceinstanceid)
+                SELECT v.valueid, v.nodeid, t.tileid, t.resourceinstanceid
+                FROM new_rows t
+                CROSS JOIN LATERAL __arches_get_tile_concept_values(t.tiledata) v;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER __arches_tiles_insert_concept_usage_trigger
+            AFTER INSERT ON tiles
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT
+            EXECUTE PROCEDURE __arches_refresh_concept_usage();
+
+        CREATE TRIGGER __arches_tiles_update_concept_usage_trigger
+            AFTER UPDATE ON tiles
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT
+            EXECUTE PROCEDURE __arches_refresh_concept_usage();
+
+        CREATE TRIGGER __arches_tiles_delete_concept_usage_trigger
+            AFTER DELETE ON tiles
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT
+            EXECUTE PROCEDURE __arches_refresh_concept_usage();
+
+        CREATE TRIGGER __arches_tiles_truncate_concept_usage_trigger
+            AFTER TRUNCATE ON tiles
+            FOR EACH STATEMENT
+            EXECUTE PROCEDURE __arches_refresh_concept_usage();
+
+        INSERT INTO concept_usage (valueid, nodeid, tileid, resourceinstanceid)
+        SELECT v.valueid, v.nodeid, t.tileid, t.resourceinstanceid
+        FROM tiles t
+        CROSS JOIN LATERAL __arches_get_tile_concept_values(t.tiledata) v;
+        """
+
+    remove_concept_usage_triggers = """
+        DROP TRIGGER IF EXISTS __arches_tiles_insert_concept_usage_trigger ON tiles;
+        DROP TRIGGER IF EXISTS __arches_tiles_update_concept_usage_trigger ON tiles;
+        DROP TRIGGER IF EXISTS __arches_tiles_delete_concept_usage_trigger ON tiles;
+        DROP TRIGGER IF EXISTS __arches_tiles_truncate_concept_usage_trigger ON tiles;
+        DROP FUNCTION IF EXISTS __arches_refresh_concept_usage();
+        DROP FUNCTION IF EXISTS __arches_get_tile_concept_values(jsonb);
+        """
+
+    operations = [
+        migrations.CreateModel(
+            name="ConceptUsage",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("valueid", models.UUIDField()),
+                ("nodeid", models.UUIDField()),
+                ("tileid", models.UUIDField()),
+                ("resourceinstanceid", models.UUIDField()),
+            ],
+            options={
+                "db_table": "concept_usage",
+                "managed": True,
+                "indexes": [
+                    models.Index(fields=["valueid"], name="concept_usage_valueid_idx"),
+                    models.Index(fields=["tileid"], name="concept_usage_tileid_idx"),
+                ],
+            },
+        ),
+        migrations.RunSQL(
+            add_concept_usage_triggers,
+            remove_concept_usage_triggers,
+        ),
+    ]
@@ -28,7 +28,6 @@ from arches.app.utils import import_class_from_string
 from django.contrib.gis.db import models
 from django.db import connection
 from django.db.models import JSONField
-from django.core.cache import caches
 from django.core.exceptions import ValidationError
 from django.core.mail import EmailMultiAlternatives
 from django.core.serializers.json import DjangoJSONEncoder
@@ -60,6 +59,59 @@ class BulkIndexQueue(models.Model):
         managed = True
         db_table = "bulk_index_queue"
 
+    @staticmethod
+    def enqueue(resourceinstanceids):
+        """
+        Queues resources to be (re)indexed. Queueing a resource that is already in the
+        queue updates the createddate of the existing entry so that many edits to the
+        same resource coalesce into a single reindex.
+
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO bulk_index_queue (resourceinstanceid, createddate)
+                SELECT unnest(%s::uuid[]), clock_timestamp()
+                ON CONFLICT (resourceinstanceid)
+                DO UPDATE SET createddate = excluded.createddate;
+                """,
+                [
+                    [
+                        str(resourceinstanceid)
+                        for resourceinstanceid in resourceinstanceids
+                    ]
+                ],
+            )
+
+    @staticmethod
+    def dequeue(queued_entries):
+        """
+        Removes entries from the queue given a list of (resourceinstanceid, createddate) tuples.
+        Entries that have been queued again since they were read are left in place.
+
+        """
+
+        if not queued_entries:
+            return
+        resourceinstanceids, createddates = zip(*queued_entries)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                DELETE FROM bulk_index_queue q
+                USING unnest(%s::uuid[], %s::timestamptz[]) AS dequeued(resourceinstanceid, createddate)
+                WHERE q.resourceinstanceid = dequeued.resourceinstanceid
+                AND q.createddate = dequeued.createddate;
+                """,
+                [
+                    [
+                        str(resourceinstanceid)
+                        for resourceinstanceid in resourceinstanceids
+                    ],
+                    list(createddates),
+                ],
+            )
+
 
 class CardModel(models.Model):
     cardid = models.UUIDField(primary_key=True)
@@ -826,10 +878,9 @@ class Node(models.Model):
 
 @receiver(post_save, sender=Node)
 def clear_user_permission_cache(sender, instance, **kwargs):
-    user_permission_cache = caches["user_permission"]
+    from arches.app.permissions.arches_permission_base import clear_permission_cache
 
-    if user_permission_cache:
-        user_permission_cache.clear()
+    clear_permission_cache()
 
 
 class Ontology(models.Model):
@@ -1800,22 +1851,70 @@ def update_groups_for_user(sender, instance, action, **kwargs):
         update_groups_for_user(instance)
 
 
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_permissions_for_group_members(
+    sender, instance, action, pk_set, **kwargs
+):
+    from arches.app.permissions.arches_permission_base import (
+        invalidate_permissions,
+    )
+
+    if action in ("post_add", "post_remove", "post_clear"):
+        if isinstance(instance, User):
+            invalidate_permissions(instance)
+        else:
+            invalidate_permissions(instance, user_ids=pk_set or ())
+
+
+@receiver(post_save, sender="guardian.UserObjectPermission")
+@receiver(post_delete, sender="guardian.UserObjectPermission")
+def invalidate_permissions_for_user(sender, instance, **kwargs):
+    from arches.app.permissions.arches_permission_base import (
+        invalidate_permissions,
+    )
+
+    invalidate_permissions(user_ids=[instance.user_id])
+
+
+@receiver(post_save, sender="guardian.GroupObjectPermission")
+@receiver(post_delete, sender="guardian.GroupObjectPermission")
+def invalidate_permissions_for_group(sender, instance, **kwargs):
+    from arches.app.permissions.arches_permission_base import (
+        invalidate_permissions,
+    )
+
+    invalidate_permissions(group_ids=[instance.group_id])
+
+
 @receiver(m2m_changed, sender=User.user_permissions.through)
 def update_permissions_for_user(sender, instance, action, **kwargs):
+    from arches.app.permissions.arches_permission_base import invalidate_permissions
     from arches.app.utils.permission_backend import update_permissions_for_user
 
     if action in ("post_add", "post_remove"):
+        invalidate_permissions(instance)
         update_permissions_for_user(instance)
 
 
 @receiver(m2m_changed, sender=Group.permissions.through)
 def update_permissions_for_group(sender, instance, action, **kwargs):
+    from arches.app.permissions.arches_permission_base import invalidate_permissions
     from arches.app.utils.permission_backend import update_permissions_for_group
 
     if action in ("post_add", "post_remove"):
+        invalidate_permissions(instance)
         update_permissions_for_group(instance)
 
 
+@receiver(post_save, sender=NodeGroup)
+@receiver(post_delete, sender=NodeGroup)
+def invalidate_nodegroup_permissions(sender, instance, **kwargs):
+    from arches.app.permissions.arches_permission_base import invalidate_permissions
+
+    if kwargs.get("created", True):
+        invalidate_permissions(nodegroups=True)
+
+
 @receiver(post_save, sender=UserXNotification)
 def send_email_on_save(sender, instance, **kwargs):
     """Checks if a notification type needs to send an email, does so if email server exists"""
@@ -2025,6 +2124,44 @@ class GeoJSONGeometry(models.Model):
         db_table = "geojson_geometries"
 
 
+class GeoJSONGeometryVersion(models.Model):
+    """
+    A counter per node that is incremented by a database trigger whenever
+    the rows of the node in geojson_geometries change.  Used to version the cached vector tiles.
+
+    """
+
+    nodeid = models.UUIDField(primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        managed = True
+        db_table = "geojson_geometries_versions"
+
+
+class ConceptUsage(models.Model):
+    """
+    A row for each value (eg: a prefLabel) referenced by a concept or concept-list node of a tile.
+    Maintained by database triggers on the tiles table, rebuild it with
+    `python manage.py concept_usage rebuild`
+
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    valueid = models.UUIDField()
+    nodeid = models.UUIDField()
+    tileid = models.UUIDField()
+    resourceinstanceid = models.UUIDField()
+
+    class Meta:
+        managed = True
+        db_table = "concept_usage"
+        indexes = [
+            models.Index(fields=["valueid"], name="concept_usage_valueid_idx"),
+            models.Index(fields=["tileid"], name="concept_usage_tileid_idx"),
+        ]
+
+
 class ETLModule(models.Model):
     etlmoduleid = models.UUIDField(primary_key=True, default=uuid.uuid1)
     name = models.TextField()
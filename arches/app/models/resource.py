@@ -21,7 +21,7 @@ import logging
 from time import time
 from uuid import UUID
 from types import SimpleNamespace
-from django.db import transaction
+from django.db import connection, transaction
 from django.db.models import Q
 from django.contrib.auth.models import User, Group
 from django.forms.models import model_to_dict
@@ -31,7 +31,7 @@ from django.utils.translation import get_language
 from arches.app.models import models
 from arches.app.models.models import EditLog
 from arches.app.models.models import TileModel
-from arches.app.models.concept import get_preflabel_from_valueid
+from arches.app.models.concept import get_preflabels_from_valueids
 from arches.app.models.system_settings import settings
 from arches.app.search.search_engine_factory import SearchEngineInstance as se
 from arches.app.search.mappings import TERMS_INDEX, RESOURCES_INDEX
@@ -54,8 +54,8 @@ from arches.app.utils.exceptions import (
 )
 from arches.app.utils.permission_backend import (
     user_is_resource_reviewer,
-    get_filtered_instances,
-    get_nodegroups_by_perm,
+    filter_resource_ids,
+    get_nodegroup_ids_by_perm,
 )
 import django.dispatch
 from arches.app.datatypes.datatypes import DataTypeFactory
@@ -168,10 +168,12 @@ class Resource(models.ResourceInstance):
             except KeyError:
                 pass
 
-    def save_descriptors(
+    def calculate_descriptors(
         self, descriptors=("name", "description", "map_popup"), context=None
     ):
         """
+        Calculates the descriptors (and name) of the resource in every language without saving them
+
         descriptors -- iterator with descriptors to be calculated
         context -- Dictionary with any key:value pairs needed to control the behavior of a custom descriptor function
 
@@ -182,6 +184,10 @@ class Resource(models.ResourceInstance):
                 graph_id=self.graph_id, function__functiontype="primarydescriptors"
             ).select_related("function")
 
+        module = None
+        if len(self.descriptor_function) == 1:
+            module = self.descriptor_function[0].function.get_class_module()()
+
         for lang in settings.LANGUAGES:
             language = self.get_descriptor_language({"language": lang[0]})
             if context:
@@ -190,8 +196,7 @@ class Resource(models.ResourceInstance):
                 context = {"language": language}
 
             for descriptor in descriptors:
-                if len(self.descriptor_function) == 1:
-                    module = self.descriptor_function[0].function.get_class_module()()
+                if module is not None:
                     self.descriptors[language][descriptor] = (
                         module.get_primary_descriptor_from_nodes(
                             self,
@@ -210,8 +215,72 @@ class Resource(models.ResourceInstance):
                 else:
                     self.descriptors[language][descriptor] = None
 
+    def save_descriptors(
+        self, descriptors=("name", "description", "map_popup"), context=None
+    ):
+        """
+        descriptors -- iterator with descriptors to be calculated
+        context -- Dictionary with any key:value pairs needed to control the behavior of a custom descriptor function
+
+        """
+
+        self.calculate_descriptors(descriptors, context)
         super(Resource, self).save()
 
+    @staticmethod
+    def save_descriptors_bulk(
+        resources, descriptors=("name", "description", "map_popup"), context=None
+    ):
+        """
+        Calculates the descriptors of a list of resources and saves them with one bulk_update,
+        the primary descriptors function of each graph is only read once
+
+        Arguments:
+        resources -- a list of resource models
+
+        Keyword Arguments:
+        descriptors -- iterator with descriptors to be calculated
+        context -- Dictionary with any key:value pairs needed to control the behavior of a custom descriptor function
+
+        """
+
+        descriptor_functions = {}
+        for resource in resources:
+            if resource.descriptor_function is None:
+                graphid = str(resource.graph_id)
+                if graphid not in descriptor_functions:
+                    descriptor_functions[graphid] = list(
+                        models.FunctionXGraph.objects.filter(
+                            graph_id=graphid,
+                            function__functiontype="primarydescriptors",
+                        ).select_related("function")
+                    )
+                resource.descriptor_function = descriptor_functions[graphid]
+            resource.calculate_descriptors(descriptors, context)
+
+        if not resources:
+            return
+
+        # the name is an I18n_TextField, which bulk_update can't write one value per row to,
+        # so it is copied from the saved descriptors instead
+        with transaction.atomic():
+            Resource.objects.bulk_update(
+                resources, ["descriptors"], batch_size=settings.BULK_IMPORT_BATCH_SIZE
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    UPDATE resource_instances
+                    SET name = COALESCE(name, '{}'::jsonb) || COALESCE((
+                        SELECT jsonb_object_agg(descriptor.key, descriptor.value -> 'name')
+                        FROM jsonb_each(descriptors) AS descriptor
+                        WHERE jsonb_typeof(descriptor.value -> 'name') = 'string'
+                    ), '{}'::jsonb)
+                    WHERE resourceinstanceid = ANY(%s::uuid[])
+                    """,
+                    [[str(resource.pk) for resource in resources]],
+                )
+
     def displaydescription(self, context=None):
         return self.get_descriptor("description", context)
 
@@ -245,6 +314,8 @@ class Resource(models.ResourceInstance):
         request -- the request object
         user -- the user to associate the edit with if the user can't be derived from the request
         index -- True(default) to index the resource, otherwise don't index the resource
+        bulk -- True to save the tiles with Tile.bulk_save, running the functions of each nodegroup
+            once and recalculating the descriptors once, rather than saving each tile in turn
 
         """
         # TODO: 7783 cbyrd throw error if graph is unpublished
@@ -257,6 +328,7 @@ class Resource(models.ResourceInstance):
         index = kwargs.pop("index", True)
         context = kwargs.pop("context", None)
         transaction_id = kwargs.pop("transaction_id", None)
+        bulk = kwargs.pop("bulk", False)
 
         if request is None:
             if user is None:
@@ -272,13 +344,27 @@ class Resource(models.ResourceInstance):
 
         for tile in self.tiles:
             tile.resourceinstance_id = self.resourceinstanceid
-            tile.save(
+        if bulk:
+            from arches.app.models.tile import Tile
+
+            Tile.bulk_save(
+                self.tiles,
                 request=request,
                 index=False,
                 resource_creation=True,
                 transaction_id=transaction_id,
                 context=context,
+                resources=[self],
             )
+        else:
+            for tile in self.tiles:
+                tile.save(
+                    request=request,
+                    index=False,
+                    resource_creation=True,
+                    transaction_id=transaction_id,
+                    context=context,
+                )
         try:
             for perm in (
                 "view_resourceinstance",
@@ -290,7 +376,10 @@ class Resource(models.ResourceInstance):
             pass
 
         if index is True:
-            self.index(context)
+            if settings.DEFER_INDEXING_TO_QUEUE:
+                models.BulkIndexQueue.enqueue([self.pk])
+            else:
+                self.index(context)
 
     def load_tiles(self, user=None, perm="read_nodegroup"):
         """
@@ -300,7 +389,7 @@ class Resource(models.ResourceInstance):
 
         self.tiles = list(models.TileModel.objects.filter(resourceinstance=self))
         if user:
-            readable_nodegroups = get_nodegroups_by_perm(user, perm, any_perm=True)
+            readable_nodegroups = get_nodegroup_ids_by_perm(user, perm, any_perm=True)
             self.tiles = [
                 tile
                 for tile in self.tiles
@@ -870,29 +959,36 @@ class Resource(models.ResourceInstance):
 
         ret["total"] = {"value": resource_relations["total"]}
         instanceids = set()
+        relations = list(resource_relations["relations"])
+        relationship_labels = get_preflabels_from_valueids(
+            [relation.relationshiptype for relation in relations], lang
+        )
+        related_resourceids = {
+            str(resourceid)
+            for relation in relations
+            for resourceid in (
+                relation.resourceinstanceidfrom_id,
+                relation.resourceinstanceidto_id,
+            )
+        }
+        if user is not None:
+            permitted_resourceids = set(filter_resource_ids(user, related_resourceids))
+        else:
+            permitted_resourceids = related_resourceids
 
         readable_graphids = set(
             permission_backend.get_resource_types_by_perm(
                 user, ["models.read_nodegroup"]
             )
         )
-        for relation in resource_relations["relations"]:
+        for relation in relations:
             relation = model_to_dict(relation)
             resourceid_to = relation["resourceinstanceidto"]
             resourceid_from = relation["resourceinstanceidfrom"]
             resourceinstanceto_graphid = relation["resourceinstanceto_graphid"]
             resourceinstancefrom_graphid = relation["resourceinstancefrom_graphid"]
-            exclusive_set, filtered_instances = get_filtered_instances(
-                user, se, resources=[resourceid_from, resourceid_to]
-            )
-            filtered_instances = filtered_instances if user is not None else []
-
-            resourceid_to_permission = resourceid_to not in filtered_instances
-            resourceid_from_permission = resourceid_from not in filtered_instances
-
-            if exclusive_set:
-                resourceid_to_permission = not (resourceid_to_permission)
-                resourceid_from_permission = not (resourceid_from_permission)
+            resourceid_to_permission = str(resourceid_to) in permitted_resourceids
+            resourceid_from_permission = str(resourceid_from) in permitted_resourceids
 
             if (
                 resourceid_to_permission
@@ -901,9 +997,7 @@ class Resource(models.ResourceInstance):
                 and str(resourceinstancefrom_graphid) in readable_graphids
             ):
                 try:
-                    preflabel = get_preflabel_from_valueid(
-                        relation["relationshiptype"], lang
-                    )
+                    preflabel = relationship_labels[str(relation["relationshiptype"])]
                     relation["relationshiptype_label"] = preflabel["value"] or ""
                 except:
                     relation["relationshiptype_label"] = (
@@ -27,7 +27,7 @@ from django.db import IntegrityError
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Max, Q
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.utils.translation import gettext as _
@@ -41,6 +41,7 @@ from arches.app.search.search_engine_factory import SearchEngineFactory
 from arches.app.search.elasticsearch_dsl_builder import Query, Bool, Terms
 from arches.app.search.mappings import TERMS_INDEX
 from arches.app.datatypes.datatypes import DataTypeFactory
+from arches.app.utils.graph_cache import published_graph_cache
 
 logger = logging.getLogger(__name__)
 
@@ -108,18 +109,38 @@ class Tile(models.TileModel):
                         self.tiles.append(tile)
 
         self.serialized_graph = None
+        self.cached_graph = None
         self.load_serialized_graph()
 
     def load_serialized_graph(self, raise_if_missing=False):
-        try:
-            resource = self.resourceinstance
-        except models.ResourceInstance.DoesNotExist:
+        if "resourceinstance" in self._state.fields_cache:
+            graphid = self.resourceinstance.graph_id
+        else:
+            graphid = published_graph_cache.get_graphid_for_resource(
+                self.resourceinstance_id
+            )
+        if graphid is None:
             return
-        published_graph = resource.graph.get_published_graph(
-            raise_if_missing=raise_if_missing
+        self.cached_graph = published_graph_cache.get_for_graph(
+            graphid, raise_if_missing=raise_if_missing
         )
-        if published_graph:
-            self.serialized_graph = published_graph.serialized_graph
+        if self.cached_graph:
+            self.serialized_graph = self.cached_graph.serialized_graph
+
+    def get_serialized_node(self, nodeid):
+        """
+        Returns the serialized node with the given id from the published graph of the tile
+        or None if the node can't be found
+
+        """
+
+        node = self.cached_graph.get_node(nodeid) if self.cached_graph else None
+        # the graph may have been published by another process since it was cached
+        if node is None and published_graph_cache.revalidate():
+            self.load_serialized_graph()
+            if self.cached_graph:
+                node = self.cached_graph.get_node(nodeid)
+        return node
 
     def save_edit(
         self,
@@ -134,11 +155,56 @@ class Tile(models.TileModel):
         transaction_id=None,
         new_resource_created=False,
     ):
+        resourcedisplayname = Resource.objects.get(
+            resourceinstanceid=self.resourceinstance.resourceinstanceid
+        ).displayname()
+        for edit in self.get_edit_logs(
+            user=user,
+            note=note,
+            edit_type=edit_type,
+            old_value=old_value,
+            new_value=new_value,
+            newprovisionalvalue=newprovisionalvalue,
+            oldprovisionalvalue=oldprovisionalvalue,
+            provisional_edit_log_details=provisional_edit_log_details,
+            transaction_id=transaction_id,
+            new_resource_created=new_resource_created,
+            resourcedisplayname=resourcedisplayname,
+        ):
+            edit.save()
+
+    def get_edit_logs(
+        self,
+        user={},
+        note="",
+        edit_type="",
+        old_value=None,
+        new_value=None,
+        newprovisionalvalue=None,
+        oldprovisionalvalue=None,
+        provisional_edit_log_details=None,
+        transaction_id=None,
+        new_resource_created=False,
+        resourcedisplayname=None,
+        graphid=None,
+    ):
+        """
+        Returns the unsaved edit log records of a save of this tile
+
+        Keyword Arguments:
+        resourcedisplayname -- the display name of the tile's resource
+        graphid -- the graph of the tile's resource, looked up from the resource if not given
+
+        """
+
+        if graphid is None:
+            graphid = self.resourceinstance.graph_id
+        edits = []
         if new_resource_created:
             timestamp = datetime.datetime.now()
             resource_edit = EditLog()
-            resource_edit.resourceclassid = self.resourceinstance.graph_id
-            resource_edit.resourceinstanceid = self.resourceinstance.resourceinstanceid
+            resource_edit.resourceclassid = graphid
+            resource_edit.resourceinstanceid = self.resourceinstance_id
             resource_edit.edittype = "create"
             resource_edit.timestamp = timestamp
             resource_edit.userid = getattr(user, "id", "")
@@ -148,12 +214,12 @@ class Tile(models.TileModel):
             resource_edit.user_username = getattr(user, "username", "")
             if transaction_id is not None:
                 resource_edit.transactionid = transaction_id
-            resource_edit.save()
+            edits.append(resource_edit)
 
         timestamp = datetime.datetime.now()
         edit = EditLog()
-        edit.resourceclassid = self.resourceinstance.graph_id
-        edit.resourceinstanceid = self.resourceinstance.resourceinstanceid
+        edit.resourceclassid = graphid
+        edit.resourceinstanceid = self.resourceinstance_id
         edit.nodegroupid = self.nodegroup_id
         edit.tileinstanceid = self.tileid
         if provisional_edit_log_details is not None:
@@ -170,9 +236,7 @@ class Tile(models.TileModel):
         edit.user_firstname = getattr(user, "first_name", "")
         edit.user_lastname = getattr(user, "last_name", "")
         edit.user_username = getattr(user, "username", "")
-        edit.resourcedisplayname = Resource.objects.get(
-            resourceinstanceid=self.resourceinstance.resourceinstanceid
-        ).displayname()
+        edit.resourcedisplayname = resourcedisplayname
         edit.oldvalue = old_value
         edit.newvalue = new_value
         edit.timestamp = timestamp
@@ -182,7 +246,8 @@ class Tile(models.TileModel):
         edit.note = note
         if transaction_id is not None:
             edit.transactionid = transaction_id
-        edit.save()
+        edits.append(edit)
+        return edits
 
     def tile_collects_data(self):
         result = True
@@ -259,20 +324,41 @@ class Tile(models.TileModel):
                 edit = edits[str(user.id)]
         return edit
 
-    def check_for_constraint_violation(self):
+    def check_for_constraint_violation(self, constraints=None, pending_tiles=()):
+        """
+        Keyword Arguments:
+        constraints -- the constraints of the tile's card, queried if not supplied
+        pending_tiles -- tiles of the same nodegroup being saved along with this tile
+            that also have to be checked for duplicate values
+        """
+
         if settings.BYPASS_UNIQUE_CONSTRAINT_TILE_VALIDATION:
             return
-        card = models.CardModel.objects.get(nodegroup=self.nodegroup)
-        constraints = models.ConstraintModel.objects.filter(card=card)
-        if constraints.exists():
+        if constraints is None:
+            card = models.CardModel.objects.get(nodegroup=self.nodegroup)
+            constraints = models.ConstraintModel.objects.filter(card=card)
+        if constraints:
             for constraint in constraints:
                 if constraint.uniquetoallinstances is True:
                     tiles = models.TileModel.objects.filter(nodegroup=self.nodegroup)
                 else:
                     tiles = models.TileModel.objects.filter(
-                        Q(resourceinstance_id=self.resourceinstance.resourceinstanceid)
+                        Q(resourceinstance_id=self.resourceinstance_id)
                         & Q(nodegroup=self.nodegroup)
                     )
+                pending = [
+                    tile
+                    for tile in pending_tiles
+                    if constraint.uniquetoallinstances is True
+                    or str(tile.resourceinstance_id) == str(self.resourceinstance_id)
+                ]
+                if pending:
+                    pending_tileids = {str(tile.tileid) for tile in pending}
+                    tiles = [
+                        tile
+                        for tile in tiles
+                        if str(tile.tileid) not in pending_tileids
+                    ] + pending
                 nodes = [node for node in constraint.nodes.all()]
                 for tile in tiles:
                     if str(self.tileid) != str(tile.tileid):
@@ -317,18 +403,10 @@ class Tile(models.TileModel):
         missing_nodes = []
         for nodeid, value in self.data.items():
             try:
-                try:
-                    node = SimpleNamespace(
-                        **next(
-                            (
-                                x
-                                for x in self.serialized_graph["nodes"]
-                                if x["nodeid"] == nodeid
-                            ),
-                            None,
-                        )
-                    )
-                except:
+                serialized_node = self.get_serialized_node(nodeid)
+                if serialized_node is not None:
+                    node = SimpleNamespace(**serialized_node)
+                else:
                     node = models.Node.objects.get(nodeid=nodeid)
                 datatype = self.datatype_factory.get_instance(node.datatype)
                 datatype.clean(self, nodeid)
@@ -364,19 +442,11 @@ class Tile(models.TileModel):
 
         tile_errors = []
         for nodeid, value in self.data.items():
-            try:
-                node = SimpleNamespace(
-                    **next(
-                        (
-                            x
-                            for x in self.serialized_graph["nodes"]
-                            if x["nodeid"] == nodeid
-                        ),
-                        None,
-                    )
-                )
+            serialized_node = self.get_serialized_node(nodeid)
+            if serialized_node is not None:
+                node = SimpleNamespace(**serialized_node)
                 node.pk = uuid.UUID(node.nodeid)
-            except TypeError:  # will catch if serialized_graph is None
+            else:
                 node = models.Node.objects.get(nodeid=nodeid)
             datatype = self.datatype_factory.get_instance(node.datatype)
             error = datatype.validate(value, node=node, strict=strict, request=request)
@@ -424,18 +494,10 @@ class Tile(models.TileModel):
 
         tile_data = self.get_tile_data(userid)
         for nodeid in tile_data.keys():
-            try:
-                node = SimpleNamespace(
-                    **next(
-                        (
-                            x
-                            for x in self.serialized_graph["nodes"]
-                            if x["nodeid"] == nodeid
-                        ),
-                        None,
-                    )
-                )
-            except:
+            serialized_node = self.get_serialized_node(nodeid)
+            if serialized_node is not None:
+                node = SimpleNamespace(**serialized_node)
+            else:
                 node = models.Node.objects.get(nodeid=nodeid)
             datatype = self.datatype_factory.get_instance(node.datatype)
             datatype.post_tile_save(self, nodeid, request)
@@ -466,11 +528,7 @@ class Tile(models.TileModel):
 
         with transaction.atomic():
             for nodeid in self.data.keys():
-                node = next(
-                    item
-                    for item in self.serialized_graph["nodes"]
-                    if item["nodeid"] == nodeid
-                )
+                node = self.get_serialized_node(nodeid)
                 datatype = self.datatype_factory.get_instance(node["datatype"])
                 datatype.pre_tile_save(self, nodeid)
             self.__preSave(request, context=context)
@@ -565,14 +623,302 @@ class Tile(models.TileModel):
             if index:
                 self.index(resource=resource)
 
+    @staticmethod
+    def bulk_save(
+        tiles,
+        request=None,
+        user=None,
+        index=True,
+        transaction_id=None,
+        context=None,
+        resource_creation=False,
+        resources=None,
+    ):
+        """
+        Saves a list of tiles (and their child tiles) with a handful of queries
+        instead of several per tile.  Tiles are grouped by nodegroup to run their
+        functions once per group, validated in batches, inserted or updated in bulk
+        and the descriptors of each affected resource are recalculated once.
+
+        Keyword Arguments:
+        request -- the request object
+        user -- the user to associate the edits with if the user can't be derived from the request
+        index -- True(default) to index the affected resources
+        transaction_id -- a uuid identifying the save as belonging to a collective load or process
+        context -- string e.g. "copy" indicating conditions under which the tiles are saved
+        resource_creation -- True if the tiles are saved as part of creating their resource
+        resources -- the Resource instances of the tiles, any that are not supplied are queried
+
+        """
+
+        flattened_tiles = []
+
+        def flatten_tiles(tile):
+            flattened_tiles.append(tile)
+            for child in tile.tiles:
+                child.resourceinstance_id = tile.resourceinstance_id
+                child.parenttile = tile
+                flatten_tiles(child)
+
+        for tile in tiles:
+            flatten_tiles(tile)
+        tiles = flattened_tiles
+        if not tiles:
+            return
+
+        note = "resource creation" if resource_creation else None
+        user_is_reviewer = False
+        try:
+            if user is None and request is not None:
+                user = request.user
+            user_is_reviewer = user_is_resource_reviewer(user)
+        except AttributeError:  # no user - probably importing data
+            user = None
+
+        graphids = {}
+        tiles_by_nodegroup = {}
+        for tile in tiles:
+            if not tile.serialized_graph:
+                tile.load_serialized_graph(raise_if_missing=True)
+            graphid = published_graph_cache.get_graphid_for_resource(
+                tile.resourceinstance_id
+            )
+            graphids[str(tile.resourceinstance_id)] = graphid
+            tiles_by_nodegroup.setdefault((graphid, tile.nodegroup_id), []).append(tile)
+
+        functions = Tile._get_function_class_instances_by_nodegroup(
+            tiles_by_nodegroup.keys()
+        )
+        constraints = {}
+        if not settings.BYPASS_UNIQUE_CONSTRAINT_TILE_VALIDATION:
+            for constraint in (
+                models.ConstraintModel.objects.filter(
+                    card__nodegroup_id__in={
+                        nodegroupid for graphid, nodegroupid in tiles_by_nodegroup
+                    }
+                )
+                .select_related("card")
+                .prefetch_related("nodes")
+            ):
+                constraints.setdefault(str(constraint.card.nodegroup_id), []).append(
+                    constraint
+                )
+        existing_models = models.TileModel.objects.in_bulk(
+            [uuid.UUID(str(tile.tileid)) for tile in tiles]
+        )
+
+        with transaction.atomic():
+            edits = {}
+            for key, nodegroup_tiles in tiles_by_nodegroup.items():
+                for tile in nodegroup_tiles:
+                    for nodeid in tile.data.keys():
+                        node = tile.get_serialized_node(nodeid)
+                        datatype = tile.datatype_factory.get_instance(node["datatype"])
+                        datatype.pre_tile_save(tile, nodeid)
+                for function in functions[key]:
+                    try:
+                        function.bulk_save(nodegroup_tiles, request, context=context)
+                    except NotImplementedError:
+                        pass
+                    except TypeError as e:
+                        logger.warning(
+                            _(
+                                "No associated functions or other TypeError raised by a function"
+                            )
+                        )
+                        logger.warning(e)
+
+                validated_tiles = []
+                for tile in nodegroup_tiles:
+                    tile.check_for_missing_nodes()
+                    tile.check_for_constraint_violation(
+                        constraints=constraints.get(str(tile.nodegroup_id), []),
+                        pending_tiles=validated_tiles,
+                    )
+                    validated_tiles.append(tile)
+                    edits[id(tile)] = tile._prepare_bulk_save(
+                        existing_models.get(uuid.UUID(str(tile.tileid))),
+                        user,
+                        user_is_reviewer,
+                        request,
+                    )
+
+            Tile._set_sortorders(
+                [
+                    tile
+                    for tile in tiles
+                    if tile.sortorder is None or tile.is_fully_provisional()
+                ]
+            )
+            Tile.objects.bulk_create(
+                [tile for tile in tiles if edits[id(tile)]["creating_new_tile"]]
+            )
+            Tile.objects.bulk_update(
+                [tile for tile in tiles if not edits[id(tile)]["creating_new_tile"]],
+                [
+                    "resourceinstance",
+                    "parenttile",
+                    "data",
+                    "nodegroup",
+                    "sortorder",
+                    "provisionaledits",
+                ],
+            )
+
+            if request is not None:
+                tiles[0].ensure_userprofile_exists(request)
+            for key, nodegroup_tiles in tiles_by_nodegroup.items():
+                for tile in nodegroup_tiles:
+                    tile.datatype_post_save_actions(request)
+                for function in functions[key]:
+                    try:
+                        function.bulk_post_save(
+                            nodegroup_tiles, request, context=context
+                        )
+                    except NotImplementedError:
+                        pass
+                    except TypeError as e:
+                        logger.warning(
+                            _(
+                                "No associated functions or other TypeError raised by a function"
+                            )
+                        )
+                        logger.warning(e)
+
+            resources = {str(resource.pk): resource for resource in (resources or [])}
+            missing_resourceids = set(graphids.keys()) - set(resources.keys())
+            if missing_resourceids:
+                resources.update(
+                    (str(resource.pk), resource)
+                    for resource in Resource.objects.filter(pk__in=missing_resourceids)
+                )
+            for resource in resources.values():
+                if str(resource.pk) in graphids:
+                    resource.save_descriptors(context={"tile": None})
+
+            edit_logs = []
+            user = {} if user is None else user
+            for tile in tiles:
+                resourceid = str(tile.resourceinstance_id)
+                edit_logs += tile.get_edit_logs(
+                    user=user,
+                    note=note,
+                    transaction_id=transaction_id,
+                    resourcedisplayname=resources[resourceid].displayname(),
+                    graphid=graphids[resourceid],
+                    **edits[id(tile)]["edit"],
+                )
+            EditLog.objects.bulk_create(edit_logs)
+
+            if index:
+                if settings.DEFER_INDEXING_TO_QUEUE:
+                    models.BulkIndexQueue.enqueue(list(graphids.keys()))
+                else:
+                    for resourceid in graphids:
+                        resources[resourceid].index()
+
+    @staticmethod
+    def _set_sortorders(tiles):
+        """
+        Does what TileModel.save does for tiles without a sortorder (or fully provisional tiles):
+        fills in their empty nodes and places them after the other tiles of their nodegroup
+
+        """
+
+        if not tiles:
+            return
+        sortorder_max = {
+            (str(row["resourceinstance_id"]), str(row["nodegroup_id"])): row[
+                "sortorder_max"
+            ]
+            for row in models.TileModel.objects.filter(
+                resourceinstance_id__in={tile.resourceinstance_id for tile in tiles},
+                nodegroup_id__in={tile.nodegroup_id for tile in tiles},
+            )
+            .values("resourceinstance_id", "nodegroup_id")
+            .annotate(sortorder_max=Max("sortorder"))
+        }
+        for tile in tiles:
+            if tile.cached_graph is not None:
+                for node in tile.cached_graph.get_nodes_by_nodegroup(tile.nodegroup_id):
+                    if (
+                        node["datatype"] != "semantic"
+                        and node["nodeid"] not in tile.data
+                    ):
+                        tile.data[node["nodeid"]] = None
+            key = (str(tile.resourceinstance_id), str(tile.nodegroup_id))
+            current_max = sortorder_max.get(key)
+            tile.sortorder = current_max + 1 if current_max is not None else 0
+            sortorder_max[key] = tile.sortorder
+
+    def _prepare_bulk_save(self, existing_model, user, user_is_reviewer, request):
+        """
+        Applies provisional edits and validates the tile ahead of a bulk save,
+        returns the details needed to log the edit
+
+        """
+
+        creating_new_tile = existing_model is None
+        newprovisionalvalue = None
+        oldprovisionalvalue = None
+        provisional_edit_log_details = None
+        if creating_new_tile:
+            self.populate_missing_nodes()
+
+        if user is not None and user_is_reviewer is False:
+            if creating_new_tile:
+                self.apply_provisional_edit(user, data=self.data, action="create")
+                newprovisionalvalue = self.data
+                self.data = {}
+            else:
+                self.apply_provisional_edit(
+                    user, self.data, action="update", existing_model=existing_model
+                )
+                newprovisionalvalue = self.data
+                self.data = existing_model.data
+
+                oldprovisional = self.get_provisional_edit(existing_model, user)
+                if oldprovisional is not None:
+                    oldprovisionalvalue = oldprovisional["value"]
+
+            provisional_edit_log_details = {
+                "user": user,
+                "provisional_editor": user,
+                "action": "create tile" if creating_new_tile else "add edit",
+            }
+
+        if user is not None:
+            self.validate([], request=request)
+
+        return {
+            "creating_new_tile": creating_new_tile,
+            "edit": {
+                "edit_type": "tile create" if creating_new_tile else "tile edit",
+                "old_value": {} if creating_new_tile else existing_model.data,
+                "new_value": self.data,
+                "newprovisionalvalue": newprovisionalvalue,
+                "oldprovisionalvalue": oldprovisionalvalue,
+                "provisional_edit_log_details": provisional_edit_log_details,
+            },
+        }
+
     def populate_missing_nodes(self):
         first_node = next(iter(self.data.items()), None)
         if first_node is not None:
-            result = Tile.get_blank_tile_from_nodegroup_id(
-                nodegroup_id=self.nodegroup_id
-            )
-            result.data.update(self.data)
-            self.data = result.data
+            if self.cached_graph is not None:
+                data = {
+                    node["nodeid"]: None
+                    for node in self.cached_graph.get_nodes_by_nodegroup(
+                        self.nodegroup_id
+                    )
+                    if node["datatype"] != "semantic"
+                }
+            else:
+                data = Tile.get_blank_tile_from_nodegroup_id(
+                    nodegroup_id=self.nodegroup_id
+                ).data
+            data.update(self.data)
+            self.data = data
 
     def delete(self, *args, **kwargs):
         se = SearchEngineFactory().create()
@@ -590,7 +936,8 @@ class Tile(models.TileModel):
             user_is_reviewer = True
 
         if user_is_reviewer is True or self.user_owns_provisional(user):
-            if index:
+            # terms of queued resources are cleared by the index queue consumer
+            if index and not settings.DEFER_INDEXING_TO_QUEUE:
                 query = Query(se)
                 bool_query = Bool()
                 bool_query.filter(Terms(field="tileid", terms=[self.tileid]))
@@ -608,18 +955,10 @@ class Tile(models.TileModel):
             try:
                 super(Tile, self).delete(*args, **kwargs)
                 for nodeid in self.data.keys():
-                    try:
-                        node = SimpleNamespace(
-                            **next(
-                                (
-                                    x
-                                    for x in self.serialized_graph["nodes"]
-                                    if x["nodeid"] == nodeid
-                                ),
-                                None,
-                            )
-                        )
-                    except TypeError:  # will catch if serialized_graph is None
+                    serialized_node = self.get_serialized_node(nodeid)
+                    if serialized_node is not None:
+                        node = SimpleNamespace(**serialized_node)
+                    else:
                         node = models.Node.objects.get(nodeid=nodeid)
 
                     datatype = self.datatype_factory.get_instance(node.datatype)
@@ -640,10 +979,13 @@ class Tile(models.TileModel):
     def index(self, resource=None):
         """
         Indexes all the nessesary documents related to resources to support the map, search, and reports
+        If settings.DEFER_INDEXING_TO_QUEUE is True the resource is queued to be indexed instead
 
         """
 
-        if not resource:
+        if settings.DEFER_INDEXING_TO_QUEUE:
+            models.BulkIndexQueue.enqueue([self.resourceinstance_id])
+        elif not resource:
             Resource.objects.get(pk=self.resourceinstance_id).index()
         else:
             resource.index()
@@ -661,13 +1003,12 @@ class Tile(models.TileModel):
         return tiles
 
     def after_update_all(self):
-        try:
+        if self.cached_graph is not None:
             nodes = [
-                SimpleNamespace(node)
-                for node in self.serialized_graph["nodes"]
-                if node["nodegroup_id"] == str(self.nodegroup_id)
+                SimpleNamespace(**node)
+                for node in self.cached_graph.get_nodes_by_nodegroup(self.nodegroup_id)
             ]
-        except TypeError:  # handle if serialized_graph is None
+        else:
             nodes = self.nodegroup.node_set.all()
 
         for node in nodes:
@@ -865,6 +1206,47 @@ class Tile(models.TileModel):
             ret.append(func)
         return ret
 
+    @staticmethod
+    def _get_function_class_instances_by_nodegroup(keys):
+        """
+        Returns the function instances triggered by each (graphid, nodegroupid) key
+        using one query for all the graphs
+
+        """
+
+        keys = list(keys)
+        functionXgraphs = {}
+        for functionXgraph in (
+            models.FunctionXGraph.objects.filter(
+                graph_id__in={graphid for graphid, nodegroupid in keys}
+            )
+            .exclude(function__functiontype="primarydescriptors")
+            .select_related("function")
+        ):
+            functionXgraphs.setdefault(str(functionXgraph.graph_id), []).append(
+                functionXgraph
+            )
+
+        functions = {}
+        for graphid, nodegroupid in keys:
+            functions[(graphid, nodegroupid)] = []
+            for functionXgraph in functionXgraphs.get(str(graphid), []):
+                triggering_nodegroups = (functionXgraph.config or {}).get(
+                    "triggering_nodegroups"
+                )
+                if triggering_nodegroups is None:
+                    continue
+                if (
+                    triggering_nodegroups == []
+                    or str(nodegroupid) in triggering_nodegroups
+                ):
+                    functions[(graphid, nodegroupid)].append(
+                        functionXgraph.function.get_class_module()(
+                            functionXgraph.config, nodegroupid
+                        )
+                    )
+        return functions
+
     def filter_by_perm(self, user, perm):
         if user:
             if self.nodegroup_id is not None and user.has_perm(perm, self.nodegroup):
@@ -13,9 +13,12 @@ from arches.app.models.system_settings import settings
 from arches.app.permissions.arches_permission_base import (
     ArchesPermissionBase,
     ResourceInstancePermissions,
+    get_current_cache_entry,
+    get_permissions_version_keys,
+    get_versions,
+    set_cache_entry,
 )
-from arches.app.search.elasticsearch_dsl_builder import Bool, Ids, Terms, Nested, Query
-from arches.app.search.mappings import RESOURCES_INDEX
+from arches.app.search.elasticsearch_dsl_builder import Bool, Terms, Nested
 from arches.app.search.search import SearchEngine
 
 
@@ -194,7 +197,9 @@ class ArchesDefaultAllowPermissionFramework(ArchesPermissionBase):
                 permission__codename="no_access_to_resourceinstance"
             )
             if resources is not None:
-                group_object_permissions.filter(object_pk__in=resources)
+                group_object_permissions = group_object_permissions.filter(
+                    object_pk__in=resources
+                )
 
             restricted_group_instances = {
                 perm["object_pk"]
@@ -204,7 +209,9 @@ class ArchesDefaultAllowPermissionFramework(ArchesPermissionBase):
                 permission__codename="no_access_to_resourceinstance"
             )
             if resources is not None:
-                user_object_permissions.filter(object_pk__in=resources)
+                user_object_permissions = user_object_permissions.filter(
+                    object_pk__in=resources
+                )
 
             restricted_user_instances = {
                 perm["object_pk"]
@@ -215,31 +222,125 @@ class ArchesDefaultAllowPermissionFramework(ArchesPermissionBase):
             )
             return all_restricted_instances
         else:
-            terms = Terms(field="permissions.users_with_no_access", terms=[str(user.id)])  # type: ignore
-            query = Query(search_engine, start=0, limit=settings.SEARCH_RESULT_LIMIT)  # type: ignore
-            has_access = Bool()  # type: ignore
-            nested_term_filter = Nested(path="permissions", query=terms)  # type: ignore
-            has_access.must(nested_term_filter)  # type: ignore
-            if resources is not None:
-                has_access.filter(
-                    Ids(
-                        ids=resources,
-                    )
-                )
+            return list(self.get_restricted_instance_ids(user, resources))
+
+    def filter_resource_ids(self, user: User, resourceids) -> list[str]:
+        resourceids = list(resourceids)
+        if user.is_superuser:
+            return resourceids
+        restricted_ids = self.get_restricted_instance_ids(user, resourceids)
+        return [
+            resourceid
+            for resourceid in resourceids
+            if str(resourceid) not in restricted_ids
+        ]
+
+    def has_instance_restrictions(self, user: User) -> bool:
+        if user.is_superuser:
+            return False
+        restrictions = self.get_instance_restrictions(user)
+        return bool(restrictions["resourceids"] or restrictions["graphids"])
+
+    def get_restricted_instance_ids(
+        self, user: User, resources: list[str] | None = None
+    ) -> set[str]:
+        """
+        Returns the ids of the resource instances the user has no access to,
+        the same set of instances that are indexed with the user in "users_with_no_access"
+
+        Arguments:
+        user -- the user to check
+        resources -- limits the result to these resource ids, pass None for all restricted resources
+
+        """
+
+        restrictions = self.get_instance_restrictions(user)
+        if resources is None:
+            restricted_ids = set(restrictions["resourceids"])
+            candidates = None
+        else:
+            candidates = {str(resourceid) for resourceid in resources}
+            restricted_ids = candidates & restrictions["resourceids"]
+            candidates -= restricted_ids
+
+        if restrictions["graphids"] and candidates != set():
+            default_restricted = ResourceInstance.objects.filter(
+                graph_id__in=restrictions["graphids"]
+            ).exclude(principaluser_id=user.pk)
+            if candidates is not None:
+                default_restricted = default_restricted.filter(pk__in=candidates)
+            restricted_ids.update(
+                str(resourceid)
+                for resourceid in default_restricted.values_list("pk", flat=True)
+            )
+
+        return restricted_ids
+
+    def get_instance_restrictions(self, user: User) -> dict:
+        """
+        Returns a dict of the resource ids ("resourceids") a user is explicitly denied access to
+        and of the graphs ("graphids") whose instances the user is denied access to by default.
+        The result is cached in the user_permission cache until an object permission of the user,
+        or of one of their groups, changes.
+
+        """
+
+        key = f"restricted_instances:{user.pk}"
+        restrictions = get_current_cache_entry(key)
+        if restrictions is not None:
+            return restrictions
+
+        group_ids = list(user.groups.values_list("id", flat=True))
+        restrictions = {
+            "versions": get_versions(get_permissions_version_keys(user, group_ids)),
+            "resourceids": frozenset(),
+            "graphids": frozenset(),
+        }
+
+        if not user.is_superuser:
+            no_access = "no_access_to_resourceinstance"
+            content_type = ContentType.objects.get_for_model(ResourceInstance)
+            perms_by_resource: dict[str, set[str]] = {}
+            restricted_ids = set()
+            for resourceid, codename in UserObjectPermission.objects.filter(
+                user_id=user.pk, content_type=content_type
+            ).values_list("object_pk", "permission__codename"):
+                perms_by_resource.setdefault(resourceid, set()).add(codename)
+                if codename == no_access:
+                    restricted_ids.add(resourceid)
+            for resourceid, codename in GroupObjectPermission.objects.filter(
+                group_id__in=group_ids, content_type=content_type
+            ).values_list("object_pk", "permission__codename"):
+                perms_by_resource.setdefault(resourceid, set()).add(codename)
+            # a group restriction applies unless another permission was granted
+            restricted_ids.update(
+                resourceid
+                for resourceid, perms in perms_by_resource.items()
+                if perms == {no_access}
+            )
 
-            query.add_query(has_access)  # type: ignore
-            results = query.search(index=RESOURCES_INDEX, scroll="1m")  # type: ignore
-            scroll_id = results["_scroll_id"]
-            total = results["hits"]["total"]["value"]
-            if total > settings.SEARCH_RESULT_LIMIT:
-                pages = total // settings.SEARCH_RESULT_LIMIT
-                for page in range(pages):
-                    results_scrolled = query.se.es.scroll(
-                        scroll_id=scroll_id, scroll="1m"
-                    )
-                    results["hits"]["hits"] += results_scrolled["hits"]["hits"]
-            restricted_ids = [res["_id"] for res in results["hits"]["hits"]]
-            return restricted_ids
+            restricted_graphids = set()
+            for graphid, default_permissions in (
+                settings.PERMISSION_DEFAULTS or {}
+            ).items():
+                for default_permission in default_permissions:
+                    if no_access in default_permission["permissions"] and (
+                        (
+                            default_permission["type"] == "user"
+                            and int(default_permission["id"]) == user.pk
+                        )
+                        or (
+                            default_permission["type"] == "group"
+                            and int(default_permission["id"]) in group_ids
+                        )
+                    ):
+                        restricted_graphids.add(graphid)
+
+            restrictions["resourceids"] = frozenset(restricted_ids)
+            restrictions["graphids"] = frozenset(restricted_graphids)
+
+        set_cache_entry(key, restrictions)
+        return restrictions
 
     def check_resource_instance_permissions(
         self, user: User, resourceid: str, permission: str
@@ -96,15 +96,11 @@ class ArchesDefaultDenyPermissionFramework(ArchesPermissionBase):
             else:
                 query.add_query(Bool().should(nested_groups_read).should(nested_users_read))  # type: ignore
 
-        results = query.search(index=RESOURCES_INDEX, scroll="1m")  # type: ignore
-        scroll_id = results["_scroll_id"]
-        total = results["hits"]["total"]["value"]
-        if total > settings.SEARCH_RESULT_LIMIT:
-            pages = total // settings.SEARCH_RESULT_LIMIT
-            for page in range(pages):
-                results_scrolled = query.se.es.scroll(scroll_id=scroll_id, scroll="1m")
-                results["hits"]["hits"] += results_scrolled["hits"]["hits"]
-        restricted_ids = [res["_id"] for res in results["hits"]["hits"]]
+        restricted_ids = []
+        for results in query.iter_pages(  # type: ignore
+            index=RESOURCES_INDEX, page_size=settings.SEARCH_RESULT_LIMIT
+        ):
+            restricted_ids.extend(res["_id"] for res in results["hits"]["hits"])
         return restricted_ids
 
     def check_resource_instance_permissions(
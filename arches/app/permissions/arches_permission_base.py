@@ -17,6 +17,7 @@ from __future__ import annotations
 
 from abc import ABCMeta, abstractmethod
 import sys
+import time
 import uuid
 from typing import Iterable
 
@@ -38,6 +39,7 @@ from arches.app.models.models import Node, NodeGroup, TileModel
 from django.db.models import Q
 from arches.app.models.system_settings import settings
 from arches.app.models.models import ResourceInstance, MapLayer
+from arches.app.utils.graph_cache import LRUDict
 
 from arches.app.utils.permission_backend import (
     PermissionFramework,
@@ -68,15 +70,20 @@ class ArchesPermissionBase(PermissionFramework, metaclass=ABCMeta):
         obj: ResourceInstance | None = None,
     ) -> Permission:
         try:
-            return gsc.assign_perm(perm, user_or_group, obj=obj)
+            permission = gsc.assign_perm(perm, user_or_group, obj=obj)
         except NotUserNorGroup:
             raise ArchesNotUserNorGroup()
+        # permissions assigned to a queryset are bulk created without signals
+        invalidate_permissions(user_or_group)
+        return permission
 
     def get_permission_backend(self):
         return PermissionBackend()
 
     def remove_perm(self, perm, user_or_group=None, obj=None):
-        return gsc.remove_perm(perm, user_or_group=user_or_group, obj=obj)
+        result = gsc.remove_perm(perm, user_or_group=user_or_group, obj=obj)
+        invalidate_permissions(user_or_group)
+        return result
 
     def process_new_user(self, instance: User, created: bool) -> None:
         pass
@@ -186,13 +193,22 @@ class ArchesPermissionBase(PermissionFramework, metaclass=ABCMeta):
         any_perm -- True to check ANY perm in "perms" or False to check ALL perms
 
         """
-        return list(
-            set(
-                nodegroup.pk
-                for nodegroup in get_nodegroups_by_perm_for_user_or_group(
-                    user, perms, any_perm=any_perm
-                )
-            )
+        return list(self.get_nodegroup_ids_by_perm(user, perms, any_perm=any_perm))
+
+    def get_nodegroup_ids_by_perm(
+        self, user: User, perms: str | Iterable[str], any_perm: bool = True
+    ) -> frozenset[uuid.UUID]:
+        """
+        returns a frozenset of the ids of the node groups that a user has the given permission on
+
+        Arguments:
+        user -- the user to check
+        perms -- the permission string eg: "read_nodegroup" or list of strings
+        any_perm -- True to check ANY perm in "perms" or False to check ALL perms
+
+        """
+        return get_nodegroup_ids_by_perm_for_user_or_group(
+            user, perms, any_perm=any_perm
         )
 
     def get_users_with_perms(
@@ -633,9 +649,7 @@ class PermissionBackend(ObjectPermissionBackend):  # type: ignore
                         "given obj has '%s'" % (app_label, obj._meta.app_label)
                     )
 
-            obj_checker: ObjectPermissionChecker = CachedObjectPermissionChecker(
-                user_obj, obj
-            )
+            obj_checker = CachedObjectPermissionChecker(user_obj, obj)
             explicitly_defined_perms = obj_checker.get_perms(obj)
 
             if len(explicitly_defined_perms) > 0:
@@ -652,28 +666,25 @@ class PermissionBackend(ObjectPermissionBackend):  # type: ignore
 class CachedUserPermissionChecker:
     """
     A permission checker that leverages the 'user_permission' cache to check user-level user permissions.
+    Only the set of permission codenames of the user and their groups is cached.
     """
 
     def __init__(self, user: User):
-        user_permission_cache = caches["user_permission"]
-        current_user_cached_permissions = user_permission_cache.get(str(user.pk), {})
-
-        if current_user_cached_permissions.get("user_permissions"):
-            user_permissions = current_user_cached_permissions.get("user_permissions")
-        else:
-            user_permissions = set()
-
-            for group in user.groups.prefetch_related("permissions").all():
-                for group_permission in group.permissions.all():
-                    user_permissions.add(group_permission.codename)
-
-            for user_permission in user.user_permissions.all():
-                user_permissions.add(user_permission.codename)
-
-            current_user_cached_permissions["user_permissions"] = user_permissions
-            user_permission_cache.set(str(user.pk), current_user_cached_permissions)
-
-        self.user_permissions: set[str] = user_permissions
+        key = f"user_permissions:{user.pk}"
+        entry = get_current_cache_entry(key)
+        if entry is None:
+            group_ids = list(user.groups.values_list("id", flat=True))
+            entry = {
+                "versions": get_versions(get_permissions_version_keys(user, group_ids)),
+                "permissions": frozenset(
+                    Permission.objects.filter(
+                        Q(group__id__in=group_ids) | Q(user=user)
+                    ).values_list("codename", flat=True)
+                ),
+            }
+            set_cache_entry(key, entry)
+
+        self.user_permissions: frozenset[str] = entry["permissions"]
 
     def user_has_permission(self, permission: str) -> bool:
         if permission in self.user_permissions:
@@ -685,9 +696,10 @@ class CachedUserPermissionChecker:
 class CachedObjectPermissionChecker:
     """
     A permission checker that leverages the 'user_permission' cache to check object-level user permissions.
+    Only the permission codenames held on each instance of the model are cached, keyed by the instance's pk.
     """
 
-    def __new__(cls, user: User, input: type | Model | str) -> ObjectPermissionChecker:
+    def __init__(self, user: User | Group, input: type | Model | str):
         if inspect.isclass(input):
             classname = input.__name__
         elif isinstance(input, Model):
@@ -697,30 +709,234 @@ class CachedObjectPermissionChecker:
         else:
             raise Exception("Cannot derive model from input.")
 
-        user_permission_cache = caches["user_permission"]
+        kind = "g" if isinstance(user, Group) else "u"
+        key = f"object_permissions:{kind}:{user.pk}:{classname}"
+        entry = get_current_cache_entry(key)
+        if entry is None:
+            versions = get_versions(get_permissions_version_keys(user))
+            checker = ObjectPermissionChecker(user)
+            objects = list(apps.get_model("models", classname).objects.only("pk"))
+            checker.prefetch_perms(objects)
+            permissions = {}
+            # objects with the same permissions share one set
+            unique_perms = {}
+            for obj in objects:
+                perms = frozenset(checker.get_perms(obj))
+                if perms:
+                    permissions[str(obj.pk)] = unique_perms.setdefault(perms, perms)
+            entry = {"versions": versions, "permissions": permissions}
+            set_cache_entry(key, entry)
 
-        key = f"g:{user.pk}" if isinstance(user, Group) else str(user.pk)
-        current_user_cached_permissions = user_permission_cache.get(key, {})
+        self.permissions: dict[str, frozenset[str]] = entry["permissions"]
 
-        if current_user_cached_permissions.get(classname):
-            checker = current_user_cached_permissions.get(classname)
-        else:
-            checker = ObjectPermissionChecker(user)
-            checker.prefetch_perms(apps.get_model("models", classname).objects.all())
+    def get_perms(self, obj: Model) -> frozenset[str]:
+        return self.permissions.get(str(obj.pk), frozenset())
 
-            current_user_cached_permissions[classname] = checker
-            user_permission_cache.set(key, current_user_cached_permissions)
 
-        return checker
+NODEGROUPS_VERSION_KEY = "permissions_version:nodegroups"
+# changed whenever the whole user_permission cache is cleared
+ALL_PERMISSIONS_VERSION_KEY = "permissions_version:all"
 
+# process local copies of user_permission cache entries, see get_current_cache_entry
+local_permission_cache = LRUDict(maxsize=settings.PERMISSION_CACHE_SIZE)
 
-def get_nodegroups_by_perm_for_user_or_group(
+
+def get_permissions_version_key(user_or_group: User | Group) -> str:
+    if isinstance(user_or_group, Group):
+        return f"permissions_version:g:{user_or_group.pk}"
+    return f"permissions_version:u:{user_or_group.pk}"
+
+
+def get_permissions_version_keys(
+    user_or_group: User | Group, group_ids: Iterable[int] | None = None
+) -> list[str]:
+    """
+    Returns the keys of the versions a cached permission of a user or group depends on,
+    for a user these include the versions of each of their groups
+
+    Arguments:
+    user_or_group -- the user or group the permission is cached for
+    group_ids -- the ids of the user's groups, queried if not given
+
+    """
+
+    keys = [ALL_PERMISSIONS_VERSION_KEY, get_permissions_version_key(user_or_group)]
+    if not isinstance(user_or_group, Group):
+        if group_ids is None:
+            group_ids = user_or_group.groups.values_list("id", flat=True)
+        keys += [f"permissions_version:g:{group_id}" for group_id in group_ids]
+    return keys
+
+
+def versions_are_current(entry: dict) -> bool:
+    versions = caches["user_permission"].get_many(entry["versions"].keys())
+    return all(
+        versions.get(version_key, 0) == version
+        for version_key, version in entry["versions"].items()
+    )
+
+
+def get_current_cache_entry(key: str) -> dict | None:
+    """
+    Returns the entry cached under key in the user_permission cache,
+    or None if it is missing or any of the versions it was computed from has since changed
+
+    Entries are also kept in a per process LRU cache, their versions are only rechecked against
+    the user_permission cache once PERMISSION_CACHE_CHECK_INTERVAL seconds have passed.
+    The process's entries are discarded whenever it invalidates any permissions itself.
+
+    """
+
+    now = time.monotonic()
+    local_entry = local_permission_cache.get(key)
+    if local_entry is not None:
+        entry, checked = local_entry
+        if (
+            checked is not None
+            and now - checked < settings.PERMISSION_CACHE_CHECK_INTERVAL
+        ):
+            return entry
+        if versions_are_current(entry):
+            local_permission_cache.set(key, (entry, now))
+            return entry
+
+    entry = caches["user_permission"].get(key)
+    if entry is not None and versions_are_current(entry):
+        local_permission_cache.set(key, (entry, now))
+        return entry
+    return None
+
+
+def set_cache_entry(key: str, entry: dict) -> None:
+    """
+    Caches an entry (a dict with the "versions" it was computed from) in the user_permission cache
+    and in this process, its versions are checked again the next time it is read
+
+    """
+
+    caches["user_permission"].set(key, entry)
+    # read on each use so that a changed setting (eg: in tests) takes effect
+    local_permission_cache.maxsize = settings.PERMISSION_CACHE_SIZE
+    local_permission_cache.set(key, (entry, None))
+
+
+def clear_permission_cache() -> None:
+    """
+    Empties the user_permission cache and marks the entries cached in every process as stale
+
+    """
+
+    user_permission_cache = caches["user_permission"]
+    user_permission_cache.clear()
+    # a value that can't match a version read before the cache was cleared
+    user_permission_cache.set(ALL_PERMISSIONS_VERSION_KEY, time.time_ns(), None)
+    local_permission_cache.clear()
+
+
+def get_versions(version_keys: Iterable[str]) -> dict[str, int]:
+    version_keys = list(version_keys)
+    versions = caches["user_permission"].get_many(version_keys)
+    return {key: versions.get(key, 0) for key in version_keys}
+
+
+def invalidate_permissions(
+    user_or_group: User | Group | None = None,
+    user_ids: Iterable[int] = (),
+    group_ids: Iterable[int] = (),
+    nodegroups: bool = False,
+) -> None:
+    """
+    Marks the permissions cached for users, and for groups and their members, as stale
+
+    Arguments:
+    user_or_group -- a user or group whose permissions changed
+    user_ids -- ids of other users whose permissions or groups changed
+    group_ids -- ids of other groups whose permissions or members changed
+    nodegroups -- True if nodegroups were added or removed
+
+    """
+
+    keys = [f"permissions_version:u:{user_id}" for user_id in user_ids]
+    keys += [f"permissions_version:g:{group_id}" for group_id in group_ids]
+    if user_or_group is not None:
+        keys.append(get_permissions_version_key(user_or_group))
+    if nodegroups:
+        keys.append(NODEGROUPS_VERSION_KEY)
+
+    user_permission_cache = caches["user_permission"]
+    for key in keys:
+        try:
+            user_permission_cache.incr(key)
+        except ValueError:
+            # a missing (eg: evicted) version starts from a value no earlier version can have had
+            user_permission_cache.set(key, time.time_ns(), None)
+    local_permission_cache.clear()
+
+
+def get_nodegroup_permissions(
+    user_or_group: User | Group,
+) -> dict[uuid.UUID, frozenset[str]]:
+    """
+    Returns a map of the id of every nodegroup to the frozenset of permission codenames
+    the user or group explicitly holds on it (empty if no permissions are defined for it).
+    The map is cached in the user_permission cache until a permission of the user,
+    or of one of their groups, changes or nodegroups are added or removed.
+
+    Arguments:
+    user_or_group -- the user or group to get the permissions of
+
+    """
+
+    kind = "g" if isinstance(user_or_group, Group) else "u"
+    key = f"nodegroup_permissions:{kind}:{user_or_group.pk}"
+    entry = get_current_cache_entry(key)
+    if entry is not None:
+        return entry["permissions"]
+
+    versions = get_versions(
+        get_permissions_version_keys(user_or_group) + [NODEGROUPS_VERSION_KEY]
+    )
+    checker = ObjectPermissionChecker(user_or_group)
+    nodegroups = list(NodeGroup.objects.all())
+    checker.prefetch_perms(nodegroups)
+    permissions = {
+        nodegroup.pk: frozenset(checker.get_perms(nodegroup))
+        for nodegroup in nodegroups
+    }
+    set_cache_entry(key, {"versions": versions, "permissions": permissions})
+    return permissions
+
+
+def get_nodegroup_ids_by_perm_for_user_or_group(
     user_or_group: User | Group,
     perms: str | Iterable[str] | None = None,
     any_perm: bool = True,
     ignore_perms: bool = False,
-) -> dict[NodeGroup, set[Permission]]:
-    formatted_perms = []
+) -> frozenset[uuid.UUID]:
+    """
+    Returns the ids of the nodegroups a user or group has the given permissions on,
+    nodegroups without explicit permissions are accessible to everyone
+
+    Arguments:
+    user_or_group -- the user or group to check
+    perms -- the permission string eg: "read_nodegroup" or list of strings
+    any_perm -- True to check ANY perm in "perms" or False to check ALL perms
+    ignore_perms -- True to return every nodegroup regardless of perms
+
+    """
+
+    formatted_perms = _format_perms(perms, ignore_perms)
+    return frozenset(
+        nodegroupid
+        for nodegroupid, explicit_perms in get_nodegroup_permissions(
+            user_or_group
+        ).items()
+        if _has_nodegroup_perms(explicit_perms, formatted_perms, any_perm, ignore_perms)
+    )
+
+
+def _format_perms(perms: str | Iterable[str] | None, ignore_perms: bool) -> set[str]:
+    formatted_perms = set()
     if perms is None:
         if not ignore_perms:
             raise RuntimeError("Must provide perms or explicitly ignore")
@@ -730,30 +946,42 @@ def get_nodegroups_by_perm_for_user_or_group(
 
         # in some cases, `perms` can have a `models.` prefix
         for perm in perms:
-            if len(perm.split(".")) > 1:
-                formatted_perms.append(perm.split(".")[1])
-            else:
-                formatted_perms.append(perm)
+            formatted_perms.add(perm.split(".")[-1])
+    return formatted_perms
 
-    permitted_nodegroups = {}
-    checker: ObjectPermissionChecker = CachedObjectPermissionChecker(
-        user_or_group,
-        NodeGroup,
-    )
 
-    for nodegroup in NodeGroup.objects.all():
-        explicit_perms = checker.get_perms(nodegroup)
+def _has_nodegroup_perms(
+    explicit_perms: frozenset[str],
+    formatted_perms: set[str],
+    any_perm: bool,
+    ignore_perms: bool,
+) -> bool:
+    # if no explicit permissions, object is considered accessible by all with group permissions
+    if not explicit_perms or ignore_perms:
+        return True
+    if any_perm:
+        return bool(formatted_perms & explicit_perms)
+    return formatted_perms == explicit_perms
 
-        if len(explicit_perms):
-            if ignore_perms:
-                permitted_nodegroups[nodegroup] = explicit_perms
-            elif any_perm:
-                if len(set(formatted_perms) & set(explicit_perms)):
-                    permitted_nodegroups[nodegroup] = explicit_perms
-            else:
-                if set(formatted_perms) == set(explicit_perms):
-                    permitted_nodegroups[nodegroup] = explicit_perms
-        else:  # if no explicit permissions, object is considered accessible by all with group permissions
-            permitted_nodegroups[nodegroup] = set()
 
-    return permitted_nodegroups
+def get_nodegroups_by_perm_for_user_or_group(
+    user_or_group: User | Group,
+    perms: str | Iterable[str] | None = None,
+    any_perm: bool = True,
+    ignore_perms: bool = False,
+) -> dict[NodeGroup, set[Permission]]:
+    formatted_perms = _format_perms(perms, ignore_perms)
+    permissions = get_nodegroup_permissions(user_or_group)
+    nodegroups = NodeGroup.objects.in_bulk(
+        [
+            nodegroupid
+            for nodegroupid, explicit_perms in permissions.items()
+            if _has_nodegroup_perms(
+                explicit_perms, formatted_perms, any_perm, ignore_perms
+            )
+        ]
+    )
+    return {
+        nodegroup: set(permissions[nodegroupid])
+        for nodegroupid, nodegroup in nodegroups.items()
+    }
@@ -9,11 +9,24 @@ details = {}
 
 
 class BaseSearchFilter:
+    # the fields of the _source of the search results that the component needs
+    source_includes = ()
+    source_excludes = ()
+
     def __init__(self, request=None, user=None, componentname=None):
         self.request = request
         self.user = user
         self.componentname = componentname
 
+    def get_source_filter(self):
+        """
+        returns the (includes, excludes) fields of the _source of the search results
+        that the component needs, override to make them depend on the request
+
+        """
+
+        return self.source_includes, self.source_excludes
+
     def append_dsl(self, search_query_object, **kwargs):
         """
         used to append ES query dsl to the search request
@@ -1,6 +1,11 @@
+import base64
+import json
 from arches.app.models.system_settings import settings
 from arches.app.search.components.base import BaseSearchFilter
+from arches.app.utils.betterJSONSerializer import JSONSerializer
 from arches.app.utils.pagination import get_paginator
+from arches.app.utils.string_utils import get_str_kwarg_as_bool
+from django.utils.translation import gettext as _
 
 details = {
     "searchcomponentid": "",
@@ -15,10 +20,51 @@ details = {
 }
 
 
+class InvalidPageTokenError(ValueError):
+    """
+    Raised for a page token that can't be decoded or whose point in time has expired
+
+    """
+
+    pass
+
+
+def encode_page_token(pit_id, search_after):
+    """
+    Returns an opaque token for the page of results after the hit with the search_after sort values
+
+    """
+
+    token = JSONSerializer().serialize({"pit_id": pit_id, "search_after": search_after})
+    return base64.urlsafe_b64encode(token.encode("utf-8")).decode("ascii")
+
+
+def decode_page_token(page_token):
+    """
+    Returns the point in time id and search_after sort values of a page token
+
+    """
+
+    try:
+        token = json.loads(base64.urlsafe_b64decode(page_token.encode("ascii")))
+        return {"pit_id": token["pit_id"], "search_after": token["search_after"]}
+    except (ValueError, KeyError, TypeError):
+        raise InvalidPageTokenError(_("Invalid page token"))
+
+
 class PagingFilter(BaseSearchFilter):
+    """
+    Pages the search results by page number, or with a cursor when the request passes
+    cursor=true (for the first page) or the pagetoken returned with the previous page.
+    Cursor pages have no page numbers but can go beyond settings.SEARCH_RESULT_LIMIT
+    and take as long to fetch as the first page.
+
+    """
+
     def append_dsl(self, search_query_object, **kwargs):
         export = self.request.GET.get("export", None)
         mobile_download = self.request.GET.get("mobiledownload", None)
+        page_token = self.request.GET.get("pagetoken", None)
         page = (
             1
             if self.request.GET.get(self.componentname) == ""
@@ -32,10 +78,22 @@ class PagingFilter(BaseSearchFilter):
         else:
             limit = settings.SEARCH_ITEMS_PER_PAGE
         limit = int(self.request.GET.get("limit", limit))
-        search_query_object["query"].start = limit * int(page - 1)
         search_query_object["query"].limit = limit
+        if export is None and mobile_download is None and page_token:
+            search_query_object["cursor"] = decode_page_token(page_token)
+        elif (
+            export is None
+            and mobile_download is None
+            and get_str_kwarg_as_bool("cursor", self.request.GET)
+        ):
+            search_query_object["cursor"] = {"pit_id": None, "search_after": None}
+        else:
+            search_query_object["query"].start = limit * int(page - 1)
 
     def post_search_hook(self, search_query_object, response_object, **kwargs):
+        if "cursor" in search_query_object:
+            return self.post_cursor_search_hook(search_query_object, response_object)
+
         total = (
             response_object["results"]["hits"]["total"]["value"]
             if response_object["results"]["hits"]["total"]["value"]
@@ -73,3 +131,19 @@ class PagingFilter(BaseSearchFilter):
         if self.componentname not in response_object:
             response_object[self.componentname] = {}
         response_object[self.componentname]["paginator"] = ret
+
+    def post_cursor_search_hook(self, search_query_object, response_object):
+        query = search_query_object["query"]
+        next_page_token = None
+        if query.advance_cursor(response_object["results"]):
+            next_page_token = encode_page_token(query.pit_id, query.search_after)
+        else:
+            query.close_cursor()
+
+        if self.componentname not in response_object:
+            response_object[self.componentname] = {}
+        response_object[self.componentname]["paginator"] = {
+            "has_next": next_page_token is not None,
+            "next_page_token": next_page_token,
+            "pages": [],
+        }
@@ -14,6 +14,7 @@ from arches.app.search.components.base import BaseSearchFilter
 from arches.app.search.components.resource_type_filter import get_permitted_graphids
 from arches.app.utils.permission_backend import user_is_resource_reviewer
 from arches.app.utils import permission_backend
+from django.urls import reverse
 from django.utils.translation import get_language, gettext as _
 
 details = {
@@ -29,7 +30,30 @@ details = {
 }
 
 
+def use_slim_results(request):
+    """
+    Returns True if the request asks for slim search results (resultschema=slim)
+    Slim results only have the descriptors, map popup and references to the geometries
+    (by tileid) of each resource, tiles are fetched on demand from the resource_tiles view
+
+    """
+
+    return request.GET.get("resultschema", None) == "slim"
+
+
 class SearchResultsFilter(BaseSearchFilter):
+    source_includes = ("points", "geometries")
+    slim_source_includes = (
+        "geometries.tileid",
+        "geometries.nodegroup_id",
+        "geometries.provisional",
+    )
+
+    def get_source_filter(self):
+        if use_slim_results(self.request):
+            return self.slim_source_includes, self.source_excludes
+        return self.source_includes, self.source_excludes
+
     def append_dsl(self, search_query_object, **kwargs):
         permitted_nodegroups = kwargs.get("permitted_nodegroups")
         include_provisional = kwargs.get("include_provisional")
@@ -96,6 +120,12 @@ class SearchResultsFilter(BaseSearchFilter):
     def post_search_hook(self, search_query_object, response_object, **kwargs):
         permitted_nodegroups = kwargs.get("permitted_nodegroups")
         user_is_reviewer = user_is_resource_reviewer(self.request.user)
+        slim_results = use_slim_results(self.request)
+        if slim_results:
+            # reverse the url of the tiles of a resource once instead of once per result
+            tiles_url = reverse(
+                "resource_tiles", kwargs={"resourceid": uuid.UUID(int=0)}
+            )
 
         descriptor_types = ("displaydescription", "displayname")
         active_and_default_language_codes = (get_language(), settings.LANGUAGE_CODE)
@@ -113,12 +143,21 @@ class SearchResultsFilter(BaseSearchFilter):
                     self.request.user, result, groups
                 )
             )
-            result["_source"]["points"] = select_geoms_for_results(
-                result["_source"]["points"], geojson_nodes, user_is_reviewer
-            )
             result["_source"]["geometries"] = select_geoms_for_results(
-                result["_source"]["geometries"], geojson_nodes, user_is_reviewer
+                result["_source"].get("geometries", []), geojson_nodes, user_is_reviewer
             )
+            if slim_results:
+                result["_source"]["geometries"] = get_geometry_refs(
+                    result["_source"]["geometries"]
+                )
+                result["_source"]["tiles_url"] = tiles_url.replace(
+                    str(uuid.UUID(int=0)), result["_source"]["resourceinstanceid"]
+                )
+                result["_source"].pop("permissions", None)
+            else:
+                result["_source"]["points"] = select_geoms_for_results(
+                    result["_source"]["points"], geojson_nodes, user_is_reviewer
+                )
             try:
                 permitted_tiles = []
                 for tile in result["_source"]["tiles"]:
@@ -166,6 +205,20 @@ def select_geoms_for_results(features, geojson_nodes, user_is_reviewer):
     return res
 
 
+def get_geometry_refs(geometries):
+    """
+    Returns a reference (tileid and nodegroup_id) to each tile of a list of geometries
+
+    """
+
+    refs = {}
+    for geometry in geometries:
+        tileid = geometry.get("tileid")
+        if tileid not in refs:
+            refs[tileid] = {"tileid": tileid, "nodegroup_id": geometry["nodegroup_id"]}
+    return list(refs.values())
+
+
 def get_localized_descriptor(resource, descriptor_type, language_codes):
     descriptor = resource["_source"][descriptor_type]
     result = descriptor[0] if len(descriptor) > 0 else None
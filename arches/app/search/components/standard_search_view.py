@@ -3,6 +3,8 @@ from typing import Dict, Tuple
 from arches.app.models.system_settings import settings
 from arches.app.search.components.base_search_view import BaseSearchView
 from arches.app.search.components.base import SearchFilterFactory
+from arches.app.search.components.paging_filter import InvalidPageTokenError
+from arches.app.search.components.search_results import use_slim_results
 from arches.app.search.elasticsearch_dsl_builder import Query
 from arches.app.search.mappings import RESOURCES_INDEX
 from arches.app.search.search_engine_factory import SearchEngineFactory
@@ -17,6 +19,7 @@ from arches.app.utils.permission_backend import (
 )
 from arches.app.utils.string_utils import get_str_kwarg_as_bool
 from django.utils.translation import gettext as _
+from elasticsearch.exceptions import NotFoundError
 from datetime import datetime
 import logging
 
@@ -120,44 +123,68 @@ logger = logging.getLogger(__name__)
 
 
 class StandardSearchView(BaseSearchView):
+    source_includes = (
+        "graph_id",
+        "root_ontology_class",
+        "resourceinstanceid",
+        "displayname",
+        "displaydescription",
+        "map_popup",
+        "provisional_resource",
+        "permissions",
+    )
+    # the permissions are only used to set the search ui permissions of slim results
+    slim_source_includes = (
+        "graph_id",
+        "resourceinstanceid",
+        "displayname",
+        "displaydescription",
+        "map_popup",
+        "permissions",
+    )
 
-    def append_dsl(self, search_query_object, **kwargs):
-        search_query_object["query"].include("graph_id")
-        search_query_object["query"].include("root_ontology_class")
-        search_query_object["query"].include("resourceinstanceid")
-        search_query_object["query"].include("points")
-        search_query_object["query"].include("geometries")
-        search_query_object["query"].include("displayname")
-        search_query_object["query"].include("displaydescription")
-        search_query_object["query"].include("map_popup")
-        search_query_object["query"].include("provisional_resource")
-        search_query_object["query"].include("permissions")
-        load_tiles = get_str_kwarg_as_bool("tiles", self.request.GET)
-        if load_tiles:
-            search_query_object["query"].include("tiles")
+    def get_source_filter(self):
+        if use_slim_results(self.request):
+            return self.slim_source_includes, self.source_excludes
+        includes = self.source_includes
+        if get_str_kwarg_as_bool("tiles", self.request.GET):
+            includes += ("tiles",)
+        return includes, self.source_excludes
 
     def execute_query(self, search_query_object, response_object, **kwargs):
         for_export = get_str_kwarg_as_bool("export", self.request.GET)
+        mobile_download = self.request.GET.get("mobiledownload", None)
         pages = self.request.GET.get("pages", None)
-        total = int(self.request.GET.get("total", "0"))
         resourceinstanceid = self.request.GET.get("id", None)
+        cursor = search_query_object.get("cursor", None)
         dsl = search_query_object["query"]
-        if for_export or pages:
-            results = dsl.search(index=RESOURCES_INDEX, scroll="1m")
-            scroll_id = results["_scroll_id"]
-            if not pages:
-                if total <= settings.SEARCH_EXPORT_LIMIT:
-                    pages = (total // settings.SEARCH_RESULT_LIMIT) + 1
+        if for_export or pages or mobile_download:
+            if pages:
+                max_hits = (int(pages) + 1) * dsl.limit
+            elif mobile_download:
+                max_hits = dsl.limit
+            else:
+                max_hits = settings.SEARCH_EXPORT_LIMIT
+            results = None
+            for page in dsl.iter_pages(
+                index=RESOURCES_INDEX,
+                page_size=min(dsl.limit, settings.SEARCH_RESULT_LIMIT),
+                max_hits=max_hits,
+            ):
+                if results is None:
+                    results = page
                 else:
-                    pages = (
-                        int(
-                            settings.SEARCH_EXPORT_LIMIT // settings.SEARCH_RESULT_LIMIT
-                        )
-                        - 1
-                    )
-            for page in range(int(pages)):
-                results_scrolled = dsl.se.es.scroll(scroll_id=scroll_id, scroll="1m")
-                results["hits"]["hits"] += results_scrolled["hits"]["hits"]
+                    results["hits"]["hits"] += page["hits"]["hits"]
+        elif cursor is not None:
+            dsl.open_cursor(
+                index=RESOURCES_INDEX,
+                keep_alive=settings.SEARCH_CURSOR_KEEP_ALIVE,
+                **cursor,
+            )
+            try:
+                results = dsl.search()
+            except NotFoundError:
+                raise InvalidPageTokenError(_("The page token has expired"))
         else:
             results = dsl.search(index=RESOURCES_INDEX, id=resourceinstanceid)
 
@@ -221,6 +248,11 @@ class StandardSearchView(BaseSearchView):
                         include_provisional=include_provisional,
                         querystring=querystring,
                     )
+                    includes, excludes = search_filter.get_source_filter()
+                    for field in includes:
+                        search_query_object["query"].include(field)
+                    for field in excludes:
+                        search_query_object["query"].exclude(field)
             append_instance_permission_filter_dsl(self.request, search_query_object)
         except Exception as err:
             logger.exception(err)
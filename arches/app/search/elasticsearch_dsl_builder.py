@@ -53,6 +53,9 @@ class Query(Dsl):
         self.start = kwargs.pop("start", 0)
         self.limit = kwargs.pop("limit", 10)
         self.scroll = None
+        self.pit_id = None
+        self.keep_alive = "1m"
+        self.search_after = None
 
         self.dsl = {
             "query": {"match_all": {}},
@@ -80,10 +83,12 @@ class Query(Dsl):
             self.dsl["aggs"][agg.name] = agg.agg[agg.name]
 
     def include(self, include):
-        self.dsl["source_includes"].append(include)
+        if include not in self.dsl["source_includes"]:
+            self.dsl["source_includes"].append(include)
 
     def exclude(self, exclude):
-        self.dsl["source_excludes"].append(exclude)
+        if exclude not in self.dsl["source_excludes"]:
+            self.dsl["source_excludes"].append(exclude)
 
     def sort(self, field, dsl):
         self.dsl["sort"] = [{field: dsl}]
@@ -96,7 +101,9 @@ class Query(Dsl):
         self.limit = kwargs.pop("limit", self.limit)
         self.scroll = kwargs.pop("scroll", None)
         self.prepare()
-        if self.scroll is None:
+        if self.pit_id is not None:
+            return self.se.search(**self.dsl)
+        elif self.scroll is None:
             return self.se.search(index=index, id=kwargs.get("id", None), **self.dsl)
         else:
             return self.se.search(index=index, scroll=self.scroll, **self.dsl)
@@ -113,10 +120,106 @@ class Query(Dsl):
         return self.se.delete(index=index, query=self.dsl, **kwargs)
 
     def prepare(self, scroll=False):
-        if self.scroll is None:
+        self.dsl.pop("from", None)
+        self.dsl.pop("pit", None)
+        self.dsl.pop("search_after", None)
+        if self.pit_id is not None:
+            self.dsl["pit"] = {"id": self.pit_id, "keep_alive": self.keep_alive}
+            if self.search_after is not None:
+                self.dsl["search_after"] = self.search_after
+        elif self.scroll is None:
             self.dsl["from"] = self.start
         self.dsl["size"] = self.limit
 
+    def add_sort_tiebreaker(self):
+        """
+        Makes the sort of the query total so that it can be paged with search_after,
+        results without a sort are ordered by score (the default order of a search)
+        then by the position of the document in the point in time
+
+        """
+
+        sort = self.dsl.setdefault("sort", [{"_score": {"order": "desc"}}])
+        if not any("_shard_doc" in field for field in sort):
+            sort.append({"_shard_doc": {"order": "asc"}})
+
+    def open_cursor(self, index="", keep_alive="1m", pit_id=None, search_after=None):
+        """
+        Pages the query with search_after over a point in time, so that every page
+        is as fast to fetch as the first one and no page is limited by index.max_result_window
+
+        Keyword Arguments:
+        index -- the index to open a point in time of (ignored if pit_id is passed)
+        keep_alive -- how long the point in time is kept open after each page is fetched
+        pit_id -- the id of an already open point in time to continue paging
+        search_after -- the sort values of the last hit of the previous page
+
+        """
+
+        self.keep_alive = keep_alive
+        if pit_id is None:
+            pit_id = self.se.open_point_in_time(index=index, keep_alive=keep_alive)
+        self.pit_id = pit_id
+        self.search_after = search_after
+        self.add_sort_tiebreaker()
+
+    def close_cursor(self):
+        if self.pit_id is not None:
+            self.se.close_point_in_time(self.pit_id)
+        self.pit_id = None
+        self.search_after = None
+
+    def advance_cursor(self, results):
+        """
+        Moves the cursor past the page of results and returns True if there may be more pages
+
+        """
+
+        self.pit_id = results.get("pit_id", self.pit_id)
+        hits = results["hits"]["hits"]
+        if len(hits) < self.limit or not hits:
+            return False
+        self.search_after = hits[-1]["sort"]
+        return True
+
+    def iter_pages(self, index="", page_size=1000, max_hits=None, keep_alive="1m"):
+        """
+        Yields the results of the query a page at a time over a point in time,
+        the first page is always yielded (with any aggregations) even if it has no hits
+
+        Keyword Arguments:
+        index -- the index to search
+        page_size -- the number of hits in each page
+        max_hits -- stop after this many hits
+        keep_alive -- how long the point in time is kept open between pages
+
+        """
+
+        if "sort" not in self.dsl:
+            # the order of an exhaustive walk doesn't matter, so skip scoring the sort
+            self.dsl["sort"] = [{"_shard_doc": {"order": "asc"}}]
+        self.open_cursor(index=index, keep_alive=keep_alive)
+        remaining = max_hits
+        try:
+            while True:
+                results = self.search(limit=page_size)
+                if results is None:
+                    raise Exception(
+                        _("There was an error retrieving the search results")
+                    )
+                more = self.advance_cursor(results)
+                if remaining is not None:
+                    results["hits"]["hits"] = results["hits"]["hits"][:remaining]
+                    remaining -= len(results["hits"]["hits"])
+                    more = more and remaining > 0
+                yield results
+                if not more:
+                    break
+                # aggregations only need to be computed for the first page
+                self.dsl.pop("aggs", None)
+        finally:
+            self.close_cursor()
+
 
 class Bool(Dsl):
     """
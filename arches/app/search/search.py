@@ -16,6 +16,7 @@ You should have received a copy of the GNU Affero General Public License
 along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
+import functools
 import urllib.request
 import urllib.parse
 import urllib.error
@@ -35,7 +36,8 @@ class SearchEngine(object):
         #
         serializer = JSONSerializer()
         serializer.mimetype = "application/json"
-        serializer.dumps = serializer.serialize
+        # documents and queries don't need their keys sorted
+        serializer.dumps = functools.partial(serializer.serialize, sort_keys=False)
         serializer.loads = JSONDeserializer().deserialize
         self.prefix = kwargs.pop("prefix", "").lower()
         self.es = Elasticsearch(serializer=serializer, **kwargs)
@@ -119,13 +121,63 @@ class SearchEngine(object):
     def delete_index(self, **kwargs):
         """
         Deletes an entire index
+        If the index name is an alias then the indexes behind the alias are deleted
 
         """
 
         kwargs = self._add_prefix(**kwargs)
+        alias_indexes = self.get_alias_indexes(kwargs["index"], prefix=False)
+        if alias_indexes:
+            kwargs["index"] = ",".join(alias_indexes)
         print("deleting index : %s" % kwargs.get("index"))
         return self.es.options(ignore_status=[400, 404]).indices.delete(**kwargs)
 
+    def get_alias_indexes(self, alias, prefix=True):
+        """
+        Returns the names of the indexes an alias points to,
+        or an empty list if there is no such alias
+
+        """
+
+        if prefix:
+            alias = self._add_prefix(alias)
+        response = self.es.options(ignore_status=404).indices.get_alias(name=alias)
+        if response.meta.status == 404:
+            return []
+        return list(response.body.keys())
+
+    def swap_aliases(self, aliases):
+        """
+        Atomically points each alias at its new index, eg: {"resources": "resources_20240101120000"}
+        The indexes each alias previously pointed to are deleted once the swap has completed.
+        An existing index with the same name as an alias is replaced by the alias.
+
+        """
+
+        actions = []
+        previous_indexes = []
+        new_indexes = [self._add_prefix(index) for index in aliases.values()]
+        for alias, index in aliases.items():
+            alias = self._add_prefix(alias)
+            index = self._add_prefix(index)
+            alias_indexes = self.get_alias_indexes(alias, prefix=False)
+            if alias_indexes:
+                for alias_index in alias_indexes:
+                    actions.append({"remove": {"index": alias_index, "alias": alias}})
+                previous_indexes.extend(alias_indexes)
+            elif self.es.indices.exists(index=alias):
+                actions.append({"remove_index": {"index": alias}})
+            actions.append(
+                {"add": {"index": index, "alias": alias, "is_write_index": True}}
+            )
+
+        self.es.indices.update_aliases(actions=actions)
+        for previous_index in previous_indexes:
+            if previous_index not in new_indexes:
+                self.es.options(ignore_status=[400, 404]).indices.delete(
+                    index=previous_index
+                )
+
     def search(self, **kwargs):
         """
         Search for an item in the index.
@@ -134,7 +186,11 @@ class SearchEngine(object):
 
         """
 
-        kwargs = self._add_prefix(**kwargs)
+        if "pit" in kwargs:
+            # the index of a point in time search is part of the point in time
+            kwargs.pop("index", None)
+        else:
+            kwargs = self._add_prefix(**kwargs)
         query = kwargs.get("query", None)
         id = kwargs.pop("id", None)
 
@@ -165,6 +221,25 @@ class SearchEngine(object):
             )
         return ret
 
+    def open_point_in_time(self, keep_alive="1m", **kwargs):
+        """
+        Opens a point in time of an index, searches that pass its id in "pit"
+        see the index as it was when the point in time was opened
+        Returns the id of the point in time
+
+        """
+
+        kwargs = self._add_prefix(**kwargs)
+        return self.es.open_point_in_time(keep_alive=keep_alive, **kwargs)["id"]
+
+    def close_point_in_time(self, id):
+        """
+        Closes a point in time, points in time that have already expired are ignored
+
+        """
+
+        self.es.options(ignore_status=404).close_point_in_time(id=id)
+
     def create_mapping(
         self, index, fieldname="", fieldtype="string", fieldindex=None, body=None
     ):
@@ -254,6 +329,31 @@ class SearchEngine(object):
         kwargs = self._add_prefix(**kwargs)
         self.es.indices.refresh(**kwargs)
 
+    def get_index_settings(self, **kwargs):
+        """
+        Returns the flattened settings of an index, eg: {"index.refresh_interval": "1s"}
+        Pass a name (or list of names) to limit the settings returned
+
+        """
+
+        kwargs = self._add_prefix(**kwargs)
+        response = self.es.indices.get_settings(flat_settings=True, **kwargs).body
+        index_settings = {}
+        for index in response.values():
+            index_settings.update(index["settings"])
+        return index_settings
+
+    def put_index_settings(self, **kwargs):
+        """
+        Updates the dynamic settings of an index
+        Pass a settings dict, eg: {"index.refresh_interval": "-1"}
+        Settings with a value of None are reset to their default
+
+        """
+
+        kwargs = self._add_prefix(**kwargs)
+        return self.es.indices.put_settings(**kwargs)
+
     def BulkIndexer(outer_self, batch_size=500, **kwargs):
         class _BulkIndexer(object):
             def __init__(self, **kwargs):
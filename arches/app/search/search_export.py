@@ -21,17 +21,18 @@ import csv
 import datetime
 import logging
 from io import StringIO
-from io import BytesIO
+from tempfile import SpooledTemporaryFile
 import re
 from django.contrib.gis.geos import GeometryCollection, GEOSGeometry
 from django.core.files import File
 from django.utils.translation import gettext as _
-from django.urls import reverse, resolve
+from django.urls import reverse
 from arches.app.models import models
 from arches.app.models.system_settings import settings
 from arches.app.datatypes.datatypes import DataTypeFactory
 from arches.app.utils.flatten_dict import flatten_dict
-from arches.app.utils.betterJSONSerializer import JSONDeserializer
+from arches.app.search.mappings import RESOURCES_INDEX
+from arches.app.utils.betterJSONSerializer import JSONSerializer, JSONDeserializer
 from arches.app.utils.data_management.resources.exporter import ResourceExporter
 from arches.app.utils.geo_utils import GeoUtils
 from arches.app.utils.string_utils import get_str_kwarg_as_bool
@@ -42,6 +43,11 @@ logger = logging.getLogger(__name__)
 
 
 class SearchResultsExporter(object):
+    # formats that export_to_zipfile can write incrementally
+    streaming_formats = ("tilecsv", "geojson")
+    # files being written are kept in memory until they grow beyond this many bytes
+    spool_max_size = 10 * 1024 * 1024
+
     def __init__(self, search_request=None):
         if search_request is None:
             raise Exception("Need to pass in a search request")
@@ -165,81 +171,51 @@ class SearchResultsExporter(object):
 
     def export(self, format, report_link):
         ret = []
-        func, args, kwargs = resolve(reverse("search_results"))
-        kwargs["request"] = self.search_request
-        search_res_json = func(*args, **kwargs)
-        if search_res_json.status_code == 500:
-            return ret
-        results = JSONDeserializer().deserialize(search_res_json.content)
-        instances = results["results"]["hits"]["hits"]
         output = {}
-
-        for resource_instance in instances:
-            use_fieldname = self.format in ("shp",)
-            resource_obj = self.flatten_tiles(
-                resource_instance["_source"]["tiles"],
-                self.datatype_factory,
-                compact=self.compact,
-                use_fieldname=use_fieldname,
+        instance_count = 0
+        # the hits are flattened a page at a time, only the flattened resources are kept
+        for instances in self.iter_search_results():
+            instance_count += len(instances)
+            display_values = self.get_display_values(
+                [
+                    tile
+                    for instance in instances
+                    for tile in instance["_source"]["tiles"]
+                ]
             )
-            has_geom = resource_obj.pop("has_geometry")
-            skip_resource = self.format in ("shp",) and has_geom is False
-            if skip_resource is False:
-                try:
-                    output[resource_instance["_source"]["graph_id"]]["output"].append(
-                        resource_obj
-                    )
-                except KeyError as e:
-                    output[resource_instance["_source"]["graph_id"]] = {"output": []}
-                    output[resource_instance["_source"]["graph_id"]]["output"].append(
-                        resource_obj
-                    )
+
+            for resource_instance in instances:
+                use_fieldname = self.format in ("shp",)
+                resource_obj = self.flatten_tiles(
+                    resource_instance["_source"]["tiles"],
+                    self.datatype_factory,
+                    compact=self.compact,
+                    use_fieldname=use_fieldname,
+                    display_values=display_values,
+                )
+                has_geom = resource_obj.pop("has_geometry")
+                skip_resource = self.format in ("shp",) and has_geom is False
+                if skip_resource is False:
+                    output.setdefault(
+                        resource_instance["_source"]["graph_id"], {"output": []}
+                    )["output"].append(resource_obj)
 
         for graph_id, resources in output.items():
             graph = models.GraphModel.objects.get(pk=graph_id)
 
             if (report_link == "true") and (format != "tilexl"):
                 for resource in resources["output"]:
-                    report_url = reverse(
-                        "resource_report", kwargs={"resourceid": resource["resourceid"]}
-                    )
-                    export_namespace = settings.ARCHES_NAMESPACE_FOR_DATA_EXPORT.rstrip(
-                        "/"
-                    )
-                    resource["Link"] = f"{export_namespace}{report_url}"
+                    resource["Link"] = self.get_report_link(resource["resourceid"])
 
             if format == "geojson":
-
-                if settings.EXPORT_DATA_FIELDS_IN_CARD_ORDER is True:
-                    headers = self.return_ordered_header(graph_id, "csv")
-                else:
-                    headers = list(
-                        graph.node_set.filter(exportable=True).values_list(
-                            "name", flat=True
-                        )
-                    )
-
-                if (report_link == "true") and ("Link" not in headers):
-                    headers.append("Link")
+                headers = self.get_headers(graph, format, report_link)
                 ret = self.to_geojson(
                     resources["output"], headers=headers, name=graph.name
                 )
                 return ret, ""
 
             if format == "tilecsv":
-
-                if settings.EXPORT_DATA_FIELDS_IN_CARD_ORDER is True:
-                    headers = self.return_ordered_header(graph_id, "csv")
-                else:
-                    headers = list(
-                        graph.node_set.filter(exportable=True).values_list(
-                            "name", flat=True
-                        )
-                    )
-
-                headers.append("resourceid")
-                if (report_link == "true") and ("Link" not in headers):
-                    headers.append("Link")
+                headers = self.get_headers(graph, format, report_link)
                 ret.append(
                     self.to_csv(resources["output"], headers=headers, name=graph.name)
                 )
@@ -300,32 +276,205 @@ class SearchResultsExporter(object):
         )
         search_export_info = models.SearchExportHistory(
             user=self.search_request.user,
-            numberofinstances=len(instances),
+            numberofinstances=instance_count,
             url=search_request_path,
         )
         search_export_info.save()
 
         return ret, search_export_info
 
-    def write_export_zipfile(self, files_for_export, export_info, export_name=None):
+    def get_headers(self, graph, format, report_link):
         """
-        Writes a list of file like objects out to a zip file
+        Returns the column names of a graph's csv or geojson export
+
         """
-        zip_stream = zip_utils.create_zip_file(files_for_export, "outputfile")
+
+        if settings.EXPORT_DATA_FIELDS_IN_CARD_ORDER is True:
+            headers = self.return_ordered_header(graph.pk, "csv")
+        else:
+            headers = list(
+                graph.node_set.filter(exportable=True).values_list("name", flat=True)
+            )
+
+        if format == "tilecsv":
+            headers.append("resourceid")
+        if (report_link == "true") and ("Link" not in headers):
+            headers.append("Link")
+        return headers
+
+    def get_report_link(self, resourceid):
+        report_url = reverse("resource_report", kwargs={"resourceid": resourceid})
+        export_namespace = settings.ARCHES_NAMESPACE_FOR_DATA_EXPORT.rstrip("/")
+        return f"{export_namespace}{report_url}"
+
+    def get_export_file_name(self, export_name=None):
         today = datetime.datetime.now().isoformat()
-        name = (
+        return (
             f"{export_name}.zip"
             if (export_name is not None and export_name != "Arches Export")
             else f"{settings.APP_NAME}_{today}.zip"
         )
+
+    def write_export_zipfile(self, files_for_export, export_info, export_name=None):
+        """
+        Writes a list of file like objects out to a zip file
+        """
         search_history_obj = models.SearchExportHistory.objects.get(
             pk=export_info.searchexportid
         )
-        f = BytesIO(zip_stream)
-        download = File(f)
-        search_history_obj.downloadfile.save(name, download)
+        with SpooledTemporaryFile(max_size=self.spool_max_size) as f:
+            zip_utils.write_zip_file(files_for_export, "outputfile", f)
+            f.seek(0)
+            search_history_obj.downloadfile.save(
+                self.get_export_file_name(export_name), File(f)
+            )
         return search_history_obj.searchexportid
 
+    def get_search_query(self):
+        """
+        Returns the query (with every search filter and permission filter applied)
+        that the search_results view would run for the search request
+
+        """
+
+        from arches.app.views.search import search_results  # avoids circular import
+
+        query = search_results(self.search_request, returnDsl=True)
+        if getattr(query, "dsl", None) is None:
+            raise Exception(_("There was an error retrieving the search results"))
+        return query
+
+    def iter_search_results(self, page_size=1000):
+        """
+        Yields the hits of the search request a page at a time, paging over a point in time
+        of the results rather than loading them all at once, up to settings.SEARCH_EXPORT_LIMIT hits.
+        As in the search results, tiles of nodegroups the user can't read are left out.
+
+        Keyword Arguments:
+        page_size -- the number of hits in each page
+
+        """
+
+        from arches.app.views.search import get_permitted_nodegroups
+
+        permitted_nodegroups = {
+            str(nodegroupid)
+            for nodegroupid in get_permitted_nodegroups(self.search_request.user)
+        }
+        query = self.get_search_query()
+        query.dsl.pop("aggs", None)
+        query.dsl["source_includes"] = ["graph_id", "resourceinstanceid", "tiles"]
+        query.dsl["source_excludes"] = []
+
+        for results in query.iter_pages(
+            index=RESOURCES_INDEX,
+            page_size=page_size,
+            max_hits=settings.SEARCH_EXPORT_LIMIT,
+        ):
+            hits = results["hits"]["hits"]
+            if not hits:
+                break
+            for hit in hits:
+                hit["_source"]["tiles"] = [
+                    tile
+                    for tile in hit["_source"].get("tiles", [])
+                    if tile["nodegroup_id"] in permitted_nodegroups
+                ]
+            self.prefetch_nodes(hits)
+            yield hits
+
+    def prefetch_nodes(self, hits):
+        """
+        Loads the nodes of the tiles in a page of hits into the node lookup with one query
+
+        """
+
+        nodeids = {
+            nodeid
+            for hit in hits
+            for tile in hit["_source"]["tiles"]
+            for nodeid in tile["data"]
+            if nodeid not in self.node_lookup
+        }
+        if nodeids:
+            for nodeid, node in models.Node.objects.in_bulk(nodeids).items():
+                self.node_lookup[str(nodeid)] = node
+
+    def export_to_zipfile(self, format, report_link, export_name=None, page_size=1000):
+        """
+        Exports the search results to a zip file saved to a new SearchExportHistory
+        and returns the id of the SearchExportHistory
+
+        Unlike export, resources are flattened a page at a time and their rows written to spooled
+        temporary files (one per graph) as they go, so memory use doesn't grow with the number of results
+
+        Keyword Arguments:
+        format -- one of streaming_formats
+        report_link -- "true" to add a link to the report of each resource
+        export_name -- the name of the zip file
+        page_size -- the number of resources fetched from the search index at a time
+
+        """
+
+        if format not in self.streaming_formats:
+            raise Exception(_("Unable to stream an export to {0}").format(format))
+
+        use_fieldname = self.format in ("shp",)
+        exports = {}
+        numberofinstances = 0
+        try:
+            for hits in self.iter_search_results(page_size=page_size):
+                display_values = self.get_display_values(
+                    [tile for hit in hits for tile in hit["_source"]["tiles"]]
+                )
+                for hit in hits:
+                    numberofinstances += 1
+                    resource_obj = self.flatten_tiles(
+                        hit["_source"]["tiles"],
+                        self.datatype_factory,
+                        compact=self.compact,
+                        use_fieldname=use_fieldname,
+                        display_values=display_values,
+                    )
+                    resource_obj.pop("has_geometry", None)
+                    if report_link == "true" and "resourceid" in resource_obj:
+                        resource_obj["Link"] = self.get_report_link(
+                            resource_obj["resourceid"]
+                        )
+                    graph_id = hit["_source"]["graph_id"]
+                    if graph_id not in exports:
+                        exports[graph_id] = self.start_graph_export(
+                            graph_id, format, report_link
+                        )
+                    exports[graph_id].write(resource_obj)
+
+            files_for_export = []
+            for graph_export in exports.values():
+                files_for_export.append(graph_export.close())
+
+            full_path = self.search_request.get_full_path()
+            search_export_info = models.SearchExportHistory.objects.create(
+                user=self.search_request.user,
+                numberofinstances=numberofinstances,
+                url=self.search_request.path if full_path is None else full_path,
+            )
+            return self.write_export_zipfile(
+                files_for_export, search_export_info, export_name
+            )
+        finally:
+            for graph_export in exports.values():
+                graph_export.file.close()
+
+    def start_graph_export(self, graph_id, format, report_link):
+        graph = models.GraphModel.objects.get(pk=graph_id)
+        headers = self.get_headers(graph, format, report_link)
+        dest = SpooledTemporaryFile(
+            max_size=self.spool_max_size, mode="w+", encoding="utf-8", newline=""
+        )
+        if format == "geojson":
+            return GeoJSONExportFile(self, dest, headers, graph.name)
+        return CsvExportFile(dest, headers, graph.name)
+
     def get_node(self, nodeid):
         nodeid = str(nodeid)
         try:
@@ -382,7 +531,33 @@ class SearchResultsExporter(object):
                     resource_json[tile["card_name"]] = tile[tile["card_name"]]
         return resource_json
 
-    def flatten_tiles(self, tiles, datatype_factory, compact=True, use_fieldname=False):
+    def get_display_values(self, tiles):
+        """
+        Returns the display values of the exportable nodes of a list of tiles keyed by (tileid, nodeid),
+        the values of each datatype are looked up together
+
+        """
+
+        if self.export_system_values:
+            return {}
+        keys = []
+        pairs = []
+        for tile in tiles:
+            for nodeid in tile["data"]:
+                node = self.get_node(nodeid)
+                if node.exportable:
+                    keys.append((tile["tileid"], nodeid))
+                    pairs.append((tile, node))
+        return dict(zip(keys, self.datatype_factory.get_display_values(pairs)))
+
+    def flatten_tiles(
+        self,
+        tiles,
+        datatype_factory,
+        compact=True,
+        use_fieldname=False,
+        display_values=None,
+    ):
         feature_collections = {}
         compacted_data = {}
         lookup = {}
@@ -398,6 +573,8 @@ class SearchResultsExporter(object):
                         node_value = datatype.transform_export_values(
                             value, **{"concept_export_value_type": "id"}
                         )
+                    elif display_values is not None:
+                        node_value = display_values[(tile["tileid"], nodeid)]
                     else:
                         node_value = datatype.get_display_value(tile, node)
                     label = node.fieldname if use_fieldname is True else node.name
@@ -515,5 +692,60 @@ class SearchResultsExporter(object):
         return feature_collection
 
 
+class CsvExportFile(object):
+    """
+    Writes the flattened resources of a graph to a csv file one row at a time
+
+    """
+
+    def __init__(self, file, headers, name):
+        self.file = file
+        self.name = f"{name}.csv"
+        self.writer = csv.DictWriter(file, delimiter=",", fieldnames=headers)
+        self.writer.writeheader()
+
+    def write(self, instance):
+        self.writer.writerow(
+            {k: sanitize_csv_value(str(v)) for k, v in list(instance.items())}
+        )
+
+    def close(self):
+        return {"name": self.name, "outputfile": self.file}
+
+
+class GeoJSONExportFile(object):
+    """
+    Writes the features of the flattened resources of a graph to a geojson
+    feature collection one resource at a time
+
+    """
+
+    def __init__(self, exporter, file, headers, name):
+        self.exporter = exporter
+        self.file = file
+        self.headers = headers
+        self.name = f"{name}.geojson"
+        self.serializer = JSONSerializer()
+        self.features_written = False
+        self.file.write('{"type": "FeatureCollection", "features": [')
+
+    def write(self, instance):
+        geometry_fields = self.exporter.get_geometry_fieldnames(instance)
+        if not geometry_fields:
+            return
+        features = self.exporter.to_geojson(
+            [instance], headers=self.headers, name=self.name
+        )["features"]
+        for feature in features:
+            if self.features_written:
+                self.file.write(", ")
+            self.file.write(self.serializer.serialize(feature, sort_keys=False))
+            self.features_written = True
+
+    def close(self):
+        self.file.write("]}")
+        return {"name": self.name, "outputfile": self.file}
+
+
 def sanitize_csv_value(value):
     return re.sub(r"^([@]|[=]|[+]|[-])", r"'\g<1>", value)
@@ -83,6 +83,9 @@ def export_search_results(self, userid, request_values, format, report_link):
             logger.error("Temp file could not be created.")
             raise
         os.unlink(tmp.name)
+    elif format in SearchResultsExporter.streaming_formats:
+        exporter = SearchResultsExporter(search_request=new_request)
+        exportid = exporter.export_to_zipfile(format, report_link, export_name)
     else:
         exporter = SearchResultsExporter(search_request=new_request)
         files, export_info = exporter.export(format, report_link)
@@ -5,6 +5,7 @@ import json
 import inspect
 import uuid
 from io import StringIO
+from json.encoder import encode_basestring, encode_basestring_ascii
 from itertools import chain
 from django.db import models, DEFAULT_DB_ALIAS
 from django.db.models import Model
@@ -59,7 +60,7 @@ class JSONSerializer(object):
             return DjangoJSONEncoder().encode(obj.raw_value)
         return self.serialize(obj, **self._options)
 
-    def serializeToPython(self, obj, **options):
+    def set_options(self, **options):
         # allow users to override any kwargs passed into the __init__ method
         self.options = self._options.copy()
         self.options.update(options)
@@ -71,9 +72,42 @@ class JSONSerializer(object):
         self.geom_format = self.options.get("geom_format", "wkt")
         self.force_recalculation = self.options.get("force_recalculation", False)
 
+    def serializeToPython(self, obj, **options):
+        self.set_options(**options)
         return self.handle_object(obj, **self.options)
 
     def serialize(self, obj, **options):
+        """
+        Serializes obj to a JSON string (or utf-8 bytes if utf_encode is set),
+        keys are sorted unless sort_keys=False is passed
+
+        """
+
+        encoder_options = {
+            key: value
+            for key, value in options.items()
+            if key not in ("sort_keys", "fields", "exclude", "force_recalculation")
+        }
+        if set(encoder_options) - JSONStreamEncoder.options:
+            return self.serialize_with_json_module(obj, **options)
+
+        self.set_options(**options)
+        encoder = JSONStreamEncoder(
+            serializer=self, sort_keys=options.get("sort_keys", True), **encoder_options
+        )
+        result = encoder.encode(obj, **self.options)
+        if isinstance(result, str):
+            # a raw string, which is not re-encoded
+            return result
+        return result if self.utf_encode else result.decode("utf-8")
+
+    def serialize_with_json_module(self, obj, **options):
+        """
+        Serializes obj by converting it to python and passing that to json.dumps,
+        used for options that are passed through to json.dumps and JSONStreamEncoder doesn't support
+
+        """
+
         obj = self.serializeToPython(obj, **options)
         # prevent raw strings from being re-encoded
         # this is especially important when doing bulk operations in elasticsearch
@@ -257,6 +291,294 @@ class JSONSerializer(object):
         return data
 
 
+# categories of values as handled by JSONSerializer.handle_object
+_STR, _INT, _FLOAT, _BOOL, _NONE, _DICT, _LIST = range(7)
+_BYTES, _UUID, _DJANGO, _ROUTINE, _OTHER = range(7, 12)
+
+
+def _categorize(value):
+    if inspect.isroutine(value) or inspect.isbuiltin(value) or inspect.isclass(value):
+        return _ROUTINE
+    elif isinstance(value, dict):
+        return _DICT
+    elif isinstance(value, (list, tuple, set)):
+        return _LIST
+    elif isinstance(value, (Model, QuerySet)):
+        return _OTHER
+    elif isinstance(value, bytes):
+        return _BYTES
+    elif value is None:
+        return _NONE
+    elif isinstance(value, str):
+        return _STR
+    elif isinstance(value, bool):
+        return _BOOL
+    elif isinstance(value, int):
+        return _INT
+    elif isinstance(value, float):
+        return _FLOAT
+    elif isinstance(
+        value, (datetime.datetime, datetime.date, datetime.time, decimal.Decimal)
+    ):
+        return _DJANGO
+    elif isinstance(value, (GEOSGeometry, File)):
+        return _OTHER
+    elif isinstance(value, uuid.UUID):
+        return _UUID
+    return _OTHER
+
+
+class JSONStreamEncoder(object):
+    """
+    Encodes objects to JSON in a single pass, producing the same output as
+    converting them with JSONSerializer.serializeToPython and passing the result to json.dumps
+
+    Values are dispatched on their type, the category of each type is worked out once
+    and cached.  Common values (dicts, lists, strings, numbers, uuids, dates) are written straight to
+    the output, any other value (eg: models) is converted by the serializer and the result encoded.
+
+    """
+
+    options = frozenset(("indent", "ensure_ascii", "separators"))
+    categories = {}
+
+    def __init__(
+        self,
+        serializer=None,
+        sort_keys=False,
+        indent=None,
+        ensure_ascii=True,
+        separators=None,
+    ):
+        self.serializer = serializer if serializer is not None else JSONSerializer()
+        self.sort_keys = sort_keys
+        if indent is not None and not isinstance(indent, str):
+            indent = " " * indent
+        self.indent = indent
+        if separators is not None:
+            self.item_separator, self.key_separator = separators
+        elif indent is not None:
+            self.item_separator, self.key_separator = ",", ": "
+        else:
+            self.item_separator, self.key_separator = ", ", ": "
+        self.encode_string = (
+            encode_basestring_ascii if ensure_ascii else encode_basestring
+        )
+        self.django_encoder = DjangoJSONEncoder()
+
+    def category(self, value):
+        value_type = type(value)
+        try:
+            return self.categories[value_type]
+        except KeyError:
+            category = self.categories[value_type] = _categorize(value)
+            return category
+
+    def encode(self, obj, **kwargs):
+        """
+        Returns obj encoded as utf-8 JSON bytes, or, like JSONSerializer.serialize,
+        the string itself if obj is (or converts to) a string
+
+        Keyword Arguments:
+        kwargs -- passed on to JSONSerializer.handle_object for values it converts
+
+        """
+
+        category = self.category(obj)
+        if category == _STR:
+            return obj
+        elif category in (_BYTES, _UUID, _DJANGO):
+            return self.convert(obj, category)
+        elif category == _OTHER or category == _ROUTINE:
+            obj = self.serializer.handle_object(obj, **kwargs)
+            if isinstance(obj, str):
+                return obj
+            chunks = []
+            self.write_native(obj, chunks, 0)
+        else:
+            chunks = []
+            self.write(obj, chunks, 0)
+        return "".join(chunks).encode("utf-8")
+
+    def dump(self, obj, fp, **kwargs):
+        """
+        Writes obj encoded as utf-8 JSON bytes to the binary file-like object fp
+
+        """
+
+        result = self.encode(obj, **kwargs)
+        fp.write(result.encode("utf-8") if isinstance(result, str) else result)
+
+    def convert(self, value, category):
+        if category == _BYTES:
+            return value.decode("utf-8")
+        elif category == _UUID:
+            return str(value)
+        return self.django_encoder.default(value)
+
+    def write(self, value, chunks, level):
+        """
+        Writes a value that still has to be converted following the rules of JSONSerializer.handle_object
+
+        """
+
+        category = self.category(value)
+        if category == _STR:
+            chunks.append(self.encode_string(value))
+        elif category == _DICT:
+            self.write_dict(value, chunks, level)
+        elif category == _LIST:
+            self.write_list(value, chunks, level)
+        elif category == _INT:
+            chunks.append(int.__repr__(value))
+        elif category == _NONE:
+            chunks.append("null")
+        elif category == _BOOL:
+            chunks.append("true" if value else "false")
+        elif category == _FLOAT:
+            chunks.append(self.float_repr(value))
+        elif category == _OTHER:
+            self.write_native(self.serializer.handle_object(value), chunks, level)
+        elif category == _ROUTINE:
+            raise UnableToSerializeMethodTypesError(type(value))
+        else:
+            chunks.append(self.encode_string(self.convert(value, category)))
+
+    def write_dict(self, value, chunks, level):
+        if not value:
+            chunks.append("{}")
+            return
+        if any(type(key) is not str for key in value):
+            # keys are converted to strings by handle_dictionary, which may merge keys
+            self.write_native(self.serializer.handle_dictionary(value), chunks, level)
+            return
+
+        start = len(chunks)
+        chunks.append("{")
+        first_separator, separator, closing = self.get_separators(level + 1)
+        items = sorted(value.items()) if self.sort_keys else value.items()
+        written = False
+        for key, item in items:
+            mark = len(chunks)
+            chunks.append(separator if written else first_separator)
+            chunks.append(self.encode_string(key))
+            chunks.append(self.key_separator)
+            try:
+                self.write(item, chunks, level + 1)
+            except UnableToSerializeMethodTypesError:
+                # handle_dictionary leaves out values that can't be serialized
+                del chunks[mark:]
+                continue
+            written = True
+        if written:
+            chunks.append(closing + "}")
+        else:
+            chunks[start] = "{}"
+
+    def write_list(self, value, chunks, level):
+        if not value:
+            chunks.append("[]")
+            return
+        first_separator, separator, closing = self.get_separators(level + 1)
+        chunks.append("[")
+        first = True
+        for item in value:
+            chunks.append(first_separator if first else separator)
+            first = False
+            self.write(item, chunks, level + 1)
+        chunks.append(closing + "]")
+
+    def write_native(self, value, chunks, level):
+        """
+        Writes a value converted by JSONSerializer following the rules of json.dumps with DjangoJSONEncoder
+
+        """
+
+        if isinstance(value, str):
+            chunks.append(self.encode_string(value))
+        elif value is None:
+            chunks.append("null")
+        elif value is True:
+            chunks.append("true")
+        elif value is False:
+            chunks.append("false")
+        elif isinstance(value, int):
+            chunks.append(int.__repr__(value))
+        elif isinstance(value, float):
+            chunks.append(self.float_repr(value))
+        elif isinstance(value, (list, tuple)):
+            if not value:
+                chunks.append("[]")
+                return
+            first_separator, separator, closing = self.get_separators(level + 1)
+            chunks.append("[")
+            first = True
+            for item in value:
+                chunks.append(first_separator if first else separator)
+                first = False
+                self.write_native(item, chunks, level + 1)
+            chunks.append(closing + "]")
+        elif isinstance(value, dict):
+            if not value:
+                chunks.append("{}")
+                return
+            first_separator, separator, closing = self.get_separators(level + 1)
+            chunks.append("{")
+            first = True
+            items = sorted(value.items()) if self.sort_keys else value.items()
+            for key, item in items:
+                chunks.append(first_separator if first else separator)
+                first = False
+                chunks.append(self.encode_string(self.key_repr(key)))
+                chunks.append(self.key_separator)
+                self.write_native(item, chunks, level + 1)
+            chunks.append(closing + "}")
+        else:
+            self.write_native(self.django_encoder.default(value), chunks, level)
+
+    def get_separators(self, level):
+        """
+        Returns the separators written before the first item, between items and before
+        the closing bracket of a list or dict at the given nesting level
+
+        """
+
+        if self.indent is None:
+            return "", self.item_separator, ""
+        newline_indent = "\n" + self.indent * level
+        return (
+            newline_indent,
+            self.item_separator + newline_indent,
+            "\n" + self.indent * (level - 1),
+        )
+
+    def float_repr(self, value):
+        if value != value:
+            return "NaN"
+        elif value == float("inf"):
+            return "Infinity"
+        elif value == -float("inf"):
+            return "-Infinity"
+        return float.__repr__(value)
+
+    def key_repr(self, key):
+        if isinstance(key, str):
+            return key
+        elif isinstance(key, float):
+            return self.float_repr(key)
+        elif key is True:
+            return "true"
+        elif key is False:
+            return "false"
+        elif key is None:
+            return "null"
+        elif isinstance(key, int):
+            return int.__repr__(key)
+        raise TypeError(
+            f"keys must be str, int, float, bool or None, not {key.__class__.__name__}"
+        )
+
+
 class JSONDeserializer(object):
     """
     Deserialize a stream or string of JSON data.
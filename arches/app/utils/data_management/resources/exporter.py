@@ -42,3 +42,25 @@ class ResourceExporter(object):
             user=user,
         )
         return resources
+
+    def export_to_files(
+        self,
+        dest_dir,
+        graph_id=None,
+        resourceinstanceids=None,
+        languages: str = None,
+        user=None,
+    ):
+        """
+        Writes the export into files in dest_dir and returns their paths,
+        formats that support it are written one resource at a time
+
+        """
+
+        return self.writer.write_resources_to_files(
+            dest_dir,
+            graph_id=graph_id,
+            resourceinstanceids=resourceinstanceids,
+            languages=languages,
+            user=user,
+        )
@@ -10,8 +10,9 @@ import logging
 import re
 from time import time
 from copy import deepcopy
+from contextlib import ExitStack
 from io import StringIO
-from .format import Writer
+from .format import Writer, get_safe_file_name
 from .format import Reader
 from elasticsearch import TransportError
 from arches.app.models.tile import Tile
@@ -103,17 +104,17 @@ class CsvWriter(Writer):
             value, concept_export_value_type=concept_export_value_type, node=node
         )
 
-    def write_resources(self, graph_id=None, resourceinstanceids=None, **kwargs):
-        # use the graph id from the mapping file, not the one passed in to the method
-        graph_id = self.resource_export_configs[0]["resource_model_id"]
-        super(CsvWriter, self).write_resources(
-            graph_id=graph_id, resourceinstanceids=resourceinstanceids, **kwargs
-        )
+    def get_export_mapping(self, languages=None):
+        """
+        Returns the csv header, the column(s) of each exported node keyed by nodeid
+        and the concept export value type of each node keyed by nodeid
 
-        csv_records = []
-        languages = kwargs.get("languages")
+        Keyword Arguments:
+        languages -- a comma separated list of language codes to export, defaults to the
+            current language if none are specified, or if the specified languages are all invalid
+
+        """
 
-        # Return data for specified languages - current language if none are specified, or if specified languages are all invalid
         language_codes = Language.objects.values_list("code", flat=True)
 
         if not (languages is None or languages == "all"):
@@ -128,7 +129,6 @@ class CsvWriter(Writer):
             except:
                 pass
 
-        other_group_records = []
         mapping = {}
         concept_export_value_lookup = {}
         csv_header = ["ResourceID"]
@@ -154,76 +154,54 @@ class CsvWriter(Writer):
                         "concept_export_value"
                     ]
 
-        csvs_for_export = []
+        return csv_header, mapping, concept_export_value_lookup
 
-        for resourceinstanceid, tiles in self.resourceinstances.items():
-            csv_record = {}
-            csv_record["ResourceID"] = resourceinstanceid
-            csv_record["populated_node_groups"] = []
+    def get_resource_records(
+        self, resourceinstanceid, tiles, mapping, concept_export_value_lookup
+    ):
+        """
+        Returns the record of a resource (or None if it has no data to export)
+        and a list of records for the values that don't fit in the resource's record
 
-            try:
-                parents = [p for p in tiles if p.parenttile_id is None]
-                children = [c for c in tiles if c.parenttile_id is not None]
-                tiles = parents + sorted(children, key=lambda k: k.parenttile_id)
-            except Exception as e:
-                logger.exception(e)
-
-            for tile in tiles:
-                other_group_record = {}
-                other_group_record["ResourceID"] = resourceinstanceid
-                if tile.data != {}:
-                    for k in list(tile.data.keys()):
-                        if (
-                            tile.data[k] != ""
-                            and k in mapping
-                            and tile.data[k] is not None
-                        ):
-                            if (
-                                (
-                                    isinstance(mapping[k], str)
-                                    and mapping[k] not in csv_record
-                                )
-                                or isinstance(mapping[k], list)
-                                and len(set(mapping[k]).intersection(csv_record)) == 0
-                            ) and tile.nodegroup_id not in csv_record[
-                                "populated_node_groups"
-                            ]:
-                                concept_export_value_type = None
-                                if k in concept_export_value_lookup:
-                                    concept_export_value_type = (
-                                        concept_export_value_lookup[k]
-                                    )
-                                if tile.data[k] is not None:
-                                    if isinstance(mapping[k], list):
-                                        for column in mapping[k]:
-                                            csv_record[column] = (
-                                                self.transform_value_for_export(
-                                                    self.node_datatypes[k],
-                                                    tile.data[k],
-                                                    concept_export_value_type,
-                                                    k,
-                                                    column,
-                                                )
-                                            )
-                                    else:
-                                        value = self.transform_value_for_export(
-                                            self.node_datatypes[k],
-                                            tile.data[k],
-                                            concept_export_value_type,
-                                            k,
-                                        )
-                                        csv_record[mapping[k]] = value
+        """
 
-                                del tile.data[k]
-                            else:
-                                concept_export_value_type = None
-                                if k in concept_export_value_lookup:
-                                    concept_export_value_type = (
-                                        concept_export_value_lookup[k]
-                                    )
+        csv_record = {}
+        csv_record["ResourceID"] = resourceinstanceid
+        csv_record["populated_node_groups"] = []
+        other_group_records = []
+
+        try:
+            parents = [p for p in tiles if p.parenttile_id is None]
+            children = [c for c in tiles if c.parenttile_id is not None]
+            tiles = parents + sorted(children, key=lambda k: k.parenttile_id)
+        except Exception as e:
+            logger.exception(e)
+
+        for tile in tiles:
+            other_group_record = {}
+            other_group_record["ResourceID"] = resourceinstanceid
+            if tile.data != {}:
+                for k in list(tile.data.keys()):
+                    if tile.data[k] != "" and k in mapping and tile.data[k] is not None:
+                        if (
+                            (
+                                isinstance(mapping[k], str)
+                                and mapping[k] not in csv_record
+                            )
+                            or isinstance(mapping[k], list)
+                            and len(set(mapping[k]).intersection(csv_record)) == 0
+                        ) and tile.nodegroup_id not in csv_record[
+                            "populated_node_groups"
+                        ]:
+                            concept_export_value_type = None
+                            if k in concept_export_value_lookup:
+                                concept_export_value_type = concept_export_value_lookup[
+                                    k
+                                ]
+                            if tile.data[k] is not None:
                                 if isinstance(mapping[k], list):
                                     for column in mapping[k]:
-                                        other_group_record[column] = (
+                                        csv_record[column] = (
                                             self.transform_value_for_export(
                                                 self.node_datatypes[k],
                                                 tile.data[k],
@@ -239,17 +217,75 @@ class CsvWriter(Writer):
                                         concept_export_value_type,
                                         k,
                                     )
-                                    other_group_record[mapping[k]] = value
-                        else:
+                                    csv_record[mapping[k]] = value
+
                             del tile.data[k]
+                        else:
+                            concept_export_value_type = None
+                            if k in concept_export_value_lookup:
+                                concept_export_value_type = concept_export_value_lookup[
+                                    k
+                                ]
+                            if isinstance(mapping[k], list):
+                                for column in mapping[k]:
+                                    other_group_record[column] = (
+                                        self.transform_value_for_export(
+                                            self.node_datatypes[k],
+                                            tile.data[k],
+                                            concept_export_value_type,
+                                            k,
+                                            column,
+                                        )
+                                    )
+                            else:
+                                value = self.transform_value_for_export(
+                                    self.node_datatypes[k],
+                                    tile.data[k],
+                                    concept_export_value_type,
+                                    k,
+                                )
+                                other_group_record[mapping[k]] = value
+                    else:
+                        del tile.data[k]
+
+                csv_record["populated_node_groups"].append(tile.nodegroup_id)
+
+            if other_group_record != {"ResourceID": resourceinstanceid}:
+                other_group_records.append(other_group_record)
+
+        if csv_record == {"ResourceID": resourceinstanceid}:
+            csv_record = None
+        return csv_record, other_group_records
+
+    def write_record(self, csvwriter, csv_record):
+        if "populated_node_groups" in csv_record:
+            del csv_record["populated_node_groups"]
+        csvwriter.writerow({k: str(v) for k, v in list(csv_record.items())})
 
-                    csv_record["populated_node_groups"].append(tile.nodegroup_id)
+    def get_groups_file_name(self, csv_name):
+        return csv_name.split(".")[0] + "_groups." + csv_name.split(".")[1]
 
-                if other_group_record != {"ResourceID": resourceinstanceid}:
-                    other_group_records.append(other_group_record)
+    def write_resources(self, graph_id=None, resourceinstanceids=None, **kwargs):
+        # use the graph id from the mapping file, not the one passed in to the method
+        graph_id = self.resource_export_configs[0]["resource_model_id"]
+        super(CsvWriter, self).write_resources(
+            graph_id=graph_id, resourceinstanceids=resourceinstanceids, **kwargs
+        )
 
-            if csv_record != {"ResourceID": resourceinstanceid}:
+        csv_header, mapping, concept_export_value_lookup = self.get_export_mapping(
+            kwargs.get("languages")
+        )
+        csv_records = []
+        other_group_records = []
+        csvs_for_export = []
+
+        for resourceinstanceid, tiles in self.resourceinstances.items():
+            csv_record, resource_group_records = self.get_resource_records(
+                resourceinstanceid, tiles, mapping, concept_export_value_lookup
+            )
+            if csv_record is not None:
                 csv_records.append(csv_record)
+            other_group_records += resource_group_records
 
         csv_name = os.path.join("{0}.{1}".format(self.file_name, "csv"))
 
@@ -259,25 +295,19 @@ class CsvWriter(Writer):
             csvwriter.writeheader()
             csvs_for_export.append({"name": csv_name, "outputfile": dest})
             for csv_record in csv_records:
-                if "populated_node_groups" in csv_record:
-                    del csv_record["populated_node_groups"]
-                csvwriter.writerow({k: str(v) for k, v in list(csv_record.items())})
+                self.write_record(csvwriter, csv_record)
 
             dest = StringIO()
             csvwriter = csv.DictWriter(dest, delimiter=",", fieldnames=csv_header)
             csvwriter.writeheader()
             csvs_for_export.append(
                 {
-                    "name": csv_name.split(".")[0]
-                    + "_groups."
-                    + csv_name.split(".")[1],
+                    "name": self.get_groups_file_name(csv_name),
                     "outputfile": dest,
                 }
             )
             for csv_record in other_group_records:
-                if "populated_node_groups" in csv_record:
-                    del csv_record["populated_node_groups"]
-                csvwriter.writerow({k: str(v) for k, v in list(csv_record.items())})
+                self.write_record(csvwriter, csv_record)
         elif self.single_file == True:
             all_records = csv_records + other_group_records
             all_records = sorted(all_records, key=lambda k: k["ResourceID"])
@@ -286,9 +316,7 @@ class CsvWriter(Writer):
             csvwriter.writeheader()
             csvs_for_export.append({"name": csv_name, "outputfile": dest})
             for csv_record in all_records:
-                if "populated_node_groups" in csv_record:
-                    del csv_record["populated_node_groups"]
-                csvwriter.writerow({k: str(v) for k, v in list(csv_record.items())})
+                self.write_record(csvwriter, csv_record)
 
         if self.graph_id is not None:
             csvs_for_export = csvs_for_export + self.write_resource_relations(
@@ -297,51 +325,135 @@ class CsvWriter(Writer):
 
         return csvs_for_export
 
+    def write_resources_to_files(
+        self, dest_dir, graph_id=None, resourceinstanceids=None, **kwargs
+    ):
+        """
+        Writes the export into csv files in dest_dir one resource at a time and returns
+        their paths, resources are written in order of their resourceinstanceid
+
+        """
+
+        # use the graph id from the mapping file, not the one passed in to the method
+        graph_id = self.resource_export_configs[0]["resource_model_id"]
+        resources = self.iter_resources(
+            graph_id=graph_id, resourceinstanceids=resourceinstanceids, **kwargs
+        )
+        csv_header, mapping, concept_export_value_lookup = self.get_export_mapping(
+            kwargs.get("languages")
+        )
+
+        csv_name = os.path.join("{0}.{1}".format(self.file_name, "csv"))
+        paths = [os.path.join(dest_dir, get_safe_file_name(csv_name))]
+        if self.single_file is not True:
+            paths.append(
+                os.path.join(
+                    dest_dir, get_safe_file_name(self.get_groups_file_name(csv_name))
+                )
+            )
+
+        with ExitStack() as stack:
+            csvwriters = []
+            for path in paths:
+                csvwriter = csv.DictWriter(
+                    stack.enter_context(open(path, "w")),
+                    delimiter=",",
+                    fieldnames=csv_header,
+                )
+                csvwriter.writeheader()
+                csvwriters.append(csvwriter)
+            groups_csvwriter = csvwriters[-1]
+
+            exported_ids = []
+            for resourceinstanceid, tiles in resources:
+                exported_ids.append(resourceinstanceid)
+                csv_record, other_group_records = self.get_resource_records(
+                    resourceinstanceid, tiles, mapping, concept_export_value_lookup
+                )
+                if csv_record is not None:
+                    self.write_record(csvwriters[0], csv_record)
+                for csv_record in other_group_records:
+                    self.write_record(groups_csvwriter, csv_record)
+
+        if (
+            self.graph_id is not None
+            and self.graph_id != settings.SYSTEM_SETTINGS_RESOURCE_MODEL_ID
+        ):
+            path = os.path.join(
+                dest_dir,
+                get_safe_file_name("{0}.{1}".format(self.file_name, "relations")),
+            )
+            with open(path, "w") as f:
+                # only the relations of the exported resources when some were requested
+                self.write_relations_csv(
+                    f, exported_ids if resourceinstanceids is not None else None
+                )
+            paths.append(path)
+
+        return paths
+
     def write_resource_relations(self, file_name):
-        resourceids = list(self.resourceinstances.keys())
         relations_file = []
 
         if self.graph_id != settings.SYSTEM_SETTINGS_RESOURCE_MODEL_ID:
             dest = StringIO()
-            csv_header = [
-                "resourcexid",
-                "resourceinstanceidfrom",
-                "resourceinstanceidto",
-                "relationshiptype",
-                "resourceinstancefrom_graphid",
-                "resourceinstanceto_graphid",
-                "nodeid",
-                "tileid",
-                "datestarted",
-                "dateended",
-                "notes",
-            ]
-            csvwriter = csv.DictWriter(dest, delimiter=",", fieldnames=csv_header)
-            csvwriter.writeheader()
+            self.write_relations_csv(dest, list(self.resourceinstances.keys()))
             csv_name = os.path.join("{0}.{1}".format(file_name, "relations"))
             relations_file.append({"name": csv_name, "outputfile": dest})
 
-            relations = ResourceXResource.objects.filter(
-                Q(resourceinstanceidfrom__in=resourceids)
-                | Q(resourceinstanceidto__in=resourceids),
-                tileid__isnull=True,
-            ).values(*csv_header)
-            for relation in relations:
-                relation["datestarted"] = (
-                    relation["datestarted"]
-                    if relation["datestarted"] is not None
-                    else ""
-                )
-                relation["dateended"] = (
-                    relation["dateended"] if relation["dateended"] is not None else ""
-                )
-                relation["notes"] = (
-                    relation["notes"] if relation["notes"] is not None else ""
-                )
-                csvwriter.writerow({k: str(v) for k, v in list(relation.items())})
-
         return relations_file
 
+    def write_relations_csv(self, dest, resourceids=None):
+        """
+        Writes the relations of resources that weren't made through a tile to dest as csv
+
+        Keyword Arguments:
+        dest -- a file like object
+        resourceids -- the resources whose relations are written, if None the
+            relations of every resource of the graph being exported are written
+
+        """
+
+        csv_header = [
+            "resourcexid",
+            "resourceinstanceidfrom",
+            "resourceinstanceidto",
+            "relationshiptype",
+            "resourceinstancefrom_graphid",
+            "resourceinstanceto_graphid",
+            "nodeid",
+            "tileid",
+            "datestarted",
+            "dateended",
+            "notes",
+        ]
+        csvwriter = csv.DictWriter(dest, delimiter=",", fieldnames=csv_header)
+        csvwriter.writeheader()
+
+        if resourceids is None:
+            resource_filter = Q(resourceinstancefrom_graphid=self.graph_id) | Q(
+                resourceinstanceto_graphid=self.graph_id
+            )
+        else:
+            resource_filter = Q(resourceinstanceidfrom__in=resourceids) | Q(
+                resourceinstanceidto__in=resourceids
+            )
+        relations = ResourceXResource.objects.filter(
+            resource_filter,
+            tileid__isnull=True,
+        ).values(*csv_header)
+        for relation in relations.iterator():
+            relation["datestarted"] = (
+                relation["datestarted"] if relation["datestarted"] is not None else ""
+            )
+            relation["dateended"] = (
+                relation["dateended"] if relation["dateended"] is not None else ""
+            )
+            relation["notes"] = (
+                relation["notes"] if relation["notes"] is not None else ""
+            )
+            csvwriter.writerow({k: str(v) for k, v in list(relation.items())})
+
 
 class TileCsvWriter(Writer):
     def __init__(self, **kwargs):
@@ -349,10 +461,16 @@ class TileCsvWriter(Writer):
         self.node_datatypes = {}
         self.datatype_factory = DataTypeFactory()
 
-        nodes = Node.objects.all().values("nodeid", "alias")
+        nodes = Node.objects.all().values("nodeid", "alias", "datatype", "nodegroup_id")
         self.node_name_lookup = {}
+        self.node_datatype_lookup = {}
+        self.nodegroup_nodes_lookup = {}
         for node in nodes:
             self.node_name_lookup[str(node["nodeid"])] = node["alias"]
+            self.node_datatype_lookup[str(node["nodeid"])] = node["datatype"]
+            self.nodegroup_nodes_lookup.setdefault(
+                str(node["nodegroup_id"]), []
+            ).append(str(node["nodeid"]))
 
     def group_tiles(self, tiles, key):
         new_tiles = {}
@@ -375,13 +493,8 @@ class TileCsvWriter(Writer):
         return node_name
 
     def lookup_node_value(self, value, nodeid):
-        if nodeid in self.node_datatypes:
-            datatype = self.node_datatypes[nodeid]
-        else:
-            datatype = self.datatype_factory.get_instance(
-                Node.objects.get(nodeid=nodeid).datatype
-            )
-            self.node_datatypes[nodeid] = datatype
+        if nodeid not in self.node_datatypes:
+            self.node_datatypes[nodeid] = self.get_datatype_instance(nodeid)
 
         if value is not None:
             value = self.node_datatypes[nodeid].transform_export_values(
@@ -390,6 +503,32 @@ class TileCsvWriter(Writer):
 
         return value
 
+    def get_datatype_instance(self, nodeid):
+        try:
+            datatype = self.node_datatype_lookup[nodeid]
+        except KeyError:
+            datatype = Node.objects.get(nodeid=nodeid).datatype
+        return self.datatype_factory.get_instance(datatype)
+
+    def warm_caches(self, tiles, semantic_nodes):
+        """
+        Lets each datatype look up the values of all the tiles together before they are flattened
+
+        """
+
+        nodeids_by_datatype = {}
+        for tile in tiles:
+            for nodeid in tile["data"]:
+                if nodeid not in semantic_nodes:
+                    nodeids_by_datatype.setdefault(
+                        self.node_datatype_lookup.get(nodeid), set()
+                    ).add(nodeid)
+        for datatype, nodeids in nodeids_by_datatype.items():
+            if datatype is not None:
+                self.datatype_factory.get_instance(datatype).warm_cache(
+                    tiles, list(nodeids)
+                )
+
     def flatten_tile(self, tile, semantic_nodes):
         for nodeid in tile["data"]:
             if nodeid not in semantic_nodes:
@@ -434,14 +573,11 @@ class TileCsvWriter(Writer):
         ]
 
         for nodegroupid, nodegroup_tiles in tiles.items():
+            self.warm_caches(nodegroup_tiles, semantic_nodes)
             flattened_tiles = []
             fieldnames = []
             for tile in nodegroup_tiles:
-                tile["tileid"] = str(tile["tileid"])
-                tile["parenttile_id"] = str(tile["parenttile_id"])
-                tile["resourceinstance_id"] = str(tile["resourceinstance_id"])
-                flattened_tile = self.flatten_tile(tile, semantic_nodes)
-                tile["nodegroup_id"] = str(tile["nodegroup_id"])
+                flattened_tile = self.prepare_tile(tile, semantic_nodes)
                 flattened_tiles.append(flattened_tile)
 
                 for fieldname in flattened_tile:
@@ -455,19 +591,134 @@ class TileCsvWriter(Writer):
             dest = StringIO()
             csvwriter = csv.DictWriter(dest, delimiter=",", fieldnames=fieldnames)
             csvwriter.writeheader()
-            csv_name = os.path.join(
-                "{0}.{1}".format(Card.objects.get(nodegroup_id=nodegroupid).name, "csv")
-            )
-            forbidden_excel_sheet_name_characters = ["\\", "/", "?", "*", "[", "]"]
-            for character in forbidden_excel_sheet_name_characters:
-                if character in csv_name:
-                    csv_name = csv_name.replace(character, "_")
+            csv_name = self.get_nodegroup_file_name(nodegroupid)
             for v in tiles[nodegroupid]:
                 csvwriter.writerow(v)
             csvs_for_export.append({"name": csv_name, "outputfile": dest})
 
         return csvs_for_export
 
+    def write_resources_to_files(
+        self,
+        dest_dir,
+        graph_id=None,
+        resourceinstanceids=None,
+        chunk_size=None,
+        **kwargs,
+    ):
+        """
+        Writes a csv file per nodegroup into dest_dir and returns their paths
+
+        Tiles are read in order of resourceinstanceid and flattened and written chunk_size
+        tiles at a time (after the tiles of the last resource in the chunk are read), so the
+        rows of each file are ordered by resource like those returned by write_resources.
+        The columns of each file are those of every node in the nodegroup.
+
+        """
+
+        chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+        resources = self.iter_resources(
+            graph_id=graph_id,
+            resourceinstanceids=resourceinstanceids,
+            chunk_size=chunk_size,
+            **kwargs,
+        )
+        semantic_nodes = {
+            str(n[0])
+            for n in Node.objects.filter(datatype="semantic").values_list("nodeid")
+        }
+        csvwriters = {}
+        paths = []
+
+        with ExitStack() as stack:
+
+            def write_tiles(tiles):
+                for nodegroupid, nodegroup_tiles in self.group_tiles(
+                    tiles, "nodegroup_id"
+                ).items():
+                    if nodegroupid not in csvwriters:
+                        path = os.path.join(
+                            dest_dir,
+                            get_safe_file_name(
+                                self.get_nodegroup_file_name(nodegroupid)
+                            ),
+                        )
+                        csvwriters[nodegroupid] = csv.DictWriter(
+                            stack.enter_context(open(path, "w")),
+                            delimiter=",",
+                            fieldnames=self.get_nodegroup_field_names(
+                                nodegroupid, semantic_nodes
+                            ),
+                            extrasaction="ignore",
+                        )
+                        csvwriters[nodegroupid].writeheader()
+                        paths.append(path)
+                    self.warm_caches(nodegroup_tiles, semantic_nodes)
+                    for tile in nodegroup_tiles:
+                        csvwriters[nodegroupid].writerow(
+                            self.prepare_tile(tile, semantic_nodes)
+                        )
+
+            chunk = []
+            for resourceinstanceid, tiles in resources:
+                chunk += [self.tile_to_dict(tile) for tile in tiles]
+                if len(chunk) >= chunk_size:
+                    write_tiles(chunk)
+                    chunk = []
+            if chunk:
+                write_tiles(chunk)
+
+        return paths
+
+    def tile_to_dict(self, tile):
+        """
+        Returns a tile model as the dict that TileModel.objects.values() would
+
+        """
+
+        return {
+            "tileid": tile.tileid,
+            "resourceinstance_id": tile.resourceinstance_id,
+            "parenttile_id": tile.parenttile_id,
+            "data": tile.data,
+            "nodegroup_id": tile.nodegroup_id,
+            "sortorder": tile.sortorder,
+            "provisionaledits": tile.provisionaledits,
+        }
+
+    def prepare_tile(self, tile, semantic_nodes):
+        tile["tileid"] = str(tile["tileid"])
+        tile["parenttile_id"] = str(tile["parenttile_id"])
+        tile["resourceinstance_id"] = str(tile["resourceinstance_id"])
+        flattened_tile = self.flatten_tile(tile, semantic_nodes)
+        tile["nodegroup_id"] = str(tile["nodegroup_id"])
+        return flattened_tile
+
+    def get_nodegroup_file_name(self, nodegroupid):
+        csv_name = os.path.join(
+            "{0}.{1}".format(Card.objects.get(nodegroup_id=nodegroupid).name, "csv")
+        )
+        forbidden_excel_sheet_name_characters = ["\\", "/", "?", "*", "[", "]"]
+        for character in forbidden_excel_sheet_name_characters:
+            if character in csv_name:
+                csv_name = csv_name.replace(character, "_")
+        return csv_name
+
+    def get_nodegroup_field_names(self, nodegroupid, semantic_nodes):
+        fieldnames = [
+            "tileid",
+            "resourceinstance_id",
+            "parenttile_id",
+            "nodegroup_id",
+            "sortorder",
+            "provisionaledits",
+        ]
+        for nodeid in self.nodegroup_nodes_lookup.get(str(nodegroupid), []):
+            if nodeid not in semantic_nodes:
+                fieldnames.append(self.lookup_node_name(nodeid))
+        self.sort_field_names(fieldnames)
+        return fieldnames
+
 
 class CsvReader(Reader):
     def __init__(self):
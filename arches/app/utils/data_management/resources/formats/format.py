@@ -19,6 +19,18 @@ from django.db import connection, transaction
 from django.utils.translation import gettext as _
 
 
+def get_safe_file_name(name):
+    """
+    Replaces the characters of a file name that aren't safe to write to disk with dashes
+
+    """
+
+    safe_characters = (" ", ".", "_", "-")
+    return "".join(
+        (char if (char.isalnum() or char in safe_characters) else "-") for char in name
+    ).rstrip()
+
+
 class MissingGraphException(Exception):
     def __init__(self, value=None):
         self.value = value
@@ -304,6 +316,26 @@ class Writer(object):
 
         """
 
+        self.get_tile_queryset(
+            graph_id=graph_id, resourceinstanceids=resourceinstanceids, **kwargs
+        )
+
+        for tile in self.tiles:
+            try:
+                self.resourceinstances[tile.resourceinstance_id].append(tile)
+            except:
+                self.resourceinstances[tile.resourceinstance_id] = []
+                self.resourceinstances[tile.resourceinstance_id].append(tile)
+
+        return self.resourceinstances
+
+    def get_tile_queryset(self, graph_id=None, resourceinstanceids=None, **kwargs):
+        """
+        Stores the (unevaluated) queryset of the tiles to export on self.tiles
+        and sets the graph and file name of the export
+
+        """
+
         user = kwargs.get("user", None)
         permitted_nodegroups = []
         if user:
@@ -335,15 +367,74 @@ class Writer(object):
                 ).graph_id
 
         self.set_file_name()
+        return self.tiles
 
-        for tile in self.tiles:
-            try:
-                self.resourceinstances[tile.resourceinstance_id].append(tile)
-            except:
-                self.resourceinstances[tile.resourceinstance_id] = []
-                self.resourceinstances[tile.resourceinstance_id].append(tile)
+    def iter_resources(
+        self, graph_id=None, resourceinstanceids=None, chunk_size=None, **kwargs
+    ):
+        """
+        Returns an iterator of (resourceinstanceid, tile list) tuples for each resource to export,
+        in order of resourceinstanceid. Tiles are read through a server side cursor chunk_size rows
+        at a time, so only the tiles of the current resource are held in memory.
 
-        return self.resourceinstances
+        Keyword Arguments:
+        graph_id -- export the resources of a graph
+        resourceinstanceids -- export a list of resources
+        chunk_size -- the number of tiles fetched from the cursor at a time,
+            defaults to settings.EXPORT_CHUNK_SIZE
+        user -- only export the tiles of nodegroups the user can read
+
+        """
+
+        # the queryset is built before anything is read so the graph and file name
+        # of the export are set as soon as this is called
+        tiles = self.get_tile_queryset(
+            graph_id=graph_id, resourceinstanceids=resourceinstanceids, **kwargs
+        ).order_by("resourceinstance_id", "tileid")
+        return self.group_tiles_by_resource(
+            tiles.iterator(chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE)
+        )
+
+    def group_tiles_by_resource(self, tiles):
+        """
+        Yields a (resourceinstanceid, tile list) tuple for each run of tiles
+        of the same resource in an iterable of tiles
+
+        """
+
+        resourceinstanceid = None
+        resource_tiles = []
+        for tile in tiles:
+            if tile.resourceinstance_id != resourceinstanceid:
+                if resource_tiles:
+                    yield resourceinstanceid, resource_tiles
+                resourceinstanceid = tile.resourceinstance_id
+                resource_tiles = []
+            resource_tiles.append(tile)
+        if resource_tiles:
+            yield resourceinstanceid, resource_tiles
+
+    def write_resources_to_files(
+        self, dest_dir, graph_id=None, resourceinstanceids=None, **kwargs
+    ):
+        """
+        Writes the export into files in dest_dir and returns their paths
+
+        Writers that support streaming override this to write one resource at a time
+        (see iter_resources), others write the files returned by write_resources
+
+        """
+
+        paths = []
+        for export_file in self.write_resources(
+            graph_id=graph_id, resourceinstanceids=resourceinstanceids, **kwargs
+        ):
+            path = os.path.join(dest_dir, get_safe_file_name(export_file["name"]))
+            export_file["outputfile"].seek(0)
+            with open(path, "w") as f:
+                shutil.copyfileobj(export_file["outputfile"], f, 16 * 1024)
+            paths.append(path)
+        return paths
 
     def set_file_name(self):
         iso_date = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
@@ -8,20 +8,20 @@ import logging
 from io import StringIO
 from django.urls import reverse
 from django.utils.translation import gettext as _
-from .format import Writer, Reader
+from .format import Writer, Reader, get_safe_file_name
 from arches.app.models import models
 from arches.app.models.resource import Resource
-from arches.app.models.graph import Graph as GraphProxy
 from arches.app.models.tile import Tile
 from arches.app.models.concept import Concept
 from arches.app.models.system_settings import settings
 from arches.app.datatypes.datatypes import DataTypeFactory
 from arches.app.utils.betterJSONSerializer import JSONSerializer, JSONDeserializer
+from arches.app.utils.graph_cache import published_graph_cache
 from rdflib import Namespace
-from rdflib import URIRef, Literal
+from rdflib import URIRef, Literal, BNode
 from rdflib import ConjunctiveGraph as Graph
-from rdflib.namespace import RDF, RDFS
-from pyld.jsonld import compact, frame, from_rdf, to_rdf, expand, set_document_loader
+from rdflib.namespace import RDF, RDFS, XSD
+from pyld.jsonld import compact, expand, set_document_loader
 
 # Stop code from looking up the contexts online for every operation
 docCache = {}
@@ -75,6 +75,8 @@ class RdfWriter(Writer):
     def __init__(self, **kwargs):
         self.format = kwargs.pop("format", "xml")
         self.logger = logging.getLogger(__name__)
+        # the GraphStructure of each graph exported by this writer, keyed by graphid
+        self.graph_cache = {}
         super(RdfWriter, self).__init__(**kwargs)
 
     def write_resources(self, graph_id=None, resourceinstanceids=None, **kwargs):
@@ -89,11 +91,25 @@ class RdfWriter(Writer):
         full_file_name = os.path.join("{0}.{1}".format(self.file_name, "rdf"))
         return [{"name": full_file_name, "outputfile": dest}]
 
-    def get_rdf_graph(self):
+    def get_rdf_graph(self, graph=None, resourceinstances=None, graph_id=None):
+        """
+        Adds the triples of a set of resources to a graph and returns the graph
+
+        Keyword Arguments:
+        graph -- the graph to add triples to, a new rdflib graph is created by default,
+            anything with an add method and += operator taking triples will do (eg: JsonLdNodeMap)
+        resourceinstances -- a dict of tile lists keyed by resourceinstanceid,
+            defaults to the resources loaded by get_tiles
+        graph_id -- the graph of the resources, defaults to the graph loaded by get_tiles
+
+        """
+
+        if resourceinstances is None:
+            resourceinstances = self.resourceinstances
+        if graph_id is None:
+            graph_id = self.graph_id
         archesproject = Namespace(settings.ARCHES_NAMESPACE_FOR_DATA_EXPORT)
-        graph_uri = URIRef(
-            archesproject[reverse("graph", args=[self.graph_id]).lstrip("/")]
-        )
+        graph_uri = URIRef(archesproject[reverse("graph", args=[graph_id]).lstrip("/")])
         self.logger.debug(
             "Using `{0}` for Arches URI namespace".format(
                 settings.ARCHES_NAMESPACE_FOR_DATA_EXPORT
@@ -101,73 +117,26 @@ class RdfWriter(Writer):
         )
         self.logger.debug("Using `{0}` for Graph URI".format(graph_uri))
 
-        g = Graph()
-        g.bind("archesproject", archesproject, False)
-        graph_cache = {}
-
-        def get_nodegroup_edges_by_collector_node(node):
-            edges = []
-            nodegroup = node.nodegroup
-
-            def getchildedges(node):
-                for edge in models.Edge.objects.filter(domainnode=node):
-                    if nodegroup == edge.rangenode.nodegroup:
-                        edges.append(edge)
-                        getchildedges(edge.rangenode)
-
-            getchildedges(node)
-            return edges
+        if graph is None:
+            graph = Graph()
+            graph.bind("archesproject", archesproject, False)
+        g = graph
+        graph_cache = self.graph_cache
 
         def get_graph_parts(graphid):
             if graphid not in graph_cache:
-                graph_cache[graphid] = {
-                    "rootedges": [],
-                    "subgraphs": {},
-                    "nodedatatypes": {},
-                }
-                graph = models.GraphModel.objects.get(pk=graphid)
-                nodegroups = set()
-                for node in graph.node_set.all():
-                    graph_cache[graphid]["nodedatatypes"][
-                        str(node.nodeid)
-                    ] = node.datatype
-                    if node.nodegroup:
-                        nodegroups.add(node.nodegroup)
-                    if node.istopnode:
-                        for edge in get_nodegroup_edges_by_collector_node(node):
-                            if edge.rangenode.nodegroup is None:
-                                graph_cache[graphid]["rootedges"].append(edge)
-                for nodegroup in nodegroups:
-                    graph_cache[graphid]["subgraphs"][nodegroup] = {
-                        "edges": [],
-                        "inedge": None,
-                        "parentnode_nodegroup": None,
-                    }
-                    graph_cache[graphid]["subgraphs"][nodegroup]["inedge"] = (
-                        models.Edge.objects.get(rangenode_id=nodegroup.pk)
-                    )
-                    graph_cache[graphid]["subgraphs"][nodegroup][
-                        "parentnode_nodegroup"
-                    ] = graph_cache[graphid]["subgraphs"][nodegroup][
-                        "inedge"
-                    ].domainnode.nodegroup
-                    graph_cache[graphid]["subgraphs"][nodegroup]["edges"] = (
-                        get_nodegroup_edges_by_collector_node(
-                            models.Node.objects.get(pk=nodegroup.pk)
-                        )
-                    )
-
+                graph_cache[graphid] = published_graph_cache.get_structure(graphid)
             return graph_cache[graphid]
 
         def add_edge_to_graph(graph, domainnode, rangenode, edge, tile, graph_info):
             pkg = {}
-            pkg["d_datatype"] = graph_info["nodedatatypes"].get(str(edge.domainnode.pk))
+            pkg["d_datatype"] = edge.domainnode.datatype
             dom_dt = self.datatype_factory.get_instance(pkg["d_datatype"])
             # Don't process any further if the domain datatype is a literal
             if dom_dt.is_a_literal_in_rdf():
                 return
 
-            pkg["r_datatype"] = graph_info["nodedatatypes"].get(str(edge.rangenode.pk))
+            pkg["r_datatype"] = edge.rangenode.datatype
             pkg["range_tile_data"] = None
             pkg["domain_tile_data"] = None
             if str(edge.rangenode_id) in tile.data:
@@ -239,18 +208,18 @@ class RdfWriter(Writer):
                 # both are single, 1 * 1
                 graph += rng_dt.to_rdf(pkg, edge)
 
-        for resourceinstanceid, tiles in self.resourceinstances.items():
-            graph_info = get_graph_parts(self.graph_id)
+        for resourceinstanceid, tiles in resourceinstances.items():
+            graph_info = get_graph_parts(graph_id)
 
             # add the edges for the group of nodes that include the root (this group of nodes has no nodegroup)
-            for edge in graph_cache[self.graph_id]["rootedges"]:
+            for edge in graph_info.root_edges:
                 domainnode = archesproject[str(edge.domainnode.pk)]
                 rangenode = archesproject[str(edge.rangenode.pk)]
                 add_edge_to_graph(g, domainnode, rangenode, edge, None, graph_info)
 
             for tile in tiles:
                 # add all the edges for a given tile/nodegroup
-                for edge in graph_info["subgraphs"][tile.nodegroup]["edges"]:
+                for edge in graph_info.get_nodegroup_edges(tile.nodegroup_id):
                     domainnode = archesproject[
                         "tile/%s/node/%s" % (str(tile.pk), str(edge.domainnode.pk))
                     ]
@@ -259,13 +228,10 @@ class RdfWriter(Writer):
                     ]
                     add_edge_to_graph(g, domainnode, rangenode, edge, tile, graph_info)
 
+                edge = graph_info.get_nodegroup_in_edge(tile.nodegroup_id)
                 # add the edge from the parent node to this tile's root node
                 # where the tile has no parent tile, which means the domain node has no tile_id
-                if (
-                    graph_info["subgraphs"][tile.nodegroup]["parentnode_nodegroup"]
-                    is None
-                ):
-                    edge = graph_info["subgraphs"][tile.nodegroup]["inedge"]
+                if edge.domainnode.nodegroup_id is None:
                     if edge.domainnode.istopnode:
                         domainnode = archesproject[
                             reverse("resources", args=[resourceinstanceid]).lstrip("/")
@@ -279,11 +245,7 @@ class RdfWriter(Writer):
 
                 # add the edge from the parent node to this tile's root node
                 # where the tile has a parent tile
-                if (
-                    graph_info["subgraphs"][tile.nodegroup]["parentnode_nodegroup"]
-                    is not None
-                ):
-                    edge = graph_info["subgraphs"][tile.nodegroup]["inedge"]
+                else:
                     domainnode = archesproject[
                         "tile/%s/node/%s"
                         % (str(tile.parenttile.pk), str(edge.domainnode.pk))
@@ -295,61 +257,341 @@ class RdfWriter(Writer):
         return g
 
 
+class JsonLdNodeMap(object):
+    """
+    Collects triples as expanded JSON-LD node objects keyed by their @id,
+    used in place of an rdflib graph by JsonLdWriter so that resources can be framed
+    without serializing them to N-Quads and reading them back with pyld
+
+    Literals are converted the way pyld's from_rdf does with useNativeTypes
+
+    """
+
+    native_types = (str(XSD.boolean), str(XSD.integer), str(XSD.double))
+
+    def __init__(self):
+        self.nodes = {}
+        # the number of times each node is the object of a triple
+        self.references = {}
+
+    def add(self, triple):
+        subject, predicate, obj = triple
+        node = self.nodes.setdefault(self.get_id(subject), {})
+        if predicate == RDF.type and not isinstance(obj, Literal):
+            types = node.setdefault("@type", [])
+            if self.get_id(obj) not in types:
+                types.append(self.get_id(obj))
+            return
+
+        values = node.setdefault(str(predicate), [])
+        value = self.get_value(obj)
+        if value not in values:
+            values.append(value)
+            if "@id" in value:
+                self.references[value["@id"]] = self.references.get(value["@id"], 0) + 1
+
+    def __iadd__(self, triples):
+        for triple in triples:
+            self.add(triple)
+        return self
+
+    def get_id(self, term):
+        return "_:%s" % term if isinstance(term, BNode) else str(term)
+
+    def get_value(self, term):
+        if not isinstance(term, Literal):
+            return {"@id": self.get_id(term)}
+
+        value = {"@value": str(term)}
+        if term.language:
+            value["@language"] = term.language
+            return value
+        datatype = str(term.datatype) if term.datatype else str(XSD.string)
+        if datatype == str(XSD.boolean):
+            if value["@value"] in ("true", "false"):
+                value["@value"] = value["@value"] == "true"
+        elif datatype in self.native_types:
+            try:
+                if datatype == str(XSD.integer):
+                    if str(int(value["@value"])) == value["@value"]:
+                        value["@value"] = int(value["@value"])
+                else:
+                    value["@value"] = float(value["@value"])
+            except ValueError:
+                pass
+        elif datatype != str(XSD.string):
+            value["@type"] = datatype
+        return value
+
+    def frame(self, nodeid):
+        """
+        Returns the node with the given @id with the nodes it references embedded in it,
+        or None if there is no such node
+
+        Each node is embedded only once, where it is first referenced, later references
+        are left as {"@id": ...} objects. The ids of blank nodes that are only referenced
+        once are dropped.
+
+        """
+
+        if nodeid not in self.nodes:
+            return None
+        return self.embed(nodeid, set())
+
+    def embed(self, nodeid, embedded):
+        embedded.add(nodeid)
+        node = {}
+        if not nodeid.startswith("_:") or self.references.get(nodeid, 0) > 1:
+            node["@id"] = nodeid
+        for key, values in sorted(self.nodes[nodeid].items()):
+            if key == "@type":
+                node[key] = list(values)
+                continue
+            node[key] = []
+            for value in values:
+                refid = value.get("@id")
+                if refid in self.nodes and refid not in embedded:
+                    node[key].append(self.embed(refid, embedded))
+                else:
+                    node[key].append(dict(value))
+        return node
+
+
 class JsonLdWriter(RdfWriter):
+    def __init__(self, **kwargs):
+        # write one document per line of an .ndjson file instead of a .jsonld file
+        self.ndjson = kwargs.pop("ndjson", False)
+        super(JsonLdWriter, self).__init__(**kwargs)
+        self.contexts = {}
+
     def build_json(self, graph_id=None, resourceinstanceids=None, **kwargs):
+        """
+        Returns the JSON-LD document of a resource, or a list of documents
+        if anything other than a single resource was requested
+
+        """
+
+        documents = [
+            document
+            for resourceinstanceid, document in self.iter_json(
+                graph_id, resourceinstanceids, **kwargs
+            )
+        ]
+        if resourceinstanceids is not None and len(resourceinstanceids) == 1:
+            return documents[0]
+        return documents
+
+    def iter_json(self, graph_id=None, resourceinstanceids=None, **kwargs):
+        """
+        Yields a (resourceinstanceid, JSON-LD document) tuple for each resource, in the
+        order they were requested. Each document is framed on its resource and compacted
+        with the JSON-LD context of its graph.
+
+        Keyword Arguments:
+        graph_id -- export every resource of this graph, the resources are read
+            one at a time (see iter_resources) in order of resourceinstanceid
+        resourceinstanceids -- the resources to export, they needn't belong to the same graph
+        user -- only export the tiles the user can read
+
+        """
+
+        if resourceinstanceids is None:
+            for resourceinstanceid, tiles in self.iter_resources(
+                graph_id=graph_id, **kwargs
+            ):
+                yield str(resourceinstanceid), self.get_json(
+                    str(resourceinstanceid), tiles, self.graph_id
+                )
+            return
+
         # Build the JSON separately serializing it, so we can use internally
         super(RdfWriter, self).write_resources(
             graph_id=graph_id, resourceinstanceids=resourceinstanceids, **kwargs
         )
-        g = self.get_rdf_graph()
-        value = g.serialize(format="nquads").decode("utf-8")
+        tiles_by_resource = {
+            str(resourceinstanceid): tiles
+            for resourceinstanceid, tiles in self.resourceinstances.items()
+        }
+        resourceinstanceids = [str(resourceid) for resourceid in resourceinstanceids]
+        resource_graphs = {
+            str(resourceid): graphid
+            for resourceid, graphid in models.ResourceInstance.objects.filter(
+                pk__in=resourceinstanceids
+            ).values_list("pk", "graph_id")
+        }
+        for resourceinstanceid in resourceinstanceids:
+            yield resourceinstanceid, self.get_json(
+                resourceinstanceid,
+                tiles_by_resource.get(resourceinstanceid, []),
+                resource_graphs.get(resourceinstanceid, self.graph_id),
+            )
 
-        js = from_rdf(value, {"format": "application/nquads", "useNativeTypes": True})
+    def get_json(self, resourceinstanceid, tiles, graph_id):
+        """
+        Returns the JSON-LD document of a resource built from its tiles
 
-        assert (
-            len(resourceinstanceids) == 1
-        )  # currently, this should be limited to a single top resource
+        """
 
         archesproject = Namespace(settings.ARCHES_NAMESPACE_FOR_DATA_EXPORT)
+        context = self.get_context(graph_id)
         resource_inst_uri = archesproject[
-            reverse("resources", args=[resourceinstanceids[0]]).lstrip("/")
+            reverse("resources", args=[resourceinstanceid]).lstrip("/")
         ]
+        node_map = self.get_rdf_graph(
+            graph=JsonLdNodeMap(),
+            resourceinstances={resourceinstanceid: tiles},
+            graph_id=graph_id,
+        )
+        js = node_map.frame(str(resource_inst_uri))
+        if js is None:
+            js = {"@graph": []}
+            if context:
+                js["@context"] = context["@context"]
+        elif context:
+            js = compact(js, context)
+        else:
+            js = self.compact_without_context(js)
+        return js
 
-        context = self.graph_model.jsonldcontext
-        framing = {
-            "@omitDefault": True,
-            "@omitGraph": False,
-            "@id": str(resource_inst_uri),
-        }
+    def get_context(self, graph_id):
+        """
+        Returns the JSON-LD context of a graph, ready to be passed to pyld's compact,
+        or None if the graph has no context
+
+        """
 
-        if context:
-            framing["@context"] = context
+        graph_id = str(graph_id)
+        if graph_id not in self.contexts:
+            if graph_id == str(self.graph_id):
+                context = self.graph_model.jsonldcontext
+            else:
+                context = models.GraphModel.objects.get(pk=graph_id).jsonldcontext
+            if context:
+                try:
+                    context = JSONDeserializer().deserialize(context)
+                except ValueError:
+                    # the url of a remote context
+                    pass
+                except AttributeError:
+                    # already deserialized
+                    pass
+                if not isinstance(context, dict) or "@context" not in context:
+                    context = {"@context": context}
+            self.contexts[graph_id] = context or None
+        return self.contexts[graph_id]
+
+    def compact_without_context(self, element):
+        """
+        Compacts a framed node the way pyld's compact does when given an empty context,
+        arrays of one item are replaced by the item and value objects holding only
+        an @value are replaced by the value
+
+        """
+
+        if isinstance(element, list):
+            items = [self.compact_without_context(item) for item in element]
+            return items[0] if len(items) == 1 else items
+        if not isinstance(element, dict):
+            return element
+        if "@value" in element:
+            return element["@value"] if len(element) == 1 else element
+        node = {}
+        for key, value in element.items():
+            if key == "@id":
+                node[key] = value
+            elif key == "@type":
+                node[key] = value[0] if len(value) == 1 else value
+            else:
+                node[key] = self.compact_without_context(value)
+        return node
 
-        js = frame(js, framing)
+    def write_ndjson(self, dest, documents):
+        """
+        Writes JSON-LD documents to dest one per line, each document is written
+        as soon as it is read from documents (eg: the documents yielded by iter_json)
 
-        try:
-            context = JSONDeserializer().deserialize(context)
-        except ValueError:
-            if context == "":
-                context = {}
-            context = {"@context": context}
-        except AttributeError:
-            context = {"@context": {}}
-
-        # Currently omitGraph is not processed by pyLd, but data is compacted
-        # simulate omitGraph:
-        if "@graph" in js and len(js["@graph"]) == 1:
-            # merge up
-            for k, v in list(js["@graph"][0].items()):
-                js[k] = v
-            del js["@graph"]
-        return js
+        """
+
+        for js in documents:
+            dest.write(json.dumps(js, sort_keys=True))
+            dest.write("\n")
+
+    def write_json_list(self, dest, documents):
+        """
+        Writes JSON-LD documents to dest as a list, each document is written as soon as
+        it is read from documents, the output is the same as json.dumps(list(documents))
+
+        """
+
+        dest.write("[")
+        for i, js in enumerate(documents):
+            if i > 0:
+                dest.write(", ")
+            dest.write(json.dumps(js, sort_keys=True))
+        dest.write("]")
+
+    def write_resources_to_files(
+        self, dest_dir, graph_id=None, resourceinstanceids=None, **kwargs
+    ):
+        """
+        Writes the resources of a graph into a .jsonld file (or an .ndjson file if the
+        writer was created with ndjson=True) in dest_dir one resource at a time
+        and returns its path
+
+        """
+
+        if resourceinstanceids is not None:
+            return super(JsonLdWriter, self).write_resources_to_files(
+                dest_dir,
+                graph_id=graph_id,
+                resourceinstanceids=resourceinstanceids,
+                **kwargs,
+            )
+
+        resources = self.iter_resources(graph_id=graph_id, **kwargs)
+        documents = (
+            self.get_json(str(resourceinstanceid), tiles, self.graph_id)
+            for resourceinstanceid, tiles in resources
+        )
+        extension = "ndjson" if self.ndjson else "jsonld"
+        path = os.path.join(
+            dest_dir, get_safe_file_name("{0}.{1}".format(self.file_name, extension))
+        )
+        with open(path, "w") as f:
+            if self.ndjson:
+                self.write_ndjson(f, documents)
+            else:
+                self.write_json_list(f, documents)
+        return [path]
 
     def write_resources(self, graph_id=None, resourceinstanceids=None, **kwargs):
-        js = self.build_json(graph_id, resourceinstanceids, **kwargs)
-        out = json.dumps(js, indent=kwargs.get("indent", None), sort_keys=True)
-        dest = StringIO(out)
-        full_file_name = os.path.join("{0}.{1}".format(self.file_name, "jsonld"))
+        """
+        Writes a .jsonld file holding the document of a single resource, or a list of
+        documents when anything else is exported. If the writer was created with
+        ndjson=True each document is written on its own line of an .ndjson file instead.
+
+        """
+
+        dest = StringIO()
+        if self.ndjson:
+            self.write_ndjson(
+                dest,
+                (
+                    js
+                    for resourceinstanceid, js in self.iter_json(
+                        graph_id, resourceinstanceids, **kwargs
+                    )
+                ),
+            )
+            extension = "ndjson"
+        else:
+            js = self.build_json(graph_id, resourceinstanceids, **kwargs)
+            dest.write(
+                json.dumps(js, indent=kwargs.get("indent", None), sort_keys=True)
+            )
+            extension = "jsonld"
+        dest.seek(0)
+        full_file_name = os.path.join("{0}.{1}".format(self.file_name, extension))
         return [{"name": full_file_name, "outputfile": dest}]
 
 
@@ -362,6 +604,8 @@ class JsonLdReader(Reader):
         self.use_ids = False
         self.root_ontologyclass_lookup = {}
         self.graphtree = None
+        # the compiled graph trees keyed by graphid, see get_graphtree
+        self.graphtrees = {}
         self.print_buf = []
         self.verbosity = kwargs.get("verbosity", 1)
         self.ignore_errors = kwargs.get("ignore_errors", False)
@@ -390,7 +634,7 @@ class JsonLdReader(Reader):
     def process_graph(self, graphid):
         root_node = None
         nodes = {}
-        graph = GraphProxy.objects.get(graphid=graphid)
+        graph = published_graph_cache.get_structure(graphid)
         for nodeid, n in graph.nodes.items():
             node = {}
             if n.istopnode:
@@ -410,11 +654,14 @@ class JsonLdReader(Reader):
             if n.config and "rdmCollection" in n.config:
                 node["config"]["collection_id"] = str(n.config["rdmCollection"])
             elif n.config and "graphs" in n.config:
-                for entry in n.config["graphs"]:
-                    entry["rootclass"] = self.root_ontologyclass_lookup[
-                        entry["graphid"]
-                    ]
-                node["config"]["graphs"] = n.config["graphs"]
+                # copied as the nodes of the graph structure are shared
+                node["config"]["graphs"] = [
+                    dict(
+                        entry,
+                        rootclass=self.root_ontologyclass_lookup[entry["graphid"]],
+                    )
+                    for entry in n.config["graphs"]
+                ]
             node["required"] = n.isrequired
             node["node_id"] = str(n.nodeid)
             node["name"] = n.name
@@ -425,7 +672,7 @@ class JsonLdReader(Reader):
             node["children"] = {}
             nodes[str(n.nodeid)] = node
 
-        for edegid, e in graph.edges.items():
+        for e in (edge for edges in graph.out_edges.values() for edge in edges):
             dn = e.domainnode_id
             rng = e.rangenode_id
             prop = e.ontologyproperty
@@ -447,6 +694,18 @@ class JsonLdReader(Reader):
 
         return root_node
 
+    def get_graphtree(self, graphid):
+        """
+        Returns the tree used to match JSON-LD documents to the nodes of a graph,
+        it is compiled once per graph and shared by every document read by this reader
+
+        """
+
+        graphid = str(graphid)
+        if graphid not in self.graphtrees:
+            self.graphtrees[graphid] = self.process_graph(graphid)
+        return self.graphtrees[graphid]
+
     def get_resource_id(self, value):
         # Allow local URI or urn:uuid:UUID
         match = re.match(
@@ -469,10 +728,10 @@ class JsonLdReader(Reader):
     def read_resource(
         self, data, use_ids=False, resourceid=None, graphid=None, expand_data=True
     ):
-        if graphid is None and self.graphtree is None:
-            raise Exception("No graphid supplied to read_resource")
+        if graphid is not None:
+            self.graphtree = self.get_graphtree(graphid)
         elif self.graphtree is None:
-            self.graphtree = self.process_graph(graphid)
+            raise Exception("No graphid supplied to read_resource")
 
         # Ensure we've reset from any previous call
         self.errors = {}
@@ -0,0 +1,434 @@
+"""
+ARCHES - a program developed to inventory and manage immovable cultural heritage.
+Copyright (C) 2013 J. Paul Getty Trust and World Monuments Fund
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import translation
+
+PUBLISHED_GRAPHS_VERSION_KEY = "published_graphs_version"
+_missing = object()
+
+# number of times each version key has been invalidated by this process
+_local_invalidations = {}
+
+
+class CachedPublishedGraph(object):
+    """
+    A published graph with lookups of its serialized nodes by nodeid and by nodegroupid
+    Instances are shared across the process and must be treated as read only
+
+    """
+
+    def __init__(self, publicationid, language, serialized_graph):
+        self.publicationid = publicationid
+        self.language = language
+        self.serialized_graph = serialized_graph
+        self.nodes = {}
+        self.nodes_by_nodegroup = {}
+        for node in serialized_graph.get("nodes", []):
+            self.nodes[node["nodeid"]] = node
+            if node["nodegroup_id"]:
+                self.nodes_by_nodegroup.setdefault(node["nodegroup_id"], []).append(
+                    node
+                )
+
+    def get_node(self, nodeid):
+        return self.nodes.get(str(nodeid))
+
+    def get_nodes_by_nodegroup(self, nodegroupid):
+        return self.nodes_by_nodegroup.get(str(nodegroupid), [])
+
+
+class GraphStructure(object):
+    """
+    The nodes and edges of a graph with lookups of the edges out of and into each node,
+    the edges of each nodegroup (reachable from its collector node without leaving the nodegroup)
+    and the edges of the nodes that belong to no nodegroup
+    Instances are shared across the process and must be treated as read only
+
+    """
+
+    def __init__(self, graphid, publicationid, nodes, edges):
+        self.graphid = str(graphid)
+        self.publicationid = publicationid
+        self.root = None
+        self.nodes = {}
+        self.out_edges = {}
+        self.in_edges = {}
+        for node in nodes:
+            self.nodes[str(node.nodeid)] = node
+            if node.istopnode:
+                self.root = node
+        for edge in edges:
+            # set the related nodes so that edge.domainnode and edge.rangenode need no queries
+            edge.domainnode = self.nodes[str(edge.domainnode_id)]
+            edge.rangenode = self.nodes[str(edge.rangenode_id)]
+            self.out_edges.setdefault(str(edge.domainnode_id), []).append(edge)
+            self.in_edges[str(edge.rangenode_id)] = edge
+
+        self.nodegroup_edges = {}
+        for node in nodes:
+            if node.nodegroup_id is not None and node.is_collector:
+                self.nodegroup_edges[str(node.nodegroup_id)] = tuple(
+                    self.collect_edges(node)
+                )
+        self.root_edges = tuple(self.collect_edges(self.root)) if self.root else ()
+
+    def collect_edges(self, node, edges=None):
+        """
+        Returns the edges below a node that stay within the node's nodegroup
+
+        """
+
+        if edges is None:
+            edges = []
+        for edge in self.out_edges.get(str(node.nodeid), []):
+            if edge.rangenode.nodegroup_id == node.nodegroup_id:
+                edges.append(edge)
+                self.collect_edges(edge.rangenode, edges)
+        return edges
+
+    def get_node(self, nodeid):
+        return self.nodes.get(str(nodeid))
+
+    def get_child_nodes(self, nodeid):
+        return [edge.rangenode for edge in self.out_edges.get(str(nodeid), [])]
+
+    def get_nodegroup_edges(self, nodegroupid):
+        return self.nodegroup_edges.get(str(nodegroupid), ())
+
+    def get_nodegroup_in_edge(self, nodegroupid):
+        return self.in_edges.get(str(nodegroupid))
+
+
+class LRUDict(object):
+    """
+    A thread safe dictionary that discards the least recently used entries beyond maxsize
+    If a timeout (in seconds) is given entries also expire that long after they were set
+
+    """
+
+    def __init__(self, maxsize=128, timeout=None):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.timeout if self.timeout else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
+
+
+class VersionedLRUDict(LRUDict):
+    """
+    An LRUDict that is emptied whenever the version stored under version_key in a django cache
+    (cache_alias) changes, so that one process can invalidate the entries of every process
+    sharing that cache. The shared version is read at most once every check_interval seconds
+
+    """
+
+    def __init__(
+        self,
+        version_key,
+        maxsize=128,
+        timeout=None,
+        check_interval=1,
+        cache_alias="default",
+    ):
+        super(VersionedLRUDict, self).__init__(maxsize=maxsize, timeout=timeout)
+        self.version_key = version_key
+        self.check_interval = check_interval
+        self.cache_alias = cache_alias
+        self.version = None
+        self._local_invalidations = 0
+        self._checked = None
+
+    def get_version(self):
+        return caches[self.cache_alias].get(self.version_key, 0)
+
+    def check_version(self, force=False):
+        """
+        Empties the dictionary if the shared version has changed since it was last read
+        and returns True if it was emptied
+
+        Keyword Arguments:
+        force -- read the shared version even if it was read less than check_interval ago
+
+        """
+
+        now = time.monotonic()
+        local_invalidations = _local_invalidations.get(self.version_key, 0)
+        changed = False
+        if (
+            force
+            or self._checked is None
+            or now - self._checked >= self.check_interval
+            or local_invalidations != self._local_invalidations
+        ):
+            version = self.get_version()
+            if (
+                version != self.version
+                or local_invalidations != self._local_invalidations
+            ):
+                changed = self._checked is not None
+                self.clear()
+                self.version = version
+            self._local_invalidations = local_invalidations
+            self._checked = now
+        return changed
+
+    def get(self, key, default=None):
+        self.check_version()
+        return super(VersionedLRUDict, self).get(key, default)
+
+    def set(self, key, value):
+        self.check_version()
+        super(VersionedLRUDict, self).set(key, value)
+
+    def invalidate(self):
+        """
+        Empties every VersionedLRUDict sharing this version_key across all processes
+
+        """
+
+        invalidate_version(self.version_key, self.cache_alias)
+        self.check_version()
+
+
+def invalidate_version(version_key, cache_alias="default"):
+    # a timestamp can't repeat a version that was read before the cache was cleared
+    caches[cache_alias].set(version_key, time.time_ns(), None)
+    _local_invalidations[version_key] = _local_invalidations.get(version_key, 0) + 1
+
+
+def get_version_cache_alias():
+    """
+    Returns the alias of the django cache that holds the versions of the process wide caches,
+    it must be shared by every process for an invalidation to reach them all
+
+    """
+
+    return getattr(settings, "PUBLISHED_GRAPHS_VERSION_CACHE", "user_permission")
+
+
+class PublishedGraphCache(object):
+    """
+    Process wide cache of published graphs keyed by (publicationid, language)
+
+    The entries are discarded whenever the version stored under PUBLISHED_GRAPHS_VERSION_KEY
+    in the settings.PUBLISHED_GRAPHS_VERSION_CACHE django cache changes, the version is changed
+    whenever a graph is published, unpublished or its published graphs are updated.
+    That cache must be shared by every process (eg: a database cache) for the
+    invalidations to reach them.
+
+    """
+
+    def __init__(self, maxsize=128, cache_alias=None, check_interval=1):
+        if cache_alias is None:
+            cache_alias = get_version_cache_alias()
+        self.versioned_dicts = [
+            VersionedLRUDict(
+                PUBLISHED_GRAPHS_VERSION_KEY,
+                maxsize=maxsize,
+                check_interval=check_interval,
+                cache_alias=cache_alias,
+            )
+            for i in range(3)
+        ]
+        self.graphs, self.graph_publications, self.structures = self.versioned_dicts
+        # the graph of a resource never changes, so this needs no versioning
+        self.resource_graphs = LRUDict(maxsize * 1000)
+
+    def get_version(self):
+        return self.graphs.get_version()
+
+    def invalidate(self):
+        self.graphs.invalidate()
+
+    def revalidate(self):
+        """
+        Reads the shared version now rather than after the check interval,
+        returns True if the cached graphs were out of date (and have been discarded)
+
+        """
+
+        changed = False
+        for versioned_dict in self.versioned_dicts:
+            changed = versioned_dict.check_version(force=True) or changed
+        return changed
+
+    def get(self, publicationid, language=None, raise_if_missing=False):
+        """
+        Returns a CachedPublishedGraph for a publication or None if it is not published
+        in the requested language (defaults to the active language)
+
+        """
+
+        from arches.app.models import models
+
+        if not language:
+            language = translation.get_language()
+        key = (str(publicationid), language)
+        cached_graph = self.graphs.get(key)
+        if cached_graph is not None:
+            return cached_graph
+
+        try:
+            published_graph = models.PublishedGraph.objects.get(
+                publication_id=publicationid, language=language
+            )
+        except models.PublishedGraph.DoesNotExist:
+            if raise_if_missing:
+                raise
+            return None
+
+        cached_graph = CachedPublishedGraph(
+            publicationid, language, published_graph.serialized_graph
+        )
+        self.graphs.set(key, cached_graph)
+        return cached_graph
+
+    def get_for_graph(self, graphid, language=None, raise_if_missing=False):
+        """
+        Returns the CachedPublishedGraph of the current publication of a graph
+
+        """
+
+        from arches.app.models import models
+
+        publicationid = self.get_publicationid(graphid)
+        if publicationid is None:
+            if raise_if_missing:
+                raise models.PublishedGraph.DoesNotExist
+            return None
+        return self.get(publicationid, language, raise_if_missing=raise_if_missing)
+
+    def get_publicationid(self, graphid):
+        """
+        Returns the id of the current publication of a graph or None if it is not published
+
+        """
+
+        from arches.app.models import models
+
+        key = str(graphid)
+        publicationid = self.graph_publications.get(key, _missing)
+        if publicationid is not _missing:
+            return publicationid
+        publicationid = (
+            models.GraphModel.objects.filter(pk=graphid)
+            .values_list("publication_id", flat=True)
+            .first()
+        )
+        self.graph_publications.set(key, publicationid)
+        return publicationid
+
+    def get_structure(self, graphid):
+        """
+        Returns the GraphStructure of a graph, it is cached for the graph's current publication
+        so the nodes and edges of unpublished graphs are read from the database every time
+
+        """
+
+        from arches.app.models import models
+
+        publicationid = self.get_publicationid(graphid)
+        key = (str(graphid), str(publicationid))
+        if publicationid is not None:
+            structure = self.structures.get(key)
+            if structure is not None:
+                return structure
+
+        structure = GraphStructure(
+            graphid,
+            publicationid,
+            list(
+                models.Node.objects.filter(graph_id=graphid).select_related("nodegroup")
+            ),
+            list(models.Edge.objects.filter(domainnode__graph_id=graphid)),
+        )
+        if publicationid is not None:
+            self.structures.set(key, structure)
+        return structure
+
+    def get_graphid_for_resource(self, resourceinstanceid):
+        """
+        Returns the graphid of a resource instance or None if the resource does not exist
+
+        """
+
+        from arches.app.models import models
+
+        if resourceinstanceid is None:
+            return None
+        key = str(resourceinstanceid)
+        graphid = self.resource_graphs.get(key)
+        if graphid is None:
+            graphid = (
+                models.ResourceInstance.objects.filter(pk=resourceinstanceid)
+                .values_list("graph_id", flat=True)
+                .first()
+            )
+            if graphid is not None:
+                self.resource_graphs.set(key, graphid)
+        return graphid
+
+
+published_graph_cache = PublishedGraphCache()
@@ -1,4 +1,5 @@
 from typing import Iterable
+from itertools import islice
 import uuid
 import django
 
@@ -10,15 +11,23 @@ from types import SimpleNamespace
 from django.db import connection, connections
 from django.db.models import prefetch_related_objects, Prefetch, Q, QuerySet
 from arches.app.models import models
+from arches.app.models.concept import invalidate_concept_caches
 from arches.app.models.models import Value
 from arches.app.models.resource import Resource
 from arches.app.models.system_settings import settings
 from arches.app.search.search_engine_factory import SearchEngineInstance as se
-from arches.app.search.elasticsearch_dsl_builder import Query, Term
+from arches.app.search.elasticsearch_dsl_builder import Bool, Query, Term, Terms
 from arches.app.search.base_index import get_index
-from arches.app.search.mappings import TERMS_INDEX, CONCEPTS_INDEX, RESOURCES_INDEX
+from arches.app.search.mappings import (
+    TERMS_INDEX,
+    CONCEPTS_INDEX,
+    RESOURCES_INDEX,
+    prepare_search_index,
+    prepare_terms_index,
+)
 from arches.app.datatypes.datatypes import DataTypeFactory
 from arches.app.utils import import_class_from_string
+from arches.app.utils.betterJSONSerializer import JSONSerializer
 from datetime import datetime
 
 
@@ -26,9 +35,24 @@ import multiprocessing
 import os
 import math
 import logging
+import traceback
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 serialized_graphs = {}
+_worker_node_datatypes = None
+
+# index settings applied for the duration of a bulk load
+BULK_LOAD_INDEX_SETTINGS = {
+    "index.refresh_interval": "-1",
+    "index.number_of_replicas": "0",
+}
 
 
 def get_serialized_graph(graph):
@@ -52,6 +76,7 @@ def index_db(
     use_multiprocessing=False,
     max_subprocesses=0,
     recalculate_descriptors=False,
+    rebuild=False,
 ):
     """
     Deletes any existing indicies from elasticsearch and then indexes all
@@ -64,6 +89,7 @@ def index_db(
     use_multiprocessing (default False) -- runs the reindexing in multiple subprocesses to take advantage of parallel indexing
     max_subprocesses - limits multiprocessing to a this number of processes. Default is half cpu count.
     recalculate_descriptors - forces the primary descriptors to be recalculated before (re)indexing
+    rebuild - builds new resources and terms indexes and swaps them in once complete instead of clearing the existing ones
     """
 
     index_concepts(clear_index=clear_index, batch_size=batch_size)
@@ -74,6 +100,7 @@ def index_db(
         use_multiprocessing=use_multiprocessing,
         max_subprocesses=max_subprocesses,
         recalculate_descriptors=recalculate_descriptors,
+        rebuild=rebuild,
     )
     index_custom_indexes(clear_index=clear_index, batch_size=batch_size, quiet=quiet)
 
@@ -85,6 +112,7 @@ def index_resources(
     use_multiprocessing=False,
     max_subprocesses=0,
     recalculate_descriptors=False,
+    rebuild=False,
 ):
     """
     Indexes all resources from the database
@@ -96,9 +124,19 @@ def index_resources(
     use_multiprocessing (default False) -- runs the reindexing in multiple subprocesses to take advantage of parallel indexing
     max_subprocesses -- explicitly sets the size of process pool. Auto limits to cpu count if more than this.
     recalculate_descriptors - forces the primary descriptors to be recalculated before (re)indexing
+    rebuild -- builds new resources and terms indexes and swaps them in once complete (see rebuild_resources_index)
 
     """
 
+    if rebuild:
+        return rebuild_resources_index(
+            batch_size=batch_size,
+            quiet=quiet,
+            use_multiprocessing=use_multiprocessing,
+            max_subprocesses=max_subprocesses,
+            recalculate_descriptors=recalculate_descriptors,
+        )
+
     resource_types = (
         models.GraphModel.objects.filter(isresource=True)
         .exclude(graphid=settings.SYSTEM_SETTINGS_RESOURCE_MODEL_ID)
@@ -116,6 +154,123 @@ def index_resources(
     )
 
 
+def rebuild_resources_index(
+    batch_size=settings.BULK_IMPORT_BATCH_SIZE,
+    quiet=False,
+    use_multiprocessing=False,
+    max_subprocesses=0,
+    recalculate_descriptors=False,
+):
+    """
+    Indexes all resources into a new, versioned pair of resources and terms indexes and then
+    atomically points the RESOURCES_INDEX and TERMS_INDEX aliases at them.
+    Search continues to be served from the previous indexes until the swap.
+    Resources edited while the new indexes were being built are reindexed after the swap.
+
+    Keyword Arguments:
+    batch_size -- the number of records to index as a group, the larger the number to more memory required
+    quiet -- Silences the status bar output during certain operations, use in celery operations for example
+    use_multiprocessing (default False) -- runs the reindexing in multiple subprocesses to take advantage of parallel indexing
+    max_subprocesses -- explicitly sets the size of process pool. Auto limits to cpu count if more than this.
+    recalculate_descriptors - forces the primary descriptors to be recalculated before (re)indexing
+
+    """
+
+    start = datetime.now()
+    version = start.strftime("%Y%m%d%H%M%S")
+    resources_index = f"{RESOURCES_INDEX}_{version}"
+    terms_index = f"{TERMS_INDEX}_{version}"
+    logger.info(f"Rebuilding resources into '{resources_index}' and '{terms_index}'")
+
+    se.create_index(index=resources_index, **prepare_search_index())
+    se.create_index(index=terms_index, **prepare_terms_index())
+
+    resource_types = (
+        models.GraphModel.objects.filter(isresource=True)
+        .exclude(graphid=settings.SYSTEM_SETTINGS_RESOURCE_MODEL_ID)
+        .exclude(publication=None)
+        .values_list("graphid", flat=True)
+    )
+    with bulk_load_index_settings([resources_index, terms_index]):
+        status = index_resources_by_type(
+            resource_types,
+            clear_index=False,
+            batch_size=batch_size,
+            quiet=quiet,
+            use_multiprocessing=use_multiprocessing,
+            max_subprocesses=max_subprocesses,
+            recalculate_descriptors=recalculate_descriptors,
+            resources_index=resources_index,
+            terms_index=terms_index,
+        )
+
+    se.swap_aliases({RESOURCES_INDEX: resources_index, TERMS_INDEX: terms_index})
+    logger.info(f"Swapped aliases to '{resources_index}' and '{terms_index}'")
+
+    # catch up on any edits made while the new indexes were being built
+    edited_resourceids = set(
+        models.EditLog.objects.filter(timestamp__gte=start)
+        .exclude(resourceinstanceid=None)
+        .values_list("resourceinstanceid", flat=True)
+    )
+    if edited_resourceids:
+        resources = Resource.objects.filter(pk__in=edited_resourceids)
+        index_resources_using_singleprocessing(
+            resources=resources,
+            batch_size=batch_size,
+            quiet=True,
+            recalculate_descriptors=recalculate_descriptors,
+        )
+        deleted_resourceids = edited_resourceids - {
+            str(resourceid) for resourceid in resources.values_list("pk", flat=True)
+        }
+        for resourceid in deleted_resourceids:
+            Resource().delete_index(resourceinstanceid=resourceid)
+
+    return status
+
+
+def iterate_resource_batches(resourceids, batch_size):
+    """
+    Lazily groups an iterable of resource ids into lists of batch_size ids
+
+    """
+
+    batch = []
+    for resourceid in resourceids:
+        batch.append(str(resourceid))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@contextmanager
+def bulk_load_index_settings(indexes):
+    """
+    Disables refresh and replicas on the given indexes for the duration of a bulk load.
+    The previous settings are restored and the indexes refreshed once the load completes.
+
+    """
+
+    previous_settings = {}
+    for index in indexes:
+        current_settings = se.get_index_settings(
+            index=index, name=list(BULK_LOAD_INDEX_SETTINGS.keys())
+        )
+        previous_settings[index] = {
+            name: current_settings.get(name) for name in BULK_LOAD_INDEX_SETTINGS
+        }
+        se.put_index_settings(index=index, settings=BULK_LOAD_INDEX_SETTINGS)
+    try:
+        yield
+    finally:
+        for index, index_settings in previous_settings.items():
+            se.put_index_settings(index=index, settings=index_settings)
+            se.refresh(index=index)
+
+
 def index_resources_using_multiprocessing(
     resourceids,
     batch_size=settings.BULK_IMPORT_BATCH_SIZE,
@@ -123,54 +278,48 @@ def index_resources_using_multiprocessing(
     max_subprocesses=0,
     callback=None,
     recalculate_descriptors=False,
+    resource_count=None,
+    bulk_workers=0,
+    resources_index=RESOURCES_INDEX,
+    terms_index=TERMS_INDEX,
 ):
+    """
+    Indexes resources with a pipeline of document building subprocesses feeding
+    a pool of threads that ship the documents to Elasticsearch in bulk
+
+    Arguments:
+    resourceids -- an iterable of resource ids, consumed lazily so a server side cursor can be used
+
+    Keyword Arguments:
+    batch_size -- the number of resources sent to a subprocess as a group
+    quiet -- Silences the status bar output during certain operations, use in celery operations for example
+    max_subprocesses -- explicitly sets the size of process pool. Auto limits to cpu count if more than this.
+    callback -- called after each batch of resources has been indexed
+    recalculate_descriptors -- forces the primary descriptors to be recalculated before (re)indexing
+    resource_count -- the number of ids in resourceids, only used for the status bar
+    bulk_workers -- the number of threads shipping bulk requests. Default is half the process count.
+    resources_index -- the name of the index (or alias) to write resource documents to
+    terms_index -- the name of the index (or alias) to write term documents to
+
+    """
+
     try:
         multiprocessing.set_start_method("spawn")
     except:
         pass
 
     logger.debug(f"... multiprocessing method: {multiprocessing.get_start_method()}")
-    resource_batches = []
-    resource_count = 0
-    batch_number = 0
-    resource_batches.append([])
-
-    for resource in resourceids:
-        resource_count += 1
-        resource_batches[batch_number].append(resource)
-        if resource_count == batch_size:
-            resource_batches.append([])
-            batch_number += 1
-            resource_count = 0
-
-    connections.close_all()
 
-    if quiet is False:
-        bar = (
-            pyprind.ProgBar(len(resource_batches), bar_char="█", stream=sys.stdout)
-            if len(resource_batches) > 1
-            else None
-        )
+    if resource_count is None and hasattr(resourceids, "__len__"):
+        resource_count = len(resourceids)
 
-    def process_complete_callback(result):
-        if quiet is False and bar is not None:
-            bar.update(item_id=result)
-        if callback is not None:
-            callback()
-
-    def process_error_callback(err):
-        import traceback
+    connections.close_all()
 
-        if quiet is False and bar is not None:
-            bar.update()
-        try:
-            raise err
-        except:
-            tb = traceback.format_exc()
-        finally:
-            logger.error(
-                f"Error indexing resource batch, type {type(err)}, message: {err}, \n>>>>>>>>>>>>>> TRACEBACK: {tb}"
-            )
+    bar = None
+    if quiet is False and resource_count:
+        batch_count = math.ceil(resource_count / batch_size)
+        if batch_count > 1:
+            bar = pyprind.ProgBar(batch_count, bar_char="█", stream=sys.stdout)
 
     default_process_count = math.ceil(multiprocessing.cpu_count() / 2)
     if max_subprocesses == 0:
@@ -183,20 +332,82 @@ def index_resources_using_multiprocessing(
     else:
         process_count = max_subprocesses
 
+    if bulk_workers == 0:
+        bulk_workers = max(1, process_count // 2)
+
+    # bound the number of batches held in memory at any one time
+    max_pending_batches = process_count * 2
+    max_pending_shipments = bulk_workers * 2
+
     logger.debug(f"... multiprocessing process count: {process_count}")
-    logger.debug(
-        f"... resource type batch count (batch size={batch_size}): {len(resource_batches)}"
-    )
-    with multiprocessing.Pool(processes=process_count) as pool:
-        for resource_batch in resource_batches:
-            pool.apply_async(
-                _index_resource_batch,
-                args=(resource_batch, recalculate_descriptors, quiet),
-                callback=process_complete_callback,
-                error_callback=process_error_callback,
+    logger.debug(f"... bulk worker thread count: {bulk_workers}")
+
+    def log_error(err):
+        logger.error(
+            f"Error indexing resource batch, type {type(err)}, message: {err}, \n>>>>>>>>>>>>>> TRACEBACK: {''.join(traceback.format_exception(err))}"
+        )
+
+    def ship(actions):
+        se.bulk_index(actions, refresh=False)
+
+    def ship_complete(future):
+        if future.exception() is not None:
+            log_error(future.exception())
+        if callback is not None:
+            callback()
+
+    def batch_complete(future):
+        if bar is not None:
+            bar.update()
+        if future.exception() is not None:
+            log_error(future.exception())
+            return None
+        return future.result()
+
+    pending_batches = set()
+    pending_shipments = set()
+
+    def drain_batches(limit):
+        nonlocal pending_batches, pending_shipments
+        while len(pending_batches) > limit:
+            done, pending_batches = wait(pending_batches, return_when=FIRST_COMPLETED)
+            for future in done:
+                actions = batch_complete(future)
+                if actions:
+                    drain_shipments(max_pending_shipments - 1)
+                    shipment = bulk_pool.submit(ship, actions)
+                    shipment.add_done_callback(ship_complete)
+                    pending_shipments.add(shipment)
+
+    def drain_shipments(limit):
+        nonlocal pending_shipments
+        while len(pending_shipments) > limit:
+            _done, pending_shipments = wait(
+                pending_shipments, return_when=FIRST_COMPLETED
             )
-        pool.close()
-        pool.join()
+
+    with bulk_load_index_settings([resources_index, terms_index]):
+        with (
+            ProcessPoolExecutor(
+                max_workers=process_count,
+                mp_context=multiprocessing.get_context(),
+                initializer=_init_index_worker,
+            ) as process_pool,
+            ThreadPoolExecutor(max_workers=bulk_workers) as bulk_pool,
+        ):
+            for resource_batch in iterate_resource_batches(resourceids, batch_size):
+                drain_batches(max_pending_batches - 1)
+                pending_batches.add(
+                    process_pool.submit(
+                        _get_index_actions_for_batch,
+                        resource_batch,
+                        recalculate_descriptors,
+                        resources_index,
+                        terms_index,
+                    )
+                )
+            drain_batches(0)
+            drain_shipments(0)
 
 
 def optimize_resource_iteration(resources: Iterable[Resource], chunk_size: int):
@@ -239,18 +450,69 @@ def optimize_resource_iteration(resources: Iterable[Resource], chunk_size: int):
         return resources
 
 
+def get_node_datatypes():
+    return {
+        str(nodeid): datatype
+        for nodeid, datatype in models.Node.objects.values_list("nodeid", "datatype")
+    }
+
+
+def get_documents_to_index(
+    resources: Iterable[Resource],
+    chunk_size,
+    node_datatypes,
+    datatype_factory=None,
+    recalculate_descriptors=False,
+    bar=None,
+):
+    """
+    Yields a tuple of (document, terms) for each resource in resources
+
+    """
+
+    if datatype_factory is None:
+        datatype_factory = DataTypeFactory()
+
+    resources = iter(optimize_resource_iteration(resources, chunk_size=chunk_size))
+    while batch := list(islice(resources, chunk_size)):
+        tiles = [tile for resource in batch for tile in resource.prefetched_tiles]
+        nodeids_by_datatype = {}
+        for nodeid in {nodeid for tile in tiles for nodeid in tile.data or {}}:
+            if nodeid in node_datatypes:
+                nodeids_by_datatype.setdefault(node_datatypes[nodeid], []).append(
+                    nodeid
+                )
+        for datatype, nodeids in nodeids_by_datatype.items():
+            datatype_factory.get_instance(datatype).warm_cache(tiles, nodeids)
+
+        for resource in batch:
+            resource.tiles = resource.prefetched_tiles
+            resource.descriptor_function = resource.graph.descriptor_function
+            resource.set_node_datatypes(node_datatypes)
+            resource.set_serialized_graph(get_serialized_graph(resource.graph))
+        if recalculate_descriptors:
+            Resource.save_descriptors_bulk(batch)
+
+        for resource in batch:
+            if bar is not None:
+                bar.update(item_id=resource)
+            yield resource.get_documents_to_index(
+                fetchTiles=False,
+                datatype_factory=datatype_factory,
+                node_datatypes=node_datatypes,
+            )
+
+
 def index_resources_using_singleprocessing(
     resources: Iterable[Resource],
     batch_size=settings.BULK_IMPORT_BATCH_SIZE,
     quiet=False,
     title=None,
     recalculate_descriptors=False,
+    resources_index=RESOURCES_INDEX,
+    terms_index=TERMS_INDEX,
 ):
-    datatype_factory = DataTypeFactory()
-    node_datatypes = {
-        str(nodeid): datatype
-        for nodeid, datatype in models.Node.objects.values_list("nodeid", "datatype")
-    }
+    bar = None
     with se.BulkIndexer(batch_size=batch_size, refresh=True) as doc_indexer:
         with se.BulkIndexer(batch_size=batch_size, refresh=True) as term_indexer:
             if quiet is False:
@@ -260,33 +522,22 @@ def index_resources_using_singleprocessing(
                     resource_count = len(resources)
                 if resource_count > 1:
                     bar = pyprind.ProgBar(resource_count, bar_char="█", title=title)
-                else:
-                    bar = None
 
-            for resource in optimize_resource_iteration(
-                resources, chunk_size=batch_size // 8
+            for document, terms in get_documents_to_index(
+                resources,
+                chunk_size=batch_size // 8,
+                node_datatypes=get_node_datatypes(),
+                recalculate_descriptors=recalculate_descriptors,
+                bar=bar,
             ):
-                resource.tiles = resource.prefetched_tiles
-                resource.descriptor_function = resource.graph.descriptor_function
-                resource.set_node_datatypes(node_datatypes)
-                resource.set_serialized_graph(get_serialized_graph(resource.graph))
-                if recalculate_descriptors:
-                    resource.save_descriptors()
-                if quiet is False and bar is not None:
-                    bar.update(item_id=resource)
-                document, terms = resource.get_documents_to_index(
-                    fetchTiles=False,
-                    datatype_factory=datatype_factory,
-                    node_datatypes=node_datatypes,
-                )
                 doc_indexer.add(
-                    index=RESOURCES_INDEX,
+                    index=resources_index,
                     id=document["resourceinstanceid"],
                     data=document,
                 )
                 for term in terms:
                     term_indexer.add(
-                        index=TERMS_INDEX, id=term["_id"], data=term["_source"]
+                        index=terms_index, id=term["_id"], data=term["_source"]
                     )
 
     return os.getpid()
@@ -300,6 +551,8 @@ def index_resources_by_type(
     use_multiprocessing=False,
     max_subprocesses=0,
     recalculate_descriptors=False,
+    resources_index=RESOURCES_INDEX,
+    terms_index=TERMS_INDEX,
 ):
     """
     Indexes all resources of a given type(s)
@@ -314,6 +567,8 @@ def index_resources_by_type(
     use_multiprocessing (default False) -- runs the reindexing in multiple subprocesses to take advantage of parallel indexing
     max_subprocesses (default 0) -- explicitly set the number of processes to use.
     recalculate_descriptors - forces the primary descriptors to be recalculated before (re)indexing
+    resources_index -- the name of the index (or alias) to write resource documents to
+    terms_index -- the name of the index (or alias) to write term documents to
 
     """
 
@@ -339,48 +594,49 @@ def index_resources_by_type(
             for nodegroup in [card.nodegroup for card in cards]:
                 term = Term(field="nodegroupid", term=str(nodegroup.nodegroupid))
                 tq.add_query(term)
-            tq.delete(index=TERMS_INDEX, refresh=True)
+            tq.delete(index=terms_index, refresh=True)
 
             rq = Query(se=se)
             term = Term(field="graph_id", term=str(resource_type))
             rq.add_query(term)
-            rq.delete(index=RESOURCES_INDEX, refresh=True)
+            rq.delete(index=resources_index, refresh=True)
+
+        resources = Resource.objects.filter(graph_id=str(resource_type))
+        resource_count = resources.count()
 
         if use_multiprocessing:
-            resources = [
-                str(rid)
-                for rid in Resource.objects.filter(
-                    graph_id=str(resource_type)
-                ).values_list("resourceinstanceid", flat=True)
-            ]
+            # stream the ids from a server side cursor rather than loading them all
+            resourceids = resources.values_list(
+                "resourceinstanceid", flat=True
+            ).iterator(chunk_size=batch_size)
             index_resources_using_multiprocessing(
-                resourceids=resources,
+                resourceids=resourceids,
                 batch_size=batch_size,
                 quiet=quiet,
                 max_subprocesses=max_subprocesses,
                 recalculate_descriptors=recalculate_descriptors,
+                resource_count=resource_count,
+                resources_index=resources_index,
+                terms_index=terms_index,
             )
 
         else:
-            from arches.app.search.search_engine_factory import (
-                SearchEngineInstance as _se,
-            )
-
-            resources = Resource.objects.filter(graph_id=str(resource_type))
             index_resources_using_singleprocessing(
                 resources=resources,
                 batch_size=batch_size,
                 quiet=quiet,
                 title=graph_name,
                 recalculate_descriptors=recalculate_descriptors,
+                resources_index=resources_index,
+                terms_index=terms_index,
             )
 
         q = Query(se=se)
         term = Term(field="graph_id", term=str(resource_type))
         q.add_query(term)
         result_summary = {
-            "database": len(resources),
-            "indexed": se.count(index=RESOURCES_INDEX, **q.dsl),
+            "database": resource_count,
+            "indexed": se.count(index=resources_index, **q.dsl),
         }
         status = (
             "Passed"
@@ -399,17 +655,103 @@ def index_resources_by_type(
     return status
 
 
-def _index_resource_batch(resourceids, recalculate_descriptors, quiet=False):
+def index_queued_resources(batch_size=settings.BULK_IMPORT_BATCH_SIZE, quiet=True):
+    """
+    Indexes the oldest resources in the bulk index queue and removes them from the queue.
+    Previously indexed terms of the queued resources are removed before reindexing and
+    resources that no longer exist are removed from the indexes.
 
+    Keyword Arguments:
+    batch_size -- the maximum number of queued resources to index
+    quiet -- Silences the status bar output during certain operations, use in celery operations for example
+
+    Returns the number of queued resources processed
+
+    """
+
+    queued_entries = list(
+        models.BulkIndexQueue.objects.order_by("createddate").values_list(
+            "resourceinstanceid", "createddate"
+        )[:batch_size]
+    )
+    if not queued_entries:
+        return 0
+
+    queued_ids = [str(resourceid) for resourceid, createddate in queued_entries]
+    resources = Resource.objects.filter(pk__in=queued_ids)
+    existing_ids = {
+        str(resourceid) for resourceid in resources.values_list("pk", flat=True)
+    }
+
+    query = Query(se=se)
+    bool_query = Bool()
+    bool_query.filter(Terms(field="resourceinstanceid", terms=queued_ids))
+    query.add_query(bool_query)
+    query.delete(index=TERMS_INDEX)
+
+    for resourceid in set(queued_ids) - existing_ids:
+        Resource().delete_index(resourceinstanceid=resourceid)
+
+    if existing_ids:
+        index_resources_using_singleprocessing(
+            resources=resources,
+            batch_size=batch_size,
+            quiet=quiet,
+            title="Processing Indexing Queue",
+        )
+        for index in settings.ELASTICSEARCH_CUSTOM_INDEXES:
+            es_index = import_class_from_string(index["module"])(index["name"])
+            for resource in resources.prefetch_related("tilemodel_set"):
+                document, document_id = es_index.get_documents_to_index(
+                    resource, list(resource.tilemodel_set.all())
+                )
+                es_index.index_document(document=document, id=document_id)
+
+    models.BulkIndexQueue.dequeue(queued_entries)
+    return len(queued_entries)
+
+
+def _init_index_worker():
+    global _worker_node_datatypes
+    _worker_node_datatypes = get_node_datatypes()
+
+
+def _get_index_actions_for_batch(
+    resourceids,
+    recalculate_descriptors,
+    resources_index=RESOURCES_INDEX,
+    terms_index=TERMS_INDEX,
+):
+    """
+    Builds the bulk actions needed to index a batch of resources.
+    Runs in a subprocess; the actions are shipped to Elasticsearch by the parent process
+
+    """
+
+    actions = []
     resources = Resource.objects.filter(resourceinstanceid__in=resourceids)
-    batch_size = int(len(resourceids) / 2)
-    return index_resources_using_singleprocessing(
-        resources=resources,
-        batch_size=batch_size,
-        quiet=quiet,
-        title="Indexing Resource Batch",
+    for document, terms in get_documents_to_index(
+        resources,
+        chunk_size=max(1, len(resourceids) // 8),
+        node_datatypes=_worker_node_datatypes,
         recalculate_descriptors=recalculate_descriptors,
-    )
+    ):
+        actions.append(
+            se.create_bulk_item(
+                index=resources_index,
+                id=document["resourceinstanceid"],
+                data=JSONSerializer().serializeToPython(document),
+            )
+        )
+        for term in terms:
+            actions.append(
+                se.create_bulk_item(
+                    index=terms_index,
+                    id=term["_id"],
+                    data=JSONSerializer().serializeToPython(term["_source"]),
+                )
+            )
+    return actions
 
 
 def index_custom_indexes(
@@ -539,6 +881,7 @@ def index_concepts(clear_index=True, batch_size=settings.BULK_IMPORT_BATCH_SIZE)
             }
             concept_indexer.add(index=CONCEPTS_INDEX, id=doc["id"], data=doc)
 
+    invalidate_concept_caches()
     cursor.execute(
         "SELECT count(*) from values WHERE valuetype in ({0})".format(valueTypes)
     )
@@ -1,5 +1,8 @@
+import logging
+
 from arches.app.datatypes.datatypes import DataTypeFactory
 from arches.app.models import models
+from arches.app.utils.graph_cache import published_graph_cache
 
 RESOURCE_ID_KEY = "@resource_id"
 NODE_ID_KEY = "@node_id"
@@ -8,6 +11,8 @@ VALUE_KEY = "@value"
 
 NON_DATA_COLLECTING_NODE = "NON_DATA_COLLECTING_NODE"
 
+logger = logging.getLogger(__name__)
+
 
 class LabelBasedNode(object):
     def __init__(self, name, node_id, tile_id, value, cardinality=None):
@@ -133,9 +138,12 @@ class LabelBasedGraph(object):
         compact=False,
         hide_empty_nodes=False,
         as_json=True,
+        display_values=None,
+        graph_structure=None,
     ):
         """
-        Generates a label-based graph from a given tile
+        Generates a label-based graph from a given tile, nodes are looked up
+        in the graph_structure (a GraphStructure) when one is given
         """
         if not datatype_factory:
             datatype_factory = DataTypeFactory()
@@ -147,7 +155,10 @@ class LabelBasedGraph(object):
 
         node = node_cache.get(nodegroup_id)
         if not node:
-            node = models.Node.objects.get(pk=nodegroup_id)
+            if graph_structure is not None:
+                node = graph_structure.get_node(nodegroup_id)
+            else:
+                node = models.Node.objects.get(pk=nodegroup_id)
             node_cache[nodegroup_id] = node
 
         graph = cls._build_graph(
@@ -158,6 +169,8 @@ class LabelBasedGraph(object):
             nodegroup_cardinality_reference=nodegroup_cardinality_reference,
             node_cache=node_cache,
             datatype_factory=datatype_factory,
+            display_values=display_values,
+            graph_structure=graph_structure,
         )
 
         return (
@@ -178,6 +191,8 @@ class LabelBasedGraph(object):
         user=None,
         perm=None,
         hide_hidden_nodes=False,
+        display_values=None,
+        graph_structure=None,
     ):
         """
         Generates a label-based graph from a given resource
@@ -191,6 +206,14 @@ class LabelBasedGraph(object):
         if not resource.tiles:
             resource.load_tiles(user, perm)
 
+        if graph_structure is None:
+            graph_structure = published_graph_cache.get_structure(resource.graph_id)
+
+        if display_values is None:
+            display_values = cls.get_display_values(
+                resource.tiles, datatype_factory, node_cache
+            )
+
         (
             node_ids_to_tiles_reference,
             nodegroup_cardinality_reference,
@@ -212,6 +235,8 @@ class LabelBasedGraph(object):
                 compact=compact,
                 hide_empty_nodes=hide_empty_nodes,
                 as_json=False,
+                display_values=display_values,
+                graph_structure=graph_structure,
             )
 
             if label_based_graph:
@@ -249,6 +274,17 @@ class LabelBasedGraph(object):
 
         resource_label_based_graphs = []
 
+        # look up the display values of all the resources together
+        resources = list(resources)
+        for resource in resources:
+            if not resource.tiles:
+                resource.load_tiles()
+        display_values = cls.get_display_values(
+            [tile for resource in resources for tile in resource.tiles],
+            datatype_factory,
+            node_cache,
+        )
+
         for resource in resources:
             resource_label_based_graph = cls.from_resource(
                 resource=resource,
@@ -257,6 +293,7 @@ class LabelBasedGraph(object):
                 compact=compact,
                 hide_empty_nodes=hide_empty_nodes,
                 as_json=as_json,
+                display_values=display_values,
             )
 
             resource_label_based_graph[RESOURCE_ID_KEY] = str(resource.pk)
@@ -265,12 +302,49 @@ class LabelBasedGraph(object):
         return resource_label_based_graphs
 
     @classmethod
-    def _get_display_value(cls, tile, node, datatype_factory):
+    def get_display_values(cls, tiles, datatype_factory, node_cache):
+        """
+        Returns the display values of the nodes in the data of a list of tiles keyed by (tileid, nodeid),
+        the nodes are loaded with one query and the values of each datatype are looked up together
+
+        """
+
+        nodeids = {nodeid for tile in tiles if tile.data for nodeid in tile.data}
+        nodes = {}
+        for nodeid, node in models.Node.objects.in_bulk(nodeids).items():
+            nodes[str(nodeid)] = node_cache.setdefault(node.pk, node)
+        keys = []
+        pairs = []
+        for tile in tiles:
+            if not tile.data:
+                continue
+            for nodeid in tile.data:
+                node = nodes.get(nodeid)
+                if (
+                    node is not None
+                    and datatype_factory.datatypes[node.datatype].defaultwidget
+                    is not None
+                ):
+                    keys.append((tile.pk, node.pk))
+                    pairs.append((tile, node))
+
+        display_values = {}
+        try:
+            display_values.update(zip(keys, datatype_factory.get_display_values(pairs)))
+        except (AttributeError, KeyError, TypeError, ValueError):
+            # values are then looked up one at a time by _get_display_value
+            logger.exception("Failed to look up the display values of tiles together")
+        return display_values
+
+    @classmethod
+    def _get_display_value(cls, tile, node, datatype_factory, display_values=None):
         display_value = None
 
         # if the node is unable to collect data, let's explicitly say so
         if datatype_factory.datatypes[node.datatype].defaultwidget is None:
             display_value = NON_DATA_COLLECTING_NODE
+        elif display_values and (tile.pk, node.pk) in display_values:
+            display_value = display_values[(tile.pk, node.pk)]
         elif tile.data:
             datatype = datatype_factory.get_instance(node.datatype)
 
@@ -293,10 +367,17 @@ class LabelBasedGraph(object):
         nodegroup_cardinality_reference,
         node_cache,
         datatype_factory,
+        display_values=None,
+        graph_structure=None,
     ):
+        def get_child_nodes(node):
+            if graph_structure is not None:
+                return graph_structure.get_child_nodes(node.pk)
+            return node.get_direct_child_nodes()
+
         def is_valid_semantic_node(node, tile):
             if node.datatype == "semantic":
-                child_nodes = node.get_direct_child_nodes()
+                child_nodes = get_child_nodes(node)
                 semantic_child_nodes = [
                     child_node
                     for child_node in child_nodes
@@ -342,6 +423,7 @@ class LabelBasedGraph(object):
                             tile=associated_tile,
                             node=input_node,
                             datatype_factory=datatype_factory,
+                            display_values=display_values,
                         ),
                         cardinality=nodegroup_cardinality_reference.get(
                             str(associated_tile.nodegroup_id)
@@ -354,7 +436,7 @@ class LabelBasedGraph(object):
                     else:
                         parent_tree.child_nodes.append(label_based_node)
 
-                    for child_node in input_node.get_direct_child_nodes():
+                    for child_node in get_child_nodes(input_node):
                         if not node_cache.get(child_node.pk):
                             node_cache[child_node.pk] = child_node
 
@@ -366,6 +448,8 @@ class LabelBasedGraph(object):
                             nodegroup_cardinality_reference=nodegroup_cardinality_reference,
                             node_cache=node_cache,
                             datatype_factory=datatype_factory,
+                            display_values=display_values,
+                            graph_structure=graph_structure,
                         )
 
         return parent_tree
@@ -1,3 +1,5 @@
+import hashlib
+import math
 from arches.app.models import models
 from arches.app.models.system_settings import settings
 from arches.app.search.search_engine_factory import SearchEngineFactory
@@ -5,9 +7,88 @@ from django.core.cache import cache
 from django.db import connection
 
 from arches.app.utils.permission_backend import (
-    get_filtered_instances,
+    filter_resource_ids,
+    has_instance_restrictions,
 )
 
+FEATURE_TILE_QUERY = """
+    SELECT ST_AsMVT(tile, %(nodeid)s, 4096, 'geom', 'id') FROM (
+        SELECT tileid,
+            id,
+            resourceinstanceid,
+            nodeid,
+            featureid::text AS featureid,
+            ST_AsMVTGeom(
+                geom,
+                TileBBox(%(zoom)s, %(x)s, %(y)s, 3857)
+            ) AS geom,
+            1 AS total
+        FROM features
+    ) AS tile
+"""
+
+CLUSTER_TILE_QUERY = """
+    SELECT ST_AsMVT(tile, %(nodeid)s, 4096, 'geom', 'id') FROM (
+        SELECT resourceinstanceid::text,
+            row_number() over () as id,
+            1 as total,
+            ST_AsMVTGeom(
+                geom,
+                TileBBox(%(zoom)s, %(x)s, %(y)s, 3857)
+            ) AS geom,
+            '' AS extent
+        FROM clusters
+        WHERE cid is NULL
+        UNION
+        SELECT NULL as resourceinstanceid,
+            row_number() over () as id,
+            count(*) as total,
+            ST_AsMVTGeom(
+                ST_Centroid(
+                    ST_Collect(geom)
+                ),
+                TileBBox(%(zoom)s, %(x)s, %(y)s, 3857)
+            ) AS geom,
+            ST_AsGeoJSON(
+                ST_Extent(geom)
+            ) AS extent
+        FROM clusters
+        WHERE cid IS NOT NULL
+        GROUP BY cid
+    ) AS tile
+"""
+
+# counts, filters and clusters the geometries of a tile in a single statement,
+# the subqueries of the branches that are not taken are never evaluated
+TILE_QUERY = """
+    WITH features AS (
+        SELECT tileid, id, resourceinstanceid, nodeid, featureid, geom
+        FROM geojson_geometries
+        WHERE nodeid = %(nodeid)s
+        AND (geom && ST_TileEnvelope(%(zoom)s, %(x)s, %(y)s))
+        {filter}
+    ),
+    clusters AS (
+        SELECT tileid,
+            resourceinstanceid,
+            nodeid,
+            geom,
+            ST_ClusterDBSCAN(geom, eps := %(distance)s, minpoints := %(min_points)s) over () AS cid
+        FROM features
+        WHERE ST_Intersects(geom, TileBBox(%(zoom)s, %(x)s, %(y)s, 3857))
+    ),
+    geom_count AS (
+        SELECT count(*) AS total
+        FROM features
+        WHERE ST_Intersects(geom, TileBBox(%(zoom)s, %(x)s, %(y)s, 3857))
+    )
+    SELECT CASE
+        WHEN NOT %(cluster)s THEN ({feature_tile})
+        WHEN (SELECT total FROM geom_count) >= %(min_points)s THEN ({cluster_tile})
+        WHEN (SELECT total FROM geom_count) > 0 THEN ({feature_tile})
+    END;
+"""
+
 
 class MVTTiler:
     se = SearchEngineFactory().create()
@@ -26,204 +107,186 @@ class MVTTiler:
         x: int,
         y: int,
     ) -> bytes | None:
+        """
+        Returns the vector tile of a node as seen by a user
+
+        The tile without any permission filtering is shared by every user (and cached once),
+        a filtered tile is only built when the user is denied access to a resource in the tile
+
+        """
+
         try:
             node = models.Node.objects.get(
                 nodeid=nodeid, nodegroup_id__in=viewable_nodegroups
             )
         except models.Node.DoesNotExist:
             return None
-        search_geom_count = 0
-        config = node.config
-        cache_key = self.create_mvt_cache_key(node, zoom, x, y, user)
+
+        excluded_resourceids = []
+        if has_instance_restrictions(user):
+            excluded_resourceids = self.get_excluded_resource_ids(
+                node, user, zoom, x, y
+            )
+        return self.get_tile(node, zoom, x, y, excluded_resourceids)
+
+    def get_tile(self, node, zoom, x, y, excluded_resourceids=()):
+        """
+        Returns a cached tile or builds and caches it
+
+        Keyword Arguments:
+        node -- the geojson-feature-collection node of the tile
+        zoom, x, y -- the tile coordinates
+        excluded_resourceids -- ids of resource instances to leave out of the tile
+
+        """
+
+        version = self.get_data_version(node.nodeid)
+        cache_key = self.create_mvt_cache_key(
+            node, zoom, x, y, version, excluded_resourceids
+        )
         tile = cache.get(cache_key)
         if tile is None:
-            with connection.cursor() as cursor:
-                resource_query = """
-                    SELECT resourceinstanceid::text
-                    FROM geojson_geometries
-                    WHERE 
-                    ST_Intersects(geom, TileBBox(%s, %s, %s, 3857))
-                    AND
-                    nodeid = %s
-                    """
-
-                # get all of the resources in this bbox
-                cursor.execute(resource_query, [zoom, x, y, nodeid])
-                resources = [record[0] for record in cursor.fetchall()]
-
-                exclusive_set, resource_ids = get_filtered_instances(
-                    user, search_engine=self.se, resources=resources
-                )
-                permission_framework_filter = (
-                    "resourceinstanceid in %s"
-                    if exclusive_set
-                    else "resourceinstanceid not in %s"
-                )
-                if len(resource_ids) == 0:
-                    resource_ids.append(
-                        "10000000-0000-0000-0000-000000000001"
-                    )  # This must have a uuid that will never be a resource id.
-                resource_ids = tuple(resource_ids)
-
-                if int(zoom) <= int(config["clusterMaxZoom"]):
-                    arc = self.EARTHCIRCUM / ((1 << int(zoom)) * self.PIXELSPERTILE)
-                    distance = arc * float(config["clusterDistance"])
-                    min_points = int(config["clusterMinPoints"])
-                    distance = (
-                        settings.CLUSTER_DISTANCE_MAX
-                        if distance > settings.CLUSTER_DISTANCE_MAX
-                        else distance
-                    )
-
-                    count_query = """
-                    SELECT count(*) FROM geojson_geometries
-                    WHERE
-                    ST_Intersects(geom, TileBBox(%s, %s, %s, 3857))
-                    AND
-                    nodeid = %s and {filter}
-                    """.format(
-                        filter=permission_framework_filter
-                    )
-
-                    # get the count of matching geometries
-                    cursor.execute(
-                        count_query,
-                        [
-                            zoom,
-                            x,
-                            y,
-                            nodeid,
-                            resource_ids,
-                        ],
-                    )
-                    search_geom_count = cursor.fetchone()[0]
-
-                    if search_geom_count >= min_points:
-                        cursor.execute(
-                            """WITH clusters(tileid, resourceinstanceid, nodeid, geom, cid)
-                            AS (
-                                SELECT m.*,
-                                ST_ClusterDBSCAN(geom, eps := %s, minpoints := %s) over () AS cid
-                                FROM (
-                                    SELECT tileid,
-                                        resourceinstanceid,
-                                        nodeid,
-                                        geom
-                                    FROM geojson_geometries
-                                    WHERE 
-                                    ST_Intersects(geom, TileBBox(%s, %s, %s, 3857))
-                                    AND
-                                    nodeid = %s and {filter}
-                                ) m
-                            )
-                            SELECT ST_AsMVT(
-                                tile,
-                                %s,
-                                4096,
-                                'geom',
-                                'id'
-                            ) FROM (
-                                SELECT resourceinstanceid::text,
-                                    row_number() over () as id,
-                                    1 as total,
-                                    ST_AsMVTGeom(
-                                        geom,
-                                        TileBBox(%s, %s, %s, 3857)
-                                    ) AS geom,
-                                    '' AS extent
-                                FROM clusters
-                                WHERE cid is NULL
-                                UNION
-                                SELECT NULL as resourceinstanceid,
-                                    row_number() over () as id,
-                                    count(*) as total,
-                                    ST_AsMVTGeom(
-                                        ST_Centroid(
-                                            ST_Collect(geom)
-                                        ),
-                                        TileBBox(%s, %s, %s, 3857)
-                                    ) AS geom,
-                                    ST_AsGeoJSON(
-                                        ST_Extent(geom)
-                                    ) AS extent
-                                FROM clusters
-                                WHERE cid IS NOT NULL
-                                GROUP BY cid
-                            ) as tile;""".format(
-                                filter=permission_framework_filter
-                            ),
-                            [
-                                distance,
-                                min_points,
-                                zoom,
-                                x,
-                                y,
-                                nodeid,
-                                resource_ids,
-                                nodeid,
-                                zoom,
-                                x,
-                                y,
-                                zoom,
-                                x,
-                                y,
-                            ],
-                        )
-                    elif search_geom_count:
-                        cursor.execute(
-                            """SELECT ST_AsMVT(tile, %s, 4096, 'geom', 'id') FROM (SELECT tileid,
-                                id,
-                                resourceinstanceid,
-                                nodeid,
-                                featureid::text AS featureid,
-                                ST_AsMVTGeom(
-                                    geom,
-                                    TileBBox(%s, %s, %s, 3857)
-                                ) AS geom,
-                                1 AS total
-                            FROM geojson_geometries
-                            WHERE nodeid = %s and {filter} and (geom && ST_TileEnvelope(%s, %s, %s))) AS tile;""".format(
-                                filter=permission_framework_filter
-                            ),
-                            [nodeid, zoom, x, y, nodeid, resource_ids, zoom, x, y],
-                        )
-                    else:
-                        tile = ""
-                else:
-                    query = """SELECT ST_AsMVT(tile, %s, 4096, 'geom', 'id') FROM (SELECT tileid,
-                            id,
-                            resourceinstanceid,
-                            nodeid,
-                            featureid::text AS featureid,
-                            ST_AsMVTGeom(
-                                geom,
-                                TileBBox(%s, %s, %s, 3857)
-                            ) AS geom,
-                            1 AS total
-                        FROM geojson_geometries
-                        WHERE nodeid = %s and {filter} and (geom && ST_TileEnvelope(%s, %s, %s))) AS tile;""".format(
-                        filter=permission_framework_filter
-                    )
-                    cursor.execute(
-                        """SELECT ST_AsMVT(tile, %s, 4096, 'geom', 'id') FROM (SELECT tileid,
-                            id,
-                            resourceinstanceid,
-                            nodeid,
-                            featureid::text AS featureid,
-                            ST_AsMVTGeom(
-                                geom,
-                                TileBBox(%s, %s, %s, 3857)
-                            ) AS geom,
-                            1 AS total
-                        FROM geojson_geometries
-                        WHERE nodeid = %s and {filter} and (geom && ST_TileEnvelope(%s, %s, %s))) AS tile;""".format(
-                            filter=permission_framework_filter
-                        ),
-                        [nodeid, zoom, x, y, nodeid, resource_ids, zoom, x, y],
-                    )
-                tile = bytes(cursor.fetchone()[0]) if tile is None else tile
-                cache.set(cache_key, tile, settings.TILE_CACHE_TIMEOUT)
+            tile = self.generate_tile(node, zoom, x, y, excluded_resourceids)
+            cache.set(cache_key, tile, settings.TILE_CACHE_TIMEOUT)
         return tile
 
-    def create_mvt_cache_key(self, node, zoom, x, y, user):
-        return f"mvt_{str(node.nodeid)}_{zoom}_{x}_{y}_{user.id}"
+    def generate_tile(self, node, zoom, x, y, excluded_resourceids=()):
+        config = node.config
+        params = {
+            "nodeid": str(node.nodeid),
+            "zoom": int(zoom),
+            "x": int(x),
+            "y": int(y),
+            "cluster": False,
+            "distance": 0,
+            "min_points": 0,
+            "excluded": list(excluded_resourceids),
+        }
+        if int(zoom) <= int(config["clusterMaxZoom"]):
+            arc = self.EARTHCIRCUM / ((1 << int(zoom)) * self.PIXELSPERTILE)
+            distance = arc * float(config["clusterDistance"])
+            params["cluster"] = True
+            params["min_points"] = int(config["clusterMinPoints"])
+            params["distance"] = (
+                settings.CLUSTER_DISTANCE_MAX
+                if distance > settings.CLUSTER_DISTANCE_MAX
+                else distance
+            )
+
+        query = TILE_QUERY.format(
+            filter=(
+                "AND resourceinstanceid <> ALL(%(excluded)s::uuid[])"
+                if excluded_resourceids
+                else ""
+            ),
+            feature_tile=FEATURE_TILE_QUERY,
+            cluster_tile=CLUSTER_TILE_QUERY,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(query, params)
+            tile = cursor.fetchone()[0]
+        return bytes(tile) if tile is not None else b""
+
+    def get_excluded_resource_ids(self, node, user, zoom, x, y):
+        """
+        Returns the sorted ids of the resource instances with geometries in a tile
+        that the user is not allowed to access
+
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT DISTINCT resourceinstanceid::text
+                FROM geojson_geometries
+                WHERE nodeid = %s
+                AND (geom && ST_TileEnvelope(%s, %s, %s))
+                """,
+                [str(node.nodeid), zoom, x, y],
+            )
+            resourceids = [record[0] for record in cursor.fetchall()]
+
+        if not resourceids:
+            return []
+        permitted_resourceids = set(filter_resource_ids(user, resourceids))
+        return sorted(set(resourceids) - permitted_resourceids)
+
+    def get_data_version(self, nodeid):
+        """
+        Returns the version of the geometries of a node,
+        it is incremented by a trigger whenever the node's rows of geojson_geometries change
+
+        """
+
+        version = (
+            models.GeoJSONGeometryVersion.objects.filter(nodeid=nodeid)
+            .values_list("version", flat=True)
+            .first()
+        )
+        return version or 0
+
+    def get_node_extent(self, nodeid):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT ST_XMin(extent), ST_YMin(extent), ST_XMax(extent), ST_YMax(extent)
+                FROM (SELECT ST_Extent(geom) AS extent FROM geojson_geometries WHERE nodeid = %s) AS node_extent
+                """,
+                [str(nodeid)],
+            )
+            extent = cursor.fetchone()
+        return None if extent is None or extent[0] is None else extent
+
+    def get_tile_range(self, extent, zoom):
+        """
+        Returns the ranges of x and y of the tiles at a zoom level
+        that intersect an extent (xmin, ymin, xmax, ymax) in EPSG:3857
+
+        """
+
+        half = self.EARTHCIRCUM / 2
+        tiles = 1 << int(zoom)
+        tile_size = self.EARTHCIRCUM / tiles
+
+        def clamp(value):
+            return min(max(value, 0), tiles - 1)
+
+        xmin, ymin, xmax, ymax = extent
+        x_range = range(
+            clamp(math.floor((xmin + half) / tile_size)),
+            clamp(math.floor((xmax + half) / tile_size)) + 1,
+        )
+        y_range = range(
+            clamp(math.floor((half - ymax) / tile_size)),
+            clamp(math.floor((half - ymin) / tile_size)) + 1,
+        )
+        return x_range, y_range
+
+    def seed(self, node, max_zoom, min_zoom=0):
+        """
+        Builds and caches the unfiltered tiles of a node from min_zoom up to max_zoom,
+        skipping tiles outside the extent of the node's geometries.
+        Returns the number of tiles seeded.
+
+        """
+
+        extent = self.get_node_extent(node.nodeid)
+        if extent is None:
+            return 0
+        count = 0
+        for zoom in range(min_zoom, max_zoom + 1):
+            x_range, y_range = self.get_tile_range(extent, zoom)
+            for x in x_range:
+                for y in y_range:
+                    self.get_tile(node, zoom, x, y)
+                    count += 1
+        return count
+
+    def create_mvt_cache_key(self, node, zoom, x, y, version, excluded_resourceids=()):
+        cache_key = f"mvt_{str(node.nodeid)}_{zoom}_{x}_{y}_{version}"
+        if excluded_resourceids:
+            digest = hashlib.sha1(
+                ",".join(excluded_resourceids).encode("utf-8")
+            ).hexdigest()
+            cache_key = f"{cache_key}_{digest}"
+        return cache_key
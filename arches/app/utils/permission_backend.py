@@ -70,6 +70,34 @@ class PermissionFramework(metaclass=ABCMeta):
         self, user, search_engine=None, allresources=False, resources=None
     ): ...
 
+    def filter_resource_ids(self, user, resourceids):
+        """
+        Returns the ids in resourceids (in the same order) of the resource instances the user can access
+
+        """
+
+        from arches.app.search.search_engine_factory import SearchEngineInstance as se
+
+        resourceids = list(resourceids)
+        exclusive_set, filtered_instances = self.get_filtered_instances(
+            user, search_engine=se, resources=resourceids
+        )
+        filtered_instances = {str(resourceid) for resourceid in filtered_instances}
+        return [
+            resourceid
+            for resourceid in resourceids
+            if (str(resourceid) in filtered_instances) == exclusive_set
+        ]
+
+    def has_instance_restrictions(self, user):
+        """
+        Returns False only if the user can access every resource instance,
+        frameworks that cannot tell cheaply assume every user other than a superuser is restricted
+
+        """
+
+        return not user.is_superuser
+
     @abstractmethod
     def get_groups_with_permission_for_object(self, perm, obj): ...
 
@@ -82,6 +110,9 @@ class PermissionFramework(metaclass=ABCMeta):
     @abstractmethod
     def get_nodegroups_by_perm(self, user, perms, any_perm=True): ...
 
+    def get_nodegroup_ids_by_perm(self, user, perms, any_perm=True):
+        return frozenset(self.get_nodegroups_by_perm(user, perms, any_perm=any_perm))
+
     @abstractmethod
     def get_map_layers_by_perm(self, user, perms, any_perm=True): ...
 
@@ -209,6 +240,14 @@ def get_filtered_instances(
     )
 
 
+def filter_resource_ids(user, resourceids):
+    return _get_permission_framework().filter_resource_ids(user, resourceids)
+
+
+def has_instance_restrictions(user):
+    return _get_permission_framework().has_instance_restrictions(user)
+
+
 def get_groups_with_permission_for_object(perm, obj):
     return _get_permission_framework().get_groups_with_permission_for_object(perm, obj)
 
@@ -229,6 +268,12 @@ def get_nodegroups_by_perm(user, perms, any_perm=True):
     )
 
 
+def get_nodegroup_ids_by_perm(user, perms, any_perm=True):
+    return _get_permission_framework().get_nodegroup_ids_by_perm(
+        user, perms, any_perm=any_perm
+    )
+
+
 def get_map_layers_by_perm(user, perms, any_perm=True):
     return _get_permission_framework().get_map_layers_by_perm(
         user, perms, any_perm=any_perm
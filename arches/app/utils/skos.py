@@ -29,7 +29,7 @@ from rdflib.namespace import SKOS, DCTERMS
 from rdflib.graph import Graph
 from time import time
 from arches.app.models import models
-from arches.app.models.concept import Concept
+from arches.app.models.concept import Concept, invalidate_concept_caches
 from arches.app.models.system_settings import settings
 from arches.app.utils.betterJSONSerializer import JSONSerializer, JSONDeserializer
 from arches.app.utils.i18n import capitalize_region
@@ -70,6 +70,7 @@ class SKOSReader(object):
         overwrite_options="overwrite",
         staging_options="keep",
         prevent_indexing=False,
+        bulk=False,
     ):
         """
         given an RDF graph, tries to save the concpets to the system
@@ -78,11 +79,13 @@ class SKOSReader(object):
         overwrite_options -- 'overwrite', 'ignore'
         staging_options -- 'stage', 'keep'
         prevent_indexing -- True to prevent indexing of concepts
+        bulk -- True to save the concepts, values and relations with a few set based
+            queries instead of one concept at a time (see bulk_save_nodes)
 
         """
 
         baseuuid = uuid.uuid4()
-        allowed_languages = models.Language.objects.values_list("code", flat=True)
+        allowed_languages = set(models.Language.objects.values_list("code", flat=True))
         default_lang = settings.LANGUAGE_CODE
 
         value_types = models.DValueType.objects.all()
@@ -95,10 +98,13 @@ class SKOSReader(object):
         skos_value_types = {
             valuetype.valuetype: valuetype for valuetype in skos_value_types
         }
-        dcterms_value_types = value_types.filter(namespace="dcterms")
-        dcterms_identifier_type = dcterms_value_types.get(
-            valuetype=str(DCTERMS.identifier).replace(str(DCTERMS), "")
-        )
+        dcterms_value_types = {
+            valuetype.valuetype: valuetype
+            for valuetype in value_types.filter(namespace="dcterms")
+        }
+        dcterms_identifier_type = dcterms_value_types[
+            str(DCTERMS.identifier).replace(str(DCTERMS), "")
+        ]
 
         # if the graph is of the type rdflib.graph.Graph
         if isinstance(graph, Graph):
@@ -116,20 +122,18 @@ class SKOSReader(object):
                 )
 
                 for predicate, object in graph.predicate_objects(subject=scheme):
-                    if str(DCTERMS) in predicate and predicate.replace(
-                        DCTERMS, ""
-                    ) in dcterms_value_types.values_list("valuetype", flat=True):
-                        if not self.language_exists(object, allowed_languages):
-                            allowed_languages = models.Language.objects.values_list(
-                                "code", flat=True
-                            )
+                    if (
+                        str(DCTERMS) in predicate
+                        and predicate.replace(DCTERMS, "") in dcterms_value_types
+                    ):
+                        self.language_exists(object, allowed_languages)
 
                         try:
                             # first try and get any values associated with the concept_scheme
                             # predicate.replace(SKOS, '') should yield something like 'prefLabel' or 'scopeNote', etc..
-                            value_type = dcterms_value_types.get(
-                                valuetype=predicate.replace(DCTERMS, "")
-                            )
+                            value_type = dcterms_value_types[
+                                predicate.replace(DCTERMS, "")
+                            ]
                             val = self.unwrapJsonLiteral(object)
                             if predicate == DCTERMS.title:
                                 concept_scheme.addvalue(
@@ -209,10 +213,7 @@ class SKOSReader(object):
                     # loop through all the elements within a <skos:Concept> element
                     for predicate, object in graph.predicate_objects(subject=s):
                         if str(SKOS) in predicate or str(ARCHES) in predicate:
-                            if not self.language_exists(object, allowed_languages):
-                                allowed_languages = models.Language.objects.values_list(
-                                    "code", flat=True
-                                )
+                            self.language_exists(object, allowed_languages)
 
                             # this is essentially the skos element type within a <skos:Concept>
                             # element (eg: prefLabel, broader, etc...)
@@ -296,10 +297,7 @@ class SKOSReader(object):
                 # loop through all the elements within a <skos:Concept> element
                 for predicate, object in graph.predicate_objects(subject=s):
                     if str(SKOS) in predicate or str(ARCHES) in predicate:
-                        if not self.language_exists(object, allowed_languages):
-                            allowed_languages = models.Language.objects.values_list(
-                                "code", flat=True
-                            )
+                        self.language_exists(object, allowed_languages)
 
                         # this is essentially the skos element type within a <skos:Concept>
                         # element (eg: prefLabel, broader, etc...)
@@ -332,6 +330,11 @@ class SKOSReader(object):
                     }
                 )
 
+            if bulk:
+                return self.bulk_save_nodes(
+                    overwrite_options, staging_options, prevent_indexing
+                )
+
             # insert and index the concpets
             scheme_node = None
             orphaned_concepts = {}
@@ -381,38 +384,7 @@ class SKOSReader(object):
 
                 if len(orphaned_concepts.keys()) > 0:
                     if scheme_node:
-                        orphaned_scheme = Concept(
-                            {
-                                "id": uuid.uuid4(),
-                                "legacyoid": uuid.uuid4(),
-                                "nodetype": "ConceptScheme",
-                            }
-                        )
-                        orphaned_scheme_value = None
-                        for value in scheme_node.values:
-                            if value.type == "prefLabel":
-                                orphaned_scheme.addvalue(
-                                    {
-                                        "id": uuid.uuid4(),
-                                        "value": "ORPHANS - " + value.value,
-                                        "language": value.language,
-                                        "type": value.type,
-                                        "category": value.category,
-                                    }
-                                )
-                        orphaned_scheme.save()
-                        for (
-                            orphaned_concept_id,
-                            orphaned_concept,
-                        ) in orphaned_concepts.items():
-                            models.Relation.objects.create(
-                                conceptfrom_id=str(orphaned_scheme.id),
-                                conceptto_id=orphaned_concept_id,
-                                relationtype_id="narrower",
-                            )
-                        self.logger.warning(
-                            f'\nThe SKOS file "{os.path.split(self.path_to_file)[1]}" appears to have orphaned concepts.'
-                        )
+                        self.save_orphaned_concepts(scheme_node, orphaned_concepts)
 
                 # need to index after the concepts and relations have been entered into the db
                 # so that the proper context gets indexed with the concept
@@ -435,6 +407,233 @@ class SKOSReader(object):
         else:
             raise Exception("graph argument should be of type rdflib.graph.Graph")
 
+    def save_orphaned_concepts(self, scheme_node, orphaned_concepts):
+        """
+        Adds the concepts that nothing points to below a new "ORPHANS - " scheme
+
+        """
+
+        orphaned_scheme = Concept(
+            {
+                "id": uuid.uuid4(),
+                "legacyoid": uuid.uuid4(),
+                "nodetype": "ConceptScheme",
+            }
+        )
+        for value in scheme_node.values:
+            if value.type == "prefLabel":
+                orphaned_scheme.addvalue(
+                    {
+                        "id": uuid.uuid4(),
+                        "value": "ORPHANS - " + value.value,
+                        "language": value.language,
+                        "type": value.type,
+                        "category": value.category,
+                    }
+                )
+        orphaned_scheme.save()
+        models.Relation.objects.bulk_create(
+            [
+                models.Relation(
+                    conceptfrom_id=str(orphaned_scheme.id),
+                    conceptto_id=orphaned_concept_id,
+                    relationtype_id="narrower",
+                )
+                for orphaned_concept_id in orphaned_concepts
+            ]
+        )
+        self.logger.warning(
+            f'\nThe SKOS file "{os.path.split(self.path_to_file)[1]}" appears to have orphaned concepts.'
+        )
+
+    def bulk_save_nodes(
+        self,
+        overwrite_options="overwrite",
+        staging_options="keep",
+        prevent_indexing=False,
+    ):
+        """
+        Saves the parsed concepts, values and relations the same way as save_concepts_from_skos
+        but diffs them against the existing concept and value ids up front and writes them with
+        bulk_create/bulk_update in a single transaction, relations are resolved once every concept exists
+
+        Keyword arguments:
+        overwrite_options -- 'overwrite', 'ignore'
+        staging_options -- 'stage', 'keep'
+        prevent_indexing -- True to prevent indexing of concepts
+
+        """
+
+        batch_size = settings.BULK_IMPORT_BATCH_SIZE
+        scheme_node = None
+        orphaned_concepts = {}
+        existing_conceptids = set()
+        conceptids = [str(node.id) for node in self.nodes]
+        for i in range(0, len(conceptids), batch_size):
+            existing_conceptids.update(
+                str(conceptid)
+                for conceptid in models.Concept.objects.filter(
+                    pk__in=conceptids[i : i + batch_size]
+                ).values_list("pk", flat=True)
+            )
+
+        concepts = {}
+        values = {}
+        for node in self.nodes:
+            node.id = str(node.id)
+            exists = node.id in existing_conceptids
+            if node.nodetype == "ConceptScheme":
+                scheme_node = node
+            elif node.nodetype == "Concept":
+                orphaned_concepts[node.id] = node
+            if staging_options == "stage" and not exists:
+                # this is a new concept, so add a reference to it in the Candiates schema
+                if node.nodetype != "ConceptScheme":
+                    self.relations.append(
+                        {
+                            "source": "00000000-0000-0000-0000-000000000006",
+                            "type": "narrower",
+                            "target": node.id,
+                        }
+                    )
+            if exists and overwrite_options == "ignore":
+                continue
+            if node.id not in concepts:
+                concepts[node.id] = models.Concept(
+                    pk=node.id,
+                    legacyoid=node.legacyoid if node.legacyoid != "" else node.id,
+                    nodetype_id=node.nodetype,
+                )
+            for value in node.values:
+                if value.value.strip() == "":
+                    continue
+                value.id = str(value.id) if value.id else str(uuid.uuid4())
+                value.conceptid = node.id
+                if value.language != "":
+                    value.language = capitalize_region(value.language)
+                values[value.id] = models.Value(
+                    pk=value.id,
+                    concept_id=node.id,
+                    valuetype_id=value.type,
+                    value=value.value,
+                    language_id=value.language or settings.LANGUAGE_CODE,
+                )
+
+        existing_valueids = set()
+        valueids = list(values.keys())
+        for i in range(0, len(valueids), batch_size):
+            existing_valueids.update(
+                str(valueid)
+                for valueid in models.Value.objects.filter(
+                    pk__in=valueids[i : i + batch_size]
+                ).values_list("pk", flat=True)
+            )
+
+        with transaction.atomic():
+            models.Concept.objects.bulk_create(
+                [
+                    concept
+                    for conceptid, concept in concepts.items()
+                    if conceptid not in existing_conceptids
+                ],
+                batch_size=batch_size,
+            )
+            models.Concept.objects.bulk_update(
+                [
+                    concept
+                    for conceptid, concept in concepts.items()
+                    if conceptid in existing_conceptids
+                ],
+                ["nodetype", "legacyoid"],
+                batch_size=batch_size,
+            )
+            models.Value.objects.bulk_create(
+                [
+                    value
+                    for valueid, value in values.items()
+                    if valueid not in existing_valueids
+                ],
+                batch_size=batch_size,
+            )
+            models.Value.objects.bulk_update(
+                [
+                    value
+                    for valueid, value in values.items()
+                    if valueid in existing_valueids
+                ],
+                ["concept", "valuetype", "value", "language"],
+                batch_size=batch_size,
+            )
+
+            # resolve the concept relations now that every concept exists
+            relations = {}
+            for relation in self.relations:
+                key = (
+                    str(relation["source"]),
+                    str(relation["target"]),
+                    relation["type"],
+                )
+                relations[key] = models.Relation(
+                    conceptfrom_id=key[0], conceptto_id=key[1], relationtype_id=key[2]
+                )
+                # check for orphaned concepts, every concept except the concept scheme should have an edge pointing to it
+                if (
+                    relation["type"] == "narrower"
+                    or relation["type"] == "hasTopConcept"
+                ):
+                    orphaned_concepts.pop(key[1], None)
+            models.Relation.objects.bulk_create(
+                relations.values(), batch_size=batch_size, ignore_conflicts=True
+            )
+
+            if len(orphaned_concepts.keys()) > 0 and scheme_node:
+                self.save_orphaned_concepts(scheme_node, orphaned_concepts)
+
+        # insert the concept collection relations, members of concepts missing
+        # from the database are skipped so that we can load incomplete collections
+        member_relations = {}
+        memberids = set()
+        for relation in self.member_relations:
+            key = (str(relation["source"]), str(relation["target"]), relation["type"])
+            member_relations[key] = relation
+            memberids.update(key[:2])
+        memberids = list(memberids)
+        existing_memberids = set()
+        for i in range(0, len(memberids), batch_size):
+            existing_memberids.update(
+                str(conceptid)
+                for conceptid in models.Concept.objects.filter(
+                    pk__in=memberids[i : i + batch_size]
+                ).values_list("pk", flat=True)
+            )
+        new_member_relations = []
+        for key in member_relations:
+            if key[0] in existing_memberids and key[1] in existing_memberids:
+                new_member_relations.append(
+                    models.Relation(
+                        conceptfrom_id=key[0],
+                        conceptto_id=key[1],
+                        relationtype_id=key[2],
+                    )
+                )
+            else:
+                self.logger.warning(
+                    "Skipping %s relation from %s to %s, the concept doesn't exist"
+                    % (key[2], key[0], key[1])
+                )
+        models.Relation.objects.bulk_create(
+            new_member_relations, batch_size=batch_size, ignore_conflicts=True
+        )
+
+        invalidate_concept_caches()
+
+        # need to index after the concepts and relations have been entered into the db
+        # so that the proper context gets indexed with the concept
+        if scheme_node and not prevent_indexing:
+            scheme_node.bulk_index()
+
+        return scheme_node
+
     def unwrapJsonLiteral(self, jsonObj):
         ret = {"value_id": "", "value": jsonObj}
 
@@ -479,6 +678,8 @@ class SKOSReader(object):
                 newlang.isdefault = False
 
             newlang.save()
+            if isinstance(allowed_languages, set):
+                allowed_languages.add(newlang.code)
             return False
         return True
 
@@ -1,5 +1,8 @@
 import logging
+import os
+import threading
 from kombu import Connection
+from django.core.cache import caches
 from django.utils.translation import gettext as _
 from arches.app.models.system_settings import settings
 from arches.celery import app
@@ -7,8 +10,17 @@ import time
 
 logger = logging.getLogger(__name__)
 
+CELERY_AVAILABILITY_CACHE_KEY = "celery_available"
+CELERY_AVAILABILITY_LOCK_KEY = "celery_availability_check"
+
+
+def ping_celery():
+    """
+    Connects to the celery broker and, unless CELERY_CHECK_ONLY_INSPECT_BROKER is set,
+    pings the workers. Returns True if celery is available
+
+    """
 
-def check_if_celery_available():
     result = False
     if settings.CELERY_BROKER_URL != "":
         try:
@@ -44,3 +56,109 @@ def check_if_celery_available():
         except Exception as e:
             logger.error(_("Unable to connect to a celery broker"))
     return result
+
+
+def get_celery_availability_cache():
+    """
+    Returns the django cache (settings.CELERY_AVAILABILITY_CACHE) that holds the availability
+    of celery, it must be shared by every process for only one of them to ping celery
+
+    """
+
+    return caches[getattr(settings, "CELERY_AVAILABILITY_CACHE", "user_permission")]
+
+
+def update_celery_availability():
+    """
+    Pings celery and stores the result in the celery availability cache
+
+    """
+
+    available = ping_celery()
+    get_celery_availability_cache().set(
+        CELERY_AVAILABILITY_CACHE_KEY,
+        available,
+        settings.CELERY_AVAILABILITY_CACHE_TIMEOUT,
+    )
+    return available
+
+
+def get_celery_availability():
+    """
+    Returns the last known availability of celery (True or False) without contacting the broker,
+    or None if it hasn't been checked within CELERY_AVAILABILITY_CACHE_TIMEOUT seconds
+
+    """
+
+    return get_celery_availability_cache().get(CELERY_AVAILABILITY_CACHE_KEY)
+
+
+class CeleryAvailabilityMonitor(object):
+    """
+    A daemon thread that refreshes the availability of celery in the celery availability cache
+    every CELERY_AVAILABILITY_CHECK_INTERVAL seconds, only one of the processes sharing
+    the cache pings celery in each interval
+
+    """
+
+    def __init__(self):
+        self.thread = None
+        self.pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if not settings.CELERY_AVAILABILITY_CHECK_INTERVAL:
+            return
+        with self._lock:
+            # threads don't survive a fork, so each process runs its own monitor
+            if self.pid == os.getpid() and self.thread.is_alive():
+                return
+            self.pid = os.getpid()
+            self.thread = threading.Thread(
+                target=self.run, name="celery-availability-monitor", daemon=True
+            )
+            self.thread.start()
+
+    def run(self):
+        interval = settings.CELERY_AVAILABILITY_CHECK_INTERVAL
+        while True:
+            try:
+                self.refresh(interval)
+            except Exception as e:
+                logger.exception(e)
+            time.sleep(interval)
+
+    def refresh(self, interval):
+        """
+        Pings celery unless another process has done so within the interval,
+        returns True if celery was pinged
+
+        """
+
+        if get_celery_availability_cache().add(
+            CELERY_AVAILABILITY_LOCK_KEY, self.pid, interval
+        ):
+            update_celery_availability()
+            return True
+        return False
+
+
+celery_availability_monitor = CeleryAvailabilityMonitor()
+
+
+def check_if_celery_available():
+    """
+    Returns True if a celery broker (and worker) is available
+
+    The availability is read from the cache kept up to date by the CeleryAvailabilityMonitor,
+    celery is only contacted here when the cache holds no answer (eg: on first use)
+
+    """
+
+    if settings.CELERY_BROKER_URL == "":
+        return False
+    celery_availability_monitor.start()
+    available = get_celery_availability()
+    if available is None:
+        available = update_celery_availability()
+    return available
@@ -41,6 +41,22 @@ def create_zip_file(files_for_export, filekey):
     return zip_stream
 
 
+def write_zip_file(files_for_export, filekey, dest, chunk_size=1024 * 1024):
+    """
+    Takes a list of dictionaries, each with a file object and a name, zips up all the files with those names into dest (a writable binary file object),
+    copying each file a chunk at a time so that neither the files nor the zip file need to fit in memory.
+    """
+
+    with zipfile.ZipFile(dest, "w", zipfile.ZIP_DEFLATED) as zip:
+        for f in files_for_export:
+            f[filekey].seek(0)
+            with zip.open(f["name"], "w", force_zip64=True) as entry:
+                while chunk := f[filekey].read(chunk_size):
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode("utf-8")
+                    entry.write(chunk)
+
+
 def zip_response(files_for_export, zip_file_name=None, filekey="outputfile"):
     """
     Takes a list of dictionaries, each with a file object and a name, returns an HttpResponse object with a zip file.
@@ -23,7 +23,7 @@ from arches.app.utils.decorators import group_required
 from arches.app.utils.index_database import index_resources_by_type
 from arches.app.utils.response import JSONResponse
 from arches.app.utils.betterJSONSerializer import JSONSerializer, JSONDeserializer
-from django.core.cache import caches
+from arches.app.permissions.arches_permission_base import clear_permission_cache
 
 
 @method_decorator(group_required("Graph Editor"), name="dispatch")
@@ -44,8 +44,7 @@ class ReIndexResources(View):
 class ClearUserPermissionCache(View):
     def post(self, request):
         try:
-            user_permission_cache = caches["user_permission"]
-            user_permission_cache.clear()
+            clear_permission_cache()
         except Exception as e:
             return JSONResponse(str(e), status=500)
 
@@ -245,6 +245,28 @@ class GeoJSON(APIBase):
             end = start + limit
             last_page = len(tiles) < end
             tiles = tiles[start:end]
+        property_tiles_by_resource = {}
+        property_display_values = {}
+        if len(nodegroups) > 0:
+            for pt in property_tiles.filter(
+                resourceinstance_id__in={tile.resourceinstance_id for tile in tiles}
+            ).order_by("sortorder"):
+                property_tiles_by_resource.setdefault(
+                    pt.resourceinstance_id, []
+                ).append(pt)
+            if use_display_values:
+                # look up the display values of every property tile together
+                keys = []
+                pairs = []
+                for pts in property_tiles_by_resource.values():
+                    for pt in pts:
+                        for key in pt.data:
+                            if pt.data[key] is not None and key in property_node_map:
+                                keys.append((pt.pk, key))
+                                pairs.append((pt, property_node_map[key]["node"]))
+                property_display_values = dict(
+                    zip(keys, datatype_factory.get_display_values(pairs))
+                )
         for tile in tiles:
             data = tile.data
             for node in nodes:
@@ -257,9 +279,9 @@ class GeoJSON(APIBase):
                             or geometry_type == feature["geometry"]["type"]
                         ):
                             if len(nodegroups) > 0:
-                                for pt in property_tiles.filter(
-                                    resourceinstance_id=tile.resourceinstance_id
-                                ).order_by("sortorder"):
+                                for pt in property_tiles_by_resource.get(
+                                    tile.resourceinstance_id, []
+                                ):
                                     for key in pt.data:
                                         field_name = (
                                             key
@@ -268,17 +290,9 @@ class GeoJSON(APIBase):
                                         )
                                         if pt.data[key] is not None:
                                             if use_display_values:
-                                                property_node = property_node_map[key][
-                                                    "node"
+                                                value = property_display_values[
+                                                    (pt.pk, key)
                                                 ]
-                                                datatype = (
-                                                    datatype_factory.get_instance(
-                                                        property_node.datatype
-                                                    )
-                                                )
-                                                value = datatype.get_display_value(
-                                                    pt, property_node
-                                                )
                                             else:
                                                 value = pt.data[key]
                                             try:
@@ -661,7 +675,7 @@ class Resources(APIBase):
                                         resource_instance.delete()
                                     except models.ResourceInstance.DoesNotExist:
                                         pass
-                                    resource.save(request=request)
+                                    resource.save(request=request, bulk=True)
                                 response.append(
                                     JSONDeserializer().deserialize(
                                         self.get(
@@ -765,7 +779,7 @@ class Resources(APIBase):
                         response = []
                         for resource in reader.resources:
                             with transaction.atomic():
-                                resource.save(request=request)
+                                resource.save(request=request, bulk=True)
                             response.append(
                                 JSONDeserializer().deserialize(
                                     self.get(
@@ -36,6 +36,7 @@ from arches.app.models.concept import (
     Concept,
     ConceptValue,
     CORE_CONCEPTS,
+    check_if_concepts_in_use,
     get_preflabel_from_valueid,
 )
 from arches.app.search.search_engine_factory import SearchEngineInstance as se
@@ -328,17 +329,17 @@ def concept(request, conceptid):
                     else:
                         in_use = False
                         if delete_self:
-                            check_concept = Concept().get(
-                                data["id"], include_subconcepts=True
+                            in_use = check_if_concepts_in_use(
+                                [data["id"]], include_subconcepts=True
+                            )
+                        if "subconcepts" in data and in_use == False:
+                            in_use = check_if_concepts_in_use(
+                                [
+                                    subconcept["id"]
+                                    for subconcept in data["subconcepts"]
+                                ],
+                                include_subconcepts=True,
                             )
-                            in_use = check_concept.check_if_concept_in_use()
-                        if "subconcepts" in data:
-                            for subconcept in data["subconcepts"]:
-                                if in_use == False:
-                                    check_concept = Concept().get(
-                                        subconcept["id"], include_subconcepts=True
-                                    )
-                                    in_use = check_concept.check_if_concept_in_use()
 
                         if in_use == False:
                             concept.delete_index(delete_self=delete_self)
@@ -36,7 +36,7 @@ from arches.app.models.models import (
     Node,
     SearchExportHistory,
 )
-from arches.app.models.concept import Concept, get_preflabel_from_conceptid
+from arches.app.models.concept import Concept, get_preflabels_from_conceptids
 from arches.app.utils.response import JSONResponse, JSONErrorResponse
 from arches.app.utils.betterJSONSerializer import JSONSerializer, JSONDeserializer
 from arches.app.search.search_engine_factory import SearchEngineFactory
@@ -52,6 +52,7 @@ from arches.app.search.elasticsearch_dsl_builder import (
 from arches.app.search.search_export import SearchResultsExporter
 from arches.app.search.time_wheel import TimeWheel
 from arches.app.search.components.base import SearchFilterFactory
+from arches.app.search.components.paging_filter import InvalidPageTokenError
 from arches.app.views.base import MapBaseManagerView
 from arches.app.utils import permission_backend
 from arches.app.utils.permission_backend import (
@@ -205,13 +206,19 @@ def search_terms(request):
         ret[index] = []
         results = query.search(index=index)
         if results is not None:
+            top_concept_labels = get_preflabels_from_conceptids(
+                [
+                    top_concept["key"]
+                    for result in results["aggregations"]["value_agg"]["buckets"]
+                    for top_concept in result["top_concept"]["buckets"]
+                ],
+                lang=lang if lang != "*" else None,
+            )
             for result in results["aggregations"]["value_agg"]["buckets"]:
                 if len(result["top_concept"]["buckets"]) > 0:
                     for top_concept in result["top_concept"]["buckets"]:
                         top_concept_id = top_concept["key"]
-                        top_concept_label = get_preflabel_from_conceptid(
-                            top_concept["key"], lang=lang if lang != "*" else None
-                        )["value"]
+                        top_concept_label = top_concept_labels[top_concept_id]["value"]
                         for concept in top_concept["conceptid"]["buckets"]:
                             ret[index].append(
                                 {
@@ -369,6 +376,12 @@ def search_results(request, returnDsl=False):
             return search_query_object.pop("query")
         else:
             return JSONResponse(content=response_object)
+    except InvalidPageTokenError as e:
+        return JSONErrorResponse(
+            _("Search Failed"),
+            _("{0}, request the first page again to restart paging").format(e),
+            status=400,
+        )
     except Exception as e:
         message = _("There was an error retrieving the search results")
         try:
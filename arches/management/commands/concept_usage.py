@@ -0,0 +1,77 @@
+"""
+ARCHES - a program developed to inventory and manage immovable cultural heritage.
+Copyright (C) 2013 J. Paul Getty Trust and World Monuments Fund
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""This module contains commands for maintaining the index of the concepts used by tiles."""
+
+from typing import Any, Optional
+from django.core.management.base import BaseCommand
+from arches.app.models.concept import (
+    get_concept_usage_counts,
+    get_resources_using_concepts,
+    rebuild_concept_usage,
+)
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds (backfills) or reports on the concept_usage table, the index of the
+    concept values referenced by tiles that is kept up to date by triggers on the tiles table
+
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "operation",
+            choices=["rebuild", "report"],
+            help="rebuild: repopulate the concept_usage table from the tiles table, "
+            "report: print the usage of the concepts given with --conceptid",
+        )
+
+        parser.add_argument(
+            "-c",
+            "--conceptid",
+            action="append",
+            dest="conceptids",
+            default=[],
+            help="A concept to report on, may be repeated",
+        )
+
+        parser.add_argument(
+            "--include_subconcepts",
+            action="store_true",
+            dest="include_subconcepts",
+            default=False,
+            help="Include the usage of the concepts below each concept in the report",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        if options["operation"] == "rebuild":
+            count = rebuild_concept_usage()
+            self.stdout.write(f"Indexed {count} concept values used by tiles")
+
+        if options["operation"] == "report":
+            conceptids = options["conceptids"]
+            include_subconcepts = options["include_subconcepts"]
+            for nodeid, counts in get_concept_usage_counts(
+                conceptids, include_subconcepts
+            ).items():
+                self.stdout.write(
+                    f"Node {nodeid}: {counts['tiles']} tiles, {counts['resources']} resources"
+                )
+            resourceids = get_resources_using_concepts(conceptids, include_subconcepts)
+            self.stdout.write(f"Used by {len(resourceids)} resources")
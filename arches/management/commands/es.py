@@ -174,6 +174,15 @@ class Command(BaseCommand):
             help="forces the primary descriptors to be recalculated before (re)indexing",
         )
 
+        parser.add_argument(
+            "-rb",
+            "--rebuild",
+            action="store_true",
+            dest="rebuild",
+            default=False,
+            help="builds new resource and term indexes and swaps them in once complete, so search stays available during index_database and index_resources",
+        )
+
     def handle(self, *args, **options):
         if options["operation"] == "setup_indexes":
             self.setup_indexes(name=options["name"])
@@ -196,6 +205,7 @@ class Command(BaseCommand):
                 use_multiprocessing=options["use_multiprocessing"],
                 max_subprocesses=options["max_subprocesses"],
                 recalculate_descriptors=options["recalculate_descriptors"],
+                rebuild=options["rebuild"],
             )
 
         if options["operation"] == "reindex_database":
@@ -221,6 +231,7 @@ class Command(BaseCommand):
                 use_multiprocessing=options["use_multiprocessing"],
                 max_subprocesses=options["max_subprocesses"],
                 recalculate_descriptors=options["recalculate_descriptors"],
+                rebuild=options["rebuild"],
             )
 
         if options["operation"] == "index_resources_by_type":
@@ -267,6 +278,7 @@ class Command(BaseCommand):
         use_multiprocessing=False,
         max_subprocesses=0,
         recalculate_descriptors=False,
+        rebuild=False,
     ):
         if name is not None:
             index_database_util.index_custom_indexes(
@@ -285,6 +297,7 @@ class Command(BaseCommand):
                 use_multiprocessing=use_multiprocessing,
                 max_subprocesses=max_subprocesses,
                 recalculate_descriptors=recalculate_descriptors,
+                rebuild=rebuild,
             )
 
     def reindex_database(
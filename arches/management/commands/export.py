@@ -19,6 +19,10 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 import os
 import subprocess
 from arches.app.models.system_settings import settings
+from arches.app.utils.data_management.resources.exporter import ResourceExporter
+from arches.app.utils.data_management.resources.formats.csvfile import (
+    MissingConfigException,
+)
 from arches.management.commands import utils
 from django.core.management.base import BaseCommand, CommandError
 from django.db import connection
@@ -60,10 +64,104 @@ class Command(BaseCommand):
             help="The name of destination file",
         )
 
+        parser.add_argument(
+            "-g",
+            "--graph",
+            action="store",
+            dest="graph",
+            default=None,
+            help="The graphid of the resources to export",
+        )
+
+        parser.add_argument(
+            "-f",
+            "--format",
+            action="store",
+            dest="format",
+            default="csv",
+            help="The format of the exported resources, eg: csv, tilecsv or json-ld",
+        )
+
+        parser.add_argument(
+            "-c",
+            "--config_file",
+            action="store",
+            dest="config_file",
+            default=None,
+            help="The export mapping file used by the csv format",
+        )
+
+        parser.add_argument(
+            "-l",
+            "--languages",
+            action="store",
+            dest="languages",
+            default=None,
+            help="A comma separated list of the languages to export",
+        )
+
+        parser.add_argument(
+            "--ndjson",
+            action="store_true",
+            dest="ndjson",
+            default=False,
+            help="Write json-ld resources one per line of an .ndjson file instead of a .jsonld file",
+        )
+
     def handle(self, *args, **options):
         if options["operation"] == "shp":
             self.shapefile(dest=options["dest"], table=options["table"])
 
+        if options["operation"] == "resources":
+            self.resources(
+                dest=options["dest"],
+                graphid=options["graph"],
+                file_format=options["format"],
+                config_file=options["config_file"],
+                languages=options["languages"],
+                ndjson=options["ndjson"],
+            )
+
+    def resources(
+        self,
+        dest,
+        graphid,
+        file_format,
+        config_file=None,
+        languages=None,
+        ndjson=False,
+    ):
+        """
+        Exports the resources of a graph into files in the dest directory,
+        csv, tilecsv and json-ld files are written one resource at a time
+
+        """
+
+        if not graphid:
+            raise CommandError("Please specify a graphid with the -g flag.")
+        if not os.path.isdir(dest):
+            raise CommandError(
+                "Cannot export data. Destination directory, {0} does not exist".format(
+                    dest
+                )
+            )
+        if file_format not in settings.RESOURCE_FORMATTERS:
+            raise CommandError(
+                "{0} is not a valid export file format.".format(file_format)
+            )
+        try:
+            resource_exporter = ResourceExporter(
+                file_format, configs=config_file, ndjson=ndjson
+            )
+        except MissingConfigException:
+            raise CommandError(
+                "No mapping file specified. Please rerun this command with the '-c' parameter populated."
+            )
+        for path in resource_exporter.export_to_files(
+            dest, graph_id=graphid, languages=languages
+        ):
+            self.stdout.write(path)
+
     def shapefile(self, dest, table):
         geometry_types = {
             "linestring": ("'ST_MultiLineString'", "'ST_LineString'"),
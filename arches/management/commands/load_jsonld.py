@@ -17,19 +17,25 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
 import os
+import csv
 import json
 import sys
 import time
+import datetime
+import multiprocessing
+from collections import deque
+from io import StringIO
 from pathlib import Path
 
 from django.core.management.base import BaseCommand
 from django.core.files.storage import default_storage
-from django.db import transaction
+from django.db import connection, connections, transaction
 
 from arches.app.models import models as archesmodels
 from arches.app.models.resource import Resource
 from arches.app.utils.data_management.resources.formats.rdffile import JsonLdReader
-from arches.app.models.models import TileModel
+from arches.app.utils.index_database import index_resources_using_multiprocessing
+from arches.app.models.models import EditLog, TileModel
 from arches.app.datatypes.datatypes import DataTypeFactory
 from arches.app.search.search_engine_factory import SearchEngineInstance
 from arches.app.utils.betterJSONSerializer import JSONSerializer
@@ -51,6 +57,21 @@ except:
         return jsdata
 
 
+# the columns of the tiles table written by copy_tiles
+TILE_COPY_COLUMNS = (
+    "tileid",
+    "resourceinstanceid",
+    "parenttileid",
+    "tiledata",
+    "nodegroupid",
+    "sortorder",
+    "provisionaledits",
+)
+
+# the Command running in a load worker process, see _init_load_worker
+_worker_command = None
+
+
 class Command(BaseCommand):
     """
     Command for importing JSON-LD data into Arches
@@ -188,6 +209,15 @@ class Command(BaseCommand):
             help="Resolve filepaths against Django default_storage.",
         )
 
+        parser.add_argument(
+            "--processes",
+            default=0,
+            type=int,
+            action="store",
+            dest="processes",
+            help="Load shards of --fast (or BULK_IMPORT_BATCH_SIZE) files in n processes, writing tiles with COPY and indexing in a separate pipeline",
+        )
+
     def handle(self, *args, **options):
 
         self.stdout.write("Starting JSON-LD load")
@@ -228,6 +258,12 @@ class Command(BaseCommand):
             )
             return
 
+        if options["strip_search"] and options["processes"]:
+            self.stderr.write(
+                "ERROR: stripping fields not exposed to advanced search does not work with --processes"
+            )
+            return
+
         if options["dry_run"]:
             self.stdout.write(
                 "Running in --dry-run mode. Validating only (no saving, no indexing)."
@@ -245,12 +281,7 @@ class Command(BaseCommand):
             return self.resources
 
     def load_resources(self, options):
-        self.reader = JsonLdReader(
-            verbosity=options["verbosity"],
-            ignore_errors=options["ignore_errors"],
-            default_timezone=options["default_timezone"],
-        )
-        self.jss = JSONSerializer()
+        self.init_loader(options)
         source = options["source"]
         if options["model"]:
             models = [options["model"]]
@@ -263,28 +294,9 @@ class Command(BaseCommand):
             models = [m for m in models if m[0] not in ["_", "."]]
         self.stdout.write(f"Found possible models: {models}")
 
-        # This is boilerplate for any use of get_documents_to_index()
-        # Need to add issearchable for strip_search option
-        # Only calculate it once per load
-        self.datatype_factory = DataTypeFactory()
-        dt_instance_hash = {}
-        self.node_info = {
-            str(nodeid): {
-                "datatype": dt_instance_hash.setdefault(
-                    datatype, self.datatype_factory.get_instance(datatype)
-                ),
-                "issearchable": srch,
-            }
-            for nodeid, datatype, srch in archesmodels.Node.objects.values_list(
-                "nodeid", "datatype", "issearchable"
-            )
-        }
-        self.node_datatypes = {
-            str(nodeid): datatype
-            for nodeid, datatype in archesmodels.Node.objects.values_list(
-                "nodeid", "datatype"
-            )
-        }
+        if options["processes"]:
+            self.load_resources_in_parallel(options, models)
+            return
 
         start = time.time()
         seen = 0
@@ -293,51 +305,18 @@ class Command(BaseCommand):
         for m in models:
             self.stdout.write(f"Loading {m}")
             model_path = Path(source) / m
-            graphid = graph_uuid_map.get(m, None)
+            graphid = self.get_graphid(m)
             if not graphid:
-                # Check slug
-                try:
-                    graphid = archesmodels.GraphModel.objects.get(slug=m).pk
-                except:
-                    self.stderr.write(
-                        f"Couldn't find a model definition for {m}; skipping"
-                    )
-                    continue
+                continue
             # We have a good model, so build the pre-processed tree once
-            self.reader.graphtree = self.reader.process_graph(graphid)
-            block = options["block"]
-            if block and "," not in block:
-                blocks = [block]
-            else:
-                if options["use_storage"]:
-                    blocks = default_storage.listdir(model_path)[0]
-                else:
-                    blocks = os.listdir(model_path)
-                blocks.sort()
-                blocks = [b for b in blocks if b[0] not in ["_", "."]]
-                if "," in block:
-                    # {slice},{max-slices}
-                    (cslice, mslice) = block.split(",")
-                    cslice = int(cslice) - 1
-                    mslice = int(mslice)
-                    blocks = blocks[cslice::mslice]
+            self.reader.graphtree = self.reader.get_graphtree(graphid)
 
             loaded_model = 0
 
             try:
-                for b in blocks:
+                for b in self.get_blocks(options, model_path):
                     block_path = model_path / b
-                    if options["use_storage"]:
-                        files = default_storage.listdir(block_path)[1]
-                    else:
-                        files = os.listdir(block_path)
-                    files.sort()
-                    for f in files:
-                        if not f.endswith(options["suffix"]):
-                            continue
-                        elif f.startswith(".") or f.startswith("_"):
-                            continue
-
+                    for f in self.get_files(options, block_path):
                         if options["max"] > 0 and loaded_model >= options["max"]:
                             raise StopIteration()
                         seen += 1
@@ -348,29 +327,9 @@ class Command(BaseCommand):
                         # Check file size of record
                         if not options["quiet"]:
                             self.stdout.write(f"About to import {fn}")
-                        if options["toobig"]:
-                            sz = os.os.path.getsize(fn)
-                            if sz > options["toobig"]:
-                                if not options["quiet"]:
-                                    self.stdout.write(
-                                        f" ... Skipping due to size:  {sz} > {options['toobig']}"
-                                    )
-                                continue
-                        uu = f.replace(f".{options['suffix']}", "")
-                        if options["use_storage"]:
-                            with default_storage.open(fn, mode="r") as fh:
-                                data = fh.read()
-                        else:
-                            with open(fn, mode="r") as fh:
-                                data = fh.read()
-                        # FIXME Timezone / DateTime Workaround
-                        # FIXME The following line should be removed when #5669 / #6346 are closed
-                        data = data.replace("T00:00:00Z", "")
-                        jsdata = json.loads(data)
-                        jsdata = fix_js_data(data, jsdata, m)
-                        if len(uu) != 36 or uu[8] != "-":
-                            # extract uuid from data if filename is not a UUID
-                            uu = jsdata["@id"][-36:]
+                        if self.is_too_big(options, fn):
+                            continue
+                        uu, jsdata = self.read_file(options, fn, m)
                         if jsdata:
                             try:
                                 if options["fast"]:
@@ -424,6 +383,251 @@ class Command(BaseCommand):
             f"Total Time: seen {seen} / loaded {loaded} in {time.time()-start} seconds"
         )
 
+    def init_loader(self, options):
+        """
+        Sets up the reader and the node lookups shared by every file that is loaded
+
+        """
+
+        self.options = options
+        self.reader = JsonLdReader(
+            verbosity=options["verbosity"],
+            ignore_errors=options["ignore_errors"],
+            default_timezone=options["default_timezone"],
+        )
+        self.jss = JSONSerializer()
+
+        # This is boilerplate for any use of get_documents_to_index()
+        # Need to add issearchable for strip_search option
+        # Only calculate it once per load
+        self.datatype_factory = DataTypeFactory()
+        dt_instance_hash = {}
+        self.node_info = {
+            str(nodeid): {
+                "datatype": dt_instance_hash.setdefault(
+                    datatype, self.datatype_factory.get_instance(datatype)
+                ),
+                "issearchable": srch,
+            }
+            for nodeid, datatype, srch in archesmodels.Node.objects.values_list(
+                "nodeid", "datatype", "issearchable"
+            )
+        }
+        self.node_datatypes = {
+            str(nodeid): datatype
+            for nodeid, datatype in archesmodels.Node.objects.values_list(
+                "nodeid", "datatype"
+            )
+        }
+
+    def get_graphid(self, model):
+        graphid = graph_uuid_map.get(model, None)
+        if not graphid:
+            # Check slug
+            try:
+                graphid = archesmodels.GraphModel.objects.get(slug=model).pk
+            except:
+                self.stderr.write(
+                    f"Couldn't find a model definition for {model}; skipping"
+                )
+        return graphid
+
+    def get_blocks(self, options, model_path):
+        block = options["block"]
+        if block and "," not in block:
+            return [block]
+        if options["use_storage"]:
+            blocks = default_storage.listdir(model_path)[0]
+        else:
+            blocks = os.listdir(model_path)
+        blocks.sort()
+        blocks = [b for b in blocks if b[0] not in ["_", "."]]
+        if "," in block:
+            # {slice},{max-slices}
+            (cslice, mslice) = block.split(",")
+            cslice = int(cslice) - 1
+            mslice = int(mslice)
+            blocks = blocks[cslice::mslice]
+        return blocks
+
+    def get_files(self, options, block_path):
+        if options["use_storage"]:
+            files = default_storage.listdir(block_path)[1]
+        else:
+            files = os.listdir(block_path)
+        files.sort()
+        return [
+            f
+            for f in files
+            if f.endswith(options["suffix"])
+            and not (f.startswith(".") or f.startswith("_"))
+        ]
+
+    def is_too_big(self, options, fn):
+        if options["toobig"]:
+            if options["use_storage"]:
+                sz = default_storage.size(fn)
+            else:
+                sz = os.path.getsize(fn)
+            if sz > options["toobig"]:
+                if not options["quiet"]:
+                    self.stdout.write(
+                        f" ... Skipping due to size:  {sz} > {options['toobig']}"
+                    )
+                return True
+        return False
+
+    def read_file(self, options, fn, model):
+        """
+        Returns the resource id and the (fixed up) JSON-LD data of a file
+
+        """
+
+        uu = Path(fn).name.replace(f".{options['suffix']}", "")
+        if options["use_storage"]:
+            with default_storage.open(fn, mode="r") as fh:
+                data = fh.read()
+        else:
+            with open(fn, mode="r") as fh:
+                data = fh.read()
+        # FIXME Timezone / DateTime Workaround
+        # FIXME The following line should be removed when #5669 / #6346 are closed
+        data = data.replace("T00:00:00Z", "")
+        jsdata = json.loads(data)
+        jsdata = fix_js_data(data, jsdata, model)
+        if len(uu) != 36 or uu[8] != "-":
+            # extract uuid from data if filename is not a UUID
+            uu = jsdata["@id"][-36:]
+        return uu, jsdata
+
+    def get_shards(self, options, models):
+        """
+        Splits the files of each model into lists of at most --fast files,
+        honouring the --block, --skip, --max and --toobig options
+
+        """
+
+        source = options["source"]
+        shard_size = options["fast"] or settings.BULK_IMPORT_BATCH_SIZE
+        shards = []
+        seen = 0
+        for m in models:
+            graphid = self.get_graphid(m)
+            if not graphid:
+                continue
+            # compile the graph tree before the workers are forked so that they all share it
+            self.reader.get_graphtree(graphid)
+            model_path = Path(source) / m
+            files = []
+            for b in self.get_blocks(options, model_path):
+                block_path = model_path / b
+                for f in self.get_files(options, block_path):
+                    if options["max"] > 0 and len(files) >= options["max"]:
+                        break
+                    seen += 1
+                    if seen <= options["skip"]:
+                        continue
+                    fn = block_path / f
+                    if not self.is_too_big(options, fn):
+                        files.append(str(fn))
+            shards.extend(
+                (m, str(graphid), files[i : i + shard_size])
+                for i in range(0, len(files), shard_size)
+            )
+        return shards
+
+    def load_resources_in_parallel(self, options, models):
+        """
+        Loads the shards of files returned by get_shards in a pool of forked processes.
+        The resources of each shard are indexed by a separate pipeline of processes
+        while the remaining shards are still being loaded.
+
+        """
+
+        start = time.time()
+        shards = self.get_shards(options, models)
+        file_count = sum(len(files) for _m, _graphid, files in shards)
+        self.stdout.write(
+            f"Loading {file_count} files in {len(shards)} shards with {options['processes']} processes"
+        )
+        counts = {"loaded": 0, "failed": 0}
+
+        def load_shards(pool):
+            for resourceids, failed in pool.imap_unordered(_load_shard, shards):
+                counts["loaded"] += len(resourceids)
+                counts["failed"] += len(failed)
+                self.stdout.write(
+                    f" ... loaded {counts['loaded']} / failed {counts['failed']} in {time.time()-start}"
+                )
+                yield from resourceids
+
+        # the workers inherit the compiled graph trees but must not share database connections
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        with context.Pool(
+            options["processes"], initializer=_init_load_worker, initargs=(self,)
+        ) as pool:
+            if options["dry_run"]:
+                deque(load_shards(pool), maxlen=0)
+            else:
+                index_resources_using_multiprocessing(
+                    load_shards(pool),
+                    batch_size=options["fast"] or settings.BULK_IMPORT_BATCH_SIZE,
+                    quiet=True,
+                    max_subprocesses=options["processes"],
+                    recalculate_descriptors=True,
+                )
+        self.stdout.write(
+            f"Total Time: seen {file_count} / loaded {counts['loaded']} in {time.time()-start} seconds"
+        )
+
+    def load_shard(self, shard):
+        """
+        Reads and saves a shard of files, runs in a worker process.
+        Returns the ids of the resources loaded and the paths of the files that failed to load
+
+        """
+
+        model, graphid, files = shard
+        options = self.options
+        documents = {}
+        for fn in files:
+            uu, jsdata = self.read_file(options, fn, model)
+            if jsdata:
+                documents[uu] = (fn, jsdata)
+        existing = {
+            str(resourceid)
+            for resourceid in archesmodels.ResourceInstance.objects.filter(
+                pk__in=list(documents)
+            ).values_list("resourceinstanceid", flat=True)
+        }
+
+        self.resources = []
+        failed = []
+        for uu, (fn, jsdata) in documents.items():
+            if uu in existing:
+                if options["force"] == "ignore":
+                    continue
+                elif options["force"] == "error":
+                    self.stderr.write(f"*** Record exists for {uu}, and -ow is error")
+                    raise FileExistsError(uu)
+                elif not options["dry_run"]:
+                    Resource.objects.get(pk=uu).delete()
+            try:
+                self.reader.read_resource(jsdata, resourceid=uu, graphid=graphid)
+                self.resources.extend(self.reader.resources)
+            except Exception as e:
+                self.stderr.write(f"*** Failed to load {fn}:\n     {e}\n")
+                if not options["ignore_errors"]:
+                    raise
+                failed.append(fn)
+
+        resourceids = [str(resource.pk) for resource in self.resources]
+        if not options["dry_run"]:
+            self.copy_resources()
+        self.resources = []
+        return resourceids, failed
+
     def fast_import_resource(
         self,
         resourceid,
@@ -511,6 +715,43 @@ class Command(BaseCommand):
         for resource in self.resources:
             resource.save_edit(edit_type="create")
 
+    def copy_resources(self):
+        """
+        Saves self.resources in one transaction, their tiles are written with COPY
+
+        """
+
+        tiles = []
+        for resource in self.resources:
+            resource.tiles = resource.get_flattened_tiles()
+            tiles.extend(resource.tiles)
+        timestamp = datetime.datetime.now()
+        with transaction.atomic():
+            Resource.objects.bulk_create(self.resources)
+            # as in Tile.save, pre_tile_save runs before the tiles are written so that the
+            # values it normalizes are the ones stored (save_resources runs it after bulk_create,
+            # which discards them); rows it writes that refer to the tiles (eg: files) are
+            # checked by the deferred foreign key constraints when the transaction commits
+            for t in tiles:
+                for nodeid in t.data.keys():
+                    datatype = self.node_info[nodeid]["datatype"]
+                    datatype.pre_tile_save(t, nodeid)
+            copy_tiles(tiles)
+            EditLog.objects.bulk_create(
+                EditLog(
+                    resourceclassid=resource.graph_id,
+                    resourceinstanceid=resource.resourceinstanceid,
+                    userid="",
+                    user_email="",
+                    user_firstname="",
+                    user_lastname="",
+                    note="",
+                    timestamp=timestamp,
+                    edittype="create",
+                )
+                for resource in self.resources
+            )
+
     def index_resources(self, strip_search=False):
         se = SearchEngineInstance
         documents = []
@@ -541,6 +782,61 @@ class Command(BaseCommand):
         se.bulk_index(term_list)
 
 
+def copy_tiles(tiles):
+    """
+    Writes tiles with COPY into a temporary staging table and moves them into the tiles table
+    with a single INSERT ... SELECT, must be called within a transaction
+
+    """
+
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    serializer = JSONSerializer()
+    for tile in tiles:
+        writer.writerow(
+            [
+                tile.tileid,
+                tile.resourceinstance_id,
+                tile.parenttile_id,
+                serializer.serialize(tile.data) if tile.data is not None else None,
+                tile.nodegroup_id,
+                tile.sortorder,
+                (
+                    serializer.serialize(tile.provisionaledits)
+                    if tile.provisionaledits is not None
+                    else None
+                ),
+            ]
+        )
+    buffer.seek(0)
+
+    columns = ", ".join(TILE_COPY_COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS tiles_staging (LIKE tiles INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+        )
+        cursor.copy_expert(
+            f"COPY tiles_staging ({columns}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+        cursor.execute(
+            f"INSERT INTO tiles ({columns}) SELECT {columns} FROM tiles_staging"
+        )
+        # the rows are only deleted on commit, so empty the table for the next call
+        # within the same transaction
+        cursor.execute("TRUNCATE tiles_staging")
+
+
+def _init_load_worker(command):
+    global _worker_command
+    _worker_command = command
+    # drop any connection inherited from the parent process
+    connections.close_all()
+
+
+def _load_shard(shard):
+    return _worker_command.load_shard(shard)
+
+
 def monkey_get_documents_to_index(self, node_info):
     document = {}
     document["displaydescription"] = None
@@ -254,7 +254,8 @@ class Command(BaseCommand):
             action="store_true",
             dest="bulk_load",
             help="Bulk load values into the database.  By setting this flag the system will bypass any PreSave \
-            functions attached to the resource, as well as prevent some logging statements from printing to console.",
+            functions attached to the resource, as well as prevent some logging statements from printing to console. \
+            With import_reference_data the concepts, values and relations are saved with set based queries.",
         )
 
         parser.add_argument(
@@ -367,6 +368,7 @@ class Command(BaseCommand):
                 options["overwrite"],
                 options["stage"],
                 options["prevent_indexing"],
+                options["bulk_load"],
             )
 
         if options["operation"] == "import_graphs":
@@ -1365,37 +1367,29 @@ class Command(BaseCommand):
         if graphid:
             graphids.append(graphid)
         if os.path.exists(data_dest):
-            safe_characters = (" ", ".", "_", "-")
             for graphid in graphids:
                 try:
                     resource_exporter = ResourceExporter(
                         file_format, configs=config_file, single_file=single_file
                     )  # New exporter needed for each graphid, else previous data is appended with each subsequent graph
-                    data = resource_exporter.export(
-                        graph_id=graphid, resourceinstanceids=None, languages=languages
-                    )
-                    for file in data:
-                        with open(
-                            os.path.join(
-                                data_dest,
-                                "".join(
-                                    (
-                                        char
-                                        if (char.isalnum() or char in safe_characters)
-                                        else "-"
-                                    )
-                                    for char in file["name"]
-                                ).rstrip(),
-                            ),
-                            "w",
-                        ) as f:
-                            if file_format == "tilexl":
-                                file["outputfile"].save(
-                                    os.path.join(data_dest, file["name"])
-                                )
-                            else:
-                                file["outputfile"].seek(0)
-                                shutil.copyfileobj(file["outputfile"], f, 16 * 1024)
+                    if file_format == "tilexl":
+                        data = resource_exporter.export(
+                            graph_id=graphid,
+                            resourceinstanceids=None,
+                            languages=languages,
+                        )
+                        for file in data:
+                            file["outputfile"].save(
+                                os.path.join(data_dest, file["name"])
+                            )
+                    else:
+                        # streams the resources into the files one at a time
+                        resource_exporter.export_to_files(
+                            data_dest,
+                            graph_id=graphid,
+                            resourceinstanceids=None,
+                            languages=languages,
+                        )
                 except KeyError:
                     utils.print_message(
                         "{0} is not a valid export file format.".format(file_format)
@@ -1413,14 +1407,21 @@ class Command(BaseCommand):
             sys.exit()
 
     def import_reference_data(
-        self, data_source, overwrite="ignore", stage="stage", prevent_indexing=False
+        self,
+        data_source,
+        overwrite="ignore",
+        stage="stage",
+        prevent_indexing=False,
+        bulk=False,
     ):
         if overwrite == "":
             overwrite = "overwrite"
 
         skos = SKOSReader()
         rdf = skos.read_file(data_source)
-        ret = skos.save_concepts_from_skos(rdf, overwrite, stage, prevent_indexing)
+        ret = skos.save_concepts_from_skos(
+            rdf, overwrite, stage, prevent_indexing, bulk=bulk
+        )
 
     def import_business_data(
         self,
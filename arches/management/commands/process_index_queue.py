@@ -18,46 +18,61 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 """This module contains commands for building Arches."""
 
-from operator import index
+import time
 from typing import Any, Optional
 from django.core.management.base import BaseCommand
-from arches.app.models.resource import Resource
 from arches.app.models.system_settings import settings
-from arches.app.search.base_index import get_index
-from arches.app.search.elasticsearch_dsl_builder import Query, Term
-from arches.app.search.mappings import (
-    RESOURCE_RELATIONS_INDEX,
-    RESOURCES_INDEX,
-    TERMS_INDEX,
-    prepare_terms_index,
-    prepare_concepts_index,
-    delete_terms_index,
-    delete_concepts_index,
-    prepare_search_index,
-    delete_search_index,
-    prepare_resource_relations_index,
-    delete_resource_relations_index,
-)
 import arches.app.utils.index_database as index_database_util
 
-from arches.app.models.models import BulkIndexQueue, ResourceInstance, TileModel
+from arches.app.models.models import BulkIndexQueue, ResourceInstance
 
 
 class Command(BaseCommand):
+    """
+    Indexes the resources queued in the bulk_index_queue table.
+    Use --daemon to keep polling the queue, indexing resources as they are queued.
+
+    """
+
     def add_arguments(self, parser):
         parser.add_argument("-operation", action="store", dest="operation", default="")
 
-    def handle(self, *args: Any, **options: Any) -> Optional[str]:
-        bulk_index_queue = BulkIndexQueue.objects.all()
-        queued_ids = bulk_index_queue.values_list("resourceinstanceid", flat=True)
-        resources = Resource.objects.filter(resourceinstanceid__in=queued_ids)
-        delete_ids = queued_ids.difference(
-            resources.values_list("resourceinstanceid", flat=True)
+        parser.add_argument(
+            "-d",
+            "--daemon",
+            action="store_true",
+            dest="daemon",
+            default=False,
+            help="Keep running and index resources as they are added to the queue",
+        )
+
+        parser.add_argument(
+            "-i",
+            "--interval",
+            action="store",
+            dest="interval",
+            type=int,
+            default=settings.INDEX_QUEUE_POLL_INTERVAL,
+            help="Number of milliseconds to wait before checking an empty queue again",
+        )
+
+        parser.add_argument(
+            "-b",
+            "--batch_size",
+            action="store",
+            dest="batch_size",
+            type=int,
+            default=settings.BULK_IMPORT_BATCH_SIZE,
+            help="The maximum number of queued resources to index in a single bulk request",
         )
 
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
         # This is for testing delete operations; it deletes a random resource (the first inside the bulk index queue)
         # without indexing the delete.  Do not use this on production systems.
         if options["operation"] == "test_delete":
+            queued_ids = BulkIndexQueue.objects.values_list(
+                "resourceinstanceid", flat=True
+            )
             instances = ResourceInstance.objects.filter(
                 resourceinstanceid__in=queued_ids
             )
@@ -65,21 +80,13 @@ class Command(BaseCommand):
             instances[0].delete()
             return
 
-        if len(delete_ids) > 0:
-            from arches.app.search.search_engine_factory import (
-                SearchEngineInstance as _se,
+        while True:
+            processed = index_database_util.index_queued_resources(
+                batch_size=options["batch_size"], quiet=options["daemon"]
             )
-
-            deleteq = Query(se=_se)
-            for resource_id in delete_ids:
-                term = Term(field="resourceinstanceid", term=str(resource_id))
-                deleteq.add_query(term)
-            deleteq.delete(index=TERMS_INDEX, refresh=True)
-            deleteq.delete(index=RESOURCES_INDEX, refresh=True)
-            deleteq.delete(index=RESOURCE_RELATIONS_INDEX, refresh=True)
-            bulk_index_queue.filter(resourceinstanceid__in=delete_ids).delete()
-
-        index_database_util.index_resources_using_singleprocessing(
-            resources, title="Processing Indexing Queue"
-        )
-        bulk_index_queue.delete()
+            if not options["daemon"]:
+                if processed == 0:
+                    break
+            elif processed < options["batch_size"]:
+                # give edits time to accumulate (and coalesce) before the next batch
+                time.sleep(options["interval"] / 1000)
@@ -0,0 +1,74 @@
+"""
+ARCHES - a program developed to inventory and manage immovable cultural heritage.
+Copyright (C) 2013 J. Paul Getty Trust and World Monuments Fund
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""This module contains commands for seeding the vector tile cache."""
+
+from typing import Any, Optional
+from django.core.management.base import BaseCommand
+from arches.app.models import models
+from arches.app.models.system_settings import settings
+from arches.app.utils.mvt_tiler import MVTTiler
+
+
+class Command(BaseCommand):
+    """
+    Builds and caches the unfiltered vector tiles of the geometry nodes at low zoom levels,
+    the tiles every user with no resource instance restrictions is served.
+    Seeding is only useful when the default cache is shared between processes (eg: redis or memcached).
+
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-n",
+            "--nodeid",
+            action="append",
+            dest="nodeids",
+            default=[],
+            help="The geojson-feature-collection node to seed, may be repeated, defaults to every geometry node",
+        )
+
+        parser.add_argument(
+            "--min_zoom",
+            action="store",
+            dest="min_zoom",
+            type=int,
+            default=0,
+            help="The lowest zoom level to seed",
+        )
+
+        parser.add_argument(
+            "--max_zoom",
+            action="store",
+            dest="max_zoom",
+            type=int,
+            default=settings.MVT_SEED_MAX_ZOOM,
+            help="The highest zoom level to seed",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> Optional[str]:
+        nodes = models.Node.objects.filter(datatype="geojson-feature-collection")
+        if options["nodeids"]:
+            nodes = nodes.filter(nodeid__in=options["nodeids"])
+
+        tiler = MVTTiler()
+        for node in nodes:
+            count = tiler.seed(
+                node, max_zoom=options["max_zoom"], min_zoom=options["min_zoom"]
+            )
+            self.stdout.write(f"Seeded {count} tiles for node {node.nodeid}")
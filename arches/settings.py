@@ -118,6 +118,12 @@ KIBANA_URL = "http://localhost:5601/"
 KIBANA_CONFIG_BASEPATH = "kibana"  # must match Kibana config.yml setting (server.basePath) but without the leading slash,
 # also make sure to set server.rewriteBasePath: true
 USE_SEMANTIC_RESOURCE_RELATIONSHIPS = True
+
+# Set to True to add edited resources to the bulk_index_queue table instead of indexing them
+# while the tile is being saved. The queue is processed by a long running consumer:
+# `python manage.py process_index_queue --daemon`
+DEFER_INDEXING_TO_QUEUE = False
+INDEX_QUEUE_POLL_INTERVAL = 500  # milliseconds between checks of an empty queue
 ROOT_DIR = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
 APP_ROOT = os.path.join(ROOT_DIR, "app")
 PACKAGE_ROOT = ROOT_DIR
@@ -177,6 +183,10 @@ ARCHES_NAMESPACE_FOR_DATA_EXPORT = PUBLIC_SERVER_ADDRESS
 # ordered as seen in the resource cards or not.
 EXPORT_DATA_FIELDS_IN_CARD_ORDER = False
 
+# The number of tiles read from the database at a time when business data
+# is exported to files (eg: with the packages -o export_business_data command)
+EXPORT_CHUNK_SIZE = 2000
+
 RDM_JSONLD_CONTEXT = {"arches": ARCHES_NAMESPACE_FOR_DATA_EXPORT}
 
 PREFERRED_COORDINATE_SYSTEMS = (
@@ -534,6 +544,15 @@ CACHES = {
     },
 }
 
+# Entries of the user_permission cache are also kept in each process, they are checked
+# against the versions of the permissions they depend on at most every PERMISSION_CACHE_CHECK_INTERVAL
+PERMISSION_CACHE_SIZE = 1000  # number of entries per process
+PERMISSION_CACHE_CHECK_INTERVAL = 1  # seconds
+
+# Published graphs and concept labels are cached in each process, this cache holds the versions
+# that tell every process to discard them when they change. It must be shared by all processes.
+PUBLISHED_GRAPHS_VERSION_CACHE = "user_permission"
+
 DEFAULT_RESOURCE_IMPORT_USER = {"username": "admin", "userid": 1}
 
 # Example of a custom time wheel configuration:
@@ -635,6 +654,9 @@ WORDS_PER_SEARCH_TERM = (
 )
 SEARCH_RESULT_LIMIT = 10000  # should be less than or equal to elasticsearch configuration, index.max_result_window (default = 10,000)
 
+# how long the point in time of a search paged with a cursor (a pagetoken) is kept open after each page
+SEARCH_CURSOR_KEEP_ALIVE = "5m"
+
 ETL_USERNAME = "ETL"  # override this setting in your packages settings.py file
 
 GOOGLE_ANALYTICS_TRACKING_ID = None
@@ -792,11 +814,28 @@ CELERY_BEAT_SCHEDULE = {
 # way of monitoring celery so you can detect the background task not being available.
 CELERY_CHECK_ONLY_INSPECT_BROKER = False
 
+# The availability of celery is checked by a background thread in each process and kept in the
+# CELERY_AVAILABILITY_CACHE, only one process sharing the cache contacts the broker per interval.
+# It must be shared by all processes so that every process reads the same state.
+# The state is rechecked on demand once it is older than CELERY_AVAILABILITY_CACHE_TIMEOUT.
+CELERY_AVAILABILITY_CACHE = "user_permission"
+CELERY_AVAILABILITY_CHECK_INTERVAL = 30  # seconds
+CELERY_AVAILABILITY_CACHE_TIMEOUT = 90  # seconds
+
 AUTO_REFRESH_GEOM_VIEW = True
 TILE_CACHE_TIMEOUT = 600  # seconds
+MVT_SEED_MAX_ZOOM = 5  # highest zoom level seeded by the seed_mvt_cache command
 CLUSTER_DISTANCE_MAX = 5000  # meters
 GRAPH_MODEL_CACHE_TIMEOUT = None  # seconds * hours * days = ~1mo
 
+# Concept prefLabels, values and collections are cached in each process
+# they are discarded whenever concepts are saved or (re)indexed
+CONCEPT_LABEL_CACHE_SIZE = 10000  # number of labels
+CONCEPT_LABEL_CACHE_TIMEOUT = 300  # seconds
+CONCEPT_VALUE_CACHE_SIZE = 10000  # number of values (per concept datatype)
+CONCEPT_VALUE_CACHE_TIMEOUT = 300  # seconds, also applies to the cached collections
+CONCEPT_COLLECTION_CACHE_SIZE = 100  # number of collections (per concept datatype)
+
 CANTALOUPE_DIR = os.path.join(ROOT_DIR, UPLOADED_FILES_DIR)
 CANTALOUPE_HTTP_ENDPOINT = "http://localhost:8182/"
 
@@ -0,0 +1,117 @@
+"""
+ARCHES - a program developed to inventory and manage immovable cultural heritage.
+Copyright (C) 2013 J. Paul Getty Trust and World Monuments Fund
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Compares the time taken by JSONSerializer.serialize with converting payloads
+to python and passing them to json.dumps, for tile, resource and search result payloads
+
+This benchmark is not run by the test runner, it can be run from the command line via
+DJANGO_SETTINGS_MODULE=tests.test_settings python -m tests.benchmarks.json_serializer_benchmark
+
+"""
+
+import datetime
+import timeit
+import uuid
+
+from arches.app.utils.betterJSONSerializer import JSONSerializer
+
+
+def tile_payload(nodes=10):
+    return {
+        "tileid": uuid.uuid4(),
+        "resourceinstance_id": uuid.uuid4(),
+        "nodegroup_id": uuid.uuid4(),
+        "parenttile_id": None,
+        "sortorder": 0,
+        "provisionaledits": None,
+        "data": {
+            str(uuid.uuid4()): {"en": {"value": "A label", "direction": "ltr"}}
+            for node in range(nodes)
+        },
+    }
+
+
+def resource_payload(tiles=25):
+    return {
+        "resourceinstanceid": uuid.uuid4(),
+        "graph_id": uuid.uuid4(),
+        "name": {"en": "A resource"},
+        "displayname": "A resource",
+        "createdtime": datetime.datetime.now(),
+        "tiles": [tile_payload() for tile in range(tiles)],
+    }
+
+
+def search_payload(hits=100):
+    return {
+        "results": {
+            "hits": {
+                "total": {"value": hits, "relation": "eq"},
+                "hits": [
+                    {
+                        "_id": str(uuid.uuid4()),
+                        "_score": 1.0,
+                        "_source": {
+                            "displayname": "A resource",
+                            "displaydescription": "A description",
+                            "points": [{"point": {"lon": 0.1, "lat": 51.5}}],
+                            "permissions": {"users_without_read_perm": []},
+                            "tiles": [tile_payload(4) for tile in range(3)],
+                        },
+                    }
+                    for hit in range(hits)
+                ],
+            }
+        },
+        "total_results": hits,
+        "reviewer": False,
+        "timestamp": datetime.datetime.now(),
+    }
+
+
+def run(number=20):
+    serializer = JSONSerializer()
+    payloads = {
+        "tiles": [tile_payload() for tile in range(100)],
+        "resource": resource_payload(),
+        "search": search_payload(),
+    }
+    for name, payload in payloads.items():
+        assert serializer.serialize(payload) == serializer.serialize_with_json_module(
+            payload
+        )
+        for label, function in (
+            ("json.dumps", serializer.serialize_with_json_module),
+            ("serialize", serializer.serialize),
+            (
+                "serialize unsorted",
+                lambda obj: serializer.serialize(obj, sort_keys=False),
+            ),
+        ):
+            seconds = min(
+                timeit.repeat(lambda: function(payload), number=number, repeat=3)
+            )
+            print(f"{name:<10}{label:<20}{seconds * 1000 / number:8.2f} ms")
+
+
+if __name__ == "__main__":
+    import django
+
+    django.setup()
+    run()
@@ -1,4 +1,6 @@
 import os
+import json
+import tempfile
 
 from django.core import management
 from django.test.client import RequestFactory, Client
@@ -7,11 +9,19 @@ from django.urls import reverse
 from tests.base_test import ArchesTestCase
 
 from arches.app.utils.betterJSONSerializer import JSONDeserializer
+from arches.app.utils.data_management.resources.exporter import ResourceExporter
+from arches.app.utils.data_management.resources.formats.rdffile import (
+    JsonLdNodeMap,
+    JsonLdWriter,
+)
 from arches.app.utils.data_management.resources.importer import BusinessDataImporter
 from arches.app.utils.data_management.resource_graphs.importer import (
     import_graph as ResourceGraphImporter,
 )
 from arches.app.utils.skos import SKOSReader
+from pyld.jsonld import frame, from_rdf
+from rdflib import BNode, Literal, URIRef
+from rdflib.namespace import RDF, RDFS, XSD
 
 # these tests can be run from the command line via
 # python manage.py test tests.exporter.jsonld_export_tests --settings="tests.test_settings"
@@ -726,3 +736,159 @@ class JsonLDExportTests(ArchesTestCase):
 
         botb = "http://www.cidoc-crm.org/cidoc-crm/P82a_begin_of_the_begin"
         self.assertTrue(tsdata[botb]["@value"] == "2019-11-01")
+
+    def test_export_many_resources_as_jsonld(self):
+        resourceids = [
+            "e6412598-f6b5-11e9-8f09-a4d18cec433a",
+            "24d0d25a-fa75-11e9-b369-3af9d3b32b71",
+        ]
+        output = ResourceExporter(format="json-ld").writer.write_resources(
+            resourceinstanceids=resourceids
+        )
+        self.assertTrue(output[0]["name"].endswith(".jsonld"))
+        documents = json.loads(output[0]["outputfile"].getvalue())
+        self.assertEqual(
+            [js["@id"] for js in documents],
+            [
+                "http://localhost:8000/resources/%s" % resourceid
+                for resourceid in resourceids
+            ],
+        )
+
+    def test_export_many_resources_as_ndjson(self):
+        resourceids = [
+            "e6412598-f6b5-11e9-8f09-a4d18cec433a",
+            "24d0d25a-fa75-11e9-b369-3af9d3b32b71",
+        ]
+        output = ResourceExporter(format="json-ld", ndjson=True).writer.write_resources(
+            resourceinstanceids=resourceids
+        )
+        self.assertTrue(output[0]["name"].endswith(".ndjson"))
+        documents = [
+            json.loads(line) for line in output[0]["outputfile"].getvalue().splitlines()
+        ]
+        self.assertEqual(
+            [js["@id"] for js in documents],
+            [
+                "http://localhost:8000/resources/%s" % resourceid
+                for resourceid in resourceids
+            ],
+        )
+        self.assertEqual(
+            documents[0]["http://www.cidoc-crm.org/cidoc-crm/P3_has_note"]["@value"],
+            "Test Text Here",
+        )
+        self.assertEqual(
+            documents[1]["http://www.cidoc-crm.org/cidoc-crm/P57_has_number_of_parts"],
+            10,
+        )
+
+    def test_export_graph_to_files(self):
+        graphid = "ee72fb1e-fa6c-11e9-b369-3af9d3b32b71"
+        resourceids = sorted(
+            [
+                "12bbf5bc-fa85-11e9-91b8-3af9d3b32b71",
+                "396dcffa-fa8a-11e9-b6e7-3af9d3b32b71",
+                "24d0d25a-fa75-11e9-b369-3af9d3b32b71",
+                "9c400558-fa8a-11e9-b6e7-3af9d3b32b71",
+            ]
+        )
+        with tempfile.TemporaryDirectory() as dest_dir:
+            paths = ResourceExporter(format="json-ld").export_to_files(
+                dest_dir, graph_id=graphid
+            )
+            self.assertTrue(paths[0].endswith(".jsonld"))
+            with open(paths[0], "r") as f:
+                documents = json.load(f)
+
+            paths = ResourceExporter(format="json-ld", ndjson=True).export_to_files(
+                dest_dir, graph_id=graphid
+            )
+            self.assertTrue(paths[0].endswith(".ndjson"))
+            with open(paths[0], "r") as f:
+                self.assertEqual([json.loads(line) for line in f], documents)
+
+        # each resource is written as it was when exported on its own
+        writer = ResourceExporter(format="json-ld").writer
+        for resourceid, js in zip(resourceids, documents):
+            output = writer.write_resources(resourceinstanceids=[resourceid])
+            self.assertEqual(js, json.loads(output[0]["outputfile"].getvalue()))
+        self.assertEqual(len(documents), len(resourceids))
+
+    def test_native_framing_matches_pyld(self):
+        def normalize(element):
+            # list order and the labels of blank nodes are arbitrary in both outputs
+            if isinstance(element, list):
+                return sorted(
+                    (normalize(item) for item in element),
+                    key=lambda item: json.dumps(item, sort_keys=True),
+                )
+            if isinstance(element, dict):
+                return {
+                    key: normalize(value)
+                    for key, value in element.items()
+                    if key != "@context"
+                    and not (key == "@id" and str(value).startswith("_:"))
+                }
+            return element
+
+        for resourceid in [
+            "e6412598-f6b5-11e9-8f09-a4d18cec433a",
+            "24d0d25a-fa75-11e9-b369-3af9d3b32b71",
+            "12bbf5bc-fa85-11e9-91b8-3af9d3b32b71",
+        ]:
+            # the documents were built like this before JsonLdNodeMap
+            writer = JsonLdWriter()
+            writer.get_tiles(resourceinstanceids=[resourceid])
+            nquads = writer.get_rdf_graph().serialize(format="nquads").decode("utf-8")
+            js = frame(
+                from_rdf(
+                    nquads, {"format": "application/nquads", "useNativeTypes": True}
+                ),
+                {
+                    "@omitDefault": True,
+                    "@omitGraph": False,
+                    "@id": "http://localhost:8000/resources/%s" % resourceid,
+                },
+            )
+            if "@graph" in js and len(js["@graph"]) == 1:
+                js.update(js.pop("@graph")[0])
+
+            self.assertEqual(
+                normalize(JsonLdWriter().build_json(resourceinstanceids=[resourceid])),
+                normalize(js),
+            )
+
+    def test_node_map_frames_and_converts_literals(self):
+        node_map = JsonLdNodeMap()
+        root = URIRef("http://localhost:8000/resources/1")
+        timespan = BNode()
+        node_map.add((root, RDF.type, URIRef("http://example.org/Object")))
+        node_map.add((root, URIRef("http://example.org/count"), Literal(3)))
+        node_map.add((root, URIRef("http://example.org/when"), timespan))
+        node_map.add(
+            (
+                timespan,
+                URIRef("http://example.org/begin"),
+                Literal("2019-10-01", datatype=XSD.dateTime),
+            )
+        )
+        node_map.add((timespan, RDFS.label, Literal("label")))
+
+        js = JsonLdWriter().compact_without_context(node_map.frame(str(root)))
+        self.assertEqual(
+            js,
+            {
+                "@id": "http://localhost:8000/resources/1",
+                "@type": "http://example.org/Object",
+                "http://example.org/count": 3,
+                "http://example.org/when": {
+                    "http://example.org/begin": {
+                        "@type": "http://www.w3.org/2001/XMLSchema#dateTime",
+                        "@value": "2019-10-01",
+                    },
+                    "http://www.w3.org/2000/01/rdf-schema#label": "label",
+                },
+            },
+        )
+        self.assertIsNone(node_map.frame("http://localhost:8000/resources/2"))
@@ -19,11 +19,17 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 import os
 import json
 import csv
+import uuid
+import tempfile
 from django.test.utils import captured_stdout
+from arches.app.models import models
 from arches.app.utils.data_management.resources.formats.csvfile import (
     CsvWriter,
     MissingConfigException,
 )
+from arches.app.utils.data_management.resources.formats.format import (
+    get_safe_file_name,
+)
 from operator import itemgetter
 from tests.base_test import ArchesTestCase
 from arches.app.utils.skos import SKOSReader
@@ -92,6 +98,133 @@ class BusinessDataExportTests(ArchesTestCase):
 
         self.assertDictEqual(dict(csv_input), dict(csv_output))
 
+    def test_csv_export_to_files(self):
+        with captured_stdout():
+            BusinessDataImporter(
+                "tests/fixtures/data/csv/resource_export_test.csv"
+            ).import_business_data()
+
+        with tempfile.TemporaryDirectory() as dest_dir:
+            paths = BusinessDataExporter(
+                "csv",
+                configs="tests/fixtures/data/csv/resource_export_test.mapping",
+                single_file=True,
+            ).export_to_files(dest_dir, languages="en")
+
+            self.assertTrue(all(os.path.dirname(path) == dest_dir for path in paths))
+            with open(paths[0], "r", encoding="utf-8") as f:
+                csv_output = list(csv.DictReader(f))[0]
+
+        csvinputfile = "tests/fixtures/data/csv/resource_export_test.csv"
+        with open(csvinputfile, "r", encoding="utf-8") as f:
+            csv_input = list(
+                csv.DictReader(
+                    f,
+                    restkey="ADDITIONAL",
+                    restval="MISSING",
+                )
+            )[0]
+
+        self.assertDictEqual(dict(csv_input), dict(csv_output))
+
+    def test_csv_export_relations_of_some_resources_to_files(self):
+        with captured_stdout():
+            BusinessDataImporter(
+                "tests/fixtures/data/csv/resource_export_test.csv"
+            ).import_business_data()
+
+        graphid = "ab74af76-fa0e-11e6-9e3e-026d961c88e6"
+        exported_id = "75226cdb-6ecb-4dab-8f83-3537fa298ca3"
+        other_id = "b546621a-9556-4955-8997-8be88dcabf2b"
+        for resourceidfrom, resourceidto in [
+            (exported_id, other_id),
+            (other_id, str(uuid.uuid4())),
+        ]:
+            models.ResourceXResource(
+                resourceinstancefrom_graphid_id=graphid,
+                resourceinstanceto_graphid_id=graphid,
+                resourceinstanceidfrom_id=resourceidfrom,
+                resourceinstanceidto_id=resourceidto,
+            ).save()
+
+        export = BusinessDataExporter(
+            "csv",
+            configs="tests/fixtures/data/csv/resource_export_test.mapping",
+            single_file=True,
+        ).export(resourceinstanceids=[exported_id], languages="en")
+        relations = list(
+            csv.DictReader(export[-1]["outputfile"].getvalue().splitlines())
+        )
+
+        with tempfile.TemporaryDirectory() as dest_dir:
+            paths = BusinessDataExporter(
+                "csv",
+                configs="tests/fixtures/data/csv/resource_export_test.mapping",
+                single_file=True,
+            ).export_to_files(
+                dest_dir, resourceinstanceids=[exported_id], languages="en"
+            )
+            self.assertTrue(paths[-1].endswith(".relations"))
+            with open(paths[-1], "r", encoding="utf-8") as f:
+                relations_output = list(csv.DictReader(f))
+
+        self.assertEqual(
+            [
+                (relation["resourceinstanceidfrom"], relation["resourceinstanceidto"])
+                for relation in relations_output
+            ],
+            [(exported_id, other_id)],
+        )
+        self.assertEqual(relations_output, relations)
+
+    def test_tilecsv_export_to_files(self):
+        with captured_stdout():
+            BusinessDataImporter(
+                "tests/fixtures/data/csv/resource_export_test.csv"
+            ).import_business_data()
+
+        graphid = "ab74af76-fa0e-11e6-9e3e-026d961c88e6"
+        export = BusinessDataExporter("tilecsv").export(graph_id=graphid)
+        with tempfile.TemporaryDirectory() as dest_dir:
+            # a chunk per tile, so each file is written to more than once
+            paths = BusinessDataExporter("tilecsv").writer.write_resources_to_files(
+                dest_dir, graph_id=graphid, chunk_size=1
+            )
+            outputs = {}
+            for path in paths:
+                with open(path, "r", encoding="utf-8") as f:
+                    reader = csv.DictReader(f)
+                    outputs[os.path.basename(path)] = (reader.fieldnames, list(reader))
+
+        self.assertEqual(
+            sorted(outputs),
+            sorted(get_safe_file_name(csv_file["name"]) for csv_file in export),
+        )
+        for csv_file in export:
+            reader = csv.DictReader(csv_file["outputfile"].getvalue().splitlines())
+            rows = sorted(reader, key=itemgetter("tileid"))
+            fieldnames, output_rows = outputs[get_safe_file_name(csv_file["name"])]
+            output_rows = sorted(output_rows, key=itemgetter("tileid"))
+
+            # every node of the nodegroup gets a column, even if no tile has a value for it
+            self.assertTrue(set(reader.fieldnames).issubset(fieldnames))
+            self.assertEqual(fieldnames[:3], reader.fieldnames[:3])
+            self.assertEqual(
+                [
+                    {fieldname: row[fieldname] for fieldname in reader.fieldnames}
+                    for row in output_rows
+                ],
+                rows,
+            )
+            for row in output_rows:
+                self.assertTrue(
+                    all(
+                        row[fieldname] == ""
+                        for fieldname in fieldnames
+                        if fieldname not in reader.fieldnames
+                    )
+                )
+
     def test_json_export(self):
         def deep_sort(obj):
             """
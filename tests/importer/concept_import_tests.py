@@ -24,7 +24,7 @@ from django.core import management
 from django.test.utils import captured_stdout
 from arches.app.models.concept import Concept
 from arches.app.models.models import Concept as django_concept_model
-from arches.app.models.models import Language
+from arches.app.models.models import Language, Relation, Value
 from arches.app.utils.betterJSONSerializer import JSONSerializer, JSONDeserializer
 from arches.app.utils.skos import SKOSReader
 from arches.app.search.search_engine_factory import SearchEngineFactory
@@ -75,3 +75,67 @@ class ConceptImportTests(ArchesTestCase):
 
         regions_inexact = Language.objects.filter(code__iexact="en-ZA").values("code")
         self.assertQuerySetEqual(regions_inexact, [{"code": "en-ZA"}])
+
+    def test_bulk_import(self):
+        skos = SKOSReader()
+        rdf = skos.read_file("tests/fixtures/data/concept_label_test_collection.xml")
+        scheme = skos.save_concepts_from_skos(rdf, bulk=True)
+        conceptids = [str(node.id) for node in skos.nodes]
+        valueids = [
+            str(value.id)
+            for node in skos.nodes
+            for value in node.values
+            if value.value.strip() != ""
+        ]
+
+        self.assertEqual(
+            django_concept_model.objects.filter(pk__in=conceptids).count(),
+            len(set(conceptids)),
+        )
+        self.assertEqual(
+            Value.objects.filter(pk__in=valueids).count(), len(set(valueids))
+        )
+        self.assertTrue(
+            Relation.objects.filter(
+                conceptfrom_id=scheme.id, relationtype_id="hasTopConcept"
+            ).exists()
+        )
+        relation_count = Relation.objects.filter(conceptfrom_id__in=conceptids).count()
+
+        # importing the same file again updates the existing rows
+        skos = SKOSReader()
+        rdf = skos.read_file("tests/fixtures/data/concept_label_test_collection.xml")
+        skos.save_concepts_from_skos(rdf, bulk=True)
+        self.assertEqual(
+            Value.objects.filter(pk__in=valueids).count(), len(set(valueids))
+        )
+        self.assertEqual(
+            Relation.objects.filter(conceptfrom_id__in=conceptids).count(),
+            relation_count,
+        )
+
+        # overwriting restores the nodetype and legacyoid of existing concepts
+        conceptid = next(
+            str(node.id) for node in skos.nodes if node.nodetype == "Concept"
+        )
+        django_concept_model.objects.filter(pk=conceptid).update(
+            nodetype_id="Collection", legacyoid="changed"
+        )
+        skos = SKOSReader()
+        rdf = skos.read_file("tests/fixtures/data/concept_label_test_collection.xml")
+        skos.save_concepts_from_skos(rdf, "overwrite", bulk=True)
+        node = next(node for node in skos.nodes if str(node.id) == conceptid)
+        concept = django_concept_model.objects.get(pk=conceptid)
+        self.assertEqual(concept.nodetype_id, "Concept")
+        self.assertEqual(
+            concept.legacyoid, node.legacyoid if node.legacyoid != "" else node.id
+        )
+
+        # ignoring leaves them as they are
+        django_concept_model.objects.filter(pk=conceptid).update(legacyoid="changed")
+        skos = SKOSReader()
+        rdf = skos.read_file("tests/fixtures/data/concept_label_test_collection.xml")
+        skos.save_concepts_from_skos(rdf, "ignore", bulk=True)
+        self.assertEqual(
+            django_concept_model.objects.get(pk=conceptid).legacyoid, "changed"
+        )
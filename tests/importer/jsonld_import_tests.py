@@ -1,23 +1,28 @@
 import os
+import uuid
 import datetime
+import tempfile
+from io import StringIO
+from unittest import mock
 
 from django.contrib.auth.models import User
 from django.core import management
 from django.test.client import RequestFactory, Client
 from django.test.utils import captured_stdout
 from django.urls import reverse
-from django.db import connection
+from django.db import connection, transaction
 from tests.base_test import ArchesTestCase, CREATE_TOKEN_SQL, DELETE_TOKEN_SQL
 from arches.app.utils.skos import SKOSReader
 from arches.app.models.graph import Graph
-from arches.app.models.models import TileModel
-from arches.app.utils.betterJSONSerializer import JSONDeserializer
+from arches.app.models.models import EditLog, ResourceInstance, TileModel
+from arches.app.utils.betterJSONSerializer import JSONDeserializer, JSONSerializer
 from arches.app.utils.data_management.resources.importer import BusinessDataImporter
 from arches.app.utils.data_management.resource_graphs.importer import (
     import_graph as ResourceGraphImporter,
 )
 from arches.app.utils.data_management.resources.formats import rdffile
 from arches.app.utils.data_management.resources.formats.rdffile import JsonLdReader
+from arches.management.commands import load_jsonld
 from pyld.jsonld import expand
 
 # these tests can be run from the command line via
@@ -1927,3 +1932,71 @@ class JsonLDImportTests(ArchesTestCase):
                 "ddb04a66-c163-11ea-8354-3af9d3b32b71"
             ]
             self.assertEqual(datetime_value[-6:], "-09:00")
+
+    def test_graph_tree_is_compiled_once_per_graph(self):
+        graph_id = "0bc001c2-c163-11ea-8354-3af9d3b32b71"
+        reader = JsonLdReader()
+        graphtree = reader.get_graphtree(graph_id)
+
+        with mock.patch.object(reader, "process_graph") as process_graph:
+            self.assertIs(reader.get_graphtree(uuid.UUID(graph_id)), graphtree)
+            process_graph.assert_not_called()
+
+    def test_load_shard_copies_resources_tiles_and_edit_logs(self):
+        resource_id = "3c6e2ea6-8fa0-4e8c-8f7a-3f9a6b7e4d21"
+        data = (
+            """{
+            "@id": "http://localhost:8000/resources/%s",
+            "@type": "http://www.cidoc-crm.org/cidoc-crm/E22_Man-Made_Object",
+            "http://www.cidoc-crm.org/cidoc-crm/P3_has_note": "test!"
+            }"""
+            % resource_id
+        )
+
+        command = load_jsonld.Command(stdout=StringIO(), stderr=StringIO())
+        options = vars(command.create_parser("manage.py", "load_jsonld").parse_args([]))
+        command.init_loader(options)
+
+        with tempfile.TemporaryDirectory() as source:
+            fn = os.path.join(source, f"{resource_id}.json")
+            with open(fn, "w") as fh:
+                fh.write(data)
+            resourceids, failed = command.load_shard(
+                ("model", "bf734b4e-f6b5-11e9-8f09-a4d18cec433a", [fn])
+            )
+
+        self.assertEqual(resourceids, [resource_id])
+        self.assertEqual(failed, [])
+        self.assertTrue(ResourceInstance.objects.filter(pk=resource_id).exists())
+        tiles = TileModel.objects.filter(resourceinstance_id=resource_id)
+        self.assertEqual(tiles.count(), 1)
+        self.assertIn('"test!"', JSONSerializer().serialize(tiles[0].data))
+        self.assertEqual(
+            EditLog.objects.filter(
+                resourceinstanceid=resource_id, edittype="create"
+            ).count(),
+            1,
+        )
+
+    def test_copy_tiles_twice_in_one_transaction(self):
+        nodeid = "cdfc22b2-f6b5-11e9-8f09-a4d18cec433a"
+        tiles = []
+        for i in range(2):
+            resource = ResourceInstance(graph_id="bf734b4e-f6b5-11e9-8f09-a4d18cec433a")
+            resource.save()
+            tiles.append(
+                TileModel(
+                    resourceinstance_id=resource.pk,
+                    nodegroup_id=nodeid,
+                    data={nodeid: {"en": {"value": f"note {i}", "direction": "ltr"}}},
+                    sortorder=0,
+                )
+            )
+
+        with transaction.atomic():
+            load_jsonld.copy_tiles(tiles[:1])
+            load_jsonld.copy_tiles(tiles[1:])
+
+        self.assertEqual(
+            TileModel.objects.filter(pk__in=[tile.pk for tile in tiles]).count(), 2
+        )
@@ -16,17 +16,31 @@ You should have received a copy of the GNU Affero General Public License
 along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
+import uuid
+from unittest import mock
+from django.db import connection
+from django.utils import translation
 from tests import test_settings
 from tests.base_test import ArchesTestCase
 from arches.app.models import models
 from arches.app.models.concept import Concept
 from arches.app.models.concept import ConceptValue
+from arches.app.models.concept import (
+    check_if_concepts_in_use,
+    get_concept_usage_counts,
+    get_preflabel_from_conceptid,
+    get_preflabels_from_valueids,
+    get_resources_using_concepts,
+    invalidate_concept_caches,
+)
 
 # these tests can be run from the command line via
 # python manage.py test tests.models.concept_model_tests --settings="tests.test_settings"
 
 
 class ConceptModelTests(ArchesTestCase):
+    graph_fixtures = ["Data_Type_Model"]
+
     def test_create_concept(self):
         """
         Test of basic CRUD on a Concept model
@@ -292,3 +306,297 @@ class ConceptModelTests(ArchesTestCase):
         self.assertEqual(pl.type, "prefLabel")
         self.assertEqual(pl.value, "bier" or "beer")
         self.assertEqual(pl.language, "nl" or "es-SP")
+
+    @mock.patch("arches.app.models.concept.se")
+    def test_get_preflabels_from_valueids(self, mock_se):
+        """
+        Test that labels for many values are looked up together, ranked and then cached
+
+        """
+
+        def label(valueid, conceptid, value, language):
+            return {
+                "_source": {
+                    "category": "label",
+                    "conceptid": conceptid,
+                    "language": language,
+                    "value": value,
+                    "type": "prefLabel",
+                    "id": valueid,
+                }
+            }
+
+        mock_se.search.side_effect = [
+            {
+                "docs": [
+                    {"_id": "v1", "found": True, "_source": {"conceptid": "c1"}},
+                    {"_id": "v2", "found": True, "_source": {"conceptid": "c2"}},
+                    {"_id": "v3", "found": False},
+                ]
+            },
+            {
+                "hits": {
+                    "hits": [
+                        label("v1", "c1", "bier", "nl"),
+                        label("v4", "c1", "beer", "en-US"),
+                        label("v2", "c2", "wine", "en"),
+                    ]
+                }
+            },
+        ]
+        invalidate_concept_caches()
+
+        preflabels = get_preflabels_from_valueids(["v1", "v2", "v3"], "en-US")
+        cached_preflabels = get_preflabels_from_valueids(["v1", "v2", "v3"], "en-US")
+
+        self.assertEqual(preflabels["v1"]["value"], "beer")
+        self.assertEqual(preflabels["v2"]["value"], "wine")
+        self.assertNotIn("v3", preflabels)
+        self.assertEqual(cached_preflabels, preflabels)
+        self.assertEqual(mock_se.search.call_count, 2)
+
+        invalidate_concept_caches()
+        mock_se.search.side_effect = None
+        mock_se.search.return_value = {"docs": [], "hits": {"hits": []}}
+        self.assertEqual(get_preflabels_from_valueids(["v1"], "en-US"), {})
+
+    @mock.patch("arches.app.models.concept.se")
+    def test_get_preflabels_without_language(self, mock_se):
+        """
+        Test that labels looked up without a language are ranked and cached
+        against the active language
+
+        """
+
+        def label(valueid, value, language):
+            return {
+                "_source": {
+                    "category": "label",
+                    "conceptid": "c1",
+                    "language": language,
+                    "value": value,
+                    "type": "prefLabel",
+                    "id": valueid,
+                }
+            }
+
+        mock_se.search.return_value = {
+            "hits": {"hits": [label("v1", "bier", "nl"), label("v2", "beer", "en-US")]}
+        }
+        invalidate_concept_caches()
+
+        with translation.override("nl"):
+            self.assertEqual(get_preflabel_from_conceptid("c1", None)["value"], "bier")
+        with translation.override("en-US"):
+            self.assertEqual(get_preflabel_from_conceptid("c1", None)["value"], "beer")
+            self.assertEqual(get_preflabel_from_conceptid("c1", None)["value"], "beer")
+        self.assertEqual(mock_se.search.call_count, 2)
+
+    @mock.patch("arches.app.models.concept.se")
+    def test_get_preflabel_from_missing_conceptid(self, mock_se):
+        """
+        Test that falsy and unknown concept ids get an empty label
+
+        """
+
+        mock_se.search.return_value = {"hits": {"hits": []}}
+        invalidate_concept_caches()
+
+        self.assertEqual(get_preflabel_from_conceptid(None, "en")["value"], "")
+        self.assertEqual(get_preflabel_from_conceptid("", "en")["value"], "")
+        self.assertEqual(
+            get_preflabel_from_conceptid(str(uuid.uuid4()), "en")["value"], ""
+        )
+        self.assertEqual(mock_se.search.call_count, 1)
+
+    def test_concept_usage(self):
+        def label(value):
+            return {
+                "type": "prefLabel",
+                "category": "label",
+                "value": value,
+                "language": "en-US",
+            }
+
+        concept = Concept(
+            {
+                "nodetype": "Concept",
+                "values": [label("usage parent")],
+                "subconcepts": [
+                    {
+                        "nodetype": "Concept",
+                        "relationshiptype": "narrower",
+                        "values": [label("usage child")],
+                    }
+                ],
+            }
+        )
+        concept.save()
+        subconcept = concept.subconcepts[0]
+        self.assertFalse(
+            check_if_concepts_in_use([concept.id], include_subconcepts=True)
+        )
+
+        nodeid = uuid.uuid4()
+        resourceids = [uuid.uuid4(), uuid.uuid4()]
+        models.ConceptUsage.objects.bulk_create(
+            models.ConceptUsage(
+                valueid=subconcept.values[0].id,
+                nodeid=nodeid,
+                tileid=uuid.uuid4(),
+                resourceinstanceid=resourceid,
+            )
+            for resourceid in resourceids
+        )
+
+        self.assertFalse(check_if_concepts_in_use([concept.id]))
+        self.assertTrue(
+            check_if_concepts_in_use([concept.id], include_subconcepts=True)
+        )
+        self.assertTrue(subconcept.check_if_concept_in_use())
+        self.assertEqual(
+            get_concept_usage_counts([concept.id], include_subconcepts=True),
+            {str(nodeid): {"tiles": 2, "resources": 2}},
+        )
+        self.assertCountEqual(
+            get_resources_using_concepts([subconcept.id]),
+            [str(resourceid) for resourceid in resourceids],
+        )
+
+    def test_concept_usage_follows_tile_changes(self):
+        """
+        Test that the tile triggers keep concept_usage in step with concept and
+        concept-list values as tiles are saved, updated and deleted
+
+        """
+
+        def label(value):
+            return {
+                "type": "prefLabel",
+                "category": "label",
+                "value": value,
+                "language": "en-US",
+            }
+
+        concept = Concept(
+            {
+                "nodetype": "Concept",
+                "values": [label("tile usage parent")],
+                "subconcepts": [
+                    {
+                        "nodetype": "Concept",
+                        "relationshiptype": "narrower",
+                        "values": [label(value)],
+                    }
+                    for value in ("tile usage first", "tile usage second")
+                ],
+            }
+        )
+        concept.save()
+        first, second = concept.subconcepts
+        first_valueid = str(first.values[0].id)
+        second_valueid = str(second.values[0].id)
+
+        concept_nodeid = "c386a030-95bd-11e8-bff6-acde48001122"
+        concept_list_nodeid = "318c9e2b-a017-11e8-a36c-0200ec49ad01"
+        resource = models.ResourceInstance(
+            graph_id="330802c5-95bd-11e8-b7ac-acde48001122"
+        )
+        resource.save()
+        tile = models.TileModel(
+            resourceinstance=resource,
+            nodegroup_id="ba84cc78-95bd-11e8-b8f5-acde48001122",
+            data={
+                concept_nodeid: first_valueid,
+                concept_list_nodeid: [first_valueid, second_valueid],
+            },
+        )
+
+        def usage():
+            return set(
+                models.ConceptUsage.objects.filter(tileid=tile.pk).values_list(
+                    "nodeid", "valueid", "resourceinstanceid"
+                )
+            )
+
+        def row(nodeid, valueid):
+            return (uuid.UUID(nodeid), uuid.UUID(valueid), resource.pk)
+
+        tile.save()
+        self.assertEqual(
+            usage(),
+            {
+                row(concept_nodeid, first_valueid),
+                row(concept_list_nodeid, first_valueid),
+                row(concept_list_nodeid, second_valueid),
+            },
+        )
+        self.assertTrue(check_if_concepts_in_use([first.id]))
+        self.assertTrue(check_if_concepts_in_use([second.id]))
+        self.assertFalse(check_if_concepts_in_use([concept.id]))
+        self.assertTrue(
+            check_if_concepts_in_use([concept.id], include_subconcepts=True)
+        )
+
+        # the backfill of existing tiles reads the values with the same function
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT v.nodeid, v.valueid, t.resourceinstanceid FROM tiles t "
+                "CROSS JOIN LATERAL __arches_get_tile_concept_values(t.tiledata) v "
+                "WHERE t.tileid = %s",
+                [tile.pk],
+            )
+            self.assertEqual(set(cursor.fetchall()), usage())
+
+        tile.data[concept_nodeid] = None
+        tile.data[concept_list_nodeid] = [second_valueid]
+        tile.save()
+        self.assertEqual(usage(), {row(concept_list_nodeid, second_valueid)})
+        self.assertFalse(check_if_concepts_in_use([first.id]))
+        self.assertTrue(check_if_concepts_in_use([second.id]))
+
+        tile.delete()
+        self.assertEqual(usage(), set())
+        self.assertFalse(
+            check_if_concepts_in_use([concept.id], include_subconcepts=True)
+        )
+
+    def test_get_concept_tree(self):
+        def concept(value, subconcepts=()):
+            return {
+                "nodetype": "Concept",
+                "relationshiptype": "narrower",
+                "values": [
+                    {
+                        "type": "prefLabel",
+                        "category": "label",
+                        "value": value,
+                        "language": "en-US",
+                    }
+                ],
+                "subconcepts": list(subconcepts),
+            }
+
+        top = Concept(
+            concept("top", [concept("b", [concept("grandchild")]), concept("a")])
+        )
+        top.save()
+        grandchild_id = top.subconcepts[0].subconcepts[0].id
+
+        tree = Concept().get(id=top.id, include_subconcepts=True)
+        self.assertEqual(
+            [subconcept.values[0].value for subconcept in tree.subconcepts],
+            ["a", "b"],
+        )
+        self.assertEqual(tree.subconcepts[1].subconcepts[0].id, grandchild_id)
+        self.assertTrue(tree.hassubconcepts)
+        self.assertFalse(tree.subconcepts[0].hassubconcepts)
+
+        tree = Concept().get(id=top.id, include_subconcepts=True, depth_limit=1)
+        self.assertEqual(tree.subconcepts[1].subconcepts, [])
+        self.assertTrue(tree.subconcepts[1].hassubconcepts)
+
+        grandchild = Concept().get(id=grandchild_id, include_parentconcepts=True)
+        self.assertEqual(grandchild.parentconcepts[0].values[0].value, "b")
+        self.assertEqual(grandchild.parentconcepts[0].parentconcepts[0].id, top.id)
+        self.assertEqual([path[0]["id"] for path in grandchild.get_paths()], [top.id])
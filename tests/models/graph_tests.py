@@ -18,6 +18,7 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 import uuid
 
+from unittest import mock
 from django.contrib.auth.models import User
 from tests.base_test import ArchesTestCase
 from arches.app.models import models
@@ -1215,6 +1216,20 @@ class GraphTests(ArchesTestCase):
             )
         self.assertEqual(cm.exception.code, 1012)
 
+    def test_unpublish_invalidates_published_graphs_on_commit(self):
+        graph = Graph.objects.get(node=self.rootNode)
+        admin = User.objects.get(username="admin")
+        graph.publish(user=admin)
+
+        with mock.patch(
+            "arches.app.models.graph.published_graph_cache.invalidate"
+        ) as invalidate:
+            with self.captureOnCommitCallbacks(execute=True):
+                graph.unpublish()
+                invalidate.assert_not_called()
+
+        invalidate.assert_called_once_with()
+
     def test_appending_published_branch_to_unpublished_graph(self):
         graph = Graph.objects.get(node=self.rootNode)
         admin = User.objects.get(username="admin")
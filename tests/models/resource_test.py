@@ -487,3 +487,69 @@ class ResourceTests(ArchesTestCase):
 
         # Until 7.4, a RecursionError was caught after this value was repeated many times.
         self.assertEqual(r.displayname(), "test value ")
+
+    def test_save_descriptors_bulk(self):
+        graph = Graph.new(name="Bulk descriptor test", is_resource=True)
+        node_group = models.NodeGroup.objects.create()
+        string_node = models.Node.objects.create(
+            graph=graph,
+            nodegroup=node_group,
+            name="String Node",
+            datatype="string",
+            istopnode=False,
+        )
+        models.FunctionXGraph.objects.create(
+            graph=graph,
+            function_id="60000000-0000-0000-0000-000000000001",
+            config={
+                "descriptor_types": {
+                    "name": {
+                        "nodegroup_id": str(node_group.nodegroupid),
+                        "string_template": "Name: <String Node>",
+                    },
+                    "map_popup": {"nodegroup_id": None, "string_template": ""},
+                    "description": {"nodegroup_id": None, "string_template": ""},
+                },
+            },
+        )
+
+        resourceids = []
+        for value in ("first", "second"):
+            resource = models.ResourceInstance.objects.create(graph=graph)
+            models.TileModel.objects.create(
+                nodegroup=node_group,
+                resourceinstance=resource,
+                data={
+                    str(string_node.pk): {"en": {"value": value, "direction": "ltr"}}
+                },
+                sortorder=0,
+            )
+            resourceids.append(resource.pk)
+
+        resources = list(Resource.objects.filter(pk__in=resourceids))
+        for resource in resources:
+            resource.load_tiles()
+
+        with CaptureQueriesContext(connection) as queries:
+            Resource.save_descriptors_bulk(resources)
+
+        tile_selects = [
+            q for q in queries if q["sql"].startswith('SELECT "tiles"."tileid"')
+        ]
+        self.assertEqual(len(tile_selects), 0)
+        function_x_graph_selects = [
+            q
+            for q in queries
+            if q["sql"].startswith('SELECT "functions_x_graphs"."id"')
+        ]
+        self.assertEqual(len(function_x_graph_selects), 1)
+
+        names = {
+            str(resource.pk): resource.displayname()
+            for resource in Resource.objects.filter(pk__in=resourceids)
+        }
+        self.assertEqual(names[str(resourceids[0])], "Name: first")
+        self.assertEqual(names[str(resourceids[1])], "Name: second")
+        self.assertEqual(
+            str(Resource.objects.get(pk=resourceids[0]).name), "Name: first"
+        )
@@ -16,6 +16,8 @@ You should have received a copy of the GNU Affero General Public License
 along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
+from collections import defaultdict
+from unittest import mock
 from uuid import UUID
 from arches.app.utils.betterJSONSerializer import JSONSerializer
 from tests.base_test import ArchesTestCase
@@ -23,11 +25,17 @@ from django.db import connection
 from django.contrib.auth.models import User
 from django.db.utils import ProgrammingError
 from django.http import HttpRequest
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from arches.app.functions.base import BaseFunction
 from arches.app.models.tile import Tile, TileValidationError
 from arches.app.models.resource import Resource
+from arches.test.utils import sync_overridden_test_settings_to_arches
 from arches.app.models.models import (
+    BulkIndexQueue,
     CardModel,
     CardXNodeXWidget,
+    EditLog,
     Node,
     NodeGroup,
     ResourceXResource,
@@ -171,6 +179,191 @@ class TileTests(ArchesTestCase):
 
         self.assertEqual(tiles.count(), 2)
 
+    def test_bulk_save(self):
+        """
+        Test that Tile.bulk_save saves nested tiles and logs their edits in bulk
+
+        """
+
+        json = {
+            "tiles": [
+                {
+                    "tiles": [],
+                    "resourceinstance_id": "40000000-0000-0000-0000-000000000000",
+                    "parenttile_id": "",
+                    "nodegroup_id": "72048cb3-adbc-11e6-9ccf-14109fd34195",
+                    "tileid": "",
+                    "data": {
+                        "72048cb3-adbc-11e6-9ccf-14109fd34195": {
+                            "en": {"value": "TEST 1", "direction": "ltr"},
+                        }
+                    },
+                }
+            ],
+            "resourceinstance_id": "40000000-0000-0000-0000-000000000000",
+            "parenttile_id": "",
+            "nodegroup_id": "7204869c-adbc-11e6-8bec-14109fd34195",
+            "tileid": "",
+            "data": {},
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            Tile.bulk_save([Tile(json)], index=False, transaction_id=None)
+
+        edit_log_inserts = [
+            q for q in queries if q["sql"].startswith('INSERT INTO "edit_log"')
+        ]
+        tiles = Tile.objects.filter(
+            resourceinstance_id="40000000-0000-0000-0000-000000000000"
+        )
+        self.assertEqual(tiles.count(), 2)
+        self.assertEqual(len(edit_log_inserts), 1)
+        self.assertEqual(
+            EditLog.objects.filter(
+                resourceinstanceid="40000000-0000-0000-0000-000000000000",
+                edittype="tile create",
+            ).count(),
+            2,
+        )
+
+    def test_bulk_save_with_legacy_function_signatures(self):
+        """
+        Test that Tile.bulk_save logs and skips functions whose save and post_save
+        hooks don't take a context, as Tile.save does
+
+        """
+
+        class LegacyFunction(BaseFunction):
+            def save(self, tile, request):
+                pass
+
+            def post_save(self, tile, request):
+                pass
+
+        json = {
+            "tiles": [
+                {
+                    "tiles": [],
+                    "resourceinstance_id": "40000000-0000-0000-0000-000000000000",
+                    "parenttile_id": "",
+                    "nodegroup_id": "72048cb3-adbc-11e6-9ccf-14109fd34195",
+                    "tileid": "",
+                    "data": {
+                        "72048cb3-adbc-11e6-9ccf-14109fd34195": {
+                            "en": {"value": "TEST 1", "direction": "ltr"},
+                        }
+                    },
+                }
+            ],
+            "resourceinstance_id": "40000000-0000-0000-0000-000000000000",
+            "parenttile_id": "",
+            "nodegroup_id": "7204869c-adbc-11e6-8bec-14109fd34195",
+            "tileid": "",
+            "data": {},
+        }
+
+        with (
+            mock.patch.object(
+                Tile,
+                "_get_function_class_instances_by_nodegroup",
+                return_value=defaultdict(lambda: [LegacyFunction()]),
+            ),
+            self.assertLogs("arches.app.models.tile", level="WARNING") as logs,
+        ):
+            Tile.bulk_save([Tile(json)], index=False, transaction_id=None)
+
+        self.assertEqual(
+            Tile.objects.filter(
+                resourceinstance_id="40000000-0000-0000-0000-000000000000",
+                nodegroup_id="72048cb3-adbc-11e6-9ccf-14109fd34195",
+            ).count(),
+            1,
+        )
+        self.assertEqual(len([line for line in logs.output if "TypeError" in line]), 2)
+
+    @override_settings(DEFER_INDEXING_TO_QUEUE=True)
+    def test_save_queues_resource_for_indexing(self):
+        """
+        Test that saving a tile many times queues its resource for indexing once
+
+        """
+
+        json = {
+            "tiles": [],
+            "resourceinstance_id": "40000000-0000-0000-0000-000000000000",
+            "parenttile_id": None,
+            "nodegroup_id": "6f985347-adbc-11e6-a0fc-14109fd34195",
+            "tileid": "",
+            "data": {
+                "6f985347-adbc-11e6-a0fc-14109fd34195": {
+                    "en": {"value": "TEST 1", "direction": "ltr"}
+                }
+            },
+        }
+
+        t = Tile(json)
+        with sync_overridden_test_settings_to_arches():
+            for value in ("TEST 1", "TEST 2", "TEST 3"):
+                t.data["6f985347-adbc-11e6-a0fc-14109fd34195"]["en"]["value"] = value
+                t.save()
+
+        queued = BulkIndexQueue.objects.filter(
+            resourceinstanceid="40000000-0000-0000-0000-000000000000"
+        )
+        self.assertEqual(queued.count(), 1)
+
+    def test_dequeue_keeps_requeued_resources(self):
+        resourceid = "40000000-0000-0000-0000-000000000000"
+        BulkIndexQueue.enqueue([resourceid])
+        queued_entries = list(
+            BulkIndexQueue.objects.values_list("resourceinstanceid", "createddate")
+        )
+
+        BulkIndexQueue.enqueue([resourceid])
+        BulkIndexQueue.dequeue(queued_entries)
+        self.assertTrue(BulkIndexQueue.objects.filter(pk=resourceid).exists())
+
+        queued_entries = list(
+            BulkIndexQueue.objects.values_list("resourceinstanceid", "createddate")
+        )
+        BulkIndexQueue.dequeue(queued_entries)
+        self.assertFalse(BulkIndexQueue.objects.filter(pk=resourceid).exists())
+
+    def test_tiles_share_cached_published_graph(self):
+        """
+        Test that loading many tiles of a resource doesn't query the published graph per tile
+
+        """
+
+        json = {
+            "tiles": [],
+            "resourceinstance_id": "40000000-0000-0000-0000-000000000000",
+            "parenttile_id": None,
+            "nodegroup_id": "6f985347-adbc-11e6-a0fc-14109fd34195",
+            "tileid": "",
+            "data": {
+                "6f985347-adbc-11e6-a0fc-14109fd34195": {
+                    "en": {"value": "TEST 1", "direction": "ltr"}
+                }
+            },
+        }
+        for i in range(3):
+            Tile(json).save(index=False)
+
+        with CaptureQueriesContext(connection) as queries:
+            tiles = list(
+                Tile.objects.filter(
+                    resourceinstance_id="40000000-0000-0000-0000-000000000000"
+                )
+            )
+
+        published_graph_selects = [
+            q for q in queries if 'FROM "published_graphs"' in q["sql"]
+        ]
+        self.assertEqual(len(tiles), 3)
+        self.assertLessEqual(len(published_graph_selects), 1)
+        self.assertIs(tiles[0].serialized_graph, tiles[2].serialized_graph)
+
     def test_simple_get(self):
         """
         Test that we can get a Tile object
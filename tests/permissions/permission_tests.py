@@ -13,14 +13,26 @@ You should have received a copy of the GNU Affero General Public License
 along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
+from unittest import mock
 from django.contrib.auth.models import User
 from django.contrib.auth.models import Group
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import override_settings
 from guardian.shortcuts import assign_perm
-from arches.app.models.models import ResourceInstance, Node
+from arches.app.models.models import ResourceInstance, Node, NodeGroup
 from arches.app.models.resource import Resource
 from arches.app.utils.permission_backend import user_can_read_resource
 from arches.app.utils.permission_backend import user_has_resource_model_permissions
 from arches.app.utils.permission_backend import get_restricted_users
+from arches.app.utils.permission_backend import get_nodegroup_ids_by_perm
+from arches.app.permissions.arches_permission_base import (
+    CachedObjectPermissionChecker,
+    get_nodegroup_permissions,
+    get_nodegroups_by_perm_for_user_or_group,
+    get_permissions_version_key,
+    local_permission_cache,
+)
+from arches.test.utils import sync_overridden_test_settings_to_arches
 from tests.base_test import ArchesTestCase
 
 # these tests can be run from the command line via
@@ -128,6 +140,107 @@ class PermissionTests(ArchesTestCase):
         )
         self.assertFalse(hasperms)
 
+    def test_get_nodegroup_ids_by_perm(self):
+        """
+        Tests that the cached nodegroup permissions follow permission changes.
+
+        """
+
+        nodegroup = (
+            Node.objects.filter(graph_id=self.data_type_graphid)
+            .exclude(nodegroup__isnull=True)
+            .select_related("nodegroup")
+            .first()
+            .nodegroup
+        )
+        readable_nodegroups = get_nodegroup_ids_by_perm(
+            self.user, "models.read_nodegroup"
+        )
+        self.assertIsInstance(readable_nodegroups, frozenset)
+        self.assertIn(nodegroup.pk, readable_nodegroups)
+
+        assign_perm("no_access_to_nodegroup", self.user, nodegroup)
+        readable_nodegroups = get_nodegroup_ids_by_perm(
+            self.user, "models.read_nodegroup"
+        )
+        self.assertNotIn(nodegroup.pk, readable_nodegroups)
+        self.assertEqual(
+            {
+                permitted.pk
+                for permitted in get_nodegroups_by_perm_for_user_or_group(
+                    self.user, "models.read_nodegroup"
+                )
+            },
+            readable_nodegroups,
+        )
+
+    def test_cached_object_permission_checker(self):
+        """
+        Tests that the cached object permissions hold the codenames of each object by pk.
+
+        """
+
+        nodegroups = list(
+            {
+                node.nodegroup
+                for node in Node.objects.filter(graph_id=self.data_type_graphid)
+                .exclude(nodegroup__isnull=True)
+                .select_related("nodegroup")
+            }
+        )[:2]
+        assign_perm("no_access_to_nodegroup", self.user, nodegroups[0])
+
+        checker = CachedObjectPermissionChecker(self.user, nodegroups[0])
+        self.assertIn("no_access_to_nodegroup", checker.get_perms(nodegroups[0]))
+        self.assertNotIn("no_access_to_nodegroup", checker.get_perms(nodegroups[1]))
+        self.assertFalse(self.user.has_perm("read_nodegroup", nodegroups[0]))
+
+    @override_settings(PERMISSION_CACHE_SIZE=100, PERMISSION_CACHE_CHECK_INTERVAL=60)
+    def test_permissions_are_cached_in_the_process(self):
+        """
+        Tests that cached permissions are served from the process until one of them changes
+
+        """
+
+        # stands in for the user_permission cache shared by every process
+        shared_cache = LocMemCache("test_user_permission", {})
+        local_permission_cache.clear()
+        self.addCleanup(local_permission_cache.clear)
+        key = f"nodegroup_permissions:u:{self.user.pk}"
+        version_key = get_permissions_version_key(self.user)
+        nodegroup = NodeGroup.objects.first()
+
+        with (
+            sync_overridden_test_settings_to_arches(),
+            mock.patch(
+                "arches.app.permissions.arches_permission_base.caches",
+                {"user_permission": shared_cache},
+            ),
+        ):
+            permissions = get_nodegroup_permissions(self.user)
+            self.assertIn(key, local_permission_cache)
+
+            # the versions of a new entry are checked once, then not within the interval
+            with self.assertNumQueries(0):
+                self.assertIs(get_nodegroup_permissions(self.user), permissions)
+            with (
+                mock.patch.object(shared_cache, "get") as get,
+                mock.patch.object(shared_cache, "get_many") as get_many,
+                self.assertNumQueries(0),
+            ):
+                self.assertIs(get_nodegroup_permissions(self.user), permissions)
+            get.assert_not_called()
+            get_many.assert_not_called()
+
+            version = shared_cache.get(version_key, 0)
+            assign_perm("no_access_to_nodegroup", self.user, nodegroup)
+            self.assertNotEqual(shared_cache.get(version_key, 0), version)
+            self.assertNotIn(key, local_permission_cache)
+            self.assertEqual(
+                get_nodegroup_permissions(self.user)[nodegroup.pk],
+                frozenset(["no_access_to_nodegroup"]),
+            )
+
     def test_get_restricted_users(self):
         """
         Tests that users are properly identified as restricted.
@@ -25,6 +25,7 @@ from arches.app.models.models import ResourceInstance, Node
 from arches.app.permissions.arches_default_allow import (
     ArchesDefaultAllowPermissionFramework,
 )
+from arches.app.search.search import SearchEngine
 
 # these tests can be run from the command line via
 # python manage.py test tests.permissions.permission_tests --settings="tests.test_settings"
@@ -252,6 +253,46 @@ class ArchesDefaultAllowPermissionsTests(ArchesPermissionFrameworkTestCase):
             with self.subTest(result=result):
                 self.assertTrue(result)
 
+    def test_filter_resource_ids(self):
+        """
+        Tests that resources a user has no access to are filtered out without searching the index
+        """
+
+        resource = ResourceInstance.objects.get(
+            resourceinstanceid=self.resource_instance_id
+        )
+        other_resource_id = "4ed2e2a8-4a8d-4e7a-8a83-1e0eb2d3d5c4"
+        resource_ids = [self.resource_instance_id, other_resource_id]
+
+        with patch.object(SearchEngine, "search") as search:
+            unrestricted = self.framework.filter_resource_ids(self.user, resource_ids)
+            self.framework.assign_perm(
+                "no_access_to_resourceinstance", self.group, resource
+            )
+            restricted = self.framework.filter_resource_ids(self.user, resource_ids)
+            self.framework.assign_perm("view_resourceinstance", self.user, resource)
+            overridden = self.framework.filter_resource_ids(self.user, resource_ids)
+            search.assert_not_called()
+
+        self.assertEqual(unrestricted, resource_ids)
+        self.assertEqual(restricted, [other_resource_id])
+        self.assertEqual(overridden, resource_ids)
+
+    def test_get_restricted_instances_from_object_permissions(self):
+        resource = ResourceInstance.objects.get(
+            resourceinstanceid=self.resource_instance_id
+        )
+        self.framework.assign_perm("no_access_to_resourceinstance", self.user, resource)
+
+        exclusive_set, restricted = self.framework.get_filtered_instances(
+            self.user, resources=[self.resource_instance_id]
+        )
+        admin = User.objects.get(username="admin")
+
+        self.assertFalse(exclusive_set)
+        self.assertEqual(restricted, [self.resource_instance_id])
+        self.assertEqual(self.framework.get_restricted_instances(admin), [])
+
     @patch("django.contrib.auth.models.User")
     def test_permission_search_filter(self, mock_User):
         mock_User.id = 12
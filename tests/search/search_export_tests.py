@@ -2,6 +2,7 @@ import uuid
 import csv
 import io
 import time
+import zipfile
 from base64 import b64encode
 from http import HTTPStatus
 from arches.app.models import models
@@ -184,6 +185,32 @@ class SearchExportTests(ArchesTestCase):
             )
             break
 
+    def test_export_to_zipfile(self):
+        """Test streaming search results to a zipped CSV saved to the export history"""
+        request = self.factory.get("/search?tiles=True&export=True&format=tilecsv")
+        request.user = self.user
+        exporter = SearchResultsExporter(search_request=request)
+        exportid = exporter.export_to_zipfile(
+            format="tilecsv", report_link="false", export_name="streamed", page_size=1
+        )
+        export = models.SearchExportHistory.objects.get(pk=exportid)
+        self.assertEqual(export.numberofinstances, 1)
+        with export.downloadfile.open("rb") as f:
+            with zipfile.ZipFile(f) as zip:
+                [name] = zip.namelist()
+                csv_content = zip.read(name).decode("utf-8")
+        self.assertIn(".csv", name)
+        rows = list(csv.DictReader(io.StringIO(csv_content)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["resourceid"], str(self.test_resourceinstanceid))
+
+    def test_export_to_zipfile_unsupported_format(self):
+        request = self.factory.get("/search?tiles=True&export=True&format=shp")
+        request.user = self.user
+        exporter = SearchResultsExporter(search_request=request)
+        with self.assertRaisesMessage(Exception, "Unable to stream an export to shp"):
+            exporter.export_to_zipfile(format="shp", report_link="false")
+
     def test_login_via_basic_auth_good(self):
         auth_string = "Basic " + b64encode(b"admin:admin").decode("utf-8")
         request = RequestFactory().get(
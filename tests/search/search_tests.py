@@ -28,6 +28,7 @@ from arches.app.search.elasticsearch_dsl_builder import (
 )
 from arches.app.search.search_engine_factory import SearchEngineFactory
 from arches.app.utils.betterJSONSerializer import JSONDeserializer
+from arches.app.utils.index_database import bulk_load_index_settings
 from arches.app.views.search import search_terms, search_results
 from django.http import HttpRequest
 from django.contrib.auth.models import User
@@ -59,6 +60,7 @@ class SearchTests(ArchesTestCase):
         with captured_stdout():
             se.delete_index(index="test")
             se.delete_index(index="bulk")
+            se.delete_index(index="bluegreen")
         super().tearDownClass()
 
     def setUp(self):
@@ -136,6 +138,41 @@ class SearchTests(ArchesTestCase):
         count_after = se.count(index="bulk")
         self.assertEqual(count_after, 1001)
 
+    def test_bulk_load_index_settings(self):
+        se = SearchEngineFactory().create()
+        with captured_stdout():
+            se.create_index(index="bulk")
+        se.put_index_settings(index="bulk", settings={"index.refresh_interval": "5s"})
+
+        with bulk_load_index_settings(["bulk"]):
+            index_settings = se.get_index_settings(index="bulk")
+            self.assertEqual(index_settings["index.refresh_interval"], "-1")
+            self.assertEqual(index_settings["index.number_of_replicas"], "0")
+
+        index_settings = se.get_index_settings(index="bulk")
+        self.assertEqual(index_settings["index.refresh_interval"], "5s")
+
+    def test_swap_aliases(self):
+        se = SearchEngineFactory().create()
+        with captured_stdout():
+            se.create_index(index="bluegreen")
+            se.create_index(index="bluegreen_1")
+            se.create_index(index="bluegreen_2")
+
+        # an existing index with the alias name is replaced by the alias
+        se.swap_aliases({"bluegreen": "bluegreen_1"})
+        self.assertEqual(
+            se.get_alias_indexes("bluegreen"), [se._add_prefix("bluegreen_1")]
+        )
+
+        se.index_data(index="bluegreen", body={"value": "test"}, id="1")
+        se.swap_aliases({"bluegreen": "bluegreen_2"})
+        self.assertEqual(
+            se.get_alias_indexes("bluegreen"), [se._add_prefix("bluegreen_2")]
+        )
+        self.assertFalse(se.es.indices.exists(index=se._add_prefix("bluegreen_1")))
+        self.assertEqual(se.count(index="bluegreen"), 0)
+
     def test_search_terms(self):
         """
         Test finding a resource by a term
@@ -71,6 +71,8 @@ CACHES = {
         "LOCATION": "user_permission_cache",
     },
 }
+# the permissions cached in the process would outlive the rolled back transaction of each test
+PERMISSION_CACHE_SIZE = 0
 
 LOGGING["loggers"]["arches"]["level"] = "ERROR"
 
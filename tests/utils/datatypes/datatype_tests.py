@@ -17,9 +17,22 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
 import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 
 from arches.app.datatypes.base import BaseDataType
+from arches.app.datatypes.concept_types import ConceptDataType
 from arches.app.datatypes.datatypes import DataTypeFactory
+from arches.app.models import models
+from arches.app.models.concept import (
+    CONCEPT_CACHE_VERSION_KEY,
+    invalidate_concept_caches,
+)
 from arches.app.models.models import Language
 from arches.app.models.tile import Tile
 from tests.base_test import ArchesTestCase
@@ -246,3 +259,89 @@ class URLDataTypeTests(ArchesTestCase):
         self.assertIsNotNone(tile1.data[nodeid])
         self.assertTrue("url_label" in tile1.data[nodeid])
         self.assertFalse(tile1.data[nodeid]["url_label"])
+
+
+class ConceptDataTypeTests(ArchesTestCase):
+    def test_warm_cache(self):
+        concept = DataTypeFactory().get_instance("concept")
+        conceptid = "00000000-0000-0000-0000-000000000007"
+        valueid = "ac41d9be-79db-4256-b368-2f4559cfbe55"
+        models.Value.objects.create(
+            concept_id=conceptid, valuetype_id="min_year", value="1900"
+        )
+        models.Value.objects.create(
+            concept_id=conceptid, valuetype_id="max_year", value="1950"
+        )
+        nodeid = str(uuid.uuid4())
+        tiles = [SimpleNamespace(data={nodeid: valueid}) for i in range(3)]
+        invalidate_concept_caches()
+
+        with CaptureQueriesContext(connection) as queries:
+            concept.warm_cache(tiles, [nodeid])
+        with self.assertNumQueries(0):
+            value = concept.get_value(valueid)
+            date_range = concept.get_concept_dates(value.concept_id)
+
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(value.value, "is related to")
+        self.assertEqual(date_range, {"min_year": "1900", "max_year": "1950"})
+        self.assertEqual(concept.get_cache_stats()["value_lookup"]["size"], 1)
+
+    @override_settings(PUBLISHED_GRAPHS_VERSION_CACHE="shared")
+    def test_lookups_are_invalidated_by_other_processes(self):
+        shared_cache = LocMemCache("test_concept_lookups", {})
+        with mock.patch(
+            "arches.app.utils.graph_cache.caches", {"shared": shared_cache}
+        ):
+            concept = ConceptDataType()
+            for lookup in concept.get_cache_stats():
+                self.assertEqual(getattr(concept, lookup).cache_alias, "shared")
+                self.assertIsNotNone(getattr(concept, lookup).timeout)
+            concept.value_lookup.set("value", "cached")
+
+            # another process saves a concept
+            shared_cache.set(CONCEPT_CACHE_VERSION_KEY, 1, None)
+            self.assertTrue(concept.value_lookup.check_version(force=True))
+            self.assertIsNone(concept.value_lookup.get("value"))
+
+    def test_get_display_values(self):
+        valueid = "ac41d9be-79db-4256-b368-2f4559cfbe55"
+        concept_node = SimpleNamespace(nodeid=uuid.uuid4(), datatype="concept")
+        string_node = SimpleNamespace(nodeid=uuid.uuid4(), datatype="string")
+        tiles = [
+            {
+                "data": {
+                    str(concept_node.nodeid): valueid,
+                    str(string_node.nodeid): {
+                        "en": {"value": f"label {i}", "direction": "ltr"}
+                    },
+                },
+                "provisionaledits": None,
+            }
+            for i in range(3)
+        ]
+        pairs = [(tile, concept_node) for tile in tiles] + [
+            (tile, string_node) for tile in tiles
+        ]
+        invalidate_concept_caches()
+
+        datatype_factory = DataTypeFactory()
+        datatype_factory.get_instance("string")
+        with self.assertNumQueries(2):
+            display_values = datatype_factory.get_display_values(pairs)
+
+        self.assertEqual(
+            display_values,
+            ["is related to"] * 3 + ["label 0", "label 1", "label 2"],
+        )
+
+    def test_caches_are_invalidated(self):
+        concept = DataTypeFactory().get_instance("concept")
+        valueid = "ac41d9be-79db-4256-b368-2f4559cfbe55"
+        concept.get_value(valueid)
+        models.Value.objects.filter(pk=valueid).update(value="is linked to")
+        self.assertEqual(concept.get_value(valueid).value, "is related to")
+
+        invalidate_concept_caches()
+
+        self.assertEqual(concept.get_value(valueid).value, "is linked to")
@@ -6,6 +6,7 @@ from unittest import mock, TestCase
 from arches.app.models import models
 from arches.app.models.tile import Tile
 from arches.app.models.resource import Resource
+from arches.app.utils.graph_cache import GraphStructure
 from arches.app.utils.label_based_graph import (
     LabelBasedGraph,
     LabelBasedNode,
@@ -210,6 +211,10 @@ class LabelBasedGraphTests(TestCase):
             mock__build_graph.assert_called_once()
 
 
+@mock.patch(
+    "arches.app.utils.label_based_graph.published_graph_cache.get_structure",
+    new=mock.Mock(return_value=None),
+)
 @mock.patch("arches.app.utils.label_based_graph.models.NodeGroup")
 @mock.patch("arches.app.utils.label_based_graph.models.Node")
 class LabelBasedGraph_FromResourceTests(TestCase):
@@ -458,6 +463,90 @@ class LabelBasedGraph_FromResourceTests(TestCase):
             {},
         )
 
+    def test_looks_up_nodes_in_graph_structure(self, mock_Node, mock_NodeGroup):
+        mock_NodeGroup.objects.filter.return_value.values.return_value = [
+            {"nodegroupid": self.grouping_tile.nodegroup_id, "cardinality": "1"}
+        ]
+        graph_structure = GraphStructure(
+            "graph",
+            "publication",
+            [self.grouping_node, self.string_node],
+            [
+                models.Edge(
+                    domainnode_id=self.grouping_node.pk,
+                    rangenode_id=self.string_node.pk,
+                )
+            ],
+        )
+
+        self.grouping_tile.data = {
+            str(self.string_node.pk): {"en": {"value": "value_2", "direction": "ltr"}}
+        }
+        self.test_resource.tiles.append(self.grouping_tile)
+        label_based_graph = LabelBasedGraph.from_resource(
+            resource=self.test_resource,
+            compact=False,
+            hide_empty_nodes=False,
+            graph_structure=graph_structure,
+        )
+
+        mock_Node.objects.get.assert_not_called()
+        self.assertEqual(
+            label_based_graph[self.grouping_node.name][self.string_node.name][
+                VALUE_KEY
+            ],
+            "value_2",
+        )
+
+    def test_looks_up_display_values_together(self, mock_Node, mock_NodeGroup):
+        mock_Node.objects.get.return_value = self.string_node
+        mock_Node.objects.in_bulk.return_value = {self.string_node.pk: self.string_node}
+        mock_NodeGroup.objects.filter.return_value.values.return_value = [
+            {"nodegroupid": self.string_tile.nodegroup_id, "cardinality": "1"}
+        ]
+
+        self.test_resource.tiles.append(self.string_tile)
+
+        with mock.patch(
+            "arches.app.utils.label_based_graph.DataTypeFactory.get_display_values",
+            return_value=["batched value"],
+        ) as mock_get_display_values:
+            label_based_graph = LabelBasedGraph.from_resource(
+                resource=self.test_resource, compact=False, hide_empty_nodes=False
+            )
+
+        mock_get_display_values.assert_called_once_with(
+            [(self.string_tile, self.string_node)]
+        )
+        self.assertEqual(
+            label_based_graph[self.string_node.name][VALUE_KEY], "batched value"
+        )
+
+    def test_falls_back_to_display_values_one_at_a_time(
+        self, mock_Node, mock_NodeGroup
+    ):
+        mock_Node.objects.get.return_value = self.string_node
+        mock_Node.objects.in_bulk.return_value = {self.string_node.pk: self.string_node}
+        mock_NodeGroup.objects.filter.return_value.values.return_value = [
+            {"nodegroupid": self.string_tile.nodegroup_id, "cardinality": "1"}
+        ]
+
+        self.test_resource.tiles.append(self.string_tile)
+
+        with (
+            mock.patch(
+                "arches.app.utils.label_based_graph.DataTypeFactory.get_display_values",
+                side_effect=KeyError("nodeid"),
+            ),
+            self.assertLogs("arches.app.utils.label_based_graph", "ERROR") as logs,
+        ):
+            label_based_graph = LabelBasedGraph.from_resource(
+                resource=self.test_resource, compact=False, hide_empty_nodes=False
+            )
+
+        self.assertIn("KeyError", logs.output[0])
+        self.assertEqual(label_based_graph[self.string_node.name][VALUE_KEY], "value_1")
+
     @mock.patch("arches.app.utils.label_based_graph.models.CardModel")
     def test_handle_hidden_nodes(self, mock_CardModel, mock_Node, mock_NodeGroup):
         filter_mock = mock.MagicMock()
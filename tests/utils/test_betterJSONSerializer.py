@@ -1,7 +1,17 @@
+import datetime
+import decimal
+import io
+import uuid
+
 from django.test import SimpleTestCase
 
 from arches.app.models.fields.i18n import I18n_JSON, I18n_String
-from arches.app.utils.betterJSONSerializer import JSONSerializer
+from arches.app.utils.betterJSONSerializer import JSONSerializer, JSONStreamEncoder
+from tests.benchmarks.json_serializer_benchmark import (
+    resource_payload,
+    search_payload,
+    tile_payload,
+)
 
 # these tests can be run from the command line via
 # python manage.py test tests.utils.test_betterJSONSerializer --settings="tests.test_settings"
@@ -24,3 +34,70 @@ class TestBetterJSONSerializer(SimpleTestCase):
         serializer = JSONSerializer()
         encoded = serializer.encode(string)
         self.assertEqual(encoded, '{"en": "English label", "de": "German label"}')
+
+    def test_serialize_matches_json_module(self):
+        class Serializable(object):
+            def serialize(self):
+                return {"date": datetime.date(2024, 1, 2), "values": (1.5, None)}
+
+        class Attributes(object):
+            def __init__(self):
+                self.name = "name"
+                self.method = len
+
+        obj = {
+            "tileid": uuid.UUID("c4c3a7d0-1b1a-4d3b-8f8e-5d2f2c9d3a1e"),
+            "data": {
+                "b": [1, 2.5, float("nan"), True, None, b"bytes"],
+                "a": {"en": {"value": 'caf\u00e9 "quoted"', "direction": "ltr"}},
+                "c": decimal.Decimal("1.10"),
+            },
+            "sortorder": 0,
+            "skipped": len,
+            "set": {3},
+            1: "int key",
+            "serializable": Serializable(),
+            "attributes": Attributes(),
+            "edited": datetime.datetime(2024, 1, 2, 3, 4, 5, 123456),
+        }
+        for options in (
+            {},
+            {"sort_keys": False},
+            {"indent": 4},
+            {"indent": 2, "ensure_ascii": False, "sort_keys": False},
+            {"separators": (",", ":")},
+        ):
+            self.assertEqual(
+                JSONSerializer().serialize(obj, **options),
+                JSONSerializer().serialize_with_json_module(obj, **options),
+            )
+
+    def test_serialize_payloads_match_json_module(self):
+        payloads = (
+            [tile_payload() for i in range(100)],
+            resource_payload(),
+            search_payload(),
+        )
+        serializer = JSONSerializer()
+        for payload in payloads:
+            for options in ({}, {"sort_keys": False}):
+                self.assertEqual(
+                    serializer.serialize(payload, **options),
+                    serializer.serialize_with_json_module(payload, **options),
+                )
+
+    def test_serialize_raw_values(self):
+        serializer = JSONSerializer()
+        self.assertEqual(serializer.serialize("raw string"), "raw string")
+        self.assertEqual(serializer.serialize(b"bytes"), "bytes")
+        self.assertEqual(
+            serializer.serialize(uuid.UUID(int=1)),
+            "00000000-0000-0000-0000-000000000001",
+        )
+        self.assertEqual(serializer.serialize({}), "{}")
+        self.assertEqual(serializer.serialize({"method": len}), "{}")
+
+    def test_stream_encoder_dump(self):
+        stream = io.BytesIO()
+        JSONStreamEncoder().dump({"b": 1, "a": ["\u00e9"]}, stream)
+        self.assertEqual(stream.getvalue(), b'{"b": 1, "a": ["\\u00e9"]}')
@@ -0,0 +1,156 @@
+from arches.app.models import models
+from arches.app.utils.graph_cache import (
+    PUBLISHED_GRAPHS_VERSION_KEY,
+    CachedPublishedGraph,
+    GraphStructure,
+    LRUDict,
+    PublishedGraphCache,
+    VersionedLRUDict,
+)
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+from unittest import mock
+
+# these tests can be run from the command line via
+# python manage.py test tests.utils.test_graph_cache --settings="tests.test_settings"
+
+
+class GraphCacheTests(SimpleTestCase):
+
+    def test_cached_published_graph_lookups(self):
+        serialized_graph = {
+            "nodes": [
+                {"nodeid": "1", "nodegroup_id": None, "datatype": "semantic"},
+                {"nodeid": "2", "nodegroup_id": "2", "datatype": "string"},
+                {"nodeid": "3", "nodegroup_id": "2", "datatype": "number"},
+            ]
+        }
+        cached_graph = CachedPublishedGraph("publication", "en", serialized_graph)
+
+        self.assertEqual(cached_graph.get_node("3")["datatype"], "number")
+        self.assertIsNone(cached_graph.get_node("4"))
+        self.assertEqual(
+            [node["nodeid"] for node in cached_graph.get_nodes_by_nodegroup("2")],
+            ["2", "3"],
+        )
+        self.assertEqual(cached_graph.get_nodes_by_nodegroup("1"), [])
+
+    def test_graph_structure_lookups(self):
+        root = models.Node(nodeid="1", name="root", istopnode=True)
+        root_child = models.Node(nodeid="2", name="root child", istopnode=False)
+        collector = models.Node(nodeid="3", nodegroup_id="3", istopnode=False)
+        member = models.Node(nodeid="4", nodegroup_id="3", istopnode=False)
+        child_collector = models.Node(nodeid="5", nodegroup_id="5", istopnode=False)
+        edges = [
+            models.Edge(domainnode_id="1", rangenode_id="2"),
+            models.Edge(domainnode_id="1", rangenode_id="3"),
+            models.Edge(domainnode_id="3", rangenode_id="4"),
+            models.Edge(domainnode_id="4", rangenode_id="5"),
+        ]
+        structure = GraphStructure(
+            "graph",
+            "publication",
+            [root, root_child, collector, member, child_collector],
+            edges,
+        )
+
+        self.assertIs(structure.root, root)
+        self.assertEqual(structure.root_edges, (edges[0],))
+        self.assertEqual(structure.get_nodegroup_edges("3"), (edges[2],))
+        self.assertEqual(structure.get_nodegroup_edges("5"), ())
+        self.assertIs(structure.get_nodegroup_in_edge("5"), edges[3])
+        self.assertIs(structure.get_nodegroup_in_edge("5").domainnode, member)
+        self.assertEqual(structure.get_child_nodes("1"), [root_child, collector])
+        self.assertEqual(structure.get_child_nodes("5"), [])
+
+    def test_lru_dict_discards_least_recently_used(self):
+        lru = LRUDict(maxsize=2)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        lru.get("a")
+        lru.set("c", 3)
+
+        self.assertEqual(len(lru), 2)
+        self.assertIsNone(lru.get("b"))
+        self.assertEqual(lru.get("a"), 1)
+
+    def test_lru_dict_expires_entries_after_timeout(self):
+        lru = LRUDict(maxsize=2, timeout=10)
+        with mock.patch("arches.app.utils.graph_cache.time.monotonic") as monotonic:
+            monotonic.return_value = 100
+            lru.set("a", 1)
+            monotonic.return_value = 105
+            self.assertEqual(lru.get("a"), 1)
+            monotonic.return_value = 111
+            self.assertIsNone(lru.get("a"))
+
+        self.assertEqual(len(lru), 0)
+
+    def test_lru_dict_counts_hits_and_misses(self):
+        lru = LRUDict(maxsize=2)
+        lru.set("a", 1)
+        lru.get("a")
+        lru.get("b")
+
+        self.assertEqual(lru.stats(), {"hits": 1, "misses": 1, "size": 1, "maxsize": 2})
+
+    def test_versioned_lru_dicts_are_invalidated_together(self):
+        first = VersionedLRUDict("test_version", check_interval=60)
+        second = VersionedLRUDict("test_version", check_interval=60)
+        first.set("a", 1)
+        second.set("a", 2)
+        self.assertEqual(second.get("a"), 2)
+
+        first.invalidate()
+
+        self.assertIsNone(first.get("a"))
+        self.assertIsNone(second.get("a"))
+
+    def test_invalidate_bumps_version(self):
+        shared_cache = LocMemCache("test_invalidate_bumps_version", {})
+        with mock.patch(
+            "arches.app.utils.graph_cache.caches", {"shared": shared_cache}
+        ):
+            graph_cache = PublishedGraphCache(cache_alias="shared")
+            version = graph_cache.get_version()
+            graph_cache.graphs.set(("publication", "en"), "graph")
+            graph_cache.invalidate()
+
+            self.assertNotEqual(graph_cache.get_version(), version)
+            self.assertEqual(len(graph_cache.graphs), 0)
+
+    def test_revalidate_reads_versions_changed_by_other_processes(self):
+        shared_cache = LocMemCache("test_revalidate", {})
+        with mock.patch(
+            "arches.app.utils.graph_cache.caches", {"shared": shared_cache}
+        ):
+            graph_cache = PublishedGraphCache(cache_alias="shared", check_interval=60)
+            graph_cache.graph_publications.set("graph", None)
+            self.assertFalse(graph_cache.revalidate())
+
+            # another process publishes the graph
+            shared_cache.set(PUBLISHED_GRAPHS_VERSION_KEY, 1, None)
+            self.assertIsNone(graph_cache.graph_publications.get("graph", "missing"))
+
+            self.assertTrue(graph_cache.revalidate())
+            self.assertEqual(
+                graph_cache.graph_publications.get("graph", "missing"), "missing"
+            )
+
+    def test_graph_structures_are_cached_per_publication(self):
+        graph_cache = PublishedGraphCache()
+        with (
+            mock.patch.object(
+                graph_cache, "get_publicationid", return_value="publication"
+            ),
+            mock.patch("arches.app.models.models.Node.objects") as nodes,
+            mock.patch("arches.app.models.models.Edge.objects") as edges,
+        ):
+            nodes.filter.return_value.select_related.return_value = []
+            edges.filter.return_value = []
+            structure = graph_cache.get_structure("graph")
+            self.assertIs(graph_cache.get_structure("graph"), structure)
+            graph_cache.invalidate()
+            self.assertIsNot(graph_cache.get_structure("graph"), structure)
+
+        self.assertEqual(nodes.filter.call_count, 2)
@@ -170,3 +170,58 @@ class MvtTilerTests(ArchesTestCase):
         )
 
         self.assertEqual(len(tile), 0)
+
+    def test_get_data_version_changes_with_geometries(self):
+        tiler = MVTTiler()
+        version = tiler.get_data_version(self.search_model_geom_nodeid)
+
+        resource = Resource(graph_id=self.search_model_graphid)
+        resource.tiles.append(
+            Tile(
+                data={self.search_model_geom_nodeid: self.geom},
+                nodegroup_id=self.search_model_geom_nodeid,
+            )
+        )
+        resource.save()
+
+        self.assertGreater(
+            tiler.get_data_version(self.search_model_geom_nodeid), version
+        )
+
+    def test_cache_key_is_shared_by_unrestricted_users(self):
+        tiler = MVTTiler()
+        node = models.Node.objects.get(pk=self.search_model_geom_nodeid)
+
+        unrestricted_key = tiler.create_mvt_cache_key(node, 0, 0, 0, 1)
+        self.assertEqual(unrestricted_key, tiler.create_mvt_cache_key(node, 0, 0, 0, 1))
+        self.assertNotEqual(
+            unrestricted_key, tiler.create_mvt_cache_key(node, 0, 0, 0, 2)
+        )
+        self.assertNotEqual(
+            unrestricted_key,
+            tiler.create_mvt_cache_key(
+                node, 0, 0, 0, 1, [str(self.test_resource.resourceinstanceid)]
+            ),
+        )
+
+    def test_get_excluded_resource_ids(self):
+        tiler = MVTTiler()
+        node = models.Node.objects.get(pk=self.search_model_geom_nodeid)
+        resourceid = str(self.test_resource.resourceinstanceid)
+
+        self.assertEqual(tiler.get_excluded_resource_ids(node, self.user, 0, 0, 0), [])
+
+        assign_perm("no_access_to_resourceinstance", self.user, self.test_resource)
+        self.assertEqual(
+            tiler.get_excluded_resource_ids(node, self.user, 0, 0, 0), [resourceid]
+        )
+
+    def test_get_tile_range(self):
+        tiler = MVTTiler()
+        extent = (-10, -10, 10, 10)
+
+        self.assertEqual(tiler.get_tile_range(extent, 0), (range(0, 1), range(0, 1)))
+        self.assertEqual(tiler.get_tile_range(extent, 1), (range(0, 2), range(0, 2)))
+        self.assertEqual(
+            tiler.get_tile_range((1, 1, 10, 10), 1), (range(1, 2), range(0, 1))
+        )
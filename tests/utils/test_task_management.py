@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+from unittest import mock
+
+from arches.app.utils import task_management
+
+# these tests can be run from the command line via
+# python manage.py test tests.utils.test_task_management --settings="tests.test_settings"
+
+
+class CeleryAvailabilityTests(SimpleTestCase):
+    def setUp(self):
+        # stands in for a cache shared by every process
+        self.cache = LocMemCache("test_celery_availability", {})
+        settings = SimpleNamespace(
+            CELERY_BROKER_URL="memory://",
+            CELERY_AVAILABILITY_CACHE="shared",
+            CELERY_AVAILABILITY_CHECK_INTERVAL=0,
+            CELERY_AVAILABILITY_CACHE_TIMEOUT=60,
+        )
+        patcher = mock.patch.object(task_management, "settings", settings)
+        self.settings = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(task_management, "caches", {"shared": self.cache})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.cache.clear()
+
+    def test_availability_is_read_from_the_cache(self):
+        with mock.patch.object(
+            task_management, "ping_celery", return_value=True
+        ) as ping_celery:
+            self.assertIsNone(task_management.get_celery_availability())
+            self.assertTrue(task_management.check_if_celery_available())
+            self.assertTrue(task_management.check_if_celery_available())
+            self.assertEqual(ping_celery.call_count, 1)
+            self.assertTrue(task_management.get_celery_availability())
+
+    def test_unavailable_celery_is_cached(self):
+        with mock.patch.object(
+            task_management, "ping_celery", return_value=False
+        ) as ping_celery:
+            self.assertFalse(task_management.check_if_celery_available())
+            self.assertFalse(task_management.check_if_celery_available())
+            self.assertEqual(ping_celery.call_count, 1)
+
+    def test_no_broker(self):
+        self.settings.CELERY_BROKER_URL = ""
+        with mock.patch.object(task_management, "ping_celery") as ping_celery:
+            self.assertFalse(task_management.check_if_celery_available())
+            ping_celery.assert_not_called()
+
+    def test_only_one_monitor_pings_per_interval(self):
+        first = task_management.CeleryAvailabilityMonitor()
+        second = task_management.CeleryAvailabilityMonitor()
+        first.pid, second.pid = 1, 2
+        self.settings.CELERY_AVAILABILITY_CHECK_INTERVAL = 30
+
+        with (
+            mock.patch.object(
+                task_management, "ping_celery", return_value=True
+            ) as ping_celery,
+            mock.patch.object(
+                task_management.time, "sleep", side_effect=[None, KeyboardInterrupt]
+            ),
+        ):
+            # run until the second sleep, so the first monitor refreshes twice
+            with self.assertRaises(KeyboardInterrupt):
+                first.run()
+            self.assertFalse(second.refresh(30))
+
+        self.assertEqual(ping_celery.call_count, 1)
+        self.assertEqual(
+            self.cache.get(task_management.CELERY_AVAILABILITY_LOCK_KEY), 1
+        )
+        self.assertTrue(task_management.get_celery_availability())
@@ -31,6 +31,7 @@ from arches.app.utils.betterJSONSerializer import JSONSerializer
 from arches.app.views.search import search_results
 from guardian.shortcuts import assign_perm
 from arches.app.search.components.base import SearchFilterFactory
+from arches.app.search.components.paging_filter import decode_page_token
 from arches.app.search.search_engine_factory import SearchEngineFactory
 from arches.app.search.elasticsearch_dsl_builder import Query, Bool, Match, Nested
 from arches.app.search.mappings import TERMS_INDEX, CONCEPTS_INDEX, RESOURCES_INDEX
@@ -804,6 +805,80 @@ class SearchTests(ArchesTestCase):
             ],
         )
 
+    def test_cursor_search(self):
+        """
+        Page through every result one at a time with the page token of each page
+
+        """
+
+        response_json = get_response_json(self.client, query={"limit": "100"})
+        expected_pks = extract_pks(response_json)
+
+        pks = []
+        query = {"cursor": "true", "limit": "1"}
+        while True:
+            response_json = get_response_json(self.client, query=query)
+            pks += extract_pks(response_json)
+            paginator = response_json["paging-filter"]["paginator"]
+            if not paginator["has_next"]:
+                break
+            query = {"pagetoken": paginator["next_page_token"], "limit": "1"}
+
+        self.assertEqual(len(pks), len(expected_pks))
+        self.assertCountEqual(pks, expected_pks)
+
+    def test_cursor_search_with_bad_or_expired_page_token(self):
+        """
+        Page tokens that can't be decoded or whose point in time has expired
+        ask the client to restart paging
+
+        """
+
+        get_response_json(self.client, query={})  # logs the client in
+        response = self.client.get(
+            "/search/resources", {"pagetoken": "not a token", "limit": "1"}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("restart paging", json.loads(response.content)["message"])
+
+        response_json = get_response_json(
+            self.client, query={"cursor": "true", "limit": "1"}
+        )
+        page_token = response_json["paging-filter"]["paginator"]["next_page_token"]
+        SearchEngineFactory().create().close_point_in_time(
+            decode_page_token(page_token)["pit_id"]
+        )
+        response = self.client.get(
+            "/search/resources", {"pagetoken": page_token, "limit": "1"}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("restart paging", json.loads(response.content)["message"])
+
+    def test_slim_search_results(self):
+        """
+        Slim results only have the descriptors, map popup and references to the geometries
+
+        """
+
+        query = {"resultschema": "slim", "limit": "100"}
+        response_json = get_response_json(self.client, query=query)
+        results = {
+            hit["_source"]["resourceinstanceid"]: hit["_source"]
+            for hit in response_json["results"]["hits"]["hits"]
+        }
+        result = results[str(self.name_resource.pk)]
+        self.assertNotIn("tiles", result)
+        self.assertNotIn("points", result)
+        self.assertNotIn("permissions", result)
+        self.assertIn("displayname", result)
+        self.assertIn("map_popup", result)
+        self.assertEqual(
+            result["tiles_url"],
+            reverse("resource_tiles", kwargs={"resourceid": self.name_resource.pk}),
+        )
+        for geometry in result["geometries"]:
+            self.assertEqual(set(geometry), {"tileid", "nodegroup_id"})
+
     def test_search_returnDsl(self):
         """
         test that a Query object is returned when returnDsl is set to True